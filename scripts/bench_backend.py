@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Measure NumPy reference backend decode tick cost across batch sizes and context lengths."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+
+from modelop.backends import NumpyReferenceBackend, PrefillChunk
+
+
+def bench_decode(batch_size: int, context_tokens: int, ticks: int) -> float:
+    backend = NumpyReferenceBackend()
+    request_ids = [f"bench-{index}" for index in range(batch_size)]
+    prompt = "x" * (context_tokens * 4)
+    backend.prefill(
+        [
+            PrefillChunk(
+                request_id=request_id,
+                adapter_id="adapter-bench",
+                prompt=prompt,
+                prompt_tokens=context_tokens,
+                start=0,
+                tokens=context_tokens,
+            )
+            for request_id in request_ids
+        ]
+    )
+    backend.decode(request_ids)
+
+    started = time.perf_counter()
+    for _ in range(ticks):
+        backend.decode(request_ids)
+    return (time.perf_counter() - started) / ticks
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark NumPy backend decode tick cost.")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--context-tokens", type=int, nargs="+", default=[128, 1024])
+    parser.add_argument("--ticks", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = [
+        {
+            "batch_size": batch_size,
+            "context_tokens": context_tokens,
+            "decode_tick_ms": bench_decode(batch_size, context_tokens, args.ticks) * 1e3,
+        }
+        for batch_size in args.batch_sizes
+        for context_tokens in args.context_tokens
+    ]
+    print(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
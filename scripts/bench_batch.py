@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Compare items/sec through /v1/generate against the same items sent to /v1/generate/batch."""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from modelop.config import GatewayConfig, TenantPolicy
+from modelop.gateway import create_app
+
+
+def _config(args: argparse.Namespace) -> GatewayConfig:
+    return GatewayConfig(
+        max_batch_items=args.batch_size,
+        scheduler_queue_capacity=args.items,
+        scheduler_max_active_sequences=args.slots,
+        scheduler_decode_step_seconds=args.decode_step_seconds,
+        scheduler_prefill_token_seconds=0.0,
+        enable_prefix_cache=False,
+        tenant_policies={
+            "bench": TenantPolicy(
+                rate_tokens_per_sec=1e9, burst_tokens=1e9, default_adapter_id="adapter-bench"
+            )
+        },
+    )
+
+
+async def run_mode(mode: str, args: argparse.Namespace) -> dict[str, float | int | str]:
+    app = create_app(_config(args))
+    prompts = [f"benchmark prompt {index} " * 4 for index in range(args.items)]
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            started = time.perf_counter()
+            if mode == "single":
+                responses = await asyncio.gather(
+                    *(
+                        client.post(
+                            "/v1/generate",
+                            json={"tenant_id": "bench", "prompt": prompt, "max_new_tokens": 1},
+                        )
+                        for prompt in prompts
+                    )
+                )
+                ok = sum(response.status_code == 200 for response in responses)
+            else:
+                batches = [
+                    prompts[start : start + args.batch_size]
+                    for start in range(0, len(prompts), args.batch_size)
+                ]
+                responses = await asyncio.gather(
+                    *(
+                        client.post(
+                            "/v1/generate/batch",
+                            json={
+                                "tenant_id": "bench",
+                                "items": [{"prompt": prompt, "max_new_tokens": 1} for prompt in batch],
+                            },
+                        )
+                        for batch in batches
+                    )
+                )
+                ok = sum(
+                    result["status"] == 200
+                    for response in responses
+                    for result in response.json()["results"]
+                )
+            elapsed = time.perf_counter() - started
+    return {"mode": mode, "items": args.items, "ok": ok, "items_per_sec": round(ok / elapsed, 1)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark bulk admission against single requests.")
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--slots", type=int, default=256)
+    parser.add_argument("--decode-step-seconds", type=float, default=0.001)
+    args = parser.parse_args()
+
+    print(json.dumps([asyncio.run(run_mode(mode, args)) for mode in ("single", "batch")], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Compare scheduler per-tick cost for the Python and NumPy batch state engines."""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+
+from modelop.capacity import KVPressureTracker
+from modelop.scheduler import ContinuousBatchingScheduler, InferenceJob
+from modelop.telemetry import Telemetry
+
+
+class NullTelemetry(Telemetry):
+    """Discards every metric, so neither engine's tick pays for Prometheus.
+
+    The Python engine reports a TPOT sample per token and the NumPy engine one
+    per finished sequence; recording them would fold that difference into the
+    comparison.
+    """
+
+
+for _name in dir(Telemetry):
+    if _name.startswith(("observe_", "record_", "add_", "set_", "tick_")):
+        setattr(NullTelemetry, _name, lambda self, *args, **kwargs: None)
+
+
+def _fill(scheduler: ContinuousBatchingScheduler, slots: int, loop: asyncio.AbstractEventLoop) -> None:
+    now = time.monotonic()
+    for index in range(slots):
+        scheduler._assign_slot(
+            InferenceJob(
+                request_id=f"bench-{index}",
+                tenant_id=f"tenant-{index % 8}",
+                adapter_id="adapter-bench",
+                prompt="",
+                prompt_tokens=0,
+                max_new_tokens=1_000_000_000,
+                estimated_total_tokens=0,
+                admitted_at=now,
+                enqueued_at=now,
+                future=loop.create_future(),
+            )
+        )
+
+
+def bench_tick(engine: str, slots: int, ticks: int) -> float:
+    loop = asyncio.new_event_loop()
+    try:
+        scheduler = ContinuousBatchingScheduler(
+            max_active_sequences=slots,
+            queue_capacity=1,
+            decode_step_seconds=0.0,
+            idle_sleep_seconds=0.0,
+            kv_tracker=KVPressureTracker(kv_budget_bytes=1),
+            telemetry=NullTelemetry(),
+            batch_state=engine,
+        )
+        _fill(scheduler, slots, loop)
+        now = time.monotonic()
+        scheduler._decode_step(now=now, paused=set(), emitting=[])  # first token is not representative
+
+        started = time.perf_counter()
+        for _ in range(ticks):
+            now += 0.02
+            scheduler._decode_step(now=now, paused=set(), emitting=[])
+            scheduler._finalize_completed(now=now)
+        return (time.perf_counter() - started) / ticks
+    finally:
+        loop.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark decode tick cost per batch state engine.")
+    parser.add_argument("--slots", type=int, nargs="+", default=[16, 256, 1024])
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--engines", nargs="+", default=["python", "numpy"])
+    args = parser.parse_args()
+
+    rows = []
+    for slots in args.slots:
+        row: dict[str, float | int] = {"slots": slots}
+        for engine in args.engines:
+            row[f"{engine}_tick_us"] = bench_tick(engine, slots, args.ticks) * 1e6
+        rows.append(row)
+    print(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Compare throughput and TPOT with and without speculative decoding across batch sizes."""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+
+from modelop.backends import SimulatedBackend
+from modelop.capacity import KVPressureTracker
+from modelop.scheduler import ContinuousBatchingScheduler, InferenceJob
+from modelop.speculative import SpeculativeDecoder
+from modelop.telemetry import Telemetry
+
+
+async def run_once(slots: int, draft_tokens: int, args: argparse.Namespace) -> dict[str, float | int]:
+    kv_tracker = KVPressureTracker(kv_budget_bytes=1 << 40)
+    scheduler = ContinuousBatchingScheduler(
+        max_active_sequences=slots,
+        queue_capacity=args.requests,
+        decode_step_seconds=args.decode_step_seconds,
+        idle_sleep_seconds=0.001,
+        kv_tracker=kv_tracker,
+        telemetry=Telemetry(),
+        backend=SimulatedBackend(
+            decode_step_seconds=args.decode_step_seconds,
+            prefill_token_seconds=args.verify_token_seconds,
+        ),
+        speculative=(
+            SpeculativeDecoder(
+                draft_tokens=draft_tokens,
+                draft_token_seconds=args.draft_token_seconds,
+                default_acceptance=args.acceptance,
+            )
+            if draft_tokens
+            else None
+        ),
+    )
+    loop = asyncio.get_running_loop()
+    jobs = [
+        InferenceJob(
+            request_id=f"bench-{index}",
+            tenant_id="tenant-bench",
+            adapter_id="adapter-bench",
+            prompt="x" * 64,
+            prompt_tokens=16,
+            max_new_tokens=args.new_tokens,
+            estimated_total_tokens=16 + args.new_tokens,
+            admitted_at=time.monotonic(),
+            enqueued_at=time.monotonic(),
+            future=loop.create_future(),
+        )
+        for index in range(args.requests)
+    ]
+    started = time.monotonic()
+    await scheduler.start()
+    try:
+        for job in jobs:
+            kv_tracker.try_reserve(job.request_id, bytes_needed=0, shed_threshold=1.0)
+            await scheduler.enqueue(job)
+        results = await asyncio.gather(*(job.future for job in jobs))
+    finally:
+        await scheduler.stop()
+    elapsed = time.monotonic() - started
+    return {
+        "slots": slots,
+        "draft_tokens": draft_tokens,
+        "tokens_per_sec": sum(result.completion_tokens for result in results) / elapsed,
+        "mean_tpot_ms": 1e3 * sum(result.avg_tpot_seconds for result in results) / len(results),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark speculative decoding trade-offs.")
+    parser.add_argument("--slots", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--draft-tokens", type=int, nargs="+", default=[0, 2, 4])
+    parser.add_argument("--acceptance", type=float, default=0.7)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--new-tokens", type=int, default=32)
+    parser.add_argument("--decode-step-seconds", type=float, default=0.005)
+    parser.add_argument("--draft-token-seconds", type=float, default=0.0005)
+    # Per draft position verified per sequence; makes large batches pay for speculation.
+    parser.add_argument("--verify-token-seconds", type=float, default=0.00005)
+    args = parser.parse_args()
+
+    rows = [
+        asyncio.run(run_once(slots, draft_tokens, args))
+        for slots in args.slots
+        for draft_tokens in args.draft_tokens
+    ]
+    print(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""Hot-path micro-benchmarks with JSON baselines and regression gating.
+
+``run`` times every benchmark (or those matching ``--filter``) and writes a
+JSON results file; ``compare`` diffs two such files and exits 1 when any
+benchmark got slower than both the threshold and either run's own noise
+(median over fastest repeat), which it otherwise reports as ``noisy``:
+
+    PYTHONPATH=src python scripts/bench_suite.py run --output current.json
+    PYTHONPATH=src python scripts/bench_suite.py compare benchmarks/baseline.json current.json
+
+Each benchmark takes ``--repeats`` samples after one warm-up run, each at
+least ``--min-sample-seconds`` long with the garbage collector off, and
+reports nanoseconds per operation. Comparisons
+use the fastest repeat, the sample least disturbed by other load.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager
+
+import httpx
+
+from modelop.capacity import KVPressureTracker, PagedKVAllocator
+from modelop.config import GatewayConfig, TenantPolicy
+from modelop.context_window import ContextWindowOptimizer
+from modelop.gateway import create_app
+from modelop.rate_limit import TokenRateLimiter
+from modelop.scheduler import ContinuousBatchingScheduler, InferenceJob
+from modelop.telemetry import Telemetry
+
+try:
+    import numpy  # noqa: F401
+except ModuleNotFoundError:  # pragma: no cover - optional dependency
+    HAS_NUMPY = False
+else:
+    HAS_NUMPY = True
+
+# A benchmark sets up its state and yields a callable that does one batch of
+# work and returns how many operations that was.
+Benchmark = Callable[[], AbstractContextManager[Callable[[], int]]]
+
+_UNLIMITED = TenantPolicy(rate_tokens_per_sec=1e12, burst_tokens=1e12, default_adapter_id="adapter-bench")
+
+
+@contextmanager
+def rate_limit_try_consume(tenants: int) -> Iterator[Callable[[], int]]:
+    limiter = TokenRateLimiter(GatewayConfig(tenant_policies={}, default_tenant_policy=_UNLIMITED))
+    tenant_ids = [f"tenant-{index}" for index in range(tenants)]
+    calls = max(10_000, tenants)
+    clock = [0.0]
+
+    def run() -> int:
+        now = clock[0]
+        for index in range(calls):
+            now += 1e-6
+            limiter.try_consume(tenant_ids[index % tenants], 100, now=now)
+        clock[0] = now
+        return calls
+
+    yield run
+
+
+@contextmanager
+def kv_reserve_release(paged: bool) -> Iterator[Callable[[], int]]:
+    tracker = (
+        PagedKVAllocator(kv_budget_bytes=1 << 36, bytes_per_token=16_384, block_tokens=16)
+        if paged
+        else KVPressureTracker(kv_budget_bytes=1 << 36)
+    )
+    request_ids = [f"request-{index}" for index in range(256)]
+    rounds = 40
+
+    def run() -> int:
+        for _ in range(rounds):
+            for request_id in request_ids:
+                tracker.try_reserve(request_id, bytes_needed=512 * 16_384, shed_threshold=0.9)
+            for request_id in request_ids:
+                tracker.release(request_id)
+        return rounds * len(request_ids)
+
+    yield run
+
+
+@contextmanager
+def context_optimize(prompt_bytes: int) -> Iterator[Callable[[], int]]:
+    optimizer = ContextWindowOptimizer()
+    prompt = ("lorem ipsum dolor sit amet " * (prompt_bytes // 27 + 1))[:prompt_bytes]
+    # Half the prompt fits, so every call truncates.
+    max_prompt_tokens = prompt_bytes // 8
+    calls = max(1, (1 << 20) // prompt_bytes)
+
+    def run() -> int:
+        for _ in range(calls):
+            optimizer.optimize(prompt, max_prompt_tokens=max_prompt_tokens)
+        return calls
+
+    yield run
+
+
+@contextmanager
+def scheduler_tick(slots: int, batch_state: str) -> Iterator[Callable[[], int]]:
+    loop = asyncio.new_event_loop()
+    clock = [0.0]
+    scheduler = ContinuousBatchingScheduler(
+        max_active_sequences=slots,
+        queue_capacity=slots,
+        decode_step_seconds=0.02,
+        idle_sleep_seconds=0.0,
+        kv_tracker=KVPressureTracker(kv_budget_bytes=1 << 40),
+        telemetry=Telemetry(),
+        batch_state=batch_state,
+        clock=lambda: clock[0],
+    )
+    for index in range(slots):
+        scheduler.enqueue_nowait(
+            InferenceJob(
+                request_id=f"bench-{index}",
+                tenant_id=f"tenant-{index % 8}",
+                adapter_id="adapter-bench",
+                prompt="",
+                prompt_tokens=16,
+                max_new_tokens=1_000_000_000,
+                estimated_total_tokens=16,
+                admitted_at=0.0,
+                enqueued_at=0.0,
+                future=loop.create_future(),
+            )
+        )
+    ticks = 100
+
+    def run() -> int:
+        for _ in range(ticks):
+            seconds = scheduler.start_tick(now=clock[0])
+            clock[0] += seconds or 0.02
+            scheduler.finish_tick(now=clock[0])
+        return ticks
+
+    try:
+        yield run
+    finally:
+        loop.close()
+
+
+@contextmanager
+def gateway_generate(concurrency: int) -> Iterator[Callable[[], int]]:
+    app = create_app(
+        GatewayConfig(
+            scheduler_max_active_sequences=concurrency,
+            scheduler_decode_step_seconds=0.0005,
+            scheduler_prefill_token_seconds=0.0,
+            tenant_policies={"bench": _UNLIMITED},
+        )
+    )
+    loop = asyncio.new_event_loop()
+    lifespan = app.router.lifespan_context(app)
+    loop.run_until_complete(lifespan.__aenter__())
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+    prompts = [f"benchmark prompt {index} " * 8 for index in range(concurrency)]
+
+    async def burst() -> None:
+        responses = await asyncio.gather(
+            *(
+                client.post(
+                    "/v1/generate",
+                    json={"tenant_id": "bench", "prompt": prompt, "max_new_tokens": 4},
+                )
+                for prompt in prompts
+            )
+        )
+        assert all(response.status_code == 200 for response in responses)
+
+    def run() -> int:
+        loop.run_until_complete(burst())
+        return concurrency
+
+    try:
+        yield run
+    finally:
+        loop.run_until_complete(client.aclose())
+        loop.run_until_complete(lifespan.__aexit__(None, None, None))
+        loop.close()
+
+
+def benchmarks() -> dict[str, Benchmark]:
+    suite: dict[str, Benchmark] = {}
+    for tenants in (10, 10_000):
+        suite[f"rate_limit.try_consume[tenants={tenants}]"] = lambda tenants=tenants: (
+            rate_limit_try_consume(tenants)
+        )
+    suite["kv.reserve_release[pressure]"] = lambda: kv_reserve_release(paged=False)
+    suite["kv.reserve_release[paged]"] = lambda: kv_reserve_release(paged=True)
+    for label, size in (("1KB", 1 << 10), ("64KB", 1 << 16), ("1MB", 1 << 20), ("4MB", 1 << 22)):
+        suite[f"context.optimize[{label}]"] = lambda size=size: context_optimize(size)
+    for batch_state in ("python", "numpy") if HAS_NUMPY else ("python",):
+        for slots in (16, 64, 256):
+            suite[f"scheduler.tick[{batch_state},slots={slots}]"] = (
+                lambda slots=slots, batch_state=batch_state: scheduler_tick(slots, batch_state)
+            )
+    suite["gateway.generate[asgi,concurrency=32]"] = lambda: gateway_generate(32)
+    return suite
+
+
+def measure(benchmark: Benchmark, repeats: int, min_sample_seconds: float) -> dict[str, float | int]:
+    """Time ``repeats`` samples, each repeating the batch for at least ``min_sample_seconds``."""
+    min_sample_ns = min_sample_seconds * 1e9
+    with benchmark() as run:
+        run()
+        samples = []
+        gc.collect()
+        gc.disable()
+        try:
+            for _ in range(repeats):
+                operations = 0
+                started = time.perf_counter_ns()
+                while True:
+                    operations += run()
+                    elapsed = time.perf_counter_ns() - started
+                    if elapsed >= min_sample_ns:
+                        break
+                samples.append(elapsed / operations)
+        finally:
+            gc.enable()
+    return {
+        "min_ns_per_op": min(samples),
+        "median_ns_per_op": statistics.median(samples),
+        "repeats": repeats,
+    }
+
+
+def _git_sha() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_command(args: argparse.Namespace) -> int:
+    results: dict[str, dict[str, float | int]] = {}
+    for name, benchmark in benchmarks().items():
+        if args.filter and args.filter not in name:
+            continue
+        results[name] = measure(benchmark, args.repeats, args.min_sample_seconds)
+        print(f"{name:45s} {results[name]['min_ns_per_op']:14,.0f} ns/op", file=sys.stderr)
+    report = {
+        "meta": {
+            "git_sha": _git_sha(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "numpy": HAS_NUMPY,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, sort_keys=True) + "\n"
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(text)
+    else:
+        print(text, end="")
+    return 0
+
+
+def _spread(result: dict[str, float]) -> float:
+    """How far the median repeat sits above the fastest: the run's own noise."""
+    return result["median_ns_per_op"] / result["min_ns_per_op"] - 1
+
+
+def compare_command(args: argparse.Namespace) -> int:
+    with open(args.baseline) as baseline_file, open(args.current) as current_file:
+        baseline = json.load(baseline_file)
+        current = json.load(current_file)
+    if baseline["meta"].get("platform") != current["meta"].get("platform"):
+        print("warning: baseline was recorded on a different platform", file=sys.stderr)
+
+    regressions = 0
+    for name in sorted(baseline["results"].keys() | current["results"].keys()):
+        before = baseline["results"].get(name)
+        after = current["results"].get(name)
+        if before is None or after is None:
+            print(f"{name:45s} {'only in ' + ('current' if before is None else 'baseline'):>30s}")
+            continue
+        change = after["min_ns_per_op"] / before["min_ns_per_op"] - 1
+        if change > max(args.threshold, _spread(before), _spread(after)):
+            verdict = "REGRESSION"
+            regressions += 1
+        elif change > args.threshold:
+            verdict = "noisy"
+        elif change < -args.threshold:
+            verdict = "improved"
+        else:
+            verdict = "ok"
+        print(
+            f"{name:45s} {before['min_ns_per_op']:14,.0f} -> {after['min_ns_per_op']:14,.0f} ns/op"
+            f" {change:+8.1%}  {verdict}"
+        )
+    if regressions:
+        print(f"{regressions} benchmark(s) slower than the {args.threshold:.0%} threshold", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Hot-path benchmark suite.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="time the benchmarks and write JSON results")
+    run.add_argument("--output", help="results file; stdout when omitted")
+    run.add_argument("--filter", help="only benchmarks whose name contains this")
+    run.add_argument("--repeats", type=int, default=7)
+    run.add_argument("--min-sample-seconds", type=float, default=0.1)
+    run.set_defaults(handler=run_command)
+
+    compare = commands.add_parser("compare", help="flag benchmarks that got slower")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument(
+        "--threshold", type=float, default=0.10, help="allowed slowdown, as a fraction"
+    )
+    compare.set_defaults(handler=compare_command)
+
+    args = parser.parse_args()
+    sys.exit(args.handler(args))
+
+
+if __name__ == "__main__":
+    main()
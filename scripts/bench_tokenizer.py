@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Report token-counting throughput (MB/s) for the heuristic and BPE tokenizers."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+
+from modelop.tokenization import BPETokenizer, CachedTokenCounter, HeuristicTokenizer, Tokenizer
+
+_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _prompts(count: int, seed: int) -> list[str]:
+    sources = [path.read_text() for path in sorted((_ROOT / "src" / "modelop").glob("*.py"))]
+    sources.append((_ROOT / "README.md").read_text())
+    sources.append("東京の天気は晴れです。明日は雨が降るでしょう。" * 20)
+    rng = random.Random(seed)
+    prompts = []
+    for _ in range(count):
+        source = rng.choice(sources)
+        start = rng.randrange(max(1, len(source) - 4000))
+        prompts.append(source[start : start + rng.randint(400, 4000)])
+    return prompts
+
+
+def _throughput(tokenizer: Tokenizer, prompts: list[str], rounds: int) -> dict[str, float]:
+    total_bytes = sum(len(prompt.encode("utf-8")) for prompt in prompts) * rounds
+    tokens = 0
+    started = time.perf_counter()
+    for _ in range(rounds):
+        tokens += sum(tokenizer.count_tokens(prompts))
+    elapsed = time.perf_counter() - started
+    return {"mb_per_sec": total_bytes / elapsed / 1e6, "bytes_per_token": total_bytes / max(1, tokens)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark admission-path token counting.")
+    parser.add_argument("--prompts", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--vocab-size", type=int, default=1024)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    prompts = _prompts(args.prompts, args.seed)
+    merges = BPETokenizer.train(prompts[: args.prompts // 2], vocab_size=args.vocab_size).merges
+
+    results = {
+        "heuristic": _throughput(HeuristicTokenizer(), prompts, args.rounds),
+        # Fresh word cache for one pass: every distinct word runs the merge loop.
+        "bpe_cold": _throughput(BPETokenizer(merges), prompts, 1),
+        "bpe_warm_words": _throughput(BPETokenizer(merges), prompts, args.rounds),
+        "bpe_cached_counts": _throughput(
+            CachedTokenCounter(BPETokenizer(merges), capacity=args.prompts), prompts, args.rounds
+        ),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Measure gateway requests/sec versus uvicorn worker count with shared admission state."""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+
+from modelop.shared_state import SharedStateSegment
+
+
+async def _wait_ready(base_url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"gateway at {base_url} did not become ready")
+
+
+async def _drive(base_url: str, concurrency: int, duration: float, tenants: int) -> dict[str, int]:
+    counts = {"ok": 0, "rejected_429": 0, "failed": 0}
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+
+        async def worker(worker_index: int) -> None:
+            sequence = 0
+            while time.monotonic() < deadline:
+                payload = {
+                    "tenant_id": f"bench-{(worker_index + sequence) % tenants}",
+                    "prompt": "benchmark prompt " * 8,
+                    "max_new_tokens": 1,
+                }
+                sequence += 1
+                try:
+                    response = await client.post("/v1/generate", json=payload)
+                except httpx.HTTPError:
+                    counts["failed"] += 1
+                    continue
+                if response.status_code == 200:
+                    counts["ok"] += 1
+                elif response.status_code == 429:
+                    counts["rejected_429"] += 1
+                else:
+                    counts["failed"] += 1
+
+        await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    return counts
+
+
+def bench_workers(workers: int, args: argparse.Namespace) -> dict[str, float | int]:
+    name = f"modelop-bench-{uuid.uuid4().hex[:12]}"
+    env = dict(os.environ, MODELOP_SHARED_STATE=name)
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "modelop.main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(args.port),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        asyncio.run(_wait_ready(base_url, timeout=30.0))
+        counts = asyncio.run(_drive(base_url, args.concurrency, args.duration, args.tenants))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        try:
+            SharedStateSegment(name=name, kv_budget_bytes=1).unlink()
+        except FileNotFoundError:
+            pass
+    handled = counts["ok"] + counts["rejected_429"]
+    return {"workers": workers, **counts, "requests_per_sec": handled / args.duration}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark requests/sec per uvicorn worker count.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--tenants", type=int, default=64)
+    parser.add_argument("--port", type=int, default=8077)
+    args = parser.parse_args()
+
+    print(json.dumps([bench_workers(workers, args) for workers in args.workers], indent=2))
+
+
+if __name__ == "__main__":
+    main()
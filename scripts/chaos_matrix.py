@@ -1,5 +1,12 @@
 #!/usr/bin/env python3
-"""Multi-tenant chaos/load runner for the gateway MVP."""
+"""Multi-tenant chaos/load runner for the gateway MVP.
+
+``--arrival closed`` keeps the original behavior: each worker waits for its
+response before sleeping, which under overload slows the offered load and hides
+tail latency (coordinated omission). ``poisson`` and ``trace`` are open-loop:
+send times are fixed in advance, and latency is measured from the intended send
+time, so a stalled gateway shows up in the tail instead of throttling the client.
+"""
 
 from __future__ import annotations
 
@@ -7,12 +14,16 @@ import argparse
 import asyncio
 import json
 import random
-import statistics
 import time
-from dataclasses import dataclass
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 
 import httpx
 
+from modelop.histogram import LogHistogram
+from modelop.simulator import load_trace
+
 
 @dataclass(frozen=True)
 class TenantProfile:
@@ -30,23 +41,27 @@ class LoadStats:
     succeeded: int = 0
     rejected_429: int = 0
     failed: int = 0
-    latencies: list[float] = None
-    ttft_values: list[float] = None
-    tpot_values: list[float] = None
-
-    def __post_init__(self) -> None:
-        self.latencies = []
-        self.ttft_values = []
-        self.tpot_values = []
+    # Open-loop arrivals skipped because --max-inflight requests were outstanding.
+    client_dropped: int = 0
+    # Worst delay between an arrival's intended and actual send time.
+    max_send_lag: float = 0.0
+    # Time from the first scheduled send to the last actual one.
+    send_seconds: float = 0.0
+    latency: LogHistogram = field(default_factory=LogHistogram)
+    ttft: LogHistogram = field(default_factory=LogHistogram)
+    tpot: LogHistogram = field(default_factory=LogHistogram)
 
     def merge(self, other: "LoadStats") -> None:
         self.sent += other.sent
         self.succeeded += other.succeeded
         self.rejected_429 += other.rejected_429
         self.failed += other.failed
-        self.latencies.extend(other.latencies)
-        self.ttft_values.extend(other.ttft_values)
-        self.tpot_values.extend(other.tpot_values)
+        self.client_dropped += other.client_dropped
+        self.max_send_lag = max(self.max_send_lag, other.max_send_lag)
+        self.send_seconds = max(self.send_seconds, other.send_seconds)
+        self.latency.merge(other.latency)
+        self.ttft.merge(other.ttft)
+        self.tpot.merge(other.tpot)
 
 
 SCENARIOS: dict[str, list[TenantProfile]] = {
@@ -76,127 +91,234 @@ def make_prompt(token_count: int) -> str:
     return " ".join(["token"] * token_count)
 
 
-def percentile(values: list[float], quantile: float) -> float:
-    if not values:
-        return 0.0
-    ordered = sorted(values)
-    index = min(len(ordered) - 1, int(round((len(ordered) - 1) * quantile)))
-    return ordered[index]
+class PromptPool:
+    """JSON-encoded prompts by token count, built once so requests only splice bytes."""
+
+    def __init__(self, profiles: list[TenantProfile]) -> None:
+        self._prompts: dict[int, bytes] = {}
+        for profile in profiles:
+            for count in range(profile.min_prompt_tokens, profile.max_prompt_tokens + 1):
+                self._encoded_prompt(count)
+
+    def body(self, tenant_id: str, prompt_tokens: int, max_new_tokens: int) -> bytes:
+        return b'{"tenant_id":%s,"prompt":%s,"max_new_tokens":%d}' % (
+            json.dumps(tenant_id).encode(),
+            self._encoded_prompt(prompt_tokens),
+            max_new_tokens,
+        )
+
+    def random_body(self, rng: random.Random, profiles: list[TenantProfile]) -> bytes:
+        profile = weighted_choice(rng, profiles)
+        return self.body(
+            profile.tenant_id,
+            rng.randint(profile.min_prompt_tokens, profile.max_prompt_tokens),
+            rng.randint(profile.min_new_tokens, profile.max_new_tokens),
+        )
+
+    def _encoded_prompt(self, token_count: int) -> bytes:
+        encoded = self._prompts.get(token_count)
+        if encoded is None:
+            encoded = self._prompts[token_count] = json.dumps(make_prompt(token_count)).encode()
+        return encoded
+
+
+_JSON_HEADERS = {"content-type": "application/json"}
+
+
+async def send(client: httpx.AsyncClient, body: bytes, stats: LoadStats, started: float) -> None:
+    """POST one request and record its outcome; latency is measured from ``started``."""
+    stats.sent += 1
+    try:
+        response = await client.post("/v1/generate", content=body, headers=_JSON_HEADERS)
+    except Exception:
+        stats.failed += 1
+        return
+    stats.latency.record(time.monotonic() - started)
+    if response.status_code == 200:
+        payload = response.json()
+        stats.succeeded += 1
+        stats.ttft.record(float(payload.get("ttft_seconds", 0.0)))
+        stats.tpot.record(float(payload.get("avg_tpot_seconds", 0.0)))
+    elif response.status_code == 429:
+        stats.rejected_429 += 1
+    else:
+        stats.failed += 1
 
 
 async def worker(
     worker_id: int,
-    base_url: str,
+    client: httpx.AsyncClient,
     scenario: str,
-    duration_seconds: int,
+    duration_seconds: float,
     target_rps: float,
-) -> LoadStats:
+    pool: PromptPool,
+    stats: LoadStats,
+) -> None:
     rng = random.Random(worker_id * 7919 + int(time.time()))
     profiles = SCENARIOS[scenario]
-    stats = LoadStats()
     started = time.monotonic()
-
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        while time.monotonic() - started < duration_seconds:
-            profile = weighted_choice(rng, profiles)
-            prompt_tokens = rng.randint(profile.min_prompt_tokens, profile.max_prompt_tokens)
-            max_new_tokens = rng.randint(profile.min_new_tokens, profile.max_new_tokens)
-            payload = {
-                "tenant_id": profile.tenant_id,
-                "prompt": make_prompt(prompt_tokens),
-                "max_new_tokens": max_new_tokens,
-            }
-
-            stats.sent += 1
-            req_started = time.monotonic()
-            try:
-                response = await client.post(f"{base_url}/v1/generate", json=payload)
-                latency = time.monotonic() - req_started
-                stats.latencies.append(latency)
-                if response.status_code == 200:
-                    body = response.json()
-                    stats.succeeded += 1
-                    stats.ttft_values.append(float(body.get("ttft_seconds", 0.0)))
-                    stats.tpot_values.append(float(body.get("avg_tpot_seconds", 0.0)))
-                elif response.status_code == 429:
-                    stats.rejected_429 += 1
-                else:
-                    stats.failed += 1
-            except Exception:
-                stats.failed += 1
-
-            if target_rps > 0:
-                sleep_time = rng.expovariate(target_rps)
-                await asyncio.sleep(min(1.0, sleep_time))
-
+    while time.monotonic() - started < duration_seconds:
+        await send(client, pool.random_body(rng, profiles), stats, started=time.monotonic())
+        if target_rps > 0:
+            sleep_time = rng.expovariate(target_rps)
+            await asyncio.sleep(min(1.0, sleep_time))
+
+
+def poisson_schedule(
+    rng: random.Random,
+    profiles: list[TenantProfile],
+    pool: PromptPool,
+    rate: float,
+    duration_seconds: float,
+) -> Iterator[tuple[float, bytes]]:
+    at = 0.0
+    while True:
+        at += rng.expovariate(rate)
+        if at >= duration_seconds:
+            return
+        yield at, pool.random_body(rng, profiles)
+
+
+def trace_schedule(path: str, shard: int, shards: int, pool: PromptPool) -> Iterator[tuple[float, bytes]]:
+    for index, arrival in enumerate(load_trace(path)):
+        if index % shards == shard:
+            yield arrival.at, pool.body(arrival.tenant_id, arrival.prompt_tokens, arrival.max_new_tokens)
+
+
+async def open_loop(
+    client: httpx.AsyncClient,
+    schedule: Iterator[tuple[float, bytes]],
+    max_inflight: int,
+    stats: LoadStats,
+) -> None:
+    """Send each request at its scheduled offset, whether or not earlier ones returned."""
+    inflight: set[asyncio.Task[None]] = set()
+    origin = time.monotonic()
+    for at, body in schedule:
+        intended = origin + at
+        delay = intended - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            stats.max_send_lag = max(stats.max_send_lag, -delay)
+        if len(inflight) >= max_inflight:
+            stats.client_dropped += 1
+            continue
+        task = asyncio.create_task(send(client, body, stats, started=intended))
+        inflight.add(task)
+        task.add_done_callback(inflight.discard)
+    stats.send_seconds = time.monotonic() - origin
+    if inflight:
+        await asyncio.gather(*inflight)
+
+
+async def run_shard_async(shard: int, args: argparse.Namespace) -> LoadStats:
+    profiles = SCENARIOS[args.scenario]
+    pool = PromptPool(profiles)
+    stats = LoadStats()
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60.0, limits=limits) as client:
+        if args.arrival == "closed":
+            await asyncio.gather(
+                *(
+                    worker(
+                        worker_id=worker_id,
+                        client=client,
+                        scenario=args.scenario,
+                        duration_seconds=args.duration_seconds,
+                        target_rps=args.target_rps,
+                        pool=pool,
+                        stats=stats,
+                    )
+                    for worker_id in range(shard, args.workers, args.processes)
+                )
+            )
+            stats.send_seconds = args.duration_seconds
+        else:
+            if args.arrival == "trace":
+                schedule = trace_schedule(args.trace, shard, args.processes, pool)
+            else:
+                # Independent Poisson streams superpose into one at the total rate.
+                rng = random.Random(args.seed * 7919 + shard)
+                schedule = poisson_schedule(
+                    rng, profiles, pool, args.rate / args.processes, args.duration_seconds
+                )
+            await open_loop(client, schedule, args.max_inflight, stats)
     return stats
 
 
-async def run_load(
-    base_url: str,
-    scenario: str,
-    workers: int,
-    duration_seconds: int,
-    target_rps: float,
-) -> LoadStats:
-    tasks = [
-        asyncio.create_task(
-            worker(
-                worker_id=i,
-                base_url=base_url,
-                scenario=scenario,
-                duration_seconds=duration_seconds,
-                target_rps=target_rps,
-            )
-        )
-        for i in range(workers)
-    ]
-    results = await asyncio.gather(*tasks)
+def run_shard(shard: int, args: argparse.Namespace) -> LoadStats:
+    return asyncio.run(run_shard_async(shard, args))
 
+
+def run_load(args: argparse.Namespace) -> LoadStats:
+    if args.processes == 1:
+        return run_shard(0, args)
     merged = LoadStats()
-    for result in results:
-        merged.merge(result)
+    with ProcessPoolExecutor(max_workers=args.processes) as executor:
+        for stats in executor.map(run_shard, range(args.processes), [args] * args.processes):
+            merged.merge(stats)
     return merged
 
 
+def percentiles_ms(histogram: LogHistogram) -> dict[str, float]:
+    return {
+        f"p{label}": histogram.percentile(percent) * 1000
+        for label, percent in (("50", 50), ("90", 90), ("99", 99), ("99_9", 99.9))
+    }
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Run multi-tenant chaos load against gateway.")
     parser.add_argument("--base-url", default="http://127.0.0.1:8000")
     parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="skewed-burst")
-    parser.add_argument("--workers", type=int, default=20)
-    parser.add_argument("--duration-seconds", type=int, default=60)
+    parser.add_argument(
+        "--arrival",
+        choices=["closed", "poisson", "trace"],
+        default="closed",
+        help="closed: workers wait for responses; poisson/trace: open-loop send schedule",
+    )
+    parser.add_argument("--workers", type=int, default=20, help="closed-loop workers in total")
+    parser.add_argument("--duration-seconds", type=float, default=60)
     parser.add_argument(
         "--target-rps",
         type=float,
         default=2.0,
-        help="Approximate request rate per worker",
+        help="Approximate request rate per worker (closed loop)",
     )
+    parser.add_argument("--rate", type=float, default=100.0, help="total arrivals/sec (poisson)")
+    parser.add_argument("--trace", help="JSON lines with at, tenant_id, prompt_tokens, max_new_tokens")
+    parser.add_argument("--processes", type=int, default=1, help="client processes sharing the load")
+    parser.add_argument("--max-connections", type=int, default=512, help="per process")
+    parser.add_argument("--max-inflight", type=int, default=10_000, help="per process (open loop)")
+    parser.add_argument("--seed", type=int, default=0)
     args = parser.parse_args()
+    if args.arrival == "trace" and not args.trace:
+        parser.error("--arrival trace requires --trace")
 
-    stats = asyncio.run(
-        run_load(
-            base_url=args.base_url,
-            scenario=args.scenario,
-            workers=args.workers,
-            duration_seconds=args.duration_seconds,
-            target_rps=args.target_rps,
-        )
-    )
-
+    stats = run_load(args)
     report = {
         "scenario": args.scenario,
+        "arrival": args.arrival,
         "workers": args.workers,
+        "processes": args.processes,
         "duration_seconds": args.duration_seconds,
         "sent": stats.sent,
+        "achieved_rps": stats.sent / stats.send_seconds if stats.send_seconds else 0.0,
         "succeeded": stats.succeeded,
         "rejected_429": stats.rejected_429,
         "failed": stats.failed,
+        "client_dropped": stats.client_dropped,
+        "max_send_lag_ms": stats.max_send_lag * 1000,
         "success_rate": (stats.succeeded / stats.sent) if stats.sent else 0.0,
         "rejection_rate": (stats.rejected_429 / stats.sent) if stats.sent else 0.0,
-        "latency_p50_ms": percentile(stats.latencies, 0.50) * 1000,
-        "latency_p95_ms": percentile(stats.latencies, 0.95) * 1000,
-        "ttft_p95_ms": percentile(stats.ttft_values, 0.95) * 1000,
-        "tpot_avg_ms": statistics.mean(stats.tpot_values) * 1000 if stats.tpot_values else 0.0,
+        "latency_p50_ms": stats.latency.percentile(50) * 1000,
+        "latency_p95_ms": stats.latency.percentile(95) * 1000,
+        "ttft_p95_ms": stats.ttft.percentile(95) * 1000,
+        "tpot_avg_ms": stats.tpot.mean * 1000,
+        "latency_ms": percentiles_ms(stats.latency),
+        "ttft_ms": percentiles_ms(stats.ttft),
+        "tpot_ms": percentiles_ms(stats.tpot),
     }
     print(json.dumps(report, indent=2))
 
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""Run the TCP lease coordinator that gateway nodes share for cluster-wide rate limits."""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+
+from modelop.distributed_rate_limit import LeaseCoordinatorServer
+
+
+async def serve(host: str, port: int) -> None:
+    server = LeaseCoordinatorServer()
+    await server.start(host=host, port=port)
+    print(f"lease coordinator listening on {host}:{server.port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve rate-limit leases to gateway nodes.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7070)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
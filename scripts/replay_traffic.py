@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""Replay a recorded gateway traffic log against a gateway, open-loop.
+
+Each record is re-sent at its original offset from the first arrival divided
+by ``--speed``, with a synthetic prompt of the recorded token count. Records
+with the same prompt hash get the same synthetic prompt, so prefix-cache and
+response-cache behavior carries over. The report puts the recorded and the
+replayed outcome and latency distributions side by side.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+from collections import Counter
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import httpx
+
+from modelop.histogram import LogHistogram
+from modelop.traffic_log import TrafficRecord, read_traffic_log
+
+# Sibling script: scripts/ is on sys.path when this file is run directly.
+from chaos_matrix import LoadStats, open_loop, percentiles_ms
+
+
+@lru_cache(maxsize=4096)
+def synthetic_prompt(hashed: int, prompt_tokens: int, chars_per_token: float) -> bytes:
+    """JSON-encoded prompt that the heuristic tokenizer counts as ``prompt_tokens``."""
+    length = max(1, round(prompt_tokens * chars_per_token))
+    text = f"{hashed:016x} "
+    text = (text + "tok " * (length // 4 + 1))[:length]
+    return json.dumps(text).encode()
+
+
+def request_body(record: TrafficRecord, chars_per_token: float) -> bytes:
+    return b'{"tenant_id":%s,"adapter_id":%s,"prompt":%s,"max_new_tokens":%d}' % (
+        json.dumps(record.tenant_id).encode(),
+        json.dumps(record.adapter_id).encode(),
+        synthetic_prompt(record.prompt_hash, record.prompt_tokens, chars_per_token),
+        record.max_new_tokens,
+    )
+
+
+def replay_schedule(
+    records: list[TrafficRecord], shard: int, shards: int, args: argparse.Namespace
+) -> Iterator[tuple[float, bytes]]:
+    origin = records[0].timestamp
+    for record in records[shard::shards]:
+        yield (record.timestamp - origin) / args.speed, request_body(record, args.chars_per_token)
+
+
+def run_shard(shard: int, args: argparse.Namespace) -> LoadStats:
+    async def run() -> LoadStats:
+        records = read_traffic_log(args.log_dir)
+        stats = LoadStats()
+        if not records:
+            return stats
+        limits = httpx.Limits(
+            max_connections=args.max_connections, max_keepalive_connections=args.max_connections
+        )
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=60.0, limits=limits) as client:
+            await open_loop(
+                client, replay_schedule(records, shard, args.processes, args), args.max_inflight, stats
+            )
+        return stats
+
+    return asyncio.run(run())
+
+
+def recorded_summary(records: list[TrafficRecord]) -> dict[str, object]:
+    latency = LogHistogram()
+    ttft = LogHistogram()
+    tpot = LogHistogram()
+    for record in records:
+        latency.record(record.total_seconds)
+        if record.status == 200:
+            ttft.record(record.ttft_seconds)
+            tpot.record(record.tpot_seconds)
+    statuses = Counter(record.status for record in records)
+    return {
+        "requests": len(records),
+        "duration_seconds": records[-1].timestamp - records[0].timestamp if records else 0.0,
+        "status_counts": {str(status): count for status, count in sorted(statuses.items())},
+        "latency_ms": percentiles_ms(latency),
+        "ttft_ms": percentiles_ms(ttft),
+        "tpot_ms": percentiles_ms(tpot),
+    }
+
+
+def replayed_summary(stats: LoadStats) -> dict[str, object]:
+    return {
+        "requests": stats.sent,
+        "duration_seconds": stats.send_seconds,
+        "succeeded": stats.succeeded,
+        "rejected_429": stats.rejected_429,
+        "failed": stats.failed,
+        "client_dropped": stats.client_dropped,
+        "max_send_lag_ms": stats.max_send_lag * 1000,
+        "latency_ms": percentiles_ms(stats.latency),
+        "ttft_ms": percentiles_ms(stats.ttft),
+        "tpot_ms": percentiles_ms(stats.tpot),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay a recorded traffic log against a gateway.")
+    parser.add_argument("log_dir", help="directory written by GatewayConfig.traffic_log_dir")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--speed", type=float, default=1.0, help="2 replays twice as fast")
+    parser.add_argument(
+        "--chars-per-token",
+        type=float,
+        default=4.0,
+        help="prompt characters per recorded token; 4 matches the heuristic tokenizer",
+    )
+    parser.add_argument("--processes", type=int, default=1, help="client processes sharing the load")
+    parser.add_argument("--max-connections", type=int, default=512, help="per process")
+    parser.add_argument("--max-inflight", type=int, default=10_000, help="per process")
+    args = parser.parse_args()
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+
+    records = read_traffic_log(args.log_dir)
+    if args.processes == 1:
+        stats = run_shard(0, args)
+    else:
+        stats = LoadStats()
+        with ProcessPoolExecutor(max_workers=args.processes) as executor:
+            for shard_stats in executor.map(
+                run_shard, range(args.processes), [args] * args.processes
+            ):
+                stats.merge(shard_stats)
+
+    report = {
+        "speed": args.speed,
+        "recorded": recorded_summary(records),
+        "replayed": replayed_summary(stats),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
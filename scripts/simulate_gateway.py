@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Sweep gateway settings against an arrival trace or tenant mix in virtual time."""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import itertools
+import json
+
+from modelop.config import GatewayConfig, TenantPolicy
+from modelop.simulator import GatewaySimulator, TenantMix, load_trace, poisson_arrivals
+
+
+def _tenant(spec: str) -> TenantMix:
+    tenant_id, weight, prompt_tokens, new_tokens = spec.split(":")
+    return TenantMix(tenant_id, float(weight), int(prompt_tokens), int(new_tokens))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulate one gateway replica in virtual time.")
+    parser.add_argument("--trace", help="JSON lines of arrivals; overrides the Poisson mix")
+    parser.add_argument("--rate", type=float, default=200.0, help="arrivals per simulated second")
+    parser.add_argument("--duration", type=float, default=60.0, help="simulated seconds of arrivals")
+    parser.add_argument(
+        "--tenant",
+        action="append",
+        type=_tenant,
+        help="tenant_id:weight:mean_prompt_tokens:mean_new_tokens (repeatable)",
+    )
+    parser.add_argument("--tenant-rate", type=float, default=20_000.0, help="tokens/s per tenant")
+    parser.add_argument("--tenant-burst", type=float, default=40_000.0)
+    parser.add_argument("--shed-threshold", type=float, nargs="+", default=[0.90])
+    parser.add_argument("--slots", type=int, nargs="+", default=[16])
+    parser.add_argument("--tick-token-budget", type=int, nargs="+", default=[2048])
+    parser.add_argument("--kv-budget-gib", type=float, default=8.0)
+    parser.add_argument(
+        "--adaptive-kv-high-watermark",
+        type=float,
+        nargs="+",
+        default=[None],
+        help="enable adaptive rate control at these KV watermarks; off when omitted",
+    )
+    parser.add_argument("--decode-step-seconds", type=float, default=0.02)
+    parser.add_argument("--batch-state", default="python", choices=["python", "numpy"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    mix = args.tenant or [TenantMix("tenant-a", 1.0, 512, 128)]
+    policies = {
+        tenant.tenant_id: TenantPolicy(
+            rate_tokens_per_sec=args.tenant_rate,
+            burst_tokens=args.tenant_burst,
+            default_adapter_id=f"adapter-{tenant.tenant_id}",
+        )
+        for tenant in mix
+    }
+    base = GatewayConfig(
+        tenant_policies=policies,
+        kv_budget_bytes=int(args.kv_budget_gib * 1024**3),
+        scheduler_decode_step_seconds=args.decode_step_seconds,
+        scheduler_batch_state=args.batch_state,
+        scheduler_queue_capacity=1 << 20,
+    )
+    for shed_threshold, slots, budget, kv_high_watermark in itertools.product(
+        args.shed_threshold, args.slots, args.tick_token_budget, args.adaptive_kv_high_watermark
+    ):
+        config = dataclasses.replace(
+            base,
+            shed_threshold=shed_threshold,
+            scheduler_max_active_sequences=slots,
+            scheduler_tick_token_budget=budget,
+            rate_limit_adaptive=kv_high_watermark is not None,
+            rate_limit_adaptive_kv_high_watermark=(
+                base.rate_limit_adaptive_kv_high_watermark
+                if kv_high_watermark is None
+                else kv_high_watermark
+            ),
+        )
+        arrivals = (
+            load_trace(args.trace)
+            if args.trace
+            else poisson_arrivals(args.rate, args.duration, mix, seed=args.seed)
+        )
+        report = GatewaySimulator(config).run(arrivals)
+        settings = {
+            "shed_threshold": shed_threshold,
+            "slots": slots,
+            "tick_token_budget": budget,
+            "adaptive_kv_high_watermark": kv_high_watermark,
+        }
+        print(json.dumps({"settings": settings, **report.summary()}))
+
+
+if __name__ == "__main__":
+    main()
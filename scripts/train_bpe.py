@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""Train byte-level BPE merges from text files for use as a "bpe:<path>" tokenizer spec."""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from modelop.tokenization import BPETokenizer
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Train BPE merges for the gateway token counter.")
+    parser.add_argument("inputs", nargs="+", type=Path, help="text files to train on")
+    parser.add_argument("--vocab-size", type=int, default=2048)
+    parser.add_argument("--output", type=Path, required=True)
+    args = parser.parse_args()
+
+    texts = [path.read_text(encoding="utf-8", errors="replace") for path in args.inputs]
+    tokenizer = BPETokenizer.train(texts, vocab_size=args.vocab_size)
+    tokenizer.save(args.output)
+    print(f"wrote {tokenizer.vocab_size - 256} merges to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
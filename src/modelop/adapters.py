@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import NamedTuple
+
+
+class AdapterAcquisition(NamedTuple):
+    # When the adapter's weights are usable; later than ``now`` while a load is in flight.
+    ready_at: float
+    loaded: bool
+    evicted_adapter_id: str | None
+
+
+class _Residency:
+    __slots__ = ("pins", "ready_at")
+
+    def __init__(self, ready_at: float) -> None:
+        self.pins = 0
+        self.ready_at = ready_at
+
+
+class AdapterSlotCache:
+    """Fixed number of resident adapters with LRU eviction and a modeled load time.
+
+    Adapters used by active sequences are pinned and never evicted. An
+    unpinned adapter stays resident after its last sequence finishes, so a
+    later job for it skips the load; the least recently acquired unpinned
+    adapter is evicted when a new one needs its slot.
+    """
+
+    def __init__(self, slots: int, load_seconds: float) -> None:
+        self._slots = slots
+        self._load_seconds = load_seconds
+        self._resident: OrderedDict[str, _Residency] = OrderedDict()
+        self.swaps = 0
+
+    @property
+    def slots(self) -> int:
+        return self._slots
+
+    @property
+    def resident_adapters(self) -> list[str]:
+        return list(self._resident)
+
+    def is_resident(self, adapter_id: str) -> bool:
+        return adapter_id in self._resident
+
+    def can_acquire(self, adapter_id: str) -> bool:
+        return adapter_id in self._resident or self.can_load()
+
+    def can_load(self) -> bool:
+        """Whether a non-resident adapter could be loaded now."""
+        if len(self._resident) < self._slots:
+            return True
+        return any(residency.pins == 0 for residency in self._resident.values())
+
+    def acquire(self, adapter_id: str, now: float) -> AdapterAcquisition | None:
+        """Pin ``adapter_id``, loading it into a free or evicted slot if needed."""
+        residency = self._resident.get(adapter_id)
+        if residency is not None:
+            self._resident.move_to_end(adapter_id)
+            residency.pins += 1
+            return AdapterAcquisition(ready_at=residency.ready_at, loaded=False, evicted_adapter_id=None)
+
+        evicted: str | None = None
+        if len(self._resident) >= self._slots:
+            evicted = next(
+                (candidate for candidate, held in self._resident.items() if held.pins == 0),
+                None,
+            )
+            if evicted is None:
+                return None
+            del self._resident[evicted]
+        residency = self._resident[adapter_id] = _Residency(ready_at=now + self._load_seconds)
+        residency.pins = 1
+        self.swaps += 1
+        return AdapterAcquisition(ready_at=residency.ready_at, loaded=True, evicted_adapter_id=evicted)
+
+    def release(self, adapter_id: str) -> None:
+        residency = self._resident.get(adapter_id)
+        if residency is not None and residency.pins > 0:
+            residency.pins -= 1
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import math
+from typing import NamedTuple
+
+from modelop.scheduler import ContinuousBatchingScheduler
+
+
+class TTFTPrediction(NamedTuple):
+    queue_wait_seconds: float
+    ttft_seconds: float
+
+
+class AdmissionPredictor:
+    """Estimate a request's TTFT from scheduler load before admitting it.
+
+    A request starts at once if a slot is free for it. Otherwise it waits for
+    the closest active sequence to finish, one token per tick, plus the time
+    the work queued ahead of it takes to drain at the scheduler's recent
+    token throughput. Its prompt then runs in ``tick_token_budget`` chunks at the
+    recent tick duration, and the first token comes with the last chunk. The
+    estimate is deliberately simple; ``ttft_prediction_error_seconds`` shows
+    how far off it runs.
+    """
+
+    def __init__(self, scheduler: ContinuousBatchingScheduler) -> None:
+        self._scheduler = scheduler
+
+    def predict(self, prompt_tokens: int) -> TTFTPrediction | None:
+        """Return the estimate, or None before the scheduler has measured throughput."""
+        scheduler = self._scheduler
+        tokens_per_second = scheduler.tokens_per_second
+        tick_seconds = scheduler.tick_seconds
+        if not tokens_per_second or tick_seconds is None:
+            return None
+        free_slots = scheduler.max_active_sequences - scheduler.active_count
+        if scheduler.queue_depth < free_slots:
+            queue_wait = 0.0
+        else:
+            queue_wait = (
+                scheduler.min_remaining_tokens * tick_seconds
+                + scheduler.queued_tokens / tokens_per_second
+            )
+        prefill_ticks = max(1, math.ceil(prompt_tokens / scheduler.tick_token_budget))
+        return TTFTPrediction(
+            queue_wait_seconds=queue_wait,
+            ttft_seconds=queue_wait + prefill_ticks * tick_seconds,
+        )
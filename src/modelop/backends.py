@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import zlib
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Protocol
+
+try:
+    import numpy as np
+except ModuleNotFoundError:
+    np = None
+
+
+@dataclass(frozen=True, slots=True)
+class PrefillChunk:
+    request_id: str
+    adapter_id: str
+    prompt: str
+    prompt_tokens: int
+    start: int
+    tokens: int
+
+
+class ModelBackend(Protocol):
+    """Batched model execution driven by the scheduler once per tick.
+
+    ``prefill`` and ``decode`` return the modeled duration of the work in
+    seconds; backends that really compute return ``0.0`` and set
+    ``compute_bound`` so the scheduler runs them off the event loop.
+    """
+
+    compute_bound: bool
+
+    def prefill(self, batch: Sequence[PrefillChunk]) -> float: ...
+
+    def decode(
+        self, request_ids: Sequence[str], steps: Sequence[int] | None = None, draft_tokens: int = 0
+    ) -> float:
+        """Commit one token per request, or ``steps[i]`` for speculative verify passes.
+
+        ``draft_tokens`` is how many draft tokens per request the verify pass
+        checked, accepted or not.
+        """
+        ...
+
+    def token_text(self, request_id: str, index: int) -> str: ...
+
+    def drop_kv(self, request_ids: Sequence[str]) -> None:
+        """Forget KV for preempted requests; generated tokens are kept for recompute."""
+        ...
+
+    def free(self, request_ids: Sequence[str]) -> None: ...
+
+
+class SimulatedBackend:
+    """Fixed-cost decode steps and linear prefill cost; emits ``tok<n>`` tokens."""
+
+    compute_bound = False
+
+    def __init__(self, decode_step_seconds: float, prefill_token_seconds: float = 0.0) -> None:
+        self._decode_step_seconds = decode_step_seconds
+        self._prefill_token_seconds = prefill_token_seconds
+
+    def prefill(self, batch: Sequence[PrefillChunk]) -> float:
+        return sum(chunk.tokens for chunk in batch) * self._prefill_token_seconds
+
+    def decode(
+        self, request_ids: Sequence[str], steps: Sequence[int] | None = None, draft_tokens: int = 0
+    ) -> float:
+        # Verifying drafts adds their positions to the step, priced like prefill tokens.
+        return self._decode_step_seconds + (
+            draft_tokens * len(request_ids) * self._prefill_token_seconds
+        )
+
+    def token_text(self, request_id: str, index: int) -> str:
+        return f"tok{index}"
+
+    def drop_kv(self, request_ids: Sequence[str]) -> None:
+        return None
+
+    def free(self, request_ids: Sequence[str]) -> None:
+        return None
+
+
+class _NumpySequence:
+    __slots__ = ("token_ids", "generated", "keys", "values", "length", "last_hidden")
+
+    def __init__(self, layers: int, capacity: int, d_model: int) -> None:
+        self.token_ids: list[int] = []
+        self.generated: list[int] = []
+        self.keys = np.zeros((layers, capacity, d_model), dtype=np.float32)
+        self.values = np.zeros((layers, capacity, d_model), dtype=np.float32)
+        # Positions with KV computed; the newest generated token is not among them yet.
+        self.length = 0
+        self.last_hidden = np.zeros(d_model, dtype=np.float32)
+
+
+class NumpyReferenceBackend:
+    """Small single-head transformer-like stack computed on the CPU with NumPy.
+
+    The weights are random, so the tokens are meaningless; what matters is
+    that the work is real: projections are batched across the whole decode
+    batch and attention reads every cached position, so tick time grows with
+    batch size and sequence length the way a GPU engine's does. Prompt text is
+    mapped to ids four characters at a time, and positions already served by
+    the prefix cache start with zeroed KV instead of being computed.
+    """
+
+    compute_bound = True
+
+    def __init__(
+        self,
+        d_model: int = 64,
+        layers: int = 2,
+        vocab_size: int = 512,
+        seed: int = 0,
+    ) -> None:
+        if np is None:
+            raise RuntimeError("numpy backend requires numpy; install modelop[numpy]")
+        rng = np.random.default_rng(seed)
+        scale = 1.0 / np.sqrt(d_model)
+        self._d_model = d_model
+        self._layers = layers
+        self._vocab_size = vocab_size
+        self._embeddings = rng.standard_normal((vocab_size, d_model), dtype=np.float32)
+        self._w_qkv = (rng.standard_normal((layers, d_model, 3 * d_model)) * scale).astype(np.float32)
+        self._w_out = (rng.standard_normal((layers, d_model, d_model)) * scale).astype(np.float32)
+        self._w_vocab = (rng.standard_normal((d_model, vocab_size)) * scale).astype(np.float32)
+        self._sequences: dict[str, _NumpySequence] = {}
+
+    def prefill(self, batch: Sequence[PrefillChunk]) -> float:
+        for chunk in batch:
+            sequence = self._sequence_for(chunk)
+            end = chunk.start + chunk.tokens
+            self._ensure_capacity(sequence, end)
+            # Positions before the chunk that were never computed (prefix-cache hits) stay zero.
+            sequence.length = max(sequence.length, chunk.start)
+            token_ids = np.asarray(sequence.token_ids[chunk.start : end], dtype=np.int64)
+            self._forward(sequence, self._embeddings[token_ids])
+        return 0.0
+
+    def decode(
+        self, request_ids: Sequence[str], steps: Sequence[int] | None = None, draft_tokens: int = 0
+    ) -> float:
+        if not request_ids:
+            return 0.0
+        sequences = [self._sequences[request_id] for request_id in request_ids]
+        if steps is None:
+            self._decode_once(sequences)
+            return 0.0
+        # Committed tokens are produced step by step; rejected drafts are not computed.
+        for round_index in range(max(steps)):
+            self._decode_once(
+                [sequence for sequence, count in zip(sequences, steps) if count > round_index]
+            )
+        return 0.0
+
+    def _decode_once(self, sequences: list[_NumpySequence]) -> None:
+        # Sequences fresh out of prefill sample from their last prompt position;
+        # the rest first run their newest token through the stack as one batch.
+        stepping = [sequence for sequence in sequences if sequence.length < len(sequence.token_ids)]
+        if stepping:
+            last_ids = np.fromiter((sequence.token_ids[-1] for sequence in stepping), dtype=np.int64)
+            hidden = self._embeddings[last_ids]
+            for layer in range(self._layers):
+                queries, keys, values = np.split(hidden @ self._w_qkv[layer], 3, axis=1)
+                attended = np.empty_like(queries)
+                for row, sequence in enumerate(stepping):
+                    self._ensure_capacity(sequence, sequence.length + 1)
+                    position = sequence.length
+                    sequence.keys[layer, position] = keys[row]
+                    sequence.values[layer, position] = values[row]
+                    attended[row] = self._attend(
+                        queries[row : row + 1],
+                        sequence.keys[layer, : position + 1],
+                        sequence.values[layer, : position + 1],
+                    )[0]
+                hidden = hidden + attended @ self._w_out[layer]
+            for row, sequence in enumerate(stepping):
+                sequence.length += 1
+                sequence.last_hidden = hidden[row]
+        last_hidden = np.stack([sequence.last_hidden for sequence in sequences])
+        next_ids = np.argmax(last_hidden @ self._w_vocab, axis=1)
+        for sequence, token_id in zip(sequences, next_ids.tolist()):
+            sequence.token_ids.append(token_id)
+            sequence.generated.append(token_id)
+
+    def token_text(self, request_id: str, index: int) -> str:
+        return f"t{self._sequences[request_id].generated[index - 1]}"
+
+    def drop_kv(self, request_ids: Sequence[str]) -> None:
+        for request_id in request_ids:
+            sequence = self._sequences.get(request_id)
+            if sequence is not None:
+                sequence.length = 0
+
+    def free(self, request_ids: Sequence[str]) -> None:
+        for request_id in request_ids:
+            self._sequences.pop(request_id, None)
+
+    def _sequence_for(self, chunk: PrefillChunk) -> _NumpySequence:
+        sequence = self._sequences.get(chunk.request_id)
+        if sequence is None:
+            sequence = _NumpySequence(self._layers, max(16, chunk.prompt_tokens + 1), self._d_model)
+            sequence.token_ids = [
+                zlib.crc32(chunk.prompt[index * 4 : index * 4 + 4].encode()) % self._vocab_size
+                for index in range(chunk.prompt_tokens)
+            ]
+            self._sequences[chunk.request_id] = sequence
+        return sequence
+
+    def _ensure_capacity(self, sequence: _NumpySequence, length: int) -> None:
+        capacity = sequence.keys.shape[1]
+        if length <= capacity:
+            return
+        grown = max(length, capacity * 2)
+        for name in ("keys", "values"):
+            current = getattr(sequence, name)
+            resized = np.zeros((self._layers, grown, self._d_model), dtype=np.float32)
+            resized[:, :capacity] = current
+            setattr(sequence, name, resized)
+
+    def _forward(self, sequence: _NumpySequence, hidden: np.ndarray) -> None:
+        start = sequence.length
+        count = hidden.shape[0]
+        for layer in range(self._layers):
+            queries, keys, values = np.split(hidden @ self._w_qkv[layer], 3, axis=1)
+            sequence.keys[layer, start : start + count] = keys
+            sequence.values[layer, start : start + count] = values
+            attended = self._attend(
+                queries,
+                sequence.keys[layer, : start + count],
+                sequence.values[layer, : start + count],
+                causal_offset=start,
+            )
+            hidden = hidden + attended @ self._w_out[layer]
+        sequence.length = start + count
+        sequence.last_hidden = hidden[-1]
+
+    def _attend(
+        self,
+        queries: np.ndarray,
+        keys: np.ndarray,
+        values: np.ndarray,
+        causal_offset: int | None = None,
+    ) -> np.ndarray:
+        scores = queries @ keys.T / np.sqrt(self._d_model)
+        if causal_offset is not None:
+            rows = np.arange(queries.shape[0])[:, None] + causal_offset
+            scores = np.where(np.arange(keys.shape[0])[None, :] > rows, -np.inf, scores)
+        scores -= scores.max(axis=1, keepdims=True)
+        weights = np.exp(scores)
+        weights /= weights.sum(axis=1, keepdims=True)
+        return weights @ values
+
+
+def create_backend(
+    kind: str, decode_step_seconds: float, prefill_token_seconds: float = 0.0
+) -> ModelBackend:
+    if kind == "simulated":
+        return SimulatedBackend(
+            decode_step_seconds=decode_step_seconds,
+            prefill_token_seconds=prefill_token_seconds,
+        )
+    if kind == "numpy":
+        return NumpyReferenceBackend()
+    raise ValueError(f"unknown model backend: {kind!r}")
@@ -0,0 +1,401 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+import time
+import uuid
+from collections.abc import Callable, Collection, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import partial
+from typing import TypeVar
+
+from modelop.scheduler import GenerationResult, InferenceJob
+from modelop.telemetry import Telemetry
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS background_jobs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL UNIQUE,
+    tenant_id TEXT NOT NULL,
+    adapter_id TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    max_new_tokens INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    submitted_at REAL NOT NULL,
+    completed_at REAL,
+    output TEXT,
+    completion_tokens INTEGER,
+    detail TEXT
+);
+CREATE INDEX IF NOT EXISTS background_jobs_by_status ON background_jobs (status, seq);
+"""
+
+_COLUMNS = (
+    "job_id, tenant_id, adapter_id, prompt, prompt_tokens, max_new_tokens, "
+    "status, submitted_at, completed_at, output, completion_tokens, detail"
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Background request ids are namespaced so they never collide with interactive ones in KV.
+_REQUEST_ID_PREFIX = "bg-"
+
+
+@dataclass(slots=True)
+class BackgroundJob:
+    job_id: str
+    tenant_id: str
+    adapter_id: str
+    prompt: str
+    prompt_tokens: int
+    max_new_tokens: int
+    # "queued", "running", "completed" or "failed".
+    status: str
+    submitted_at: float
+    completed_at: float | None = None
+    output: str | None = None
+    completion_tokens: int | None = None
+    detail: str | None = None
+
+
+class BackgroundJobStore:
+    """Durable job queue in SQLite, claimed oldest first.
+
+    Every write commits before returning, so submitted jobs and results
+    survive a restart. Claims run in ``BEGIN IMMEDIATE`` transactions, so
+    several worker processes can share one file without double-claiming.
+    """
+
+    def __init__(self, path: str, max_queued_jobs: int = 100_000) -> None:
+        self._max_queued_jobs = max_queued_jobs
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    @property
+    def queued_count(self) -> int:
+        return self._db.execute(
+            "SELECT COUNT(*) FROM background_jobs WHERE status = 'queued'"
+        ).fetchone()[0]
+
+    def submit(
+        self,
+        tenant_id: str,
+        adapter_id: str,
+        prompt: str,
+        prompt_tokens: int,
+        max_new_tokens: int,
+    ) -> BackgroundJob | None:
+        """Append a queued job; returns None once ``max_queued_jobs`` are waiting."""
+        job = BackgroundJob(
+            job_id=uuid.uuid4().hex,
+            tenant_id=tenant_id,
+            adapter_id=adapter_id,
+            prompt=prompt,
+            prompt_tokens=prompt_tokens,
+            max_new_tokens=max_new_tokens,
+            status="queued",
+            submitted_at=time.time(),
+        )
+        with self._transaction():
+            if self.queued_count >= self._max_queued_jobs:
+                return None
+            self._db.execute(
+                f"INSERT INTO background_jobs ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job.job_id,
+                    job.tenant_id,
+                    job.adapter_id,
+                    job.prompt,
+                    job.prompt_tokens,
+                    job.max_new_tokens,
+                    job.status,
+                    job.submitted_at,
+                    None,
+                    None,
+                    None,
+                    None,
+                ),
+            )
+        return job
+
+    def get(self, job_id: str) -> BackgroundJob | None:
+        row = self._db.execute(
+            f"SELECT {_COLUMNS} FROM background_jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        return None if row is None else BackgroundJob(*row)
+
+    def claim(
+        self, limit: int, adapter_ids: Collection[str] | None = None
+    ) -> list[BackgroundJob]:
+        """Mark up to ``limit`` of the oldest queued jobs running and return them.
+
+        With ``adapter_ids``, only jobs for those adapters are claimed.
+        """
+        if limit <= 0 or (adapter_ids is not None and not adapter_ids):
+            return []
+        adapter_filter = ""
+        params: list[object] = []
+        if adapter_ids is not None:
+            adapter_filter = f"AND adapter_id IN ({', '.join('?' * len(adapter_ids))}) "
+            params.extend(adapter_ids)
+        with self._transaction():
+            rows = self._db.execute(
+                f"SELECT {_COLUMNS} FROM background_jobs WHERE status = 'queued' "
+                f"{adapter_filter}ORDER BY seq LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+            self._db.executemany(
+                "UPDATE background_jobs SET status = 'running' WHERE job_id = ?",
+                [(row[0],) for row in rows],
+            )
+        jobs = [BackgroundJob(*row) for row in rows]
+        for job in jobs:
+            job.status = "running"
+        return jobs
+
+    def requeue(self, job_ids: list[str]) -> None:
+        """Return running jobs to the queue; they restart from the prompt."""
+        self._db.executemany(
+            "UPDATE background_jobs SET status = 'queued' WHERE job_id = ? AND status = 'running'",
+            [(job_id,) for job_id in job_ids],
+        )
+
+    def recover(self) -> int:
+        """Requeue jobs left running by a process that exited; returns how many."""
+        return self._db.execute(
+            "UPDATE background_jobs SET status = 'queued' WHERE status = 'running'"
+        ).rowcount
+
+    def complete(self, job_id: str, output: str, completion_tokens: int) -> None:
+        self._db.execute(
+            "UPDATE background_jobs SET status = 'completed', completed_at = ?, output = ?, "
+            "completion_tokens = ? WHERE job_id = ?",
+            (time.time(), output, completion_tokens, job_id),
+        )
+
+    def fail(self, job_id: str, detail: str) -> None:
+        self._db.execute(
+            "UPDATE background_jobs SET status = 'failed', completed_at = ?, detail = ? "
+            "WHERE job_id = ?",
+            (time.time(), detail, job_id),
+        )
+
+    def close(self) -> None:
+        self._db.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+
+class BackgroundTier:
+    """Feeds stored background jobs to the scheduler and records their results.
+
+    Every store call runs on one worker thread, which keeps the connection's
+    transactions in order and keeps a claim waiting on another process's write
+    lock off the event loop. ``take`` hands over jobs an earlier claim already
+    fetched and starts the next claim if it came up short; ``on_ready`` runs
+    once that claim lands. An empty claim is not retried for ``poll_seconds``
+    unless this process submitted or preempted a job since, so idle ticks
+    rarely touch disk.
+    """
+
+    def __init__(
+        self,
+        store: BackgroundJobStore,
+        telemetry: Telemetry | None = None,
+        poll_seconds: float = 1.0,
+    ) -> None:
+        self._store = store
+        self._telemetry = telemetry or Telemetry()
+        self._poll_seconds = poll_seconds
+        self._next_poll_at = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="modelop-background")
+        # Claimed jobs waiting for the scheduler's next take.
+        self._ready: list[InferenceJob] = []
+        self._claim_task: asyncio.Task[None] | None = None
+
+    @property
+    def store(self) -> BackgroundJobStore:
+        """The underlying store; only safe to call directly while the tier is idle."""
+        return self._store
+
+    @property
+    def poll_seconds(self) -> float:
+        return self._poll_seconds
+
+    async def submit(
+        self,
+        tenant_id: str,
+        adapter_id: str,
+        prompt: str,
+        prompt_tokens: int,
+        max_new_tokens: int,
+    ) -> BackgroundJob | None:
+        job = await self._run(
+            self._store.submit,
+            tenant_id=tenant_id,
+            adapter_id=adapter_id,
+            prompt=prompt,
+            prompt_tokens=prompt_tokens,
+            max_new_tokens=max_new_tokens,
+        )
+        self._telemetry.record_background_job(result="rejected" if job is None else "submitted")
+        if job is not None:
+            self._next_poll_at = 0.0
+        return job
+
+    async def get(self, job_id: str) -> BackgroundJob | None:
+        return await self._run(self._store.get, job_id)
+
+    async def recover(self) -> int:
+        return await self._run(self._store.recover)
+
+    async def close(self) -> None:
+        """Finish the claim in flight and pending writes, then close the store."""
+        if self._claim_task is not None:
+            await asyncio.gather(self._claim_task, return_exceptions=True)
+        self._requeue_unstarted(self._ready)
+        self._ready = []
+        await self._run(self._store.close)
+        self._executor.shutdown()
+
+    def take(
+        self,
+        limit: int,
+        adapter_ids: Collection[str] | None = None,
+        on_ready: Callable[[], None] | None = None,
+    ) -> list[InferenceJob]:
+        """Return up to ``limit`` claimed jobs, only for ``adapter_ids`` if given.
+
+        Claimed jobs that are not returned go back to the store for any worker
+        to claim; ``take(0)`` hands all of them back.
+        """
+        taken: list[InferenceJob] = []
+        unstarted: list[InferenceJob] = []
+        for job in self._ready:
+            if len(taken) < limit and (adapter_ids is None or job.adapter_id in adapter_ids):
+                taken.append(job)
+            else:
+                unstarted.append(job)
+        self._ready = []
+        self._requeue_unstarted(unstarted)
+        if len(taken) < limit:
+            self._start_claim(limit - len(taken), adapter_ids, on_ready)
+        return taken
+
+    def requeue(self, job: InferenceJob, preempted: bool = True) -> None:
+        """Return a claimed job to the store; ``preempted`` if it had started."""
+        if not preempted:
+            self._requeue_unstarted([job])
+            return
+        self._write(self._store.requeue, [job.request_id.removeprefix(_REQUEST_ID_PREFIX)])
+        self._telemetry.record_background_job(result="preempted")
+        self._next_poll_at = 0.0
+
+    def _start_claim(
+        self,
+        limit: int,
+        adapter_ids: Collection[str] | None,
+        on_ready: Callable[[], None] | None,
+    ) -> None:
+        if self._claim_task is not None or time.monotonic() < self._next_poll_at:
+            return
+        # A snapshot, since the caller's collection may change before the claim runs.
+        adapter_ids = None if adapter_ids is None else tuple(adapter_ids)
+        self._claim_task = asyncio.get_running_loop().create_task(
+            self._claim(limit, adapter_ids, on_ready)
+        )
+
+    async def _claim(
+        self,
+        limit: int,
+        adapter_ids: Collection[str] | None,
+        on_ready: Callable[[], None] | None,
+    ) -> None:
+        try:
+            records = await self._run(self._store.claim, limit, adapter_ids)
+        except Exception:
+            logger.exception("background job claim failed")
+            records = []
+        finally:
+            self._claim_task = None
+        now = time.monotonic()
+        if len(records) < limit:
+            self._next_poll_at = now + self._poll_seconds
+        if not records:
+            return
+        loop = asyncio.get_running_loop()
+        for record in records:
+            future: asyncio.Future[GenerationResult] = loop.create_future()
+            future.add_done_callback(partial(self._persist, record.job_id))
+            self._ready.append(
+                InferenceJob(
+                    request_id=_REQUEST_ID_PREFIX + record.job_id,
+                    tenant_id=record.tenant_id,
+                    adapter_id=record.adapter_id,
+                    prompt=record.prompt,
+                    prompt_tokens=record.prompt_tokens,
+                    max_new_tokens=record.max_new_tokens,
+                    estimated_total_tokens=record.prompt_tokens + record.max_new_tokens,
+                    admitted_at=now,
+                    enqueued_at=now,
+                    future=future,
+                    background=True,
+                )
+            )
+        if on_ready is not None:
+            on_ready()
+
+    def _requeue_unstarted(self, jobs: list[InferenceJob]) -> None:
+        # Never started, so neither a preemption nor a reason to poll again early.
+        if jobs:
+            self._write(
+                self._store.requeue,
+                [job.request_id.removeprefix(_REQUEST_ID_PREFIX) for job in jobs],
+            )
+
+    def _persist(self, job_id: str, future: asyncio.Future[GenerationResult]) -> None:
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            self._write(self._store.fail, job_id, detail=str(error))
+            self._telemetry.record_background_job(result="failed")
+            return
+        result = future.result()
+        self._write(
+            self._store.complete,
+            job_id,
+            output=result.output,
+            completion_tokens=result.completion_tokens,
+        )
+        self._telemetry.record_background_job(result="completed")
+
+    async def _run(self, function: Callable[..., T], *args: object, **kwargs: object) -> T:
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, partial(function, *args, **kwargs)
+        )
+
+    def _write(self, function: Callable[..., object], *args: object, **kwargs: object) -> None:
+        """Queue a store write behind earlier ones without waiting for it."""
+        self._executor.submit(function, *args, **kwargs).add_done_callback(_log_write_failure)
+
+
+def _log_write_failure(future: Future[object]) -> None:
+    if future.exception() is not None:
+        logger.error("background job store write failed", exc_info=future.exception())
@@ -0,0 +1,322 @@
+from __future__ import annotations
+
+from collections.abc import Collection, Mapping
+from typing import NamedTuple, Protocol
+
+try:
+    import numpy as np
+except ModuleNotFoundError:
+    np = None
+
+
+class TokenUpdate(NamedTuple):
+    first_token_slots: list[int]
+    tpot_samples: list[tuple[int, float]]
+
+
+class SequenceProgress(NamedTuple):
+    """Decode progress carried by a preempted job until it resumes."""
+
+    generated_tokens: int
+    first_token_at: float
+    last_token_at: float
+    tpot_sum: float
+
+
+class BatchState(Protocol):
+    """Per-slot decode progress for the sequences of the active batch."""
+
+    per_token_tpot: bool
+
+    def __len__(self) -> int: ...
+
+    def allocate(self, max_new_tokens: int, resume: SequenceProgress | None = None) -> int: ...
+
+    def release(self, slot: int) -> None: ...
+
+    def mark_done(self, slot: int) -> None: ...
+
+    def is_done(self, slot: int) -> bool: ...
+
+    def decoding_slots(self, paused: Collection[int] = ()) -> list[int]:
+        """Slots that the next ``advance`` with the same ``paused`` set will step."""
+        ...
+
+    def advance(
+        self,
+        now: float,
+        paused: Collection[int] = (),
+        steps: Mapping[int, int] | None = None,
+    ) -> TokenUpdate:
+        """Commit one token per decoding slot, or ``steps[slot]`` when given.
+
+        Tokens committed together arrive at ``now``; their TPOT samples split
+        the gap since the previous commit evenly.
+        """
+        ...
+
+    def completed_slots(self) -> list[int]: ...
+
+    def generated_tokens(self, slot: int) -> int: ...
+
+    def first_token_at(self, slot: int) -> float | None: ...
+
+    def avg_tpot(self, slot: int) -> float: ...
+
+    def remaining_tokens(self, slot: int) -> int: ...
+
+    def snapshot(self, slot: int) -> SequenceProgress: ...
+
+    def add_kv_credit(self, slot: int, tokens: int) -> None: ...
+
+    def slots_short_of_kv(self, step_tokens: int) -> list[int]: ...
+
+
+class PythonBatchState:
+    """Slot-indexed lists walked one sequence at a time.
+
+    Reports one TPOT sample per emitted token, matching the per-sequence
+    telemetry the scheduler has always exported.
+    """
+
+    per_token_tpot = True
+
+    def __init__(self, capacity: int) -> None:
+        self._free = list(range(capacity - 1, -1, -1))
+        self._live: dict[int, None] = {}
+        self._generated = [0] * capacity
+        self._limit = [0] * capacity
+        self._first_token_at = [0.0] * capacity
+        self._last_token_at = [0.0] * capacity
+        self._tpot_sum = [0.0] * capacity
+        self._kv_credit = [0] * capacity
+        self._done = [False] * capacity
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def allocate(self, max_new_tokens: int, resume: SequenceProgress | None = None) -> int:
+        slot = self._free.pop()
+        self._live[slot] = None
+        self._limit[slot] = max_new_tokens
+        self._done[slot] = False
+        if resume is None:
+            self._generated[slot] = 0
+            self._tpot_sum[slot] = 0.0
+        else:
+            self._generated[slot] = resume.generated_tokens
+            self._first_token_at[slot] = resume.first_token_at
+            self._last_token_at[slot] = resume.last_token_at
+            self._tpot_sum[slot] = resume.tpot_sum
+        self._kv_credit[slot] = self._generated[slot]
+        return slot
+
+    def release(self, slot: int) -> None:
+        if slot in self._live:
+            del self._live[slot]
+            self._free.append(slot)
+
+    def mark_done(self, slot: int) -> None:
+        self._done[slot] = True
+
+    def is_done(self, slot: int) -> bool:
+        return self._done[slot]
+
+    def decoding_slots(self, paused: Collection[int] = ()) -> list[int]:
+        return [slot for slot in self._live if not self._done[slot] and slot not in paused]
+
+    def advance(
+        self,
+        now: float,
+        paused: Collection[int] = (),
+        steps: Mapping[int, int] | None = None,
+    ) -> TokenUpdate:
+        first_token_slots: list[int] = []
+        tpot_samples: list[tuple[int, float]] = []
+        for slot in self._live:
+            if self._done[slot] or slot in paused:
+                continue
+            generated = self._generated[slot]
+            count = 1 if steps is None else max(1, min(steps.get(slot, 1), self._limit[slot] - generated))
+            if generated == 0:
+                self._first_token_at[slot] = now
+                first_token_slots.append(slot)
+                tpot_samples.extend((slot, 0.0) for _ in range(count - 1))
+            else:
+                delta = now - self._last_token_at[slot]
+                self._tpot_sum[slot] += delta
+                tpot_samples.extend((slot, delta / count) for _ in range(count))
+            generated += count
+            self._generated[slot] = generated
+            self._last_token_at[slot] = now
+            if generated >= self._limit[slot]:
+                self._done[slot] = True
+        return TokenUpdate(first_token_slots, tpot_samples)
+
+    def completed_slots(self) -> list[int]:
+        return [slot for slot in self._live if self._done[slot]]
+
+    def generated_tokens(self, slot: int) -> int:
+        return self._generated[slot]
+
+    def first_token_at(self, slot: int) -> float | None:
+        return self._first_token_at[slot] if self._generated[slot] else None
+
+    def avg_tpot(self, slot: int) -> float:
+        generated = self._generated[slot]
+        return self._tpot_sum[slot] / (generated - 1) if generated > 1 else 0.0
+
+    def remaining_tokens(self, slot: int) -> int:
+        return self._limit[slot] - self._generated[slot]
+
+    def snapshot(self, slot: int) -> SequenceProgress:
+        return SequenceProgress(
+            generated_tokens=self._generated[slot],
+            first_token_at=self._first_token_at[slot],
+            last_token_at=self._last_token_at[slot],
+            tpot_sum=self._tpot_sum[slot],
+        )
+
+    def add_kv_credit(self, slot: int, tokens: int) -> None:
+        self._kv_credit[slot] += tokens
+
+    def slots_short_of_kv(self, step_tokens: int) -> list[int]:
+        return [
+            slot
+            for slot in self._live
+            if not self._done[slot] and self._generated[slot] + step_tokens > self._kv_credit[slot]
+        ]
+
+
+class NumpyBatchState:
+    """Struct-of-arrays decode state updated with one vectorized pass per tick.
+
+    Per-token TPOT samples are not materialized; the scheduler observes each
+    sequence's mean TPOT once when it completes instead.
+    """
+
+    per_token_tpot = False
+
+    def __init__(self, capacity: int) -> None:
+        if np is None:
+            raise RuntimeError("numpy batch state requires numpy; install modelop[numpy]")
+        self._free = list(range(capacity - 1, -1, -1))
+        self._live = np.zeros(capacity, dtype=bool)
+        self._done = np.zeros(capacity, dtype=bool)
+        self._generated = np.zeros(capacity, dtype=np.int64)
+        self._limit = np.zeros(capacity, dtype=np.int64)
+        self._first_token_at = np.zeros(capacity, dtype=np.float64)
+        self._last_token_at = np.zeros(capacity, dtype=np.float64)
+        self._tpot_sum = np.zeros(capacity, dtype=np.float64)
+        self._kv_credit = np.zeros(capacity, dtype=np.int64)
+        self._mask = np.zeros(capacity, dtype=bool)
+        self._scratch = np.zeros(capacity, dtype=np.float64)
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def allocate(self, max_new_tokens: int, resume: SequenceProgress | None = None) -> int:
+        slot = self._free.pop()
+        self._live[slot] = True
+        self._done[slot] = False
+        self._limit[slot] = max_new_tokens
+        if resume is None:
+            self._generated[slot] = 0
+            self._tpot_sum[slot] = 0.0
+        else:
+            self._generated[slot] = resume.generated_tokens
+            self._first_token_at[slot] = resume.first_token_at
+            self._last_token_at[slot] = resume.last_token_at
+            self._tpot_sum[slot] = resume.tpot_sum
+        self._kv_credit[slot] = self._generated[slot]
+        self._count += 1
+        return slot
+
+    def release(self, slot: int) -> None:
+        if not self._live[slot]:
+            return
+        self._live[slot] = False
+        self._free.append(slot)
+        self._count -= 1
+
+    def mark_done(self, slot: int) -> None:
+        self._done[slot] = True
+
+    def is_done(self, slot: int) -> bool:
+        return bool(self._done[slot])
+
+    def decoding_slots(self, paused: Collection[int] = ()) -> list[int]:
+        mask = self._live & ~self._done
+        if paused:
+            mask[list(paused)] = False
+        return np.flatnonzero(mask).tolist()
+
+    def advance(
+        self,
+        now: float,
+        paused: Collection[int] = (),
+        steps: Mapping[int, int] | None = None,
+    ) -> TokenUpdate:
+        mask = self._mask
+        np.greater(self._live, self._done, out=mask)  # live and not done
+        if paused:
+            mask[list(paused)] = False
+
+        first_token_slots = np.flatnonzero(mask & (self._generated == 0))
+        self._first_token_at[first_token_slots] = now
+
+        decoding = mask & (self._generated > 0)
+        np.subtract(now, self._last_token_at, out=self._scratch, where=decoding)
+        np.add(self._tpot_sum, self._scratch, out=self._tpot_sum, where=decoding)
+
+        if steps:
+            counts = np.ones_like(self._generated)
+            counts[list(steps)] = list(steps.values())
+            np.minimum(counts, self._limit - self._generated, out=counts)
+            np.maximum(counts, 1, out=counts)
+            np.add(self._generated, counts, out=self._generated, where=mask)
+        else:
+            np.add(self._generated, 1, out=self._generated, where=mask)
+        np.copyto(self._last_token_at, now, where=mask)
+        self._done |= mask & (self._generated >= self._limit)
+        return TokenUpdate(first_token_slots.tolist(), [])
+
+    def completed_slots(self) -> list[int]:
+        return np.flatnonzero(self._live & self._done).tolist()
+
+    def generated_tokens(self, slot: int) -> int:
+        return int(self._generated[slot])
+
+    def first_token_at(self, slot: int) -> float | None:
+        return float(self._first_token_at[slot]) if self._generated[slot] else None
+
+    def avg_tpot(self, slot: int) -> float:
+        generated = int(self._generated[slot])
+        return float(self._tpot_sum[slot]) / (generated - 1) if generated > 1 else 0.0
+
+    def remaining_tokens(self, slot: int) -> int:
+        return int(self._limit[slot] - self._generated[slot])
+
+    def snapshot(self, slot: int) -> SequenceProgress:
+        return SequenceProgress(
+            generated_tokens=int(self._generated[slot]),
+            first_token_at=float(self._first_token_at[slot]),
+            last_token_at=float(self._last_token_at[slot]),
+            tpot_sum=float(self._tpot_sum[slot]),
+        )
+
+    def add_kv_credit(self, slot: int, tokens: int) -> None:
+        self._kv_credit[slot] += tokens
+
+    def slots_short_of_kv(self, step_tokens: int) -> list[int]:
+        short = self._live & ~self._done & (self._generated + step_tokens > self._kv_credit)
+        return np.flatnonzero(short).tolist()
+
+
+def create_batch_state(kind: str, capacity: int) -> BatchState:
+    if kind == "python":
+        return PythonBatchState(capacity)
+    if kind == "numpy":
+        return NumpyBatchState(capacity)
+    raise ValueError(f"unknown batch state engine: {kind!r}")
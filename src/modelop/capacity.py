@@ -1,5 +1,40 @@
 from __future__ import annotations
 
+import math
+from collections.abc import Sequence
+from typing import Protocol
+
+
+class KVTracker(Protocol):
+    @property
+    def active_bytes(self) -> int: ...
+
+    @property
+    def utilization_ratio(self) -> float: ...
+
+    @property
+    def worker_utilization_ratio(self) -> float:
+        """Share of the budget held by this process's own reservations.
+
+        Equal to ``utilization_ratio`` unless the budget is shared across workers.
+        """
+        ...
+
+    @property
+    def fragmentation_ratio(self) -> float: ...
+
+    def try_reserve(self, request_id: str, bytes_needed: int, shed_threshold: float) -> bool: ...
+
+    def try_reserve_many(
+        self, reservations: Sequence[tuple[str, int]], shed_threshold: float
+    ) -> bool:
+        """Reserve ``(request_id, bytes_needed)`` pairs all together or not at all."""
+        ...
+
+    def try_grow(self, request_id: str, bytes_needed: int) -> bool: ...
+
+    def release(self, request_id: str) -> None: ...
+
 
 class KVCapacityEstimator:
     def __init__(self, bytes_per_token: int) -> None:
@@ -25,6 +60,14 @@ class KVPressureTracker:
     def utilization_ratio(self) -> float:
         return min(1.0, self._active_bytes / self._kv_budget_bytes)
 
+    @property
+    def worker_utilization_ratio(self) -> float:
+        return self.utilization_ratio
+
+    @property
+    def fragmentation_ratio(self) -> float:
+        return 0.0
+
     def try_reserve(self, request_id: str, bytes_needed: int, shed_threshold: float) -> bool:
         projected = self._active_bytes + max(0, bytes_needed)
         projected_ratio = projected / self._kv_budget_bytes
@@ -34,6 +77,216 @@ class KVPressureTracker:
         self._active_bytes = projected
         return True
 
+    def try_reserve_many(
+        self, reservations: Sequence[tuple[str, int]], shed_threshold: float
+    ) -> bool:
+        total = sum(max(0, bytes_needed) for _, bytes_needed in reservations)
+        if (self._active_bytes + total) / self._kv_budget_bytes >= shed_threshold:
+            return False
+        for request_id, bytes_needed in reservations:
+            self._allocations[request_id] = max(0, bytes_needed)
+        self._active_bytes += total
+        return True
+
+    def try_grow(self, request_id: str, bytes_needed: int) -> bool:
+        if request_id not in self._allocations:
+            return False
+        extra = max(0, bytes_needed)
+        if self._active_bytes + extra > self._kv_budget_bytes:
+            return False
+        self._allocations[request_id] += extra
+        self._active_bytes += extra
+        return True
+
     def release(self, request_id: str) -> None:
         bytes_reserved = self._allocations.pop(request_id, 0)
         self._active_bytes = max(0, self._active_bytes - bytes_reserved)
+
+
+class BlockCache(Protocol):
+    """Holder of idle-but-cached blocks that the allocator may reclaim."""
+
+    @property
+    def reclaimable_blocks(self) -> int: ...
+
+    def evict(self, blocks_needed: int) -> None: ...
+
+    def release_request(self, request_id: str) -> None: ...
+
+
+class PagedKVAllocator:
+    """Block-granular KV accounting modeled on paged-attention engines.
+
+    The budget is split into fixed-size blocks of ``block_tokens`` tokens.
+    Each request owns a block table; blocks are reference counted so they can
+    be shared between requests. An attached ``BlockCache`` keeps blocks alive
+    after their requests finish and gives them back when space runs out, so
+    its idle blocks do not count as pressure.
+    """
+
+    def __init__(self, kv_budget_bytes: int, bytes_per_token: int, block_tokens: int = 16) -> None:
+        if kv_budget_bytes <= 0:
+            raise ValueError("kv_budget_bytes must be positive")
+        if bytes_per_token <= 0:
+            raise ValueError("bytes_per_token must be positive")
+        if block_tokens <= 0:
+            raise ValueError("block_tokens must be positive")
+        if kv_budget_bytes < bytes_per_token:
+            raise ValueError("kv_budget_bytes must hold at least one token")
+        # Budgets smaller than one block shrink the block rather than yield zero blocks.
+        self._block_tokens = min(block_tokens, kv_budget_bytes // bytes_per_token)
+        self._bytes_per_token = bytes_per_token
+        self._block_bytes = self._block_tokens * bytes_per_token
+        self._total_blocks = kv_budget_bytes // self._block_bytes
+
+        self._free_blocks: list[int] = list(range(self._total_blocks - 1, -1, -1))
+        self._refcounts: list[int] = [0] * self._total_blocks
+        self._fill: list[int] = [0] * self._total_blocks
+        self._block_tables: dict[str, list[int]] = {}
+        self._used_tokens = 0
+        self._block_cache: BlockCache | None = None
+
+    @property
+    def block_tokens(self) -> int:
+        return self._block_tokens
+
+    @property
+    def bytes_per_token(self) -> int:
+        return self._bytes_per_token
+
+    @property
+    def total_blocks(self) -> int:
+        return self._total_blocks
+
+    @property
+    def free_blocks(self) -> int:
+        return len(self._free_blocks)
+
+    @property
+    def used_blocks(self) -> int:
+        return self._total_blocks - len(self._free_blocks)
+
+    @property
+    def reclaimable_blocks(self) -> int:
+        return self._block_cache.reclaimable_blocks if self._block_cache is not None else 0
+
+    @property
+    def active_bytes(self) -> int:
+        return (self.used_blocks - self.reclaimable_blocks) * self._block_bytes
+
+    @property
+    def utilization_ratio(self) -> float:
+        return (self.used_blocks - self.reclaimable_blocks) / self._total_blocks
+
+    @property
+    def worker_utilization_ratio(self) -> float:
+        return self.utilization_ratio
+
+    @property
+    def fragmentation_ratio(self) -> float:
+        """Share of allocated token slots left empty in partially filled blocks."""
+        capacity_tokens = self.used_blocks * self._block_tokens
+        if capacity_tokens == 0:
+            return 0.0
+        return max(0.0, 1.0 - self._used_tokens / capacity_tokens)
+
+    def attach_block_cache(self, block_cache: BlockCache) -> None:
+        self._block_cache = block_cache
+
+    def block_table(self, request_id: str) -> list[int]:
+        return list(self._block_tables.get(request_id, ()))
+
+    def tokens_for_bytes(self, bytes_needed: int) -> int:
+        return math.ceil(max(0, bytes_needed) / self._bytes_per_token)
+
+    def try_reserve(
+        self,
+        request_id: str,
+        bytes_needed: int,
+        shed_threshold: float,
+        shared_blocks: Sequence[int] = (),
+    ) -> bool:
+        """Reserve ``bytes_needed`` of new KV, prefixed by already-filled ``shared_blocks``."""
+        tokens = self.tokens_for_bytes(bytes_needed)
+        blocks_needed = self._blocks_for_tokens(tokens)
+        pressure_blocks = self.used_blocks - self.reclaimable_blocks + blocks_needed
+        if pressure_blocks / self._total_blocks >= shed_threshold:
+            return False
+        if not self._ensure_free(blocks_needed):
+            return False
+        for block in shared_blocks:
+            self._refcounts[block] += 1
+        self._block_tables[request_id] = [*shared_blocks, *self._take_blocks(blocks_needed, tokens)]
+        return True
+
+    def try_reserve_many(
+        self, reservations: Sequence[tuple[str, int]], shed_threshold: float
+    ) -> bool:
+        tokens = [self.tokens_for_bytes(bytes_needed) for _, bytes_needed in reservations]
+        blocks_needed = sum(self._blocks_for_tokens(count) for count in tokens)
+        pressure_blocks = self.used_blocks - self.reclaimable_blocks + blocks_needed
+        if pressure_blocks / self._total_blocks >= shed_threshold:
+            return False
+        if not self._ensure_free(blocks_needed):
+            return False
+        for (request_id, _), count in zip(reservations, tokens):
+            self._block_tables[request_id] = self._take_blocks(self._blocks_for_tokens(count), count)
+        return True
+
+    def try_grow(self, request_id: str, bytes_needed: int) -> bool:
+        """Extend a reservation, allocating new blocks only past the tail block."""
+        table = self._block_tables.get(request_id)
+        if table is None:
+            return False
+        tokens = self.tokens_for_bytes(bytes_needed)
+        tail_room = self._block_tokens - self._fill[table[-1]] if table else 0
+        if table and self._refcounts[table[-1]] > 1:
+            tail_room = 0  # never write into a block another request shares
+        new_blocks = self._blocks_for_tokens(max(0, tokens - tail_room))
+        if not self._ensure_free(new_blocks):
+            return False
+        in_tail = min(tokens, tail_room)
+        if in_tail:
+            self._fill[table[-1]] += in_tail
+            self._used_tokens += in_tail
+        table.extend(self._take_blocks(new_blocks, tokens - in_tail))
+        return True
+
+    def retain_blocks(self, blocks: Sequence[int]) -> None:
+        for block in blocks:
+            self._refcounts[block] += 1
+
+    def drop_blocks(self, blocks: Sequence[int]) -> None:
+        for block in blocks:
+            self._refcounts[block] -= 1
+            if self._refcounts[block] == 0:
+                self._used_tokens -= self._fill[block]
+                self._fill[block] = 0
+                self._free_blocks.append(block)
+
+    def release(self, request_id: str) -> None:
+        table = self._block_tables.pop(request_id, None)
+        if table is None:
+            return
+        self.drop_blocks(table)
+        if self._block_cache is not None:
+            self._block_cache.release_request(request_id)
+
+    def _ensure_free(self, blocks_needed: int) -> bool:
+        shortfall = blocks_needed - len(self._free_blocks)
+        if shortfall > 0 and self._block_cache is not None:
+            self._block_cache.evict(shortfall)
+        return blocks_needed <= len(self._free_blocks)
+
+    def _take_blocks(self, count: int, tokens: int) -> list[int]:
+        blocks = [self._free_blocks.pop() for _ in range(count)]
+        for block in blocks:
+            fill = min(self._block_tokens, tokens)
+            tokens -= fill
+            self._refcounts[block] = 1
+            self._fill[block] = fill
+            self._used_tokens += fill
+        return blocks
+
+    def _blocks_for_tokens(self, tokens: int) -> int:
+        return math.ceil(tokens / self._block_tokens)
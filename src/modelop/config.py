@@ -8,6 +8,14 @@ class TenantPolicy:
     rate_tokens_per_sec: float
     burst_tokens: float
     default_adapter_id: str
+    # Share of scheduler service under the "fair" queue policy.
+    weight: float = 1.0
+    # Identical (adapter, prompt, max_new_tokens) requests share one generation
+    # while in flight and are served from the response cache afterwards.
+    coalesce_identical_requests: bool = False
+    # Requests whose predicted time to first token exceeds this are rejected
+    # with 429 and Retry-After at admission; None admits regardless.
+    ttft_slo_seconds: float | None = None
 
 
 DEFAULT_TENANT_POLICIES: dict[str, TenantPolicy] = {
@@ -27,7 +35,18 @@ DEFAULT_TENANT_POLICIES: dict[str, TenantPolicy] = {
 @dataclass
 class GatewayConfig:
     max_request_tokens: int = 8192
+    # Items accepted by one /v1/generate/batch call.
+    max_batch_items: int = 1024
     generation_timeout_seconds: float = 120.0
+    stream_channel_capacity: int = 64
+    # Completed generations kept for tenants that opt into coalescing.
+    response_cache_size: int = 4096
+    response_cache_ttl_seconds: float = 300.0
+
+    # Token counting: "heuristic" (chars/4) or "bpe:<merges file>", per adapter.
+    default_tokenizer: str = "heuristic"
+    adapter_tokenizers: dict[str, str] = field(default_factory=dict)
+    token_count_cache_size: int = 4096
 
     enable_prompt_truncation: bool = True
     prompt_truncation_head_ratio: float = 0.35
@@ -36,11 +55,98 @@ class GatewayConfig:
     shed_threshold: float = 0.90
     kv_budget_bytes: int = 8 * 1024 * 1024 * 1024
     kv_bytes_per_token: int = 16_384
+    kv_block_tokens: int = 16
+    # Active sequences are preempted once KV utilization rises above this ratio.
+    kv_preempt_watermark: float = 0.98
+    enable_prefix_cache: bool = True
+
+    # Tenant ids come from clients, so per-process token buckets are capped;
+    # idle (refilled) buckets are dropped first. Tenants beyond
+    # telemetry_max_tenant_labels, other than configured ones, share the
+    # "other" metric label. Adapter ids are client-chosen too: beyond
+    # telemetry_max_adapter_labels, adapters no tenant policy, tokenizer or
+    # speculation setting names are labelled "other".
+    rate_limit_max_tenants: int = 100_000
+    telemetry_max_tenant_labels: int = 256
+    telemetry_max_adapter_labels: int = 64
+
+    # Adaptive rate control: every interval, tenant refill rates are multiplied
+    # by decrease_factor while KV utilization or queue fill (depth / capacity) is
+    # at or above its high watermark, and raised by increase_step (as a fraction
+    # of the policy rate) once both are at or below their low watermarks. Under
+    # full pushback tenants still share floor_fraction of the combined configured
+    # rates by TenantPolicy.weight. Not applied with a lease coordinator, whose
+    # buckets are cluster-wide.
+    rate_limit_adaptive: bool = False
+    rate_limit_adaptive_interval_seconds: float = 0.1
+    rate_limit_adaptive_kv_high_watermark: float = 0.85
+    rate_limit_adaptive_kv_low_watermark: float = 0.6
+    rate_limit_adaptive_queue_high_watermark: float = 0.5
+    rate_limit_adaptive_queue_low_watermark: float = 0.1
+    rate_limit_adaptive_decrease_factor: float = 0.7
+    rate_limit_adaptive_increase_step: float = 0.05
+    rate_limit_adaptive_floor_fraction: float = 0.1
+
+    # Name of a shared-memory segment holding rate limits, KV bytes and in-flight
+    # IDs for every worker process; None keeps that state per process.
+    shared_state_name: str | None = None
+    shared_state_tenant_capacity: int = 4096
+    shared_state_inflight_capacity: int = 65536
+    # Admission gives up on a busy segment lock after this long and answers 503.
+    shared_state_lock_timeout_seconds: float = 0.005
+
+    # "host:port" of a lease coordinator shared by every gateway node; None keeps
+    # token buckets local. Each node overdraws at most overdraft_fraction * burst
+    # before settling, which bounds cluster-wide over-admission per node.
+    rate_limit_coordinator_url: str | None = None
+    rate_limit_node_id: str | None = None
+    rate_limit_renew_interval_seconds: float = 0.1
+    rate_limit_lease_fraction: float = 0.25
+    rate_limit_overdraft_fraction: float = 0.05
 
     scheduler_max_active_sequences: int = 16
     scheduler_queue_capacity: int = 1024
+    # "fifo", "fair" (weighted by TenantPolicy.weight) or "edf" (earliest deadline first).
+    scheduler_queue_policy: str = "fifo"
     scheduler_decode_step_seconds: float = 0.02
+    # Idle loops wait for enqueue; this only paces retries of queued work blocked on KV.
     scheduler_idle_sleep_seconds: float = 0.005
+    scheduler_batch_state: str = "python"
+    # "simulated" sleeps modeled step costs; "numpy" runs a small CPU reference model.
+    scheduler_backend: str = "simulated"
+    # Tokens of work per tick shared by decode steps (1 each) and prefill chunks.
+    scheduler_tick_token_budget: int = 2048
+    scheduler_prefill_token_seconds: float = 0.00002
+    # Adapters resident at once (0 = unlimited); loading one into a slot takes
+    # scheduler_adapter_load_seconds. Refill prefers jobs whose adapter is
+    # resident among the next lookahead queued jobs, but a job passed over
+    # max_skips times goes first.
+    scheduler_adapter_slots: int = 0
+    scheduler_adapter_load_seconds: float = 0.05
+    scheduler_adapter_lookahead: int = 16
+    scheduler_adapter_max_skips: int = 4
+    # Speculative decoding: a draft model proposes this many tokens per sequence
+    # each tick (0 disables) and each is accepted with the adapter's rate until
+    # the first rejection. Draft KV is reserved alongside the committed token.
+    scheduler_speculative_tokens: int = 0
+    scheduler_speculative_draft_token_seconds: float = 0.002
+    scheduler_speculative_acceptance: float = 0.7
+    adapter_speculative_acceptance: dict[str, float] = field(default_factory=dict)
+
+    # SQLite file backing the background job tier (POST /v1/jobs); None disables
+    # it. Background jobs start only in idle slots while KV utilization is below
+    # scheduler_background_kv_threshold, and give their slots back to waiting
+    # interactive jobs, restarting later from the prompt.
+    background_queue_path: str | None = None
+    background_max_queued_jobs: int = 100_000
+    background_poll_seconds: float = 1.0
+    scheduler_background_kv_threshold: float = 0.5
+
+    # Directory for a binary log of every /v1/generate request's shape and
+    # outcome (no prompt text), in rotating memory-mapped segments; None disables it.
+    traffic_log_dir: str | None = None
+    traffic_log_segment_bytes: int = 64 * 1024 * 1024
+    traffic_log_max_segments: int = 16
 
     tenant_policies: dict[str, TenantPolicy] = field(
         default_factory=lambda: DEFAULT_TENANT_POLICIES.copy()
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 
-from modelop.tokenization import estimate_tokens
+from modelop.tokenization import HeuristicTokenizer, Tokenizer
 
 
 @dataclass(frozen=True)
@@ -20,12 +20,15 @@ class ContextWindowOptimizer:
         head_ratio: float = 0.35,
         truncation_marker: str = "\n[...context truncated...]\n",
     ) -> None:
-        self._chars_per_token = chars_per_token
+        self._heuristic = HeuristicTokenizer(chars_per_token=chars_per_token)
         self._head_ratio = min(0.90, max(0.10, head_ratio))
         self._marker = truncation_marker
 
-    def optimize(self, prompt: str, max_prompt_tokens: int) -> ContextOptimizationResult:
-        original_prompt_tokens = estimate_tokens(prompt, chars_per_token=self._chars_per_token)
+    def optimize(
+        self, prompt: str, max_prompt_tokens: int, tokenizer: Tokenizer | None = None
+    ) -> ContextOptimizationResult:
+        count = (tokenizer or self._heuristic).count
+        original_prompt_tokens = count(prompt)
         if max_prompt_tokens <= 0:
             return ContextOptimizationResult(
                 prompt="",
@@ -42,22 +45,31 @@ class ContextWindowOptimizer:
                 prompt_truncated=False,
             )
 
-        max_chars = max(1, int(max_prompt_tokens * self._chars_per_token))
-        marker_len = len(self._marker)
-        if max_chars <= marker_len + 4:
-            trimmed = prompt[:max_chars]
-        else:
-            head_chars = int(max_chars * self._head_ratio)
-            tail_chars = max_chars - head_chars - marker_len
-            if tail_chars < 1:
-                tail_chars = 1
-                head_chars = max(1, max_chars - marker_len - tail_chars)
-            trimmed = f"{prompt[:head_chars]}{self._marker}{prompt[-tail_chars:]}"
-
-        effective_prompt_tokens = estimate_tokens(trimmed, chars_per_token=self._chars_per_token)
+        # Start from this prompt's own density rather than a nominal ratio.
+        chars_per_token = len(prompt) / original_prompt_tokens
+        max_chars = max(1, int(max_prompt_tokens * chars_per_token))
+        trimmed = self._trim(prompt, max_chars)
+        effective_prompt_tokens = count(trimmed)
+        # Real tokenizers are denser in some parts of a prompt than others;
+        # shrink proportionally until the kept text fits.
+        while effective_prompt_tokens > max_prompt_tokens and max_chars > 1:
+            max_chars = max(1, min(max_chars - 1, max_chars * max_prompt_tokens // effective_prompt_tokens))
+            trimmed = self._trim(prompt, max_chars)
+            effective_prompt_tokens = count(trimmed)
         return ContextOptimizationResult(
             prompt=trimmed,
             original_prompt_tokens=original_prompt_tokens,
             effective_prompt_tokens=effective_prompt_tokens,
             prompt_truncated=True,
         )
+
+    def _trim(self, prompt: str, max_chars: int) -> str:
+        marker_len = len(self._marker)
+        if max_chars <= marker_len + 4:
+            return prompt[:max_chars]
+        head_chars = int(max_chars * self._head_ratio)
+        tail_chars = max_chars - head_chars - marker_len
+        if tail_chars < 1:
+            tail_chars = 1
+            head_chars = max(1, max_chars - marker_len - tail_chars)
+        return f"{prompt[:head_chars]}{self._marker}{prompt[-tail_chars:]}"
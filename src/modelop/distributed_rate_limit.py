@@ -0,0 +1,374 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import secrets
+import time
+from typing import NamedTuple, Protocol
+
+from modelop.config import GatewayConfig
+from modelop.rate_limit import TokenBucket
+from modelop.telemetry import Telemetry
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseRequest(NamedTuple):
+    """One tenant's entry in a bulk renewal.
+
+    ``settle`` hands back the node's whole local balance (negative when the
+    node overdrew before its lease arrived); ``want`` is the fresh lease asked
+    for. The policy travels with the request so coordinators need no config.
+    """
+
+    settle: float
+    want: float
+    rate_tokens_per_sec: float
+    burst_tokens: float
+
+
+class LeaseGrant(NamedTuple):
+    tokens: float
+    # False while the tenant's global bucket is in debt from earlier overdrafts.
+    overdraft_allowed: bool
+
+
+class LeaseCoordinator(Protocol):
+    """Authoritative per-tenant buckets that gateway nodes lease from."""
+
+    async def renew(
+        self, node_id: str, requests: dict[str, LeaseRequest], seq: int
+    ) -> dict[str, LeaseGrant]:
+        """Settle balances and return the lease granted per tenant.
+
+        ``seq`` numbers the node's renewals. A node resends an unacknowledged
+        renewal unchanged under the same ``seq``, and the coordinator answers
+        it with the grants it already made instead of settling twice.
+        """
+        ...
+
+    async def close(self) -> None: ...
+
+
+class InProcessLeaseCoordinator:
+    def __init__(self) -> None:
+        self._buckets: dict[str, TokenBucket] = {}
+        # Last renewal applied per node, replayed if the node retries it.
+        self._applied: dict[str, tuple[int, dict[str, LeaseGrant]]] = {}
+
+    async def renew(
+        self, node_id: str, requests: dict[str, LeaseRequest], seq: int
+    ) -> dict[str, LeaseGrant]:
+        return self.renew_now(node_id, requests, seq, now=time.monotonic())
+
+    def renew_now(
+        self, node_id: str, requests: dict[str, LeaseRequest], seq: int, now: float
+    ) -> dict[str, LeaseGrant]:
+        applied = self._applied.get(node_id)
+        if applied is not None and applied[0] == seq:
+            return applied[1]
+        granted: dict[str, LeaseGrant] = {}
+        for tenant_id, request in requests.items():
+            bucket = self._buckets.get(tenant_id)
+            if bucket is None:
+                bucket = self._buckets[tenant_id] = TokenBucket(
+                    rate_tokens_per_sec=request.rate_tokens_per_sec,
+                    burst_tokens=request.burst_tokens,
+                    tokens=request.burst_tokens,
+                    last_refill_ts=now,
+                )
+            bucket.rate_tokens_per_sec = request.rate_tokens_per_sec
+            bucket.burst_tokens = request.burst_tokens
+            bucket.refill(now)
+            # Overdrafts are charged in full, so the bucket may go negative.
+            bucket.tokens = min(bucket.burst_tokens, bucket.tokens + request.settle)
+            grant = min(max(0.0, request.want), max(0.0, bucket.tokens))
+            bucket.tokens -= grant
+            granted[tenant_id] = LeaseGrant(tokens=grant, overdraft_allowed=bucket.tokens > 0.0)
+        self._applied[node_id] = (seq, granted)
+        return granted
+
+    async def close(self) -> None:
+        return None
+
+
+class LeaseCoordinatorServer:
+    """Newline-delimited JSON front end for an ``InProcessLeaseCoordinator``."""
+
+    def __init__(self, coordinator: InProcessLeaseCoordinator | None = None) -> None:
+        self._coordinator = coordinator or InProcessLeaseCoordinator()
+        self._server: asyncio.AbstractServer | None = None
+        self._connections: set[asyncio.StreamWriter] = set()
+
+    @property
+    def port(self) -> int:
+        assert self._server is not None
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        self._server = await asyncio.start_server(self._handle, host=host, port=port)
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._connections):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._connections.add(writer)
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+                requests = {
+                    tenant_id: LeaseRequest(*fields)
+                    for tenant_id, fields in message["requests"].items()
+                }
+                granted = self._coordinator.renew_now(
+                    message["node_id"], requests, message["seq"], now=time.monotonic()
+                )
+                writer.write(json.dumps({"granted": granted}).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, json.JSONDecodeError, KeyError, TypeError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+
+class TcpLeaseCoordinator:
+    """Client for ``LeaseCoordinatorServer``; reconnects on the next renewal after errors."""
+
+    def __init__(self, host: str, port: int, timeout_seconds: float = 1.0) -> None:
+        self._host = host
+        self._port = port
+        self._timeout_seconds = timeout_seconds
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+
+    async def renew(
+        self, node_id: str, requests: dict[str, LeaseRequest], seq: int
+    ) -> dict[str, LeaseGrant]:
+        try:
+            return await asyncio.wait_for(
+                self._roundtrip(node_id, requests, seq), self._timeout_seconds
+            )
+        except BaseException:
+            await self.close()
+            raise
+
+    async def _roundtrip(
+        self, node_id: str, requests: dict[str, LeaseRequest], seq: int
+    ) -> dict[str, LeaseGrant]:
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self._host, self._port)
+        payload = {
+            "node_id": node_id,
+            "seq": seq,
+            "requests": {k: list(v) for k, v in requests.items()},
+        }
+        self._writer.write(json.dumps(payload).encode() + b"\n")
+        await self._writer.drain()
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("lease coordinator closed the connection")
+        granted = json.loads(line)["granted"]
+        return {tenant_id: LeaseGrant(*fields) for tenant_id, fields in granted.items()}
+
+    async def close(self) -> None:
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+
+
+class _Lease:
+    __slots__ = ("balance", "spent", "denied", "overdraft_allowed", "largest", "quiet_renewals")
+
+    def __init__(self) -> None:
+        self.balance = 0.0
+        self.spent = 0.0
+        self.denied = 0.0
+        self.overdraft_allowed = True
+        # Largest single request seen lately; leases are never sized below it.
+        self.largest = 0.0
+        self.quiet_renewals = 0
+
+
+class LeasedTokenRateLimiter:
+    """Cluster-wide token buckets spent from locally leased slices.
+
+    ``try_consume`` only touches this node's lease, so the hot path makes no
+    network call and takes no lock. A background task renews every tenant's
+    lease in one bulk call per interval, sized to twice the recent demand and
+    capped at ``lease_fraction`` of the burst, but never below the largest
+    request seen in the last ``_LARGEST_HOLD_RENEWALS`` renewals (up to the
+    burst), so requests bigger than a routine lease still fit. A request
+    larger than any seen before wakes the renewal task early.
+
+    A node may overdraw by ``overdraft_fraction`` of the burst before a lease
+    arrives (new tenants, demand spikes). The overdraft is charged at the next
+    settlement and no node may overdraw again until the global bucket is out
+    of debt, so the cluster admits at most ``replicas * overdraft_fraction *
+    burst`` tokens beyond the global bucket; that is the error bound. If the
+    coordinator is unreachable, nodes keep spending what they hold and then
+    reject, so the bound still holds. A renewal that fails is resent unchanged
+    under the same sequence number, so a settlement whose reply was lost is
+    never applied twice. Sequence numbers start at a random value, so a
+    restarted node under the same id is not mistaken for a retry.
+    """
+
+    _LARGEST_HOLD_RENEWALS = 50
+
+    def __init__(
+        self,
+        config: GatewayConfig,
+        coordinator: LeaseCoordinator,
+        node_id: str,
+        renew_interval_seconds: float = 0.1,
+        lease_fraction: float = 0.25,
+        overdraft_fraction: float = 0.05,
+        telemetry: Telemetry | None = None,
+    ) -> None:
+        self._config = config
+        self._coordinator = coordinator
+        self._node_id = node_id
+        self._renew_interval_seconds = renew_interval_seconds
+        self._lease_fraction = lease_fraction
+        self._overdraft_fraction = overdraft_fraction
+        self._telemetry = telemetry or Telemetry()
+        self._leases: dict[str, _Lease] = {}
+        self._task: asyncio.Task[None] | None = None
+        self._renew_soon = asyncio.Event()
+        self._seq = secrets.randbits(48)
+        # Sent but unacknowledged renewal: its requests and the demand they covered.
+        self._unacknowledged: (
+            tuple[dict[str, LeaseRequest], dict[str, tuple[float, float]]] | None
+        ) = None
+
+    def try_consume(self, tenant_id: str, amount: int, now: float | None = None) -> bool:
+        if amount <= 0:
+            return True
+        lease = self._leases.get(tenant_id)
+        if lease is None:
+            lease = self._leases[tenant_id] = _Lease()
+        floor = 0.0
+        if lease.overdraft_allowed:
+            floor = -self._overdraft_fraction * self._config.policy_for(tenant_id).burst_tokens
+        if lease.balance - amount < floor:
+            lease.denied += amount
+            if amount > lease.largest:
+                lease.largest = amount
+                self._renew_soon.set()
+            return False
+        lease.largest = max(lease.largest, amount)
+        lease.balance -= amount
+        lease.spent += amount
+        return True
+
+    def refund(self, tenant_id: str, amount: int) -> None:
+        lease = self._leases.get(tenant_id)
+        if lease is None or amount <= 0:
+            return
+        lease.balance += amount
+        lease.spent = max(0.0, lease.spent - amount)
+
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._renew_loop(), name="rate-limit-lease-renewal")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            if self._unacknowledged is not None:
+                await self.renew()
+            # Hand unspent leases back so other nodes can use them.
+            for lease in self._leases.values():
+                lease.spent = lease.denied = 0.0
+            await self.renew()
+        except (OSError, asyncio.TimeoutError):
+            pass
+        await self._coordinator.close()
+
+    async def renew(self) -> None:
+        """Settle every lease and request fresh ones in a single coordinator call.
+
+        After a failure the same renewal is resent before any new one.
+        """
+        if self._unacknowledged is not None:
+            requests, demand = self._unacknowledged
+            granted = await self._coordinator.renew(self._node_id, requests, self._seq)
+            self._unacknowledged = None
+            self._apply(requests, demand, granted)
+            return
+        if not self._leases:
+            return
+        requests: dict[str, LeaseRequest] = {}
+        demand: dict[str, tuple[float, float]] = {}
+        for tenant_id, lease in self._leases.items():
+            policy = self._config.policy_for(tenant_id)
+            want = max(
+                min(2.0 * (lease.spent + lease.denied), self._lease_fraction * policy.burst_tokens),
+                min(lease.largest, policy.burst_tokens),
+            )
+            requests[tenant_id] = LeaseRequest(
+                settle=lease.balance,
+                want=want,
+                rate_tokens_per_sec=policy.rate_tokens_per_sec,
+                burst_tokens=policy.burst_tokens,
+            )
+            demand[tenant_id] = (lease.spent, lease.denied)
+
+        self._seq += 1
+        self._unacknowledged = (requests, demand)
+        granted = await self._coordinator.renew(self._node_id, requests, self._seq)
+        self._unacknowledged = None
+        self._apply(requests, demand, granted)
+
+    def _apply(
+        self,
+        requests: dict[str, LeaseRequest],
+        demand: dict[str, tuple[float, float]],
+        granted: dict[str, LeaseGrant],
+    ) -> None:
+        for tenant_id, request in requests.items():
+            lease = self._leases[tenant_id]
+            # Spending continued while the call was in flight; keep only that delta.
+            spent, denied = demand[tenant_id]
+            lease.spent -= spent
+            lease.denied -= denied
+            grant = granted[tenant_id]
+            lease.balance += grant.tokens - request.settle
+            lease.overdraft_allowed = grant.overdraft_allowed
+            if spent or denied:
+                lease.quiet_renewals = 0
+            else:
+                lease.quiet_renewals += 1
+                if lease.quiet_renewals >= self._LARGEST_HOLD_RENEWALS:
+                    lease.largest = 0.0
+            idle = lease.balance == 0.0 and lease.spent == 0.0 and lease.denied == 0.0
+            if idle and lease.overdraft_allowed:
+                del self._leases[tenant_id]
+
+    async def _renew_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._renew_soon.wait(), self._renew_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._renew_soon.clear()
+            try:
+                await self.renew()
+            except Exception:
+                # Any failure, including a malformed reply, must not end renewal.
+                logger.exception("rate limit lease renewal failed")
+                self._telemetry.record_lease_renewal(result="error")
+            else:
+                self._telemetry.record_lease_renewal(result="ok")
@@ -1,22 +1,74 @@
 from __future__ import annotations
 
 import asyncio
+import json
+import math
+import os
+import socket
 import time
 import uuid
-from contextlib import asynccontextmanager
-from dataclasses import dataclass
+from collections.abc import AsyncIterator
+from contextlib import aclosing, asynccontextmanager
+from dataclasses import asdict, dataclass
 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import Response
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
-from modelop.capacity import KVCapacityEstimator, KVPressureTracker
+from modelop.admission import AdmissionPredictor
+from modelop.background import BackgroundJobStore, BackgroundTier
+from modelop.backends import create_backend
+from modelop.capacity import KVCapacityEstimator, KVTracker, PagedKVAllocator
 from modelop.config import GatewayConfig
 from modelop.context_window import ContextOptimizationResult, ContextWindowOptimizer
-from modelop.identity import InflightRequestRegistry
-from modelop.rate_limit import TokenRateLimiter
-from modelop.schemas import GenerateRequest, GenerateResponse, HealthResponse
-from modelop.scheduler import ContinuousBatchingScheduler, InferenceJob
+from modelop.distributed_rate_limit import LeasedTokenRateLimiter, TcpLeaseCoordinator
+from modelop.identity import InflightRequestRegistry, RequestCoalescer
+from modelop.prefix_cache import PrefixCache
+from modelop.queueing import create_job_queue
+from modelop.rate_limit import AdaptiveRateController, RateLimiter, TokenRateLimiter
+from modelop.response_cache import ResponseCache, response_cache_key
+from modelop.schemas import (
+    BackgroundJobRequest,
+    BackgroundJobStatus,
+    GenerateBatchItemResult,
+    GenerateBatchRequest,
+    GenerateBatchResponse,
+    GenerateRequest,
+    GenerateResponse,
+    GenerateStreamToken,
+    GenerationUsage,
+    HealthResponse,
+)
+from modelop.scheduler import (
+    ContinuousBatchingScheduler,
+    DeadlineExceededError,
+    GenerationResult,
+    InferenceJob,
+)
+from modelop.shared_state import (
+    SharedInflightRequestRegistry,
+    SharedKVTracker,
+    SharedStateSegment,
+    SharedStateUnavailableError,
+    SharedTokenRateLimiter,
+)
+from modelop.speculative import SpeculativeDecoder
 from modelop.telemetry import Telemetry
+from modelop.tokenization import TokenizerRegistry
+from modelop.traffic_log import TrafficRecord, TrafficRecorder, prompt_hash
+
+
+class _TokenizedRejection(HTTPException):
+    """An HTTP rejection raised after the prompt was tokenized, with its token count."""
+
+    def __init__(
+        self,
+        prompt_tokens: int,
+        status_code: int,
+        detail: str,
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        super().__init__(status_code=status_code, detail=detail, headers=headers)
+        self.prompt_tokens = prompt_tokens
 
 
 @dataclass
@@ -24,16 +76,135 @@ class Services:
     config: GatewayConfig
     telemetry: Telemetry
     context_optimizer: ContextWindowOptimizer
-    request_registry: InflightRequestRegistry
-    rate_limiter: TokenRateLimiter
+    tokenizers: TokenizerRegistry
+    request_registry: InflightRequestRegistry | SharedInflightRequestRegistry
+    rate_limiter: RateLimiter
     kv_estimator: KVCapacityEstimator
-    kv_tracker: KVPressureTracker
+    kv_tracker: KVTracker
+    prefix_cache: PrefixCache | None
     scheduler: ContinuousBatchingScheduler
+    admission_predictor: AdmissionPredictor
+    coalescer: RequestCoalescer[GenerateResponse]
+    response_cache: ResponseCache[GenerateResponse]
+    background: BackgroundTier | None = None
+    traffic_recorder: TrafficRecorder | None = None
+    shared_state: SharedStateSegment | None = None
+    rate_controller: AdaptiveRateController | None = None
+
+
+def _sse_frame(event: str | None, data: dict[str, object]) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, separators=(',', ':'))}\n\n"
 
 
 def _build_services(config: GatewayConfig) -> Services:
-    telemetry = Telemetry()
-    kv_tracker = KVPressureTracker(kv_budget_bytes=config.kv_budget_bytes)
+    telemetry = Telemetry(
+        max_tenant_labels=config.telemetry_max_tenant_labels,
+        tenant_labels=config.tenant_policies,
+        max_adapter_labels=config.telemetry_max_adapter_labels,
+        adapter_labels=[
+            config.default_tenant_policy.default_adapter_id,
+            *(policy.default_adapter_id for policy in config.tenant_policies.values()),
+            *config.adapter_tokenizers,
+            *config.adapter_speculative_acceptance,
+        ],
+    )
+    rate_controller = (
+        AdaptiveRateController(config, telemetry=telemetry)
+        if config.rate_limit_adaptive and not config.rate_limit_coordinator_url
+        else None
+    )
+    shared_state: SharedStateSegment | None = None
+    if config.shared_state_name:
+        # Worker processes share admission state; paged blocks and the prefix
+        # cache stay per process, so they are not used in this mode.
+        shared_state = SharedStateSegment(
+            name=config.shared_state_name,
+            kv_budget_bytes=config.kv_budget_bytes,
+            tenant_capacity=config.shared_state_tenant_capacity,
+            inflight_capacity=config.shared_state_inflight_capacity,
+            lock_timeout_seconds=config.shared_state_lock_timeout_seconds,
+        )
+        kv_tracker: KVTracker = SharedKVTracker(shared_state)
+        rate_limiter: RateLimiter = SharedTokenRateLimiter(
+            config=config, segment=shared_state, rate_controller=rate_controller
+        )
+        request_registry: InflightRequestRegistry | SharedInflightRequestRegistry = (
+            SharedInflightRequestRegistry(shared_state)
+        )
+        prefix_cache = None
+    else:
+        kv_tracker = PagedKVAllocator(
+            kv_budget_bytes=config.kv_budget_bytes,
+            bytes_per_token=config.kv_bytes_per_token,
+            block_tokens=config.kv_block_tokens,
+        )
+        rate_limiter = TokenRateLimiter(config=config, rate_controller=rate_controller)
+        request_registry = InflightRequestRegistry()
+        prefix_cache = PrefixCache(allocator=kv_tracker) if config.enable_prefix_cache else None
+    if config.rate_limit_coordinator_url:
+        host, _, port = config.rate_limit_coordinator_url.rpartition(":")
+        rate_limiter = LeasedTokenRateLimiter(
+            config=config,
+            coordinator=TcpLeaseCoordinator(host=host, port=int(port)),
+            node_id=config.rate_limit_node_id or f"{socket.gethostname()}-{os.getpid()}",
+            renew_interval_seconds=config.rate_limit_renew_interval_seconds,
+            lease_fraction=config.rate_limit_lease_fraction,
+            overdraft_fraction=config.rate_limit_overdraft_fraction,
+            telemetry=telemetry,
+        )
+    background = (
+        BackgroundTier(
+            BackgroundJobStore(
+                config.background_queue_path, max_queued_jobs=config.background_max_queued_jobs
+            ),
+            telemetry=telemetry,
+            poll_seconds=config.background_poll_seconds,
+        )
+        if config.background_queue_path
+        else None
+    )
+    scheduler = ContinuousBatchingScheduler(
+        max_active_sequences=config.scheduler_max_active_sequences,
+        queue_capacity=config.scheduler_queue_capacity,
+        decode_step_seconds=config.scheduler_decode_step_seconds,
+        idle_sleep_seconds=config.scheduler_idle_sleep_seconds,
+        kv_tracker=kv_tracker,
+        batch_state=config.scheduler_batch_state,
+        tick_token_budget=config.scheduler_tick_token_budget,
+        prefill_token_seconds=config.scheduler_prefill_token_seconds,
+        kv_bytes_per_token=config.kv_bytes_per_token,
+        kv_growth_tokens=config.kv_block_tokens,
+        preempt_watermark=config.kv_preempt_watermark,
+        adapter_slots=config.scheduler_adapter_slots,
+        adapter_load_seconds=config.scheduler_adapter_load_seconds,
+        adapter_lookahead=config.scheduler_adapter_lookahead,
+        adapter_max_skips=config.scheduler_adapter_max_skips,
+        speculative=(
+            SpeculativeDecoder(
+                draft_tokens=config.scheduler_speculative_tokens,
+                draft_token_seconds=config.scheduler_speculative_draft_token_seconds,
+                default_acceptance=config.scheduler_speculative_acceptance,
+                acceptance_rates=config.adapter_speculative_acceptance,
+            )
+            if config.scheduler_speculative_tokens > 0
+            else None
+        ),
+        backend=create_backend(
+            config.scheduler_backend,
+            decode_step_seconds=config.scheduler_decode_step_seconds,
+            prefill_token_seconds=config.scheduler_prefill_token_seconds,
+        ),
+        queue=create_job_queue(
+            config.scheduler_queue_policy,
+            capacity=config.scheduler_queue_capacity,
+            weight_for=lambda tenant_id: config.policy_for(tenant_id).weight,
+            default_deadline_seconds=config.generation_timeout_seconds,
+        ),
+        background=background,
+        background_kv_threshold=config.scheduler_background_kv_threshold,
+        telemetry=telemetry,
+    )
     services = Services(
         config=config,
         telemetry=telemetry,
@@ -41,18 +212,35 @@ def _build_services(config: GatewayConfig) -> Services:
             head_ratio=config.prompt_truncation_head_ratio,
             truncation_marker=config.prompt_truncation_marker,
         ),
-        request_registry=InflightRequestRegistry(),
-        rate_limiter=TokenRateLimiter(config=config),
+        tokenizers=TokenizerRegistry(
+            default_spec=config.default_tokenizer,
+            adapter_specs=config.adapter_tokenizers,
+            cache_size=config.token_count_cache_size,
+        ),
+        request_registry=request_registry,
+        rate_limiter=rate_limiter,
         kv_estimator=KVCapacityEstimator(bytes_per_token=config.kv_bytes_per_token),
         kv_tracker=kv_tracker,
-        scheduler=ContinuousBatchingScheduler(
-            max_active_sequences=config.scheduler_max_active_sequences,
-            queue_capacity=config.scheduler_queue_capacity,
-            decode_step_seconds=config.scheduler_decode_step_seconds,
-            idle_sleep_seconds=config.scheduler_idle_sleep_seconds,
-            kv_tracker=kv_tracker,
-            telemetry=telemetry,
+        prefix_cache=prefix_cache,
+        scheduler=scheduler,
+        admission_predictor=AdmissionPredictor(scheduler),
+        coalescer=RequestCoalescer(),
+        response_cache=ResponseCache(
+            capacity=config.response_cache_size,
+            ttl_seconds=config.response_cache_ttl_seconds,
         ),
+        background=background,
+        traffic_recorder=(
+            TrafficRecorder(
+                config.traffic_log_dir,
+                segment_bytes=config.traffic_log_segment_bytes,
+                max_segments=config.traffic_log_max_segments,
+            )
+            if config.traffic_log_dir
+            else None
+        ),
+        shared_state=shared_state,
+        rate_controller=rate_controller,
     )
     telemetry.set_kv_utilization(0.0)
     return services
@@ -88,171 +276,769 @@ def create_app(config: GatewayConfig | None = None) -> FastAPI:
     async def lifespan(app: FastAPI):
         services = _build_services(config=app_config)
         app.state.services = services
+        if isinstance(services.rate_limiter, LeasedTokenRateLimiter):
+            await services.rate_limiter.start()
+        if services.background is not None and services.shared_state is None:
+            # With one process per file, anything still running was orphaned by a restart.
+            await services.background.recover()
         await services.scheduler.start()
+        if services.rate_controller is not None:
+            scheduler = services.scheduler
+            await services.rate_controller.start(
+                lambda: (
+                    services.kv_tracker.utilization_ratio,
+                    scheduler.queue_depth / max(1, scheduler.queue_capacity),
+                )
+            )
         yield
+        if services.rate_controller is not None:
+            await services.rate_controller.stop()
         await services.scheduler.stop()
+        if services.background is not None:
+            await services.background.close()
+        if services.traffic_recorder is not None:
+            services.traffic_recorder.close()
+        if isinstance(services.rate_limiter, LeasedTokenRateLimiter):
+            await services.rate_limiter.stop()
+        if services.shared_state is not None:
+            services.shared_state.close()
 
     app = FastAPI(title="ModelOp Gateway", version="0.1.0", lifespan=lifespan)
 
-    @app.post("/v1/generate", response_model=GenerateResponse)
-    async def generate(request: GenerateRequest) -> GenerateResponse:
-        services: Services = app.state.services
-        now = time.monotonic()
-        request_id = await allocate_request_id(services=services, request=request)
-        policy = services.config.policy_for(request.tenant_id)
-        adapter_id = request.adapter_id or policy.default_adapter_id
+    @app.exception_handler(SharedStateUnavailableError)
+    async def shared_state_unavailable(
+        _request: Request, exc: SharedStateUnavailableError
+    ) -> JSONResponse:
+        # A full shared table or a busy segment lock is transient back-pressure.
+        return JSONResponse(
+            status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"}
+        )
 
-        try:
-            prompt_budget_tokens = services.config.max_request_tokens - request.max_new_tokens
-            if prompt_budget_tokens <= 0:
-                services.telemetry.record_request_outcome(
-                    tenant_id=request.tenant_id,
-                    result="rejected",
-                    reason="invalid",
-                )
-                raise HTTPException(
-                    status_code=400,
-                    detail="max_new_tokens leaves no room for prompt tokens",
-                )
+    def fit_prompt(
+        services: Services,
+        tenant_id: str,
+        prompt: str,
+        max_new_tokens: int,
+        adapter_id: str,
+    ) -> tuple[ContextOptimizationResult, int]:
+        """Fit the prompt into the context window; returns it with the request's token total."""
 
-            context_result: ContextOptimizationResult = services.context_optimizer.optimize(
-                prompt=request.prompt,
-                max_prompt_tokens=prompt_budget_tokens,
+        def reject(detail: str, prompt_tokens: int | None = None) -> HTTPException:
+            services.telemetry.record_request_outcome(
+                tenant_id=tenant_id,
+                result="rejected",
+                reason="invalid",
             )
+            if prompt_tokens is None:
+                return HTTPException(status_code=400, detail=detail)
+            return _TokenizedRejection(prompt_tokens, status_code=400, detail=detail)
 
-            if context_result.prompt_truncated and not services.config.enable_prompt_truncation:
-                services.telemetry.record_request_outcome(
-                    tenant_id=request.tenant_id,
-                    result="rejected",
-                    reason="invalid",
-                )
-                raise HTTPException(
-                    status_code=400,
-                    detail=(
-                        f"request token budget {context_result.original_prompt_tokens + request.max_new_tokens} "
-                        f"exceeds max_request_tokens={services.config.max_request_tokens}"
-                    ),
-                )
+        prompt_budget_tokens = services.config.max_request_tokens - max_new_tokens
+        if prompt_budget_tokens <= 0:
+            raise reject("max_new_tokens leaves no room for prompt tokens")
 
-            if context_result.prompt_truncated:
-                services.telemetry.record_prompt_truncation(request.tenant_id)
+        context_result: ContextOptimizationResult = services.context_optimizer.optimize(
+            prompt=prompt,
+            max_prompt_tokens=prompt_budget_tokens,
+            tokenizer=services.tokenizers.for_adapter(adapter_id),
+        )
 
-            prompt_tokens = context_result.effective_prompt_tokens
-            estimated_total_tokens = prompt_tokens + request.max_new_tokens
+        if context_result.prompt_truncated and not services.config.enable_prompt_truncation:
+            raise reject(
+                f"request token budget {context_result.original_prompt_tokens + max_new_tokens} "
+                f"exceeds max_request_tokens={services.config.max_request_tokens}",
+                context_result.original_prompt_tokens,
+            )
 
-            if estimated_total_tokens > services.config.max_request_tokens:
-                services.telemetry.record_request_outcome(
-                    tenant_id=request.tenant_id,
-                    result="rejected",
-                    reason="invalid",
-                )
-                raise HTTPException(
-                    status_code=400,
-                    detail=(
-                        f"request token budget {estimated_total_tokens} exceeds "
-                        f"max_request_tokens={services.config.max_request_tokens}"
-                    ),
-                )
+        if context_result.prompt_truncated:
+            services.telemetry.record_prompt_truncation(tenant_id)
+
+        estimated_total_tokens = context_result.effective_prompt_tokens + max_new_tokens
+        if estimated_total_tokens > services.config.max_request_tokens:
+            raise reject(
+                f"request token budget {estimated_total_tokens} exceeds "
+                f"max_request_tokens={services.config.max_request_tokens}",
+                context_result.original_prompt_tokens,
+            )
+        return context_result, estimated_total_tokens
 
-            if not services.rate_limiter.try_consume(
+    async def admit(
+        services: Services,
+        request: GenerateRequest,
+        request_id: str,
+        now: float,
+        token_channel: asyncio.Queue[str] | None = None,
+    ) -> tuple[InferenceJob, ContextOptimizationResult]:
+        policy = services.config.policy_for(request.tenant_id)
+        adapter_id = request.adapter_id or policy.default_adapter_id
+        context_result, estimated_total_tokens = fit_prompt(
+            services=services,
+            tenant_id=request.tenant_id,
+            prompt=request.prompt,
+            max_new_tokens=request.max_new_tokens,
+            adapter_id=adapter_id,
+        )
+        prompt_tokens = context_result.effective_prompt_tokens
+        original_prompt_tokens = context_result.original_prompt_tokens
+
+        prediction = services.admission_predictor.predict(prompt_tokens)
+        if (
+            prediction is not None
+            and policy.ttft_slo_seconds is not None
+            and prediction.ttft_seconds > policy.ttft_slo_seconds
+        ):
+            services.telemetry.record_request_outcome(
                 tenant_id=request.tenant_id,
-                amount=estimated_total_tokens,
-                now=now,
-            ):
-                services.telemetry.record_request_outcome(
-                    tenant_id=request.tenant_id,
-                    result="rejected",
-                    reason="rate_limit",
-                )
-                raise HTTPException(status_code=429, detail="rate limit exceeded")
+                result="rejected",
+                reason="slo",
+            )
+            retry_after = max(1, math.ceil(prediction.ttft_seconds - policy.ttft_slo_seconds))
+            raise _TokenizedRejection(
+                original_prompt_tokens,
+                status_code=429,
+                detail="predicted time to first token exceeds the tenant's SLO",
+                headers={"Retry-After": str(retry_after)},
+            )
 
-            estimated_kv_bytes = services.kv_estimator.estimate_request_bytes(
-                estimated_total_tokens=estimated_total_tokens
+        if not services.rate_limiter.try_consume(
+            tenant_id=request.tenant_id,
+            amount=estimated_total_tokens,
+            now=now,
+        ):
+            services.telemetry.record_request_outcome(
+                tenant_id=request.tenant_id,
+                result="rejected",
+                reason="rate_limit",
+            )
+            raise _TokenizedRejection(
+                original_prompt_tokens, status_code=429, detail="rate limit exceeded"
             )
-            if not services.kv_tracker.try_reserve(
+
+        # Only the prompt is reserved up front; the scheduler grows KV as tokens decode.
+        estimated_kv_bytes = services.kv_estimator.estimate_request_bytes(
+            estimated_total_tokens=prompt_tokens
+        )
+        cached_prompt_tokens: int | None = 0
+        if services.prefix_cache is not None:
+            cached_prompt_tokens = services.prefix_cache.try_reserve(
                 request_id=request_id,
+                tenant_id=request.tenant_id,
+                adapter_id=adapter_id,
+                prompt=context_result.prompt,
                 bytes_needed=estimated_kv_bytes,
                 shed_threshold=services.config.shed_threshold,
-            ):
-                services.rate_limiter.refund(
-                    tenant_id=request.tenant_id, amount=estimated_total_tokens
-                )
+                prompt_tokens=prompt_tokens,
+            )
+        elif not services.kv_tracker.try_reserve(
+            request_id=request_id,
+            bytes_needed=estimated_kv_bytes,
+            shed_threshold=services.config.shed_threshold,
+        ):
+            cached_prompt_tokens = None
+        if cached_prompt_tokens is None:
+            services.rate_limiter.refund(
+                tenant_id=request.tenant_id, amount=estimated_total_tokens
+            )
+            services.telemetry.record_request_outcome(
+                tenant_id=request.tenant_id,
+                result="rejected",
+                reason="kv_pressure",
+            )
+            raise _TokenizedRejection(
+                original_prompt_tokens,
+                status_code=429,
+                detail="request shed due to KV-cache pressure threshold",
+            )
+        services.telemetry.set_kv_utilization(services.kv_tracker.utilization_ratio)
+        if services.prefix_cache is not None:
+            services.telemetry.record_prefix_cache_lookup(
+                tenant_id=request.tenant_id,
+                prompt_tokens=prompt_tokens,
+                hit_tokens=cached_prompt_tokens,
+                saved_bytes=services.kv_estimator.estimate_request_bytes(cached_prompt_tokens),
+            )
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        job = InferenceJob(
+            request_id=request_id,
+            tenant_id=request.tenant_id,
+            adapter_id=adapter_id,
+            prompt=context_result.prompt,
+            prompt_tokens=prompt_tokens,
+            max_new_tokens=request.max_new_tokens,
+            estimated_total_tokens=estimated_total_tokens,
+            admitted_at=now,
+            enqueued_at=time.monotonic(),
+            future=future,
+            token_channel=token_channel,
+            cached_prompt_tokens=cached_prompt_tokens,
+            predicted_ttft_seconds=None if prediction is None else prediction.ttft_seconds,
+            deadline_at=None if request.deadline_ms is None else now + request.deadline_ms / 1000,
+            priority=request.priority,
+        )
+        accepted = await services.scheduler.enqueue(job)
+        if not accepted:
+            services.kv_tracker.release(request_id=request_id)
+            services.rate_limiter.refund(
+                tenant_id=request.tenant_id, amount=estimated_total_tokens
+            )
+            services.telemetry.set_kv_utilization(services.kv_tracker.utilization_ratio)
+            services.telemetry.record_request_outcome(
+                tenant_id=request.tenant_id,
+                result="rejected",
+                reason="queue_full",
+            )
+            raise _TokenizedRejection(
+                original_prompt_tokens, status_code=429, detail="scheduler queue is full"
+            )
+
+        services.telemetry.record_request_outcome(
+            tenant_id=request.tenant_id,
+            result="accepted",
+            reason="accepted",
+        )
+        return job, context_result
+
+    async def admit_batch(
+        services: Services,
+        batch: GenerateBatchRequest,
+        now: float,
+        results: list[GenerateBatchItemResult | None],
+        claimed: list[str],
+    ) -> list[tuple[int, InferenceJob, ContextOptimizationResult]]:
+        """Admit a batch with one rate-limit debit, one KV reservation and one enqueue.
+
+        Invalid items and request_id collisions are answered per item; the SLO
+        gate, rate limiting and KV pressure reject the whole batch, and a batch
+        larger than the tenant's burst is rejected with a 400.
+        """
+        policy = services.config.policy_for(batch.tenant_id)
+        adapter_id = batch.adapter_id or policy.default_adapter_id
+        # Generated ids share one random prefix and skip the registry; clients
+        # cannot guess them, so only client-supplied ids are claimed.
+        id_prefix = str(uuid.uuid4())
+
+        def reject(index: int, status: int, reason: str, detail: str) -> None:
+            services.telemetry.record_request_outcome(
+                tenant_id=batch.tenant_id, result="rejected", reason=reason
+            )
+            results[index] = GenerateBatchItemResult(index=index, status=status, detail=detail)
+
+        def reject_batch(reason: str) -> None:
+            for _ in pending:
                 services.telemetry.record_request_outcome(
-                    tenant_id=request.tenant_id,
-                    result="rejected",
-                    reason="kv_pressure",
+                    tenant_id=batch.tenant_id, result="rejected", reason=reason
+                )
+
+        pending: list[tuple[int, str, ContextOptimizationResult, int]] = []
+        for index, item in enumerate(batch.items):
+            try:
+                context_result, estimated_total_tokens = fit_prompt(
+                    services=services,
+                    tenant_id=batch.tenant_id,
+                    prompt=item.prompt,
+                    max_new_tokens=item.max_new_tokens,
+                    adapter_id=adapter_id,
                 )
-                raise HTTPException(
-                    status_code=429,
-                    detail="request shed due to KV-cache pressure threshold",
+            except HTTPException as exc:
+                results[index] = GenerateBatchItemResult(
+                    index=index, status=exc.status_code, detail=exc.detail
                 )
-            services.telemetry.set_kv_utilization(services.kv_tracker.utilization_ratio)
+                continue
 
-            future: asyncio.Future = asyncio.get_running_loop().create_future()
-            job = InferenceJob(
+            if item.request_id is None:
+                request_id = f"{id_prefix}-{index}"
+            elif await services.request_registry.claim(item.request_id):
+                request_id = item.request_id
+                claimed.append(request_id)
+            else:
+                services.telemetry.record_request_id_collision(batch.tenant_id)
+                reject(
+                    index,
+                    409,
+                    "request_id_collision",
+                    "request_id already in flight; use a unique request_id",
+                )
+                continue
+            pending.append((index, request_id, context_result, estimated_total_tokens))
+
+        if not pending:
+            return []
+
+        # The head of the batch is the best case; if it would already miss, all would.
+        prediction = services.admission_predictor.predict(
+            pending[0][2].effective_prompt_tokens
+        )
+        if (
+            prediction is not None
+            and policy.ttft_slo_seconds is not None
+            and prediction.ttft_seconds > policy.ttft_slo_seconds
+        ):
+            reject_batch("slo")
+            retry_after = max(1, math.ceil(prediction.ttft_seconds - policy.ttft_slo_seconds))
+            raise HTTPException(
+                status_code=429,
+                detail="predicted time to first token exceeds the tenant's SLO",
+                headers={"Retry-After": str(retry_after)},
+            )
+
+        batch_tokens = sum(total for _, _, _, total in pending)
+        if batch_tokens > policy.burst_tokens:
+            # No bucket ever holds more than its burst, so a retry cannot succeed.
+            reject_batch("invalid")
+            raise HTTPException(
+                status_code=400,
+                detail=(
+                    f"batch token budget {batch_tokens} exceeds the tenant's "
+                    f"burst_tokens={policy.burst_tokens:g}; split the batch"
+                ),
+            )
+        if not services.rate_limiter.try_consume(
+            tenant_id=batch.tenant_id, amount=batch_tokens, now=now
+        ):
+            reject_batch("rate_limit")
+            raise HTTPException(status_code=429, detail="rate limit exceeded")
+
+        # Batch items bypass the prefix cache so the whole batch reserves in one call.
+        reservations = [
+            (
+                request_id,
+                services.kv_estimator.estimate_request_bytes(
+                    estimated_total_tokens=context_result.effective_prompt_tokens
+                ),
+            )
+            for _, request_id, context_result, _ in pending
+        ]
+        if not services.kv_tracker.try_reserve_many(
+            reservations, shed_threshold=services.config.shed_threshold
+        ):
+            services.rate_limiter.refund(tenant_id=batch.tenant_id, amount=batch_tokens)
+            reject_batch("kv_pressure")
+            raise HTTPException(
+                status_code=429,
+                detail="batch shed due to KV-cache pressure threshold",
+            )
+
+        loop = asyncio.get_running_loop()
+        enqueued_at = time.monotonic()
+        jobs = [
+            InferenceJob(
                 request_id=request_id,
-                tenant_id=request.tenant_id,
+                tenant_id=batch.tenant_id,
                 adapter_id=adapter_id,
                 prompt=context_result.prompt,
-                prompt_tokens=prompt_tokens,
-                max_new_tokens=request.max_new_tokens,
+                prompt_tokens=context_result.effective_prompt_tokens,
+                max_new_tokens=batch.items[index].max_new_tokens,
                 estimated_total_tokens=estimated_total_tokens,
                 admitted_at=now,
-                enqueued_at=time.monotonic(),
-                future=future,
-            )
-            accepted = await services.scheduler.enqueue(job)
-            if not accepted:
-                services.kv_tracker.release(request_id=request_id)
-                services.rate_limiter.refund(
-                    tenant_id=request.tenant_id, amount=estimated_total_tokens
+                enqueued_at=enqueued_at,
+                future=loop.create_future(),
+            )
+            for index, request_id, context_result, estimated_total_tokens in pending
+        ]
+        accepted = await services.scheduler.enqueue_many(jobs)
+        for (index, request_id, _, estimated_total_tokens) in pending[accepted:]:
+            services.kv_tracker.release(request_id=request_id)
+            services.rate_limiter.refund(tenant_id=batch.tenant_id, amount=estimated_total_tokens)
+            reject(index, 429, "queue_full", "scheduler queue is full")
+        services.telemetry.set_kv_utilization(services.kv_tracker.utilization_ratio)
+        for _ in range(accepted):
+            services.telemetry.record_request_outcome(
+                tenant_id=batch.tenant_id, result="accepted", reason="accepted"
+            )
+        return [
+            (index, job, context_result)
+            for (index, _, context_result, _), job in zip(pending[:accepted], jobs)
+        ]
+
+    def usage_fields(
+        result: GenerationResult, context_result: ContextOptimizationResult
+    ) -> dict[str, object]:
+        prompt_tokens = context_result.effective_prompt_tokens
+        return {
+            "request_id": result.request_id,
+            "tenant_id": result.tenant_id,
+            "adapter_id": result.adapter_id,
+            "prompt_tokens": prompt_tokens,
+            "original_prompt_tokens": context_result.original_prompt_tokens,
+            "effective_prompt_tokens": prompt_tokens,
+            "prompt_truncated": context_result.prompt_truncated,
+            "cached_prompt_tokens": result.cached_prompt_tokens,
+            "completion_tokens": result.completion_tokens,
+            "total_tokens": prompt_tokens + result.completion_tokens,
+            "queue_time_seconds": result.queue_time_seconds,
+            "ttft_seconds": result.ttft_seconds,
+            "avg_tpot_seconds": result.avg_tpot_seconds,
+            "total_time_seconds": result.total_time_seconds,
+        }
+
+    async def stream_events(
+        services: Services,
+        job: InferenceJob,
+        context_result: ContextOptimizationResult,
+    ) -> AsyncIterator[str]:
+        channel = job.token_channel
+        assert channel is not None
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + services.config.generation_timeout_seconds
+        index = 0
+        try:
+            while True:
+                if channel.empty() and not job.future.done():
+                    getter = asyncio.ensure_future(channel.get())
+                    try:
+                        await asyncio.wait(
+                            {getter, job.future},
+                            timeout=max(0.0, deadline - loop.time()),
+                            return_when=asyncio.FIRST_COMPLETED,
+                        )
+                    finally:
+                        if not getter.done():
+                            getter.cancel()
+                    if getter.done() and not getter.cancelled():
+                        token = getter.result()
+                    elif job.future.done():
+                        continue
+                    else:
+                        services.telemetry.record_request_outcome(
+                            tenant_id=job.tenant_id,
+                            result="rejected",
+                            reason="timeout",
+                        )
+                        yield _sse_frame("error", {"detail": "generation timeout"})
+                        return
+                elif not channel.empty():
+                    token = channel.get_nowait()
+                else:
+                    break
+
+                index += 1
+                chunk = GenerateStreamToken(request_id=job.request_id, index=index, token=token)
+                yield _sse_frame(None, chunk.model_dump())
+
+            error = None if job.future.cancelled() else job.future.exception()
+            if job.future.cancelled() or error is not None:
+                if isinstance(error, DeadlineExceededError):
+                    detail = "deadline exceeded before start"
+                else:
+                    detail = "generation failed"
+                yield _sse_frame("error", {"detail": detail})
+                return
+            usage = GenerationUsage(**usage_fields(job.future.result(), context_result))
+            yield _sse_frame("done", usage.model_dump())
+        finally:
+            if not job.future.done():
+                job.future.cancel()
+            await services.request_registry.release(job.request_id)
+
+    async def batch_results(
+        services: Services,
+        tenant_id: str,
+        admitted: list[tuple[int, InferenceJob, ContextOptimizationResult]],
+    ) -> AsyncIterator[GenerateBatchItemResult]:
+        """Yield each admitted item's result as it completes, within the generation timeout."""
+        items = {job.future: (index, context_result) for index, job, context_result in admitted}
+        pending: set[asyncio.Future] = set(items)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + services.config.generation_timeout_seconds
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=max(0.0, deadline - loop.time()),
+                    return_when=asyncio.FIRST_COMPLETED,
                 )
-                services.telemetry.set_kv_utilization(services.kv_tracker.utilization_ratio)
+                if not done:
+                    break
+                for future in sorted(done, key=lambda future: items[future][0]):
+                    index, context_result = items[future]
+                    if future.cancelled() or future.exception() is not None:
+                        yield GenerateBatchItemResult(
+                            index=index, status=500, detail="generation failed"
+                        )
+                        continue
+                    result = future.result()
+                    yield GenerateBatchItemResult(
+                        index=index,
+                        status=200,
+                        response=GenerateResponse(
+                            output=result.output, **usage_fields(result, context_result)
+                        ),
+                    )
+            for future in sorted(pending, key=lambda future: items[future][0]):
                 services.telemetry.record_request_outcome(
-                    tenant_id=request.tenant_id,
-                    result="rejected",
-                    reason="queue_full",
+                    tenant_id=tenant_id, result="rejected", reason="timeout"
+                )
+                yield GenerateBatchItemResult(
+                    index=items[future][0], status=504, detail="generation timeout"
                 )
-                raise HTTPException(status_code=429, detail="scheduler queue is full")
+        finally:
+            for future in pending:
+                future.cancel()
+
+    async def batch_lines(
+        services: Services,
+        tenant_id: str,
+        results: list[GenerateBatchItemResult | None],
+        admitted: list[tuple[int, InferenceJob, ContextOptimizationResult]],
+        claimed: list[str],
+    ) -> AsyncIterator[str]:
+        try:
+            for result in results:
+                if result is not None:
+                    yield result.model_dump_json() + "\n"
+            async with aclosing(batch_results(services, tenant_id, admitted)) as stream:
+                async for result in stream:
+                    yield result.model_dump_json() + "\n"
+        finally:
+            for request_id in claimed:
+                await services.request_registry.release(request_id)
+
+    async def run_generation(
+        services: Services, request: GenerateRequest, request_id: str, now: float
+    ) -> GenerateResponse:
+        job, context_result = await admit(
+            services=services, request=request, request_id=request_id, now=now
+        )
 
+        try:
+            result = await asyncio.wait_for(
+                job.future,
+                timeout=services.config.generation_timeout_seconds,
+            )
+        except asyncio.TimeoutError as exc:
             services.telemetry.record_request_outcome(
                 tenant_id=request.tenant_id,
-                result="accepted",
-                reason="accepted",
+                result="rejected",
+                reason="timeout",
             )
+            raise _TokenizedRejection(
+                context_result.original_prompt_tokens, status_code=504, detail="generation timeout"
+            ) from exc
+        except DeadlineExceededError as exc:
+            services.telemetry.record_request_outcome(
+                tenant_id=request.tenant_id,
+                result="rejected",
+                reason="deadline",
+            )
+            raise _TokenizedRejection(
+                context_result.original_prompt_tokens,
+                status_code=504,
+                detail="deadline exceeded before start",
+            ) from exc
 
-            try:
-                result = await asyncio.wait_for(
-                    future,
-                    timeout=services.config.generation_timeout_seconds,
-                )
-            except asyncio.TimeoutError as exc:
-                services.telemetry.record_request_outcome(
-                    tenant_id=request.tenant_id,
-                    result="rejected",
-                    reason="timeout",
-                )
-                raise HTTPException(status_code=504, detail="generation timeout") from exc
+        return GenerateResponse(output=result.output, **usage_fields(result, context_result))
 
-            return GenerateResponse(
-                request_id=result.request_id,
-                tenant_id=result.tenant_id,
-                adapter_id=result.adapter_id,
-                output=result.output,
+    async def coalesced_generation(
+        services: Services, request: GenerateRequest, request_id: str, now: float
+    ) -> GenerateResponse:
+        # Generation is greedy, so identical inputs produce identical outputs and
+        # repeats skip rate limiting, KV reservation and decode entirely.
+        policy = services.config.policy_for(request.tenant_id)
+        key = response_cache_key(
+            tenant_id=request.tenant_id,
+            adapter_id=request.adapter_id or policy.default_adapter_id,
+            prompt=request.prompt,
+            max_new_tokens=request.max_new_tokens,
+        )
+        response = services.response_cache.get(key)
+        if response is not None:
+            served_by = "hit"
+        else:
+            response, coalesced = await services.coalescer.run(
+                key,
+                lambda: run_generation(
+                    services=services, request=request, request_id=request_id, now=now
+                ),
+            )
+            if not coalesced:
+                services.telemetry.record_response_cache(request.tenant_id, result="miss")
+                services.response_cache.put(key, response)
+                return response
+            served_by = "coalesced"
+
+        services.telemetry.record_response_cache(request.tenant_id, result=served_by)
+        services.telemetry.record_request_outcome(
+            tenant_id=request.tenant_id,
+            result="accepted",
+            reason=served_by,
+        )
+        return response.model_copy(update={"request_id": request_id, "cache_hit": True})
+
+    def record_traffic(
+        services: Services,
+        request: GenerateRequest,
+        now: float,
+        status: int,
+        prompt_tokens: int,
+        response: GenerateResponse | None = None,
+    ) -> None:
+        assert services.traffic_recorder is not None
+        elapsed = time.monotonic() - now
+        policy = services.config.policy_for(request.tenant_id)
+        adapter_id = request.adapter_id or policy.default_adapter_id
+        services.traffic_recorder.record(
+            TrafficRecord(
+                timestamp=time.time() - elapsed,
+                tenant_id=request.tenant_id,
+                adapter_id=adapter_id,
                 prompt_tokens=prompt_tokens,
-                original_prompt_tokens=context_result.original_prompt_tokens,
-                effective_prompt_tokens=prompt_tokens,
-                prompt_truncated=context_result.prompt_truncated,
-                completion_tokens=result.completion_tokens,
-                total_tokens=prompt_tokens + result.completion_tokens,
-                queue_time_seconds=result.queue_time_seconds,
-                ttft_seconds=result.ttft_seconds,
-                avg_tpot_seconds=result.avg_tpot_seconds,
-                total_time_seconds=result.total_time_seconds,
+                max_new_tokens=request.max_new_tokens,
+                prompt_hash=prompt_hash(request.prompt),
+                status=status,
+                completion_tokens=0 if response is None else response.completion_tokens,
+                queue_seconds=0.0 if response is None else response.queue_time_seconds,
+                ttft_seconds=0.0 if response is None else response.ttft_seconds,
+                tpot_seconds=0.0 if response is None else response.avg_tpot_seconds,
+                total_seconds=elapsed,
+            )
+        )
+
+    @app.post("/v1/generate", response_model=GenerateResponse)
+    async def generate(request: GenerateRequest) -> GenerateResponse:
+        services: Services = app.state.services
+        now = time.monotonic()
+        if services.traffic_recorder is None:
+            return await serve_generate(services=services, request=request, now=now)
+        try:
+            response = await serve_generate(services=services, request=request, now=now)
+        except HTTPException as exc:
+            # Requests rejected before fit_prompt tokenized them record 0 prompt tokens.
+            record_traffic(
+                services=services,
+                request=request,
+                now=now,
+                status=exc.status_code,
+                prompt_tokens=exc.prompt_tokens if isinstance(exc, _TokenizedRejection) else 0,
+            )
+            raise
+        record_traffic(
+            services=services,
+            request=request,
+            now=now,
+            status=200,
+            prompt_tokens=response.original_prompt_tokens,
+            response=response,
+        )
+        return response
+
+    async def serve_generate(
+        services: Services, request: GenerateRequest, now: float
+    ) -> GenerateResponse:
+        request_id = await allocate_request_id(services=services, request=request)
+
+        try:
+            if services.config.policy_for(request.tenant_id).coalesce_identical_requests:
+                return await coalesced_generation(
+                    services=services, request=request, request_id=request_id, now=now
+                )
+            return await run_generation(
+                services=services, request=request, request_id=request_id, now=now
             )
         finally:
             await services.request_registry.release(request_id)
 
+    @app.post("/v1/generate/stream")
+    async def generate_stream(request: GenerateRequest) -> StreamingResponse:
+        services: Services = app.state.services
+        now = time.monotonic()
+        request_id = await allocate_request_id(services=services, request=request)
+
+        try:
+            job, context_result = await admit(
+                services=services,
+                request=request,
+                request_id=request_id,
+                now=now,
+                token_channel=asyncio.Queue(maxsize=services.config.stream_channel_capacity),
+            )
+        except BaseException:
+            await services.request_registry.release(request_id)
+            raise
+
+        # The registry claim is released by stream_events once the stream ends.
+        return StreamingResponse(
+            stream_events(services=services, job=job, context_result=context_result),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache"},
+        )
+
+    @app.post("/v1/generate/batch", response_model=GenerateBatchResponse)
+    async def generate_batch(batch: GenerateBatchRequest) -> Response:
+        services: Services = app.state.services
+        now = time.monotonic()
+        if len(batch.items) > services.config.max_batch_items:
+            raise HTTPException(
+                status_code=400,
+                detail=(
+                    f"batch has {len(batch.items)} items; "
+                    f"max_batch_items={services.config.max_batch_items}"
+                ),
+            )
+
+        results: list[GenerateBatchItemResult | None] = [None] * len(batch.items)
+        claimed: list[str] = []
+        try:
+            admitted = await admit_batch(
+                services=services, batch=batch, now=now, results=results, claimed=claimed
+            )
+        except BaseException:
+            for request_id in claimed:
+                await services.request_registry.release(request_id)
+            raise
+
+        # Claimed request ids are released once every item has an answer.
+        if batch.stream:
+            return StreamingResponse(
+                batch_lines(services, batch.tenant_id, results, admitted, claimed),
+                media_type="application/x-ndjson",
+            )
+        try:
+            async with aclosing(batch_results(services, batch.tenant_id, admitted)) as stream:
+                async for result in stream:
+                    results[result.index] = result
+        finally:
+            for request_id in claimed:
+                await services.request_registry.release(request_id)
+        return GenerateBatchResponse(results=results)
+
+    @app.post("/v1/jobs", response_model=BackgroundJobStatus, status_code=202)
+    async def submit_job(request: BackgroundJobRequest) -> BackgroundJobStatus:
+        services: Services = app.state.services
+        if services.background is None:
+            raise HTTPException(
+                status_code=503, detail="background job tier is disabled; set background_queue_path"
+            )
+        policy = services.config.policy_for(request.tenant_id)
+        adapter_id = request.adapter_id or policy.default_adapter_id
+        context_result, _ = fit_prompt(
+            services=services,
+            tenant_id=request.tenant_id,
+            prompt=request.prompt,
+            max_new_tokens=request.max_new_tokens,
+            adapter_id=adapter_id,
+        )
+        # Background jobs bypass token buckets; they only ever use idle capacity.
+        job = await services.background.submit(
+            tenant_id=request.tenant_id,
+            adapter_id=adapter_id,
+            prompt=context_result.prompt,
+            prompt_tokens=context_result.effective_prompt_tokens,
+            max_new_tokens=request.max_new_tokens,
+        )
+        if job is None:
+            raise HTTPException(status_code=429, detail="background job queue is full")
+        services.scheduler.wake()
+        return BackgroundJobStatus(**asdict(job))
+
+    @app.get("/v1/jobs/{job_id}", response_model=BackgroundJobStatus)
+    async def get_job(job_id: str) -> BackgroundJobStatus:
+        services: Services = app.state.services
+        job = None if services.background is None else await services.background.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="unknown job_id")
+        return BackgroundJobStatus(**asdict(job))
+
     @app.get("/metrics")
     async def metrics() -> Response:
         body, content_type = Telemetry.scrape()
@@ -266,6 +1052,7 @@ def create_app(config: GatewayConfig | None = None) -> FastAPI:
             queue_depth=services.scheduler.queue_depth,
             active_sequences=services.scheduler.active_count,
             kv_cache_utilization_ratio=services.kv_tracker.utilization_ratio,
+            kv_cache_fragmentation_ratio=services.kv_tracker.fragmentation_ratio,
         )
 
     return app
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import math
+
+
+class LogHistogram:
+    """Mergeable histogram with logarithmic buckets, in the style of HdrHistogram.
+
+    A value ``v`` lands in bucket ``ceil(log(v / lowest) / log(1 + precision))``
+    and is reported as that bucket's upper bound, so every percentile is within
+    ``precision`` relative error. Memory grows with the dynamic range, not the
+    sample count, and histograms from several processes merge by adding counts.
+    """
+
+    __slots__ = ("_lowest", "_precision", "_log_base", "_counts", "count", "total", "min", "max")
+
+    def __init__(self, lowest: float = 1e-6, precision: float = 0.01) -> None:
+        if lowest <= 0 or precision <= 0:
+            raise ValueError("lowest and precision must be positive")
+        self._lowest = lowest
+        self._precision = precision
+        self._log_base = math.log1p(precision)
+        self._counts: dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, value: float) -> None:
+        index = 0 if value <= self._lowest else math.ceil(math.log(value / self._lowest) / self._log_base)
+        self._counts[index] = self._counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: LogHistogram) -> None:
+        if (other._lowest, other._precision) != (self._lowest, self._precision):
+            raise ValueError("cannot merge histograms with different bucket layouts")
+        for index, count in other._counts.items():
+            self._counts[index] = self._counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """Value at or below which ``percent`` of samples fall; 0.0 when empty."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(percent / 100 * self.count))
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= rank:
+                upper = self._lowest * math.exp(index * self._log_base)
+                return min(max(upper, self.min), self.max)
+        return self.max
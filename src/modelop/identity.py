@@ -1,6 +1,10 @@
 from __future__ import annotations
 
 import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
 
 
 class InflightRequestRegistry:
@@ -20,3 +24,41 @@ class InflightRequestRegistry:
     async def release(self, request_id: str) -> None:
         async with self._lock:
             self._active_request_ids.discard(request_id)
+
+
+class RequestCoalescer(Generic[T]):
+    """Single-flight execution: concurrent calls with one key share one result.
+
+    The first caller for a key runs ``produce``; callers arriving while it is
+    in flight wait for its result instead of running their own. If the leader
+    fails or is cancelled, waiters retry and one of them becomes the new
+    leader, so one client's disconnect never fails the others.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: dict[bytes, asyncio.Future[T]] = {}
+
+    @property
+    def inflight_count(self) -> int:
+        return len(self._inflight)
+
+    async def run(self, key: bytes, produce: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        """Return ``(result, coalesced)``; ``coalesced`` is True for waiters."""
+        while (pending := self._inflight.get(key)) is not None:
+            await asyncio.wait({pending})
+            if not pending.cancelled():
+                return pending.result(), True
+
+        future: asyncio.Future[T] = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await produce()
+        except BaseException:
+            future.cancel()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
@@ -1,4 +1,14 @@
-from modelop.gateway import create_app
+import os
 
-app = create_app()
+from modelop.config import GatewayConfig
+from modelop.gateway import create_app
 
+# Set MODELOP_SHARED_STATE when running uvicorn with --workers N so that every
+# worker admits against the same rate limits, KV budget and in-flight IDs.
+# Set MODELOP_TRAFFIC_LOG to a directory to record request shapes for replay.
+app = create_app(
+    GatewayConfig(
+        shared_state_name=os.environ.get("MODELOP_SHARED_STATE") or None,
+        traffic_log_dir=os.environ.get("MODELOP_TRAFFIC_LOG") or None,
+    )
+)
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+
+from modelop.capacity import PagedKVAllocator
+
+
+class _Node:
+    __slots__ = ("key", "parent", "children", "block", "pins")
+
+    def __init__(self, key: object, parent: _Node | None, block: int) -> None:
+        self.key = key
+        self.parent = parent
+        self.children: dict[str, _Node] = {}
+        self.block = block
+        self.pins = 0
+
+
+class PrefixCache:
+    """Radix tree of block-sized prompt chunks mapped to shared KV blocks.
+
+    Each edge is one chunk of ``block_tokens * chars_per_token`` characters, so
+    a node corresponds to exactly one KV block of the paged allocator. Trees are
+    kept per ``(tenant_id, adapter_id)``: KV depends on the adapter, and tenants
+    never read each other's cached prompts.
+
+    Nodes used by in-flight requests are pinned. Unpinned nodes keep their
+    block cached and are evicted leaf-first in LRU order when the allocator
+    runs out of free blocks.
+    """
+
+    def __init__(self, allocator: PagedKVAllocator, chars_per_token: float = 4.0) -> None:
+        self._allocator = allocator
+        self._chunk_chars = max(1, int(allocator.block_tokens * chars_per_token))
+        self._roots: dict[tuple[str, str], _Node] = {}
+        self._pins: dict[str, list[_Node]] = {}
+        # Unpinned nodes, least recently used first.
+        self._idle: OrderedDict[_Node, None] = OrderedDict()
+        self._cached_blocks = 0
+        allocator.attach_block_cache(self)
+
+    @property
+    def cached_blocks(self) -> int:
+        return self._cached_blocks
+
+    @property
+    def reclaimable_blocks(self) -> int:
+        return len(self._idle)
+
+    def try_reserve(
+        self,
+        request_id: str,
+        tenant_id: str,
+        adapter_id: str,
+        prompt: str,
+        bytes_needed: int,
+        shed_threshold: float,
+        prompt_tokens: int | None = None,
+    ) -> int | None:
+        """Reserve KV for a request, reusing cached prompt blocks.
+
+        ``prompt_tokens`` is the tokenizer's count for ``prompt``; a tokenizer
+        denser than ``chars_per_token`` fills fewer blocks than the prompt has
+        chunks, so only that many chunks are cached.
+
+        Returns the number of prompt tokens served from cache, or ``None`` when
+        the uncached remainder is shed by the allocator.
+        """
+        # Leave at least one prompt character uncached so the model still runs a step.
+        full_chunks = (len(prompt) - 1) // self._chunk_chars
+        if prompt_tokens is not None:
+            full_chunks = min(full_chunks, max(0, prompt_tokens - 1) // self._allocator.block_tokens)
+        chunks = [
+            prompt[index * self._chunk_chars : (index + 1) * self._chunk_chars]
+            for index in range(full_chunks)
+        ]
+
+        root_key = (tenant_id, adapter_id)
+        node = self._roots.get(root_key)
+        if node is None:
+            node = self._roots[root_key] = _Node(key=root_key, parent=None, block=-1)
+        path: list[_Node] = []
+        for chunk in chunks:
+            child = node.children.get(chunk)
+            if child is None:
+                break
+            path.append(child)
+            node = child
+
+        # Pin before reserving so evictions triggered by this request spare its prefix.
+        self._pin(path)
+        cached_tokens = len(path) * self._allocator.block_tokens
+        remaining_bytes = max(0, bytes_needed - cached_tokens * self._allocator.bytes_per_token)
+        if not self._allocator.try_reserve(
+            request_id=request_id,
+            bytes_needed=remaining_bytes,
+            shed_threshold=shed_threshold,
+            shared_blocks=[cached.block for cached in path],
+        ):
+            self._unpin(path)
+            self._prune_root(root_key)
+            return None
+
+        table = self._allocator.block_table(request_id)
+        for index in range(len(path), min(len(chunks), len(table))):
+            child = _Node(key=chunks[index], parent=node, block=table[index])
+            child.pins = 1
+            node.children[child.key] = child
+            self._allocator.retain_blocks([child.block])
+            self._cached_blocks += 1
+            path.append(child)
+            node = child
+        self._prune_root(root_key)
+        self._pins[request_id] = path
+        return cached_tokens
+
+    def release_request(self, request_id: str) -> None:
+        path = self._pins.pop(request_id, None)
+        if path:
+            self._unpin(path)
+
+    def evict(self, blocks_needed: int) -> None:
+        while blocks_needed > 0:
+            victim = next((node for node in self._idle if not node.children), None)
+            if victim is None:
+                return
+            del self._idle[victim]
+            parent = victim.parent
+            del parent.children[victim.key]
+            self._allocator.drop_blocks([victim.block])
+            self._cached_blocks -= 1
+            blocks_needed -= 1
+            if parent.parent is None:
+                self._prune_root(parent.key)
+
+    def _pin(self, path: list[_Node]) -> None:
+        for node in path:
+            if node.pins == 0:
+                del self._idle[node]
+            node.pins += 1
+
+    def _unpin(self, path: list[_Node]) -> None:
+        # Leaf first, so shared ancestors end up most recently used.
+        for node in reversed(path):
+            node.pins -= 1
+            if node.pins == 0:
+                self._idle[node] = None
+
+    def _prune_root(self, root_key: tuple[str, str]) -> None:
+        root = self._roots.get(root_key)
+        if root is not None and not root.children:
+            del self._roots[root_key]
@@ -0,0 +1,375 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+from collections import deque
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Protocol, TypeVar
+
+if TYPE_CHECKING:
+    from modelop.scheduler import InferenceJob
+
+_Entry = TypeVar("_Entry", bound=tuple)
+
+
+class JobQueue(Protocol):
+    """Waiting-room discipline consulted by the scheduler when refilling slots."""
+
+    @property
+    def capacity(self) -> int: ...
+
+    def __len__(self) -> int: ...
+
+    @property
+    def queued_tokens(self) -> int:
+        """Sum of ``estimated_total_tokens`` over waiting jobs."""
+        ...
+
+    def push(self, job: InferenceJob) -> bool: ...
+
+    def push_front(self, job: InferenceJob) -> None:
+        """Return a job that already held a slot; never refused for capacity."""
+        ...
+
+    def pop(self) -> InferenceJob | None: ...
+
+    def peek(self, limit: int) -> list[InferenceJob]:
+        """The next ``limit`` jobs in pop order, without dequeuing or charging them."""
+        ...
+
+    def take(self, job: InferenceJob) -> None:
+        """Dequeue a waiting job chosen from ``peek``, accounted as if popped."""
+        ...
+
+    def discard(self, job: InferenceJob) -> bool:
+        """Remove a waiting job whose caller gave up; False if unsupported or absent."""
+        ...
+
+
+class FifoJobQueue:
+    def __init__(self, capacity: int) -> None:
+        self._capacity = capacity
+        self._jobs: deque[InferenceJob] = deque()
+        self._tokens = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def queued_tokens(self) -> int:
+        return self._tokens
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def push(self, job: InferenceJob) -> bool:
+        if len(self._jobs) >= self._capacity:
+            return False
+        self._jobs.append(job)
+        self._tokens += job.estimated_total_tokens
+        return True
+
+    def push_front(self, job: InferenceJob) -> None:
+        self._jobs.appendleft(job)
+        self._tokens += job.estimated_total_tokens
+
+    def pop(self) -> InferenceJob | None:
+        if not self._jobs:
+            return None
+        job = self._jobs.popleft()
+        self._tokens -= job.estimated_total_tokens
+        return job
+
+    def peek(self, limit: int) -> list[InferenceJob]:
+        return list(itertools.islice(self._jobs, limit))
+
+    def take(self, job: InferenceJob) -> None:
+        # Peeked jobs sit near the front, so the scan is short.
+        for index, queued in enumerate(self._jobs):
+            if queued is job:
+                del self._jobs[index]
+                self._tokens -= job.estimated_total_tokens
+                return
+        raise ValueError("job is not queued")
+
+    def discard(self, job: InferenceJob) -> bool:
+        # Abandoned jobs are skipped when popped instead.
+        return False
+
+
+class WeightedFairJobQueue:
+    """Per-tenant FIFO sub-queues served by token-weighted deficit counters.
+
+    Each tenant's counter advances by ``estimated_total_tokens / weight`` for
+    every job it dispatches, and the backlogged tenant with the smallest counter
+    goes next. Counters live in a heap, so selection is O(log tenants). A tenant
+    that becomes backlogged again starts at the current virtual time instead of
+    cashing in credit from its idle period. ``take`` may dispatch a tenant out
+    of turn; its old heap entry is then left behind and skipped when it surfaces.
+    """
+
+    def __init__(self, capacity: int, weight_for: Callable[[str], float]) -> None:
+        self._capacity = capacity
+        self._weight_for = weight_for
+        self._size = 0
+        self._tokens = 0
+        self._queues: dict[str, deque[InferenceJob]] = {}
+        # Counter and live heap entry id of every backlogged tenant.
+        self._counters: dict[str, tuple[float, int]] = {}
+        self._heap: list[tuple[float, int, str]] = []
+        self._order = itertools.count()
+        self._virtual_time = 0.0
+        # Counters of idle tenants that overdrew past the virtual time.
+        self._carried: dict[str, float] = {}
+        self._carried_limit = 64
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def queued_tokens(self) -> int:
+        return self._tokens
+
+    @property
+    def backlogged_tenants(self) -> int:
+        return len(self._queues)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def push(self, job: InferenceJob) -> bool:
+        if self._size >= self._capacity:
+            return False
+        tenant_queue = self._queues.get(job.tenant_id)
+        if tenant_queue is None:
+            tenant_queue = self._queues[job.tenant_id] = deque()
+            counter = max(self._virtual_time, self._carried.pop(job.tenant_id, 0.0))
+            self._schedule(job.tenant_id, counter)
+        tenant_queue.append(job)
+        self._size += 1
+        self._tokens += job.estimated_total_tokens
+        return True
+
+    def push_front(self, job: InferenceJob) -> None:
+        tenant_queue = self._queues.get(job.tenant_id)
+        if tenant_queue is None:
+            tenant_queue = self._queues[job.tenant_id] = deque()
+            # Preempted work goes first within its tenant, at the current virtual time.
+            self._carried.pop(job.tenant_id, None)
+            self._schedule(job.tenant_id, self._virtual_time)
+        tenant_queue.appendleft(job)
+        self._size += 1
+        self._tokens += job.estimated_total_tokens
+
+    def pop(self) -> InferenceJob | None:
+        head = self._head()
+        if head is None:
+            return None
+        heapq.heappop(self._heap)
+        counter, _, tenant_id = head
+        self._virtual_time = counter
+        job = self._queues[tenant_id].popleft()
+        self._charge(tenant_id, counter, job)
+        return job
+
+    def peek(self, limit: int) -> list[InferenceJob]:
+        # Only the ``limit`` smallest counters can dispatch within ``limit`` pops;
+        # replay the pops on copies of those.
+        simulated = [
+            (counter, order, tenant_id, 0)
+            for counter, order, tenant_id in _smallest_live(self._heap, limit, self._is_live)
+        ]
+        heapq.heapify(simulated)
+        jobs: list[InferenceJob] = []
+        while simulated and len(jobs) < limit:
+            counter, _, tenant_id, index = heapq.heappop(simulated)
+            tenant_queue = self._queues[tenant_id]
+            job = tenant_queue[index]
+            jobs.append(job)
+            if index + 1 < len(tenant_queue):
+                counter += self._cost(tenant_id, job)
+                heapq.heappush(simulated, (counter, next(self._order), tenant_id, index + 1))
+        return jobs
+
+    def take(self, job: InferenceJob) -> None:
+        tenant_queue = self._queues.get(job.tenant_id)
+        if tenant_queue is None:
+            raise ValueError("job is not queued")
+        for index, queued in enumerate(tenant_queue):
+            if queued is job:
+                del tenant_queue[index]
+                break
+        else:
+            raise ValueError("job is not queued")
+        head = self._head()
+        assert head is not None
+        self._virtual_time = max(self._virtual_time, head[0])
+        self._charge(job.tenant_id, self._counters[job.tenant_id][0], job)
+
+    def discard(self, job: InferenceJob) -> bool:
+        return False
+
+    def _cost(self, tenant_id: str, job: InferenceJob) -> float:
+        return max(1, job.estimated_total_tokens) / max(1e-9, self._weight_for(tenant_id))
+
+    def _schedule(self, tenant_id: str, counter: float) -> None:
+        order = next(self._order)
+        self._counters[tenant_id] = (counter, order)
+        heapq.heappush(self._heap, (counter, order, tenant_id))
+
+    def _is_live(self, entry: tuple[float, int, str]) -> bool:
+        current = self._counters.get(entry[2])
+        return current is not None and current[1] == entry[1]
+
+    def _head(self) -> tuple[float, int, str] | None:
+        heap = self._heap
+        while heap and not self._is_live(heap[0]):
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def _charge(self, tenant_id: str, counter: float, job: InferenceJob) -> None:
+        """Account for ``job`` having left ``tenant_id``'s queue at ``counter``."""
+        self._size -= 1
+        self._tokens -= job.estimated_total_tokens
+        counter += self._cost(tenant_id, job)
+        if self._queues[tenant_id]:
+            self._schedule(tenant_id, counter)
+        else:
+            del self._queues[tenant_id]
+            del self._counters[tenant_id]
+            self._carried[tenant_id] = counter
+            self._expire_carried()
+        if len(self._heap) > 2 * len(self._counters) + 64:
+            self._heap = [entry for entry in self._heap if self._is_live(entry)]
+            heapq.heapify(self._heap)
+
+    def _expire_carried(self) -> None:
+        # Counters at or behind the virtual time carry no debt; sweep them with
+        # a doubling threshold so the cost stays amortized O(1) per dispatch.
+        if len(self._carried) <= self._carried_limit:
+            return
+        self._carried = {
+            tenant_id: counter
+            for tenant_id, counter in self._carried.items()
+            if counter > self._virtual_time
+        }
+        self._carried_limit = 2 * len(self._carried) + 64
+
+
+class EarliestDeadlineJobQueue:
+    """Jobs ordered by deadline, then priority (higher first), then arrival.
+
+    Deadlines are absolute times, so priority only decides between jobs due at
+    exactly the same moment; it mainly orders preemption victims.
+
+    Jobs without a deadline are ordered as if due ``default_deadline_seconds``
+    after they were enqueued, so a steady stream of deadline traffic cannot
+    starve them. Discarded jobs stay in the heap as dead entries that are
+    skipped when they surface; the heap is rebuilt once dead entries outnumber
+    live ones, so removal stays amortized O(1).
+    """
+
+    def __init__(self, capacity: int, default_deadline_seconds: float = 120.0) -> None:
+        self._capacity = capacity
+        self._default_deadline_seconds = default_deadline_seconds
+        self._heap: list[tuple[float, int, int]] = []
+        self._live: dict[int, InferenceJob] = {}
+        self._sequence_by_request: dict[str, int] = {}
+        self._order = itertools.count()
+        self._tokens = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def queued_tokens(self) -> int:
+        return self._tokens
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def push(self, job: InferenceJob) -> bool:
+        if len(self._live) >= self._capacity:
+            return False
+        self._insert(job)
+        return True
+
+    def push_front(self, job: InferenceJob) -> None:
+        # Preempted jobs keep their deadline; EDF order already puts urgent work first.
+        self._insert(job)
+
+    def pop(self) -> InferenceJob | None:
+        while self._heap:
+            _, _, sequence = heapq.heappop(self._heap)
+            job = self._live.pop(sequence, None)
+            if job is not None:
+                del self._sequence_by_request[job.request_id]
+                self._tokens -= job.estimated_total_tokens
+                return job
+        return None
+
+    def peek(self, limit: int) -> list[InferenceJob]:
+        entries = _smallest_live(self._heap, limit, lambda entry: entry[2] in self._live)
+        return [self._live[sequence] for _, _, sequence in entries]
+
+    def take(self, job: InferenceJob) -> None:
+        if not self.discard(job):
+            raise ValueError("job is not queued")
+
+    def discard(self, job: InferenceJob) -> bool:
+        sequence = self._sequence_by_request.get(job.request_id)
+        if sequence is None or self._live[sequence] is not job:
+            return False
+        del self._live[sequence]
+        del self._sequence_by_request[job.request_id]
+        self._tokens -= job.estimated_total_tokens
+        if len(self._heap) > 2 * len(self._live) + 64:
+            self._heap = [entry for entry in self._heap if entry[2] in self._live]
+            heapq.heapify(self._heap)
+        return True
+
+    def _insert(self, job: InferenceJob) -> None:
+        deadline = job.deadline_at
+        if deadline is None:
+            deadline = job.enqueued_at + self._default_deadline_seconds
+        sequence = next(self._order)
+        self._live[sequence] = job
+        self._sequence_by_request[job.request_id] = sequence
+        self._tokens += job.estimated_total_tokens
+        heapq.heappush(self._heap, (deadline, -job.priority, sequence))
+
+
+def _smallest_live(
+    heap: list[_Entry], limit: int, is_live: Callable[[_Entry], bool]
+) -> list[_Entry]:
+    """Pop up to ``limit`` live entries in order, then push them back.
+
+    Costs O(limit log n) instead of a scan of the whole heap; dead entries met
+    on the way are dropped for good.
+    """
+    entries: list[_Entry] = []
+    while heap and len(entries) < limit:
+        entry = heapq.heappop(heap)
+        if is_live(entry):
+            entries.append(entry)
+    for entry in entries:
+        heapq.heappush(heap, entry)
+    return entries
+
+
+def create_job_queue(
+    kind: str,
+    capacity: int,
+    weight_for: Callable[[str], float] | None = None,
+    default_deadline_seconds: float = 120.0,
+) -> JobQueue:
+    if kind == "fifo":
+        return FifoJobQueue(capacity)
+    if kind == "fair":
+        return WeightedFairJobQueue(capacity, weight_for=weight_for or (lambda _tenant_id: 1.0))
+    if kind == "edf":
+        return EarliestDeadlineJobQueue(capacity, default_deadline_seconds=default_deadline_seconds)
+    raise ValueError(f"unknown queue policy: {kind!r}")
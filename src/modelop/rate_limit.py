@@ -1,12 +1,17 @@
 from __future__ import annotations
 
+import asyncio
 import time
+from collections import OrderedDict
+from collections.abc import Callable
 from dataclasses import dataclass
+from typing import Protocol
 
 from modelop.config import GatewayConfig, TenantPolicy
+from modelop.telemetry import Telemetry
 
 
-@dataclass
+@dataclass(slots=True)
 class TokenBucket:
     rate_tokens_per_sec: float
     burst_tokens: float
@@ -22,7 +27,7 @@ class TokenBucket:
             last_refill_ts=now,
         )
 
-    def _refill(self, now: float) -> None:
+    def refill(self, now: float) -> None:
         elapsed = max(0.0, now - self.last_refill_ts)
         self.tokens = min(self.burst_tokens, self.tokens + elapsed * self.rate_tokens_per_sec)
         self.last_refill_ts = now
@@ -30,7 +35,7 @@ class TokenBucket:
     def try_consume(self, amount: float, now: float) -> bool:
         if amount <= 0:
             return True
-        self._refill(now)
+        self.refill(now)
         if self.tokens < amount:
             return False
         self.tokens -= amount
@@ -41,23 +46,178 @@ class TokenBucket:
             return
         self.tokens = min(self.burst_tokens, self.tokens + amount)
 
+    def is_full(self, now: float) -> bool:
+        """True once refill has topped the bucket up, i.e. it equals a fresh one."""
+        elapsed = max(0.0, now - self.last_refill_ts)
+        return self.tokens + elapsed * self.rate_tokens_per_sec >= self.burst_tokens
 
-class TokenRateLimiter:
-    def __init__(self, config: GatewayConfig) -> None:
+
+class RateLimiter(Protocol):
+    def try_consume(self, tenant_id: str, amount: int, now: float | None = None) -> bool: ...
+
+    def refund(self, tenant_id: str, amount: int) -> None: ...
+
+
+class TenantBucketStore:
+    """Token buckets by tenant with memory bounded by idle eviction and a hard cap.
+
+    A bucket that has refilled to its burst is indistinguishable from a new
+    one, so dropping it changes no decision. Each new tenant first inspects
+    the two stalest entries: full ones untouched for ``_MIN_IDLE_SECONDS`` are
+    evicted, others move to the back. The idle requirement keeps active tenants
+    whose buckets refill between requests from being dropped and rebuilt.
+    The sweep is O(1), outpaces inserts while idle tenants are full, and
+    costs nothing on lookups of known tenants. Past ``max_tenants`` the
+    stalest entry is evicted even if it is not full, which at worst hands
+    that tenant one extra burst, the same as a previously unseen tenant gets.
+    """
+
+    _SWEEP_PER_INSERT = 2
+    _MIN_IDLE_SECONDS = 1.0
+
+    def __init__(self, config: GatewayConfig, max_tenants: int = 100_000) -> None:
         self._config = config
-        self._buckets: dict[str, TokenBucket] = {}
+        self._max_tenants = max(1, max_tenants)
+        # Least recently touched or swept first.
+        self._buckets: OrderedDict[str, TokenBucket] = OrderedDict()
 
-    def _bucket_for(self, tenant_id: str, now: float) -> TokenBucket:
-        bucket = self._buckets.get(tenant_id)
-        if bucket is None:
-            policy = self._config.policy_for(tenant_id)
-            bucket = TokenBucket.from_policy(policy, now=now)
-            self._buckets[tenant_id] = bucket
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def get(self, tenant_id: str) -> TokenBucket | None:
+        return self._buckets.get(tenant_id)
+
+    def bucket_for(self, tenant_id: str, now: float) -> TokenBucket:
+        buckets = self._buckets
+        bucket = buckets.get(tenant_id)
+        if bucket is not None:
+            buckets.move_to_end(tenant_id)
+            return bucket
+        # Only inserts grow the store, so only inserts pay for the sweep.
+        for _ in range(min(self._SWEEP_PER_INSERT, len(buckets))):
+            stalest_id = next(iter(buckets))
+            stalest = buckets[stalest_id]
+            if now - stalest.last_refill_ts >= self._MIN_IDLE_SECONDS and stalest.is_full(now):
+                del buckets[stalest_id]
+            else:
+                buckets.move_to_end(stalest_id)
+        if len(buckets) >= self._max_tenants:
+            buckets.popitem(last=False)
+        bucket = buckets[tenant_id] = TokenBucket.from_policy(
+            self._config.policy_for(tenant_id), now=now
+        )
         return bucket
 
+
+class AdaptiveRateController:
+    """AIMD scaling of tenant refill rates driven by KV utilization and queue fill.
+
+    Each ``update`` multiplies the scale by the decrease factor while either
+    signal is at or above its high watermark, adds the increase step once both
+    are at or below their low watermarks, and holds in between. A tenant's
+    effective rate is its policy rate times the scale, but never below its
+    floor: ``floor_fraction`` of the combined configured rates, split by
+    ``TenantPolicy.weight``, so under full pushback every tenant keeps its
+    weighted share. Requests are then turned away at the bucket instead of
+    being shed after KV reservation.
+    """
+
+    _MIN_SCALE = 0.01
+
+    def __init__(self, config: GatewayConfig, telemetry: Telemetry | None = None) -> None:
+        self._config = config
+        self._telemetry = telemetry or Telemetry()
+        self._scale = 1.0
+        policies = [*config.tenant_policies.values(), config.default_tenant_policy]
+        floor_pool = config.rate_limit_adaptive_floor_fraction * sum(
+            policy.rate_tokens_per_sec for policy in policies
+        )
+        total_weight = sum(policy.weight for policy in policies) or 1.0
+        self._floor_per_weight = floor_pool / total_weight
+        self._rates: dict[str, float] = {}
+        self._default_rate = config.default_tenant_policy.rate_tokens_per_sec
+        self._task: asyncio.Task[None] | None = None
+        self._apply()
+
+    @property
+    def scale(self) -> float:
+        return self._scale
+
+    def rate_for(self, tenant_id: str) -> float:
+        return self._rates.get(tenant_id, self._default_rate)
+
+    def update(self, kv_utilization: float, queue_fill: float) -> float:
+        """Step the scale from one sample of KV utilization and queue depth / capacity."""
+        config = self._config
+        if (
+            kv_utilization >= config.rate_limit_adaptive_kv_high_watermark
+            or queue_fill >= config.rate_limit_adaptive_queue_high_watermark
+        ):
+            scale = max(self._MIN_SCALE, self._scale * config.rate_limit_adaptive_decrease_factor)
+        elif (
+            kv_utilization <= config.rate_limit_adaptive_kv_low_watermark
+            and queue_fill <= config.rate_limit_adaptive_queue_low_watermark
+        ):
+            scale = min(1.0, self._scale + config.rate_limit_adaptive_increase_step)
+        else:
+            scale = self._scale
+        if scale != self._scale:
+            self._scale = scale
+            self._apply()
+        return scale
+
+    def _effective_rate(self, policy: TenantPolicy) -> float:
+        floor = min(policy.rate_tokens_per_sec, self._floor_per_weight * policy.weight)
+        return max(policy.rate_tokens_per_sec * self._scale, floor)
+
+    def _apply(self) -> None:
+        self._rates = {
+            tenant_id: self._effective_rate(policy)
+            for tenant_id, policy in self._config.tenant_policies.items()
+        }
+        self._default_rate = self._effective_rate(self._config.default_tenant_policy)
+        self._telemetry.set_adaptive_rates(scale=self._scale, rates=self._rates)
+
+    async def start(self, sample: Callable[[], tuple[float, float]]) -> None:
+        """Update every interval from ``sample()``, which returns (KV utilization, queue fill)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._control_loop(sample), name="adaptive-rate-control")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _control_loop(self, sample: Callable[[], tuple[float, float]]) -> None:
+        while True:
+            await asyncio.sleep(self._config.rate_limit_adaptive_interval_seconds)
+            self.update(*sample())
+
+
+class TokenRateLimiter:
+    def __init__(
+        self, config: GatewayConfig, rate_controller: AdaptiveRateController | None = None
+    ) -> None:
+        self._config = config
+        self._buckets = TenantBucketStore(config, max_tenants=config.rate_limit_max_tenants)
+        self._rate_controller = rate_controller
+
+    @property
+    def tracked_tenants(self) -> int:
+        return len(self._buckets)
+
     def try_consume(self, tenant_id: str, amount: int, now: float | None = None) -> bool:
         ts = now if now is not None else time.monotonic()
-        return self._bucket_for(tenant_id, now=ts).try_consume(amount=amount, now=ts)
+        bucket = self._buckets.bucket_for(tenant_id, now=ts)
+        if self._rate_controller is not None:
+            # Refill up to now at the old rate so a rate change only affects the future.
+            bucket.refill(ts)
+            bucket.rate_tokens_per_sec = self._rate_controller.rate_for(tenant_id)
+        return bucket.try_consume(amount=amount, now=ts)
 
     def refund(self, tenant_id: str, amount: int) -> None:
         bucket = self._buckets.get(tenant_id)
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Generic, TypeVar
+
+V = TypeVar("V")
+
+
+def response_cache_key(tenant_id: str, adapter_id: str, prompt: str, max_new_tokens: int) -> bytes:
+    """Digest of everything that determines a greedy generation.
+
+    The tenant is part of the key, so tenants never read each other's entries
+    even for identical prompts.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (tenant_id, adapter_id, str(max_new_tokens), prompt):
+        encoded = part.encode("utf-8")
+        digest.update(len(encoded).to_bytes(8, "little"))
+        digest.update(encoded)
+    return digest.digest()
+
+
+class ResponseCache(Generic[V]):
+    """Bounded LRU of completed generations whose entries expire after a TTL.
+
+    Expiry is checked lazily on lookup, and inserts first drop expired entries
+    from the least recently used end, so neither operation scans the cache.
+    """
+
+    def __init__(self, capacity: int, ttl_seconds: float) -> None:
+        self._capacity = capacity
+        self._ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[bytes, tuple[float, V]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: bytes, now: float | None = None) -> V | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= (time.monotonic() if now is None else now):
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: bytes, value: V, now: float | None = None) -> None:
+        if self._capacity <= 0:
+            return
+        current = time.monotonic() if now is None else now
+        entries = self._entries
+        while entries:
+            oldest_key, (expires_at, _) = next(iter(entries.items()))
+            if expires_at > current:
+                break
+            del entries[oldest_key]
+        entries[key] = (current + self._ttl_seconds, value)
+        entries.move_to_end(key)
+        if len(entries) > self._capacity:
+            entries.popitem(last=False)
@@ -1,13 +1,25 @@
 from __future__ import annotations
 
 import asyncio
+import math
 import time
-from dataclasses import dataclass, field
-
-from modelop.capacity import KVPressureTracker
+from collections.abc import Callable, Collection
+from dataclasses import dataclass
+from typing import Protocol
+
+from modelop.adapters import AdapterSlotCache
+from modelop.backends import ModelBackend, PrefillChunk, SimulatedBackend
+from modelop.batch_state import SequenceProgress, create_batch_state
+from modelop.capacity import KVTracker
+from modelop.queueing import FifoJobQueue, JobQueue
+from modelop.speculative import SpeculativeDecoder
 from modelop.telemetry import Telemetry
 
 
+class DeadlineExceededError(RuntimeError):
+    """The job's deadline passed while it waited for a slot."""
+
+
 @dataclass(slots=True)
 class GenerationResult:
     request_id: str
@@ -15,6 +27,7 @@ class GenerationResult:
     adapter_id: str
     output: str
     completion_tokens: int
+    cached_prompt_tokens: int
     queue_time_seconds: float
     ttft_seconds: float
     avg_tpot_seconds: float
@@ -33,18 +46,61 @@ class InferenceJob:
     admitted_at: float
     enqueued_at: float
     future: asyncio.Future[GenerationResult]
+    token_channel: asyncio.Queue[str] | None = None
+    cached_prompt_tokens: int = 0
+    started_at: float | None = None
+    resume: SequenceProgress | None = None
+    # Times a later job was started first because its adapter was resident.
+    adapter_skips: int = 0
+    # Admission-time TTFT estimate, compared with the observed TTFT.
+    predicted_ttft_seconds: float | None = None
+    # Monotonic time after which the job is dropped if it has not started.
+    deadline_at: float | None = None
+    # Higher runs first among equal deadlines and is preempted last.
+    priority: int = 0
+    # Drawn from the background tier: runs only in idle capacity and is preempted first.
+    background: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class ActiveSequence:
     job: InferenceJob
-    started_at: float | None = None
-    first_token_at: float | None = None
-    last_token_at: float | None = None
-    output_chunks: list[str] = field(default_factory=list)
-    generated_tokens: int = 0
-    tpot_deltas: list[float] = field(default_factory=list)
-    done: bool = False
+    slot: int
+    prefill_remaining: int = 0
+    prefill_position: int = 0
+    # Prefill waits until the sequence's adapter has finished loading.
+    adapter_ready_at: float = 0.0
+
+
+@dataclass(slots=True)
+class _TickPlan:
+    started_at: float
+    prefill_batch: list[PrefillChunk]
+    decode_slots: list[int]
+    decode_batch: list[str]
+    paused: set[int]
+    emitting: list[ActiveSequence]
+    steps: list[int] | None
+
+
+class BackgroundSource(Protocol):
+    """Low-priority jobs the scheduler draws on when interactive traffic leaves capacity idle."""
+
+    @property
+    def poll_seconds(self) -> float: ...
+
+    def take(
+        self,
+        limit: int,
+        adapter_ids: Collection[str] | None = None,
+        on_ready: Callable[[], None] | None = None,
+    ) -> list[InferenceJob]:
+        """Return jobs fetched so far without blocking; ``on_ready`` runs when more arrive."""
+        ...
+
+    def requeue(self, job: InferenceJob, preempted: bool = True) -> None:
+        """Return a job to the source; it restarts from its prompt later."""
+        ...
 
 
 class ContinuousBatchingScheduler:
@@ -54,32 +110,121 @@ class ContinuousBatchingScheduler:
         queue_capacity: int,
         decode_step_seconds: float,
         idle_sleep_seconds: float,
-        kv_tracker: KVPressureTracker,
+        kv_tracker: KVTracker,
         telemetry: Telemetry,
+        batch_state: str = "python",
+        tick_token_budget: int = 2048,
+        prefill_token_seconds: float = 0.0,
+        queue: JobQueue | None = None,
+        kv_bytes_per_token: int = 0,
+        kv_growth_tokens: int = 16,
+        preempt_watermark: float = 1.0,
+        backend: ModelBackend | None = None,
+        adapter_slots: int = 0,
+        adapter_load_seconds: float = 0.0,
+        adapter_lookahead: int = 16,
+        adapter_max_skips: int = 4,
+        speculative: SpeculativeDecoder | None = None,
+        background: BackgroundSource | None = None,
+        background_kv_threshold: float = 0.5,
+        clock: Callable[[], float] = time.monotonic,
     ) -> None:
+        # Every timestamp comes from here, so a simulator can drive the scheduler in virtual time.
+        self._clock = clock
         self._max_active_sequences = max_active_sequences
-        self._decode_step_seconds = decode_step_seconds
+        self._tick_token_budget = max(1, tick_token_budget)
+        self._backend: ModelBackend = backend or SimulatedBackend(
+            decode_step_seconds=decode_step_seconds,
+            prefill_token_seconds=prefill_token_seconds,
+        )
         self._idle_sleep_seconds = idle_sleep_seconds
-        self._queue: asyncio.Queue[InferenceJob] = asyncio.Queue(maxsize=queue_capacity)
-        self._active_sequences: list[ActiveSequence] = []
+        self._queue: JobQueue = queue if queue is not None else FifoJobQueue(queue_capacity)
+        self._state = create_batch_state(batch_state, capacity=max_active_sequences)
+        self._sequences: dict[int, ActiveSequence] = {}
+        self._streaming: dict[int, ActiveSequence] = {}
+        # Slots still consuming their prompt, in admission order.
+        self._prefilling: dict[int, ActiveSequence] = {}
 
         self._kv_tracker = kv_tracker
+        # Zero keeps KV fully reserved at admission; otherwise decode grows it on demand.
+        self._kv_bytes_per_token = kv_bytes_per_token
+        self._kv_growth_tokens = max(1, kv_growth_tokens)
+        self._preempt_watermark = preempt_watermark
         self._telemetry = telemetry
 
+        # Zero slots means every adapter is always resident and jobs run in queue order.
+        self._adapters = (
+            AdapterSlotCache(slots=adapter_slots, load_seconds=adapter_load_seconds)
+            if adapter_slots > 0
+            else None
+        )
+        self._adapter_lookahead = max(0, adapter_lookahead)
+        self._adapter_max_skips = adapter_max_skips
+        self._speculative = speculative
+        # Tokens a decode step may write: the committed token plus every draft.
+        self._decode_step_tokens = 1 + (speculative.draft_tokens if speculative else 0)
+
+        self._background = background
+        # Background jobs start only while KV utilization is below this ratio.
+        self._background_kv_threshold = background_kv_threshold
+
+        # Recent throughput, smoothed over busy ticks; None until the first one.
+        self._tokens_per_second: float | None = None
+        self._tick_seconds: float | None = None
+        self._throughput_smoothing = 0.2
+
         self._stop_event = asyncio.Event()
+        # Set by enqueue and stop so an idle loop starts work without polling.
+        self._wakeup = asyncio.Event()
         self._task: asyncio.Task[None] | None = None
+        # Tick started by start_tick and awaiting finish_tick.
+        self._pending_tick: _TickPlan | None = None
+        self._min_remaining_tokens: int | None = None
 
     @property
     def queue_depth(self) -> int:
-        return self._queue.qsize()
+        return len(self._queue)
 
     @property
     def active_count(self) -> int:
-        return len(self._active_sequences)
+        return len(self._sequences)
 
     @property
     def queue_capacity(self) -> int:
-        return self._queue.maxsize
+        return self._queue.capacity
+
+    @property
+    def queued_tokens(self) -> int:
+        return self._queue.queued_tokens
+
+    @property
+    def max_active_sequences(self) -> int:
+        return self._max_active_sequences
+
+    @property
+    def tick_token_budget(self) -> int:
+        return self._tick_token_budget
+
+    @property
+    def min_remaining_tokens(self) -> int:
+        """Fewest tokens any active sequence still has to generate."""
+        # Admission asks on every request, but the answer only changes when a
+        # tick commits tokens or a slot is filled or freed.
+        if self._min_remaining_tokens is None:
+            self._min_remaining_tokens = min(
+                (self._state.remaining_tokens(slot) for slot in self._sequences),
+                default=0,
+            )
+        return self._min_remaining_tokens
+
+    @property
+    def tokens_per_second(self) -> float | None:
+        """Prefill plus decode tokens processed per second over recent busy ticks."""
+        return self._tokens_per_second
+
+    @property
+    def tick_seconds(self) -> float | None:
+        return self._tick_seconds
 
     async def start(self) -> None:
         if self._task and not self._task.done():
@@ -89,142 +234,622 @@ class ContinuousBatchingScheduler:
 
     async def stop(self) -> None:
         self._stop_event.set()
+        self._wakeup.set()
         if self._task is not None:
             await self._task
             self._task = None
 
-        while not self._queue.empty():
-            try:
-                job = self._queue.get_nowait()
-            except asyncio.QueueEmpty:
-                break
+        stopped: list[str] = []
+        while (job := self._queue.pop()) is not None:
             self._kv_tracker.release(job.request_id)
+            stopped.append(job.request_id)
             if not job.future.done():
                 job.future.set_exception(RuntimeError("scheduler stopped before execution"))
-            self._queue.task_done()
 
-        for active in self._active_sequences:
-            self._kv_tracker.release(active.job.request_id)
-            if not active.job.future.done():
-                active.job.future.set_exception(RuntimeError("scheduler stopped during execution"))
-        self._active_sequences.clear()
+        for sequence in list(self._sequences.values()):
+            self._release_slot(sequence)
+            self._kv_tracker.release(sequence.job.request_id)
+            stopped.append(sequence.job.request_id)
+            if sequence.job.background and self._background is not None:
+                self._background.requeue(sequence.job)
+            elif not sequence.job.future.done():
+                sequence.job.future.set_exception(RuntimeError("scheduler stopped during execution"))
+        self._backend.free(stopped)
 
         self._telemetry.tick_scheduler(queue_depth=self.queue_depth, active_sequences=self.active_count)
         self._telemetry.set_kv_utilization(self._kv_tracker.utilization_ratio)
+        self._telemetry.set_kv_fragmentation(self._kv_tracker.fragmentation_ratio)
 
     async def enqueue(self, job: InferenceJob) -> bool:
-        if self._queue.full():
+        return self.enqueue_nowait(job)
+
+    def enqueue_nowait(self, job: InferenceJob) -> bool:
+        if not self._queue.push(job):
             return False
-        await self._queue.put(job)
+        job.future.add_done_callback(lambda _future: self._discard_abandoned(job))
+        self._wakeup.set()
         self._telemetry.tick_scheduler(
             queue_depth=self.queue_depth, active_sequences=self.active_count
         )
         return True
 
+    async def enqueue_many(self, jobs: list[InferenceJob]) -> int:
+        """Enqueue jobs in order until the queue is full; returns how many were accepted."""
+        accepted = 0
+        for job in jobs:
+            if not self._queue.push(job):
+                break
+            job.future.add_done_callback(lambda _future, job=job: self._discard_abandoned(job))
+            accepted += 1
+        if accepted:
+            self._wakeup.set()
+            self._telemetry.tick_scheduler(
+                queue_depth=self.queue_depth, active_sequences=self.active_count
+            )
+        return accepted
+
     async def _run_loop(self) -> None:
+        # Ticks run on an absolute clock: each is due when the previous tick's
+        # modeled work ends, regardless of how long bookkeeping took.
+        tick_started_at: float | None = None
         while not self._stop_event.is_set():
-            await self._refill_slots()
+            # Cleared before refilling, so an enqueue racing with the check below still wakes us.
+            self._wakeup.clear()
+            self._refill_slots()
 
-            if not self._active_sequences:
+            if not self._sequences:
                 self._telemetry.tick_scheduler(
                     queue_depth=self.queue_depth, active_sequences=self.active_count
                 )
-                await asyncio.sleep(self._idle_sleep_seconds)
+                tick_started_at = None
+                if len(self._queue) > 0:
+                    # Queued work is blocked on KV; nothing in flight will free it, so retry.
+                    timeout: float | None = self._idle_sleep_seconds
+                elif self._background is not None:
+                    # Other worker processes may submit background jobs without waking us.
+                    timeout = self._background.poll_seconds
+                else:
+                    timeout = None
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
                 continue
 
-            await asyncio.sleep(self._decode_step_seconds)
-            now = time.monotonic()
+            if tick_started_at is None:
+                tick_started_at = self._clock()
+            plan = self._plan_tick(now=tick_started_at)
+            if self._backend.compute_bound:
+                modeled_seconds = await asyncio.to_thread(self._execute_tick, plan)
+            else:
+                modeled_seconds = self._execute_tick(plan)
+            deadline = tick_started_at + modeled_seconds
+            delay = deadline - self._clock()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                if modeled_seconds > 0:
+                    self._telemetry.observe_tick_overrun(-delay)
+                await asyncio.sleep(0)
+            now = self._clock()
+            # An overrun tick is not made up by bursting; the next one starts now.
+            tick_started_at = max(deadline, now)
+            self._finish_tick(plan, now=now)
+
+    def start_tick(self, now: float) -> float | None:
+        """Refill and run one tick's backend work at ``now`` without sleeping.
+
+        For driving the scheduler in virtual time: returns the tick's modeled
+        seconds, after which the caller calls ``finish_tick``, or None when no
+        sequence is active. Do not mix with ``start``.
+        """
+        self._refill_slots()
+        if not self._sequences:
+            return None
+        self._pending_tick = self._plan_tick(now=now)
+        return self._execute_tick(self._pending_tick)
+
+    def finish_tick(self, now: float) -> None:
+        """Commit the tokens of the tick begun by ``start_tick`` at virtual time ``now``."""
+        plan, self._pending_tick = self._pending_tick, None
+        assert plan is not None
+        self._finish_tick(plan, now=now)
+
+    def _plan_tick(self, now: float) -> _TickPlan:
+        self._reserve_decode_kv()
+        prefill_batch = self._prefill_step(now=now)
+        paused, emitting = self._plan_decode()
+        decode_slots = self._state.decoding_slots(paused)
+        return _TickPlan(
+            started_at=now,
+            prefill_batch=prefill_batch,
+            decode_slots=decode_slots,
+            decode_batch=[self._sequences[slot].job.request_id for slot in decode_slots],
+            paused=paused,
+            emitting=emitting,
+            steps=self._speculate(decode_slots) if self._speculative and decode_slots else None,
+        )
+
+    def _execute_tick(self, plan: _TickPlan) -> float:
+        return self._execute_backend(plan.prefill_batch, plan.decode_batch, plan.steps)
 
-            for sequence in list(self._active_sequences):
-                self._decode_single_step(sequence=sequence, now=now)
+    def _finish_tick(self, plan: _TickPlan, now: float) -> None:
+        steps = plan.steps
+        self._telemetry.observe_tick_duration(now - plan.started_at)
+        self._observe_throughput(
+            tokens=sum(chunk.tokens for chunk in plan.prefill_batch)
+            + (len(plan.decode_batch) if steps is None else sum(steps)),
+            seconds=now - plan.started_at,
+        )
+        self._decode_step(
+            now=now,
+            paused=plan.paused,
+            emitting=plan.emitting,
+            steps=None if steps is None else dict(zip(plan.decode_slots, steps)),
+        )
+        self._finalize_completed(now=now)
+        self._refill_slots()
+        self._telemetry.tick_scheduler(
+            queue_depth=self.queue_depth, active_sequences=self.active_count
+        )
+        self._telemetry.set_kv_utilization(self._kv_tracker.utilization_ratio)
+        self._telemetry.set_kv_fragmentation(self._kv_tracker.fragmentation_ratio)
 
-            self._finalize_completed(now=now)
-            await self._refill_slots()
-            self._telemetry.tick_scheduler(
-                queue_depth=self.queue_depth, active_sequences=self.active_count
-            )
-            self._telemetry.set_kv_utilization(self._kv_tracker.utilization_ratio)
+    def _observe_throughput(self, tokens: int, seconds: float) -> None:
+        if seconds <= 0:
+            return
+        rate = tokens / seconds
+        if self._tokens_per_second is None or self._tick_seconds is None:
+            self._tokens_per_second, self._tick_seconds = rate, seconds
+            return
+        alpha = self._throughput_smoothing
+        self._tokens_per_second += alpha * (rate - self._tokens_per_second)
+        self._tick_seconds += alpha * (seconds - self._tick_seconds)
 
-    async def _refill_slots(self) -> None:
-        while len(self._active_sequences) < self._max_active_sequences:
-            try:
-                job = self._queue.get_nowait()
-            except asyncio.QueueEmpty:
-                break
-            self._queue.task_done()
-            self._active_sequences.append(ActiveSequence(job=job))
+    def wake(self) -> None:
+        """Start an idle loop, e.g. after a background job was submitted."""
+        self._wakeup.set()
 
-    def _decode_single_step(self, sequence: ActiveSequence, now: float) -> None:
-        if sequence.done:
+    def _refill_slots(self) -> None:
+        self._refill_interactive()
+        if self._background is None:
+            return
+        if len(self._queue) == 0:
+            self._refill_background(self._background)
             return
+        # Jobs claimed for slots that interactive work now needs go back unstarted.
+        self._background.take(0)
+        if self._evict_background(len(self._queue)):
+            self._refill_interactive()
+
+    def _refill_interactive(self) -> None:
+        if self._adapters is not None:
+            self._refill_slots_by_adapter(self._adapters)
+            return
+        deferred: list[InferenceJob] = []
+        while len(self._sequences) < self._max_active_sequences:
+            job = self._queue.pop()
+            if job is None:
+                break
+            if self._drop_if_stale(job):
+                continue
+            if job.resume is not None:
+                if not self._reserve_resume_kv(job):
+                    # Let jobs that already hold KV run and free space first.
+                    deferred.append(job)
+                    continue
+            self._assign_slot(job)
+        for job in reversed(deferred):
+            self._queue.push_front(job)
+
+    def _discard_abandoned(self, job: InferenceJob) -> None:
+        # Caller gave up while queued; queues that support it drop the job at once.
+        if job.started_at is None and self._queue.discard(job):
+            self._kv_tracker.release(job.request_id)
+            self._telemetry.set_kv_utilization(self._kv_tracker.utilization_ratio)
 
-        if sequence.started_at is None:
-            sequence.started_at = now
-            self._telemetry.observe_queue_wait(
-                tenant_id=sequence.job.tenant_id,
-                value=sequence.started_at - sequence.job.enqueued_at,
-            )
+    def _drop_if_stale(self, job: InferenceJob) -> bool:
+        """Drop a queued job whose caller is gone or whose deadline passed before it started.
 
-        if sequence.generated_tokens == 0:
-            sequence.first_token_at = now
-            self._telemetry.observe_ttft(
-                tenant_id=sequence.job.tenant_id,
-                value=sequence.first_token_at - sequence.job.admitted_at,
+        Preempted jobs waiting to resume have started and may have streamed
+        tokens, so they always run to completion.
+        """
+        if job.future.done():
+            self._kv_tracker.release(job.request_id)
+            self._backend.free([job.request_id])
+            return True
+        if job.deadline_at is None or job.started_at is not None or self._clock() < job.deadline_at:
+            return False
+        self._kv_tracker.release(job.request_id)
+        self._backend.free([job.request_id])
+        self._telemetry.record_deadline_outcome(tenant_id=job.tenant_id, result="dropped")
+        job.future.set_exception(DeadlineExceededError("deadline passed before the request started"))
+        return True
+
+    def _reserve_resume_kv(self, job: InferenceJob) -> bool:
+        assert job.resume is not None
+        recompute_tokens = job.prompt_tokens + job.resume.generated_tokens
+        return self._kv_tracker.try_reserve(
+            request_id=job.request_id,
+            bytes_needed=recompute_tokens * self._kv_bytes_per_token,
+            shed_threshold=self._preempt_watermark,
+        )
+
+    def _refill_slots_by_adapter(self, adapters: AdapterSlotCache) -> None:
+        """Refill from a window of queued jobs, preferring resident adapters.
+
+        Jobs skipped ``adapter_max_skips`` times go first regardless of their
+        adapter; if one of them cannot start, refilling stops until it can, so
+        adapter affinity never starves a job indefinitely.
+        """
+        free_slots = self._max_active_sequences - len(self._sequences)
+        if free_slots <= 0:
+            return
+        # Peeking leaves jobs that do not start queued and uncharged, so the
+        # window never costs a fair-queue tenant its turn.
+        window: list[InferenceJob] = []
+        for job in self._queue.peek(free_slots + self._adapter_lookahead):
+            if self._drop_if_stale(job):
+                self._queue.take(job)
+                continue
+            window.append(job)
+
+        starving = [i for i, job in enumerate(window) if job.adapter_skips >= self._adapter_max_skips]
+        resident = [
+            i
+            for i, job in enumerate(window)
+            if job.adapter_skips < self._adapter_max_skips and adapters.is_resident(job.adapter_id)
+        ]
+        preferred = set(starving) | set(resident)
+        ranked = starving + resident + [i for i in range(len(window)) if i not in preferred]
+
+        started: set[int] = set()
+        for index in ranked:
+            if len(self._sequences) >= self._max_active_sequences:
+                break
+            job = window[index]
+            blocked = not adapters.can_acquire(job.adapter_id) or (
+                job.resume is not None and not self._reserve_resume_kv(job)
+            )
+            if blocked:
+                if job.adapter_skips >= self._adapter_max_skips:
+                    break
+                continue
+            self._queue.take(job)
+            self._assign_slot(job, adapter_ready_at=self._acquire_adapter(adapters, job))
+            started.add(index)
+
+        last_started = max(started, default=-1)
+        for index in range(last_started):
+            if index not in started:
+                window[index].adapter_skips += 1
+
+    def _acquire_adapter(self, adapters: AdapterSlotCache, job: InferenceJob) -> float:
+        """Pin the job's adapter, loading it if needed; returns when it is ready."""
+        now = self._clock()
+        acquisition = adapters.acquire(job.adapter_id, now=now)
+        assert acquisition is not None
+        if acquisition.loaded:
+            self._telemetry.record_adapter_swap(
+                adapter_id=job.adapter_id, evicted_adapter_id=acquisition.evicted_adapter_id
             )
-        elif sequence.last_token_at is not None:
-            delta = now - sequence.last_token_at
-            sequence.tpot_deltas.append(delta)
-            self._telemetry.observe_tpot(tenant_id=sequence.job.tenant_id, value=delta)
+        if acquisition.ready_at > now:
+            self._telemetry.observe_adapter_load_wait(
+                adapter_id=job.adapter_id, value=acquisition.ready_at - now
+            )
+        return acquisition.ready_at
 
-        next_index = sequence.generated_tokens + 1
-        sequence.output_chunks.append(f"tok{next_index}")
-        sequence.generated_tokens = next_index
-        sequence.last_token_at = now
+    def _refill_background(self, background: BackgroundSource) -> None:
+        """Start background jobs in the slots and KV headroom interactive traffic left idle."""
+        free_slots = self._max_active_sequences - len(self._sequences)
+        if free_slots <= 0 or self._kv_tracker.utilization_ratio >= self._background_kv_threshold:
+            return
+        adapters = self._adapters
+        # With every adapter slot pinned, only jobs for resident adapters can start.
+        adapter_ids = None if adapters is None or adapters.can_load() else adapters.resident_adapters
+        jobs = background.take(free_slots, adapter_ids, on_ready=self.wake)
+        for index, job in enumerate(jobs):
+            if adapters is not None and not adapters.can_acquire(job.adapter_id):
+                background.requeue(job, preempted=False)
+                continue
+            if not self._kv_tracker.try_reserve(
+                request_id=job.request_id,
+                bytes_needed=job.prompt_tokens * self._kv_bytes_per_token,
+                shed_threshold=self._background_kv_threshold,
+            ):
+                for rest in jobs[index:]:
+                    background.requeue(rest, preempted=False)
+                return
+            ready_at = 0.0 if adapters is None else self._acquire_adapter(adapters, job)
+            self._assign_slot(job, adapter_ready_at=ready_at)
+
+    def _evict_background(self, count: int) -> int:
+        """Hand up to ``count`` background slots back to waiting interactive jobs."""
+        victims = sorted(
+            (sequence for sequence in self._sequences.values() if sequence.job.background),
+            key=lambda sequence: self._state.remaining_tokens(sequence.slot),
+            reverse=True,
+        )[:count]
+        for sequence in victims:
+            self._preempt(sequence)
+        return len(victims)
+
+    def _assign_slot(self, job: InferenceJob, adapter_ready_at: float = 0.0) -> ActiveSequence:
+        if job.resume is None:
+            # At least one prompt token always runs so the backend sees the sequence.
+            prefill_position = min(job.cached_prompt_tokens, max(0, job.prompt_tokens - 1))
+            sequence = ActiveSequence(
+                job=job,
+                slot=self._state.allocate(job.max_new_tokens),
+                prefill_remaining=max(0, job.prompt_tokens - prefill_position),
+                prefill_position=prefill_position,
+                adapter_ready_at=adapter_ready_at,
+            )
+        else:
+            # Preempted KV was dropped: recompute the prompt and every token generated so far.
+            sequence = ActiveSequence(
+                job=job,
+                slot=self._state.allocate(job.max_new_tokens, resume=job.resume),
+                prefill_remaining=job.prompt_tokens + job.resume.generated_tokens,
+                adapter_ready_at=adapter_ready_at,
+            )
+            job.resume = None
+        if job.started_at is None:
+            job.started_at = self._clock()
+            self._telemetry.observe_queue_wait(
+                tenant_id=job.tenant_id, value=job.started_at - job.enqueued_at
+            )
+        self._sequences[sequence.slot] = sequence
+        self._min_remaining_tokens = None
+        if sequence.prefill_remaining:
+            self._prefilling[sequence.slot] = sequence
+        if job.token_channel is not None:
+            self._streaming[sequence.slot] = sequence
+        job.future.add_done_callback(lambda _future: self._on_caller_done(sequence))
+        return sequence
+
+    def _release_slot(self, sequence: ActiveSequence) -> None:
+        del self._sequences[sequence.slot]
+        self._min_remaining_tokens = None
+        self._streaming.pop(sequence.slot, None)
+        self._prefilling.pop(sequence.slot, None)
+        self._state.release(sequence.slot)
+        if self._adapters is not None:
+            self._adapters.release(sequence.job.adapter_id)
+
+    def _on_caller_done(self, sequence: ActiveSequence) -> None:
+        # Caller gave up (timeout or stream disconnect); free the slot on the next sweep.
+        if self._sequences.get(sequence.slot) is sequence:
+            self._state.mark_done(sequence.slot)
+
+    def _reserve_decode_kv(self) -> None:
+        """Grow KV for sequences about to outrun their reservation, preempting if needed."""
+        if self._kv_bytes_per_token <= 0:
+            return
+        step_tokens = self._decode_step_tokens
+        growth_tokens = self._kv_growth_tokens * math.ceil(step_tokens / self._kv_growth_tokens)
+        growth_bytes = growth_tokens * self._kv_bytes_per_token
+        for slot in self._state.slots_short_of_kv(step_tokens=step_tokens):
+            sequence = self._sequences.get(slot)
+            if sequence is None:
+                continue  # preempted earlier in this sweep
+            while not self._kv_tracker.try_grow(sequence.job.request_id, growth_bytes):
+                victim = self._pick_preemption_victim()
+                self._preempt(victim)
+                if victim is sequence:
+                    break
+            else:
+                self._state.add_kv_credit(slot, growth_tokens)
 
-        if sequence.generated_tokens >= sequence.job.max_new_tokens:
-            sequence.done = True
+        # Only this worker's own reservations count: preempting cannot free
+        # bytes another worker holds.
+        while self._kv_tracker.worker_utilization_ratio > self._preempt_watermark:
+            victim = self._pick_preemption_victim()
+            if victim is None or len(self._sequences) <= 1:
+                break
+            self._preempt(victim)
+
+    def _pick_preemption_victim(self) -> ActiveSequence | None:
+        return max(
+            (
+                sequence
+                for sequence in self._sequences.values()
+                if not self._state.is_done(sequence.slot)
+            ),
+            # Background first, then lowest priority, then the most work left.
+            key=lambda sequence: (
+                sequence.job.background,
+                -sequence.job.priority,
+                self._state.remaining_tokens(sequence.slot),
+            ),
+            default=None,
+        )
 
-    def _finalize_completed(self, now: float) -> None:
-        if not self._active_sequences:
+    def _preempt(self, sequence: ActiveSequence) -> None:
+        job = sequence.job
+        if job.background and self._background is not None:
+            # Background work goes back to its source and restarts from the prompt.
+            self._release_slot(sequence)
+            self._kv_tracker.release(job.request_id)
+            self._backend.free([job.request_id])
+            self._background.requeue(job)
             return
+        job.resume = self._state.snapshot(sequence.slot)
+        self._release_slot(sequence)
+        self._kv_tracker.release(job.request_id)
+        self._backend.drop_kv([job.request_id])
+        self._queue.push_front(job)
+        self._telemetry.record_preemption(
+            tenant_id=job.tenant_id,
+            recompute_tokens=job.prompt_tokens + job.resume.generated_tokens,
+        )
 
-        remaining: list[ActiveSequence] = []
-        for sequence in self._active_sequences:
-            if not sequence.done:
-                remaining.append(sequence)
+    def _prefill_step(self, now: float) -> list[PrefillChunk]:
+        """Spend what the tick's token budget leaves after decodes on prompt chunks.
+
+        Every decoding sequence costs one token, so running decodes are never
+        stalled by a long prompt; prompts larger than the remainder are split
+        across ticks. Returns the chunks the backend must prefill this tick.
+        """
+        if not self._prefilling:
+            return []
+        decoding = len(self._sequences) - len(self._prefilling)
+        budget = max(0, self._tick_token_budget - decoding)
+        batch: list[PrefillChunk] = []
+        for slot, sequence in list(self._prefilling.items()):
+            if budget <= 0:
+                break
+            if self._state.is_done(slot) or sequence.adapter_ready_at > now:
                 continue
+            chunk = min(budget, sequence.prefill_remaining)
+            job = sequence.job
+            batch.append(
+                PrefillChunk(
+                    request_id=job.request_id,
+                    adapter_id=job.adapter_id,
+                    prompt=job.prompt,
+                    prompt_tokens=job.prompt_tokens,
+                    start=sequence.prefill_position,
+                    tokens=chunk,
+                )
+            )
+            sequence.prefill_position += chunk
+            sequence.prefill_remaining -= chunk
+            budget -= chunk
+            if sequence.prefill_remaining == 0:
+                # Prompt complete: this tick's decode emits the first token.
+                del self._prefilling[slot]
+        return batch
+
+    def _plan_decode(self) -> tuple[set[int], list[ActiveSequence]]:
+        """Split the batch into paused slots and streams that can take a token."""
+        paused: set[int] = set(self._prefilling)
+        emitting: list[ActiveSequence] = []
+        for slot, sequence in self._streaming.items():
+            if self._state.is_done(slot) or slot in paused:
+                continue
+            if sequence.job.token_channel.full():
+                # Slow stream consumer: hold this sequence back instead of buffering.
+                paused.add(slot)
+            else:
+                emitting.append(sequence)
+        return paused, emitting
+
+    def _speculate(self, decode_slots: list[int]) -> list[int]:
+        """Tokens each decoding slot commits this tick under speculative decoding."""
+        speculative = self._speculative
+        assert speculative is not None
+        steps: list[int] = []
+        accepted_total = 0
+        for slot in decode_slots:
+            job = self._sequences[slot].job
+            accepted = speculative.accepted_drafts(job.adapter_id)
+            self._telemetry.record_speculation(
+                adapter_id=job.adapter_id,
+                drafted=speculative.draft_tokens,
+                accepted=accepted,
+            )
+            count = min(accepted + 1, max(1, self._state.remaining_tokens(slot)))
+            channel = job.token_channel
+            if channel is not None and channel.maxsize > 0:
+                count = min(count, channel.maxsize - channel.qsize())
+            accepted_total += count - 1
+            steps.append(count)
+        self._telemetry.observe_accepted_tokens_per_tick(accepted_total)
+        return steps
+
+    def _execute_backend(
+        self,
+        prefill_batch: list[PrefillChunk],
+        decode_batch: list[str],
+        steps: list[int] | None = None,
+    ) -> float:
+        # One backend call per phase for the whole batch; returns modeled seconds.
+        modeled_seconds = self._backend.prefill(prefill_batch)
+        if steps is None:
+            return modeled_seconds + self._backend.decode(decode_batch)
+        assert self._speculative is not None
+        draft_tokens = self._speculative.draft_tokens
+        return (
+            modeled_seconds
+            + self._speculative.draft_seconds
+            + self._backend.decode(decode_batch, steps=steps, draft_tokens=draft_tokens)
+        )
 
-            self._kv_tracker.release(sequence.job.request_id)
+    def _decode_step(
+        self,
+        now: float,
+        paused: set[int],
+        emitting: list[ActiveSequence],
+        steps: dict[int, int] | None = None,
+    ) -> None:
+        emitted_before = {
+            sequence.slot: self._state.generated_tokens(sequence.slot) for sequence in emitting
+        }
+        update = self._state.advance(now=now, paused=paused, steps=steps)
+        self._min_remaining_tokens = None
+
+        for slot in update.first_token_slots:
+            job = self._sequences[slot].job
+            ttft = now - job.admitted_at
+            self._telemetry.observe_ttft(tenant_id=job.tenant_id, value=ttft)
+            if job.predicted_ttft_seconds is not None:
+                self._telemetry.observe_ttft_prediction_error(
+                    tenant_id=job.tenant_id, value=ttft - job.predicted_ttft_seconds
+                )
+        for slot, delta in update.tpot_samples:
+            self._telemetry.observe_tpot(tenant_id=self._sequences[slot].job.tenant_id, value=delta)
+
+        for sequence in emitting:
+            first = emitted_before[sequence.slot] + 1
+            for index in range(first, self._state.generated_tokens(sequence.slot) + 1):
+                sequence.job.token_channel.put_nowait(
+                    self._backend.token_text(sequence.job.request_id, index)
+                )
+
+    def _finalize_completed(self, now: float) -> None:
+        for slot in self._state.completed_slots():
+            sequence = self._sequences[slot]
+            job = sequence.job
+            generated_tokens = self._state.generated_tokens(slot)
+            first_token_at = self._state.first_token_at(slot)
+            avg_tpot = self._state.avg_tpot(slot)
+            self._release_slot(sequence)
+
+            self._kv_tracker.release(job.request_id)
             self._telemetry.set_kv_utilization(self._kv_tracker.utilization_ratio)
-            self._telemetry.add_generated_tokens(
-                tenant_id=sequence.job.tenant_id,
-                count=sequence.generated_tokens,
-            )
+            self._telemetry.add_generated_tokens(tenant_id=job.tenant_id, count=generated_tokens)
+            if not self._state.per_token_tpot and generated_tokens > 1:
+                self._telemetry.observe_tpot(tenant_id=job.tenant_id, value=avg_tpot)
 
-            if sequence.first_token_at is None:
-                ttft = 0.0
-            else:
-                ttft = max(0.0, sequence.first_token_at - sequence.job.admitted_at)
+            if job.deadline_at is not None:
+                self._telemetry.record_deadline_outcome(
+                    tenant_id=job.tenant_id, result="met" if now <= job.deadline_at else "late"
+                )
+            if job.future.done():
+                self._backend.free([job.request_id])
+                continue
 
-            avg_tpot = (
-                sum(sequence.tpot_deltas) / len(sequence.tpot_deltas)
-                if sequence.tpot_deltas
-                else 0.0
-            )
+            ttft = 0.0 if first_token_at is None else max(0.0, first_token_at - job.admitted_at)
+            if job.token_channel is None:
+                output = " ".join(
+                    self._backend.token_text(job.request_id, index)
+                    for index in range(1, generated_tokens + 1)
+                )
+            else:
+                output = ""
+            self._backend.free([job.request_id])
 
             result = GenerationResult(
-                request_id=sequence.job.request_id,
-                tenant_id=sequence.job.tenant_id,
-                adapter_id=sequence.job.adapter_id,
-                output=" ".join(sequence.output_chunks),
-                completion_tokens=sequence.generated_tokens,
-                queue_time_seconds=max(0.0, (sequence.started_at or now) - sequence.job.enqueued_at),
+                request_id=job.request_id,
+                tenant_id=job.tenant_id,
+                adapter_id=job.adapter_id,
+                output=output,
+                completion_tokens=generated_tokens,
+                cached_prompt_tokens=job.cached_prompt_tokens,
+                queue_time_seconds=max(0.0, (job.started_at or now) - job.enqueued_at),
                 ttft_seconds=ttft,
                 avg_tpot_seconds=avg_tpot,
-                total_time_seconds=max(0.0, now - sequence.job.admitted_at),
+                total_time_seconds=max(0.0, now - job.admitted_at),
             )
-
-            if not sequence.job.future.cancelled() and not sequence.job.future.done():
-                sequence.job.future.set_result(result)
-
-        self._active_sequences = remaining
+            job.future.set_result(result)
@@ -9,17 +9,21 @@ class GenerateRequest(BaseModel):
     max_new_tokens: int = Field(default=128, ge=1, le=4096)
     adapter_id: str | None = Field(default=None, max_length=128)
     request_id: str | None = Field(default=None, max_length=128)
+    # Milliseconds from receipt; requests that have not started by then are dropped.
+    deadline_ms: int | None = Field(default=None, ge=1)
+    # Higher is preempted later. In EDF queue order it only breaks exact deadline ties.
+    priority: int = Field(default=0, ge=0, le=9)
 
 
-class GenerateResponse(BaseModel):
+class GenerationUsage(BaseModel):
     request_id: str
     tenant_id: str
     adapter_id: str
-    output: str
     prompt_tokens: int
     original_prompt_tokens: int
     effective_prompt_tokens: int
     prompt_truncated: bool
+    cached_prompt_tokens: int
     completion_tokens: int
     total_tokens: int
     queue_time_seconds: float
@@ -28,8 +32,68 @@ class GenerateResponse(BaseModel):
     total_time_seconds: float
 
 
+class GenerateResponse(GenerationUsage):
+    output: str
+    # True when served from a cached or coalesced generation rather than a decode of its own.
+    cache_hit: bool = False
+
+
+class GenerateBatchItem(BaseModel):
+    prompt: str = Field(min_length=1)
+    max_new_tokens: int = Field(default=128, ge=1, le=4096)
+    request_id: str | None = Field(default=None, max_length=128)
+
+
+class GenerateBatchRequest(BaseModel):
+    tenant_id: str = Field(min_length=1, max_length=128)
+    adapter_id: str | None = Field(default=None, max_length=128)
+    items: list[GenerateBatchItem] = Field(min_length=1)
+    # Stream one NDJSON result line per item as it completes instead of one JSON body.
+    stream: bool = False
+
+
+class GenerateBatchItemResult(BaseModel):
+    index: int
+    status: int
+    detail: str | None = None
+    response: GenerateResponse | None = None
+
+
+class GenerateBatchResponse(BaseModel):
+    results: list[GenerateBatchItemResult]
+
+
+class BackgroundJobRequest(BaseModel):
+    tenant_id: str = Field(min_length=1, max_length=128)
+    prompt: str = Field(min_length=1)
+    max_new_tokens: int = Field(default=128, ge=1, le=4096)
+    adapter_id: str | None = Field(default=None, max_length=128)
+
+
+class BackgroundJobStatus(BaseModel):
+    job_id: str
+    tenant_id: str
+    adapter_id: str
+    # "queued", "running", "completed" or "failed".
+    status: str
+    prompt_tokens: int
+    max_new_tokens: int
+    submitted_at: float
+    completed_at: float | None = None
+    output: str | None = None
+    completion_tokens: int | None = None
+    detail: str | None = None
+
+
+class GenerateStreamToken(BaseModel):
+    request_id: str
+    index: int
+    token: str
+
+
 class HealthResponse(BaseModel):
     status: str
     queue_depth: int
     active_sequences: int
     kv_cache_utilization_ratio: float
+    kv_cache_fragmentation_ratio: float
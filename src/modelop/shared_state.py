@@ -0,0 +1,559 @@
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import hashlib
+import math
+import os
+import struct
+import tempfile
+import time
+from collections.abc import AsyncIterator, Callable, Iterator, Sequence
+from contextlib import asynccontextmanager, contextmanager
+from multiprocessing import resource_tracker, shared_memory
+
+from modelop.config import GatewayConfig
+from modelop.rate_limit import AdaptiveRateController, TenantBucketStore, TokenBucket
+
+_MAGIC = 0x4D4F505348415245  # "MOPSHARE"
+# magic, owner pid, KV bytes in use, KV budget, tenant slots, in-flight slots, worker slots
+_HEADER = struct.Struct("<QQqQIII")
+# worker pid, KV bytes that worker holds
+_WORKER = struct.Struct("<Qq")
+# tenant key hash, tokens, last refill timestamp, time from which the slot may be reused
+_BUCKET = struct.Struct("<Qddd")
+_KEY = struct.Struct("<Q")
+_EMPTY = 0
+# Tenant lookups and inserts stop after this many slots past the key's home slot.
+_BUCKET_PROBE_LIMIT = 64
+_LOCK_RETRY_SECONDS = 0.0001
+
+
+class SharedStateUnavailableError(RuntimeError):
+    """The segment lock stayed busy or a fixed-size table had no free slot."""
+
+
+def _key_hash(value: str) -> int:
+    digest = int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "little")
+    return digest or 1  # zero marks an empty slot
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class SharedStateSegment:
+    """Fixed-layout shared-memory block holding cross-worker admission state.
+
+    The segment holds a header (KV bytes in use and the KV budget), an
+    open-addressed table of tenant token buckets and an open-addressed set of
+    in-flight request-id hashes. Every read-modify-write happens under an
+    ``flock`` on a sidecar lock file, so updates are atomic across workers.
+    Admission paths take the lock with ``bounded=True``: a non-blocking attempt
+    retried for at most ``lock_timeout_seconds`` before giving up. Async
+    callers use ``locked_async``, which retries with ``asyncio.sleep``, and
+    releases go through ``run_or_defer``, so neither waits on the event loop.
+
+    A worker table records the KV bytes each worker pid holds, so bytes held by
+    a worker that died are reclaimed instead of counting against the budget
+    forever.
+
+    ``owner`` identifies one gateway launch and defaults to the parent pid,
+    which uvicorn workers share. A segment left behind by another launch is
+    reset instead of inheriting its stale reservations.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        kv_budget_bytes: int,
+        tenant_capacity: int = 4096,
+        inflight_capacity: int = 65536,
+        owner: int | None = None,
+        worker_capacity: int = 256,
+        lock_timeout_seconds: float = 0.005,
+    ) -> None:
+        self._name = name
+        self._tenant_capacity = tenant_capacity
+        self._inflight_capacity = inflight_capacity
+        self._worker_capacity = worker_capacity
+        self._lock_timeout_seconds = lock_timeout_seconds
+        self._pid = os.getpid()
+        # Updates that found the lock busy; applied by this worker's next holder.
+        self._deferred: list[Callable[[], None]] = []
+        self._retry_scheduled = False
+        self._workers_offset = _HEADER.size
+        self._buckets_offset = self._workers_offset + worker_capacity * _WORKER.size
+        self._inflight_offset = self._buckets_offset + tenant_capacity * _BUCKET.size
+        size = self._inflight_offset + inflight_capacity * _KEY.size
+        owner = os.getppid() if owner is None else owner
+
+        self._lock_fd = os.open(
+            os.path.join(tempfile.gettempdir(), f"{name}.lock"), os.O_RDWR | os.O_CREAT, 0o600
+        )
+        with self.locked():
+            try:
+                self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+                fresh = True
+            except FileExistsError:
+                self._shm = shared_memory.SharedMemory(name=name)
+                fresh = False
+            # Workers come and go independently; no single process may unlink on exit.
+            resource_tracker.unregister(self._shm._name, "shared_memory")
+            self._buf = self._shm.buf
+            if len(self._buf) < size:
+                raise RuntimeError(f"shared state segment {name!r} is smaller than configured")
+            magic, current_owner, _, _, *layout = _HEADER.unpack_from(self._buf, 0)
+            if fresh or magic != _MAGIC or current_owner != owner:
+                self._buf[:size] = bytes(size)
+                _HEADER.pack_into(
+                    self._buf,
+                    0,
+                    _MAGIC,
+                    owner,
+                    0,
+                    kv_budget_bytes,
+                    tenant_capacity,
+                    inflight_capacity,
+                    worker_capacity,
+                )
+            elif layout != [tenant_capacity, inflight_capacity, worker_capacity]:
+                raise RuntimeError(f"shared state segment {name!r} has a different layout")
+            self._worker_offset = self._register_worker()
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @contextmanager
+    def locked(self, bounded: bool = False) -> Iterator[None]:
+        """Hold the segment lock.
+
+        With ``bounded``, raise ``SharedStateUnavailableError`` rather than wait
+        more than ``lock_timeout_seconds``; paths that must not fail (releases
+        and refunds) wait as long as it takes.
+        """
+        if bounded:
+            deadline = time.monotonic() + self._lock_timeout_seconds
+            while not self._try_lock():
+                if time.monotonic() >= deadline:
+                    raise SharedStateUnavailableError("shared state lock is busy")
+                time.sleep(_LOCK_RETRY_SECONDS)
+        else:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        try:
+            self._run_deferred()
+            yield
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    @asynccontextmanager
+    async def locked_async(self, bounded: bool = False) -> AsyncIterator[None]:
+        """``locked`` for coroutines: waits with ``asyncio.sleep`` instead of blocking."""
+        deadline = time.monotonic() + self._lock_timeout_seconds
+        while not self._try_lock():
+            if bounded and time.monotonic() >= deadline:
+                raise SharedStateUnavailableError("shared state lock is busy")
+            await asyncio.sleep(_LOCK_RETRY_SECONDS)
+        try:
+            self._run_deferred()
+            yield
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def run_or_defer(self, update: Callable[[], None]) -> None:
+        """Apply ``update`` under the lock now, or later if the lock is busy.
+
+        For releases and refunds, which must not fail. On an event loop a busy
+        lock is retried with ``call_later``, and any lock taken by this worker
+        applies pending updates first; off the loop it simply waits.
+        """
+        self._deferred.append(update)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            with self.locked():
+                pass
+            return
+        if self._try_lock():
+            try:
+                self._run_deferred()
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+        elif not self._retry_scheduled:
+            self._retry_scheduled = True
+            loop.call_later(_LOCK_RETRY_SECONDS, self._retry_deferred)
+
+    def _retry_deferred(self) -> None:
+        self._retry_scheduled = False
+        if self._deferred and self._buf is not None:
+            self.run_or_defer(lambda: None)
+
+    def _try_lock(self) -> bool:
+        try:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+
+    def _run_deferred(self) -> None:
+        while self._deferred:
+            self._deferred.pop(0)()
+
+    def close(self) -> None:
+        if self._deferred:
+            with self.locked():
+                pass
+        self._buf = None
+        self._shm.close()
+        os.close(self._lock_fd)
+
+    def unlink(self) -> None:
+        """Remove the segment; call once, from whoever owns the launch."""
+        segment = shared_memory.SharedMemory(name=self._name)
+        segment.close()
+        segment.unlink()
+        try:
+            os.unlink(os.path.join(tempfile.gettempdir(), f"{self._name}.lock"))
+        except FileNotFoundError:
+            pass
+
+    # The helpers below assume the caller holds ``locked()``.
+
+    def kv_active_bytes(self) -> int:
+        return struct.unpack_from("<q", self._buf, 16)[0]
+
+    def set_kv_active_bytes(self, value: int) -> None:
+        struct.pack_into("<q", self._buf, 16, value)
+
+    def kv_budget_bytes(self) -> int:
+        return struct.unpack_from("<Q", self._buf, 24)[0]
+
+    def worker_kv_bytes(self) -> int:
+        """KV bytes this worker holds; only this worker writes its slot."""
+        return _WORKER.unpack_from(self._buf, self._worker_offset)[1]
+
+    def add_kv_bytes(self, delta: int) -> None:
+        """Adjust the shared total and this worker's share by ``delta`` bytes."""
+        self.set_kv_active_bytes(max(0, self.kv_active_bytes() + delta))
+        pid, held = _WORKER.unpack_from(self._buf, self._worker_offset)
+        _WORKER.pack_into(self._buf, self._worker_offset, pid, max(0, held + delta))
+
+    def reclaim_dead_workers(self) -> int:
+        """Drop the KV bytes of workers whose process is gone; returns bytes freed."""
+        reclaimed = 0
+        for index in range(self._worker_capacity):
+            offset = self._workers_offset + index * _WORKER.size
+            pid, held = _WORKER.unpack_from(self._buf, offset)
+            if pid in (_EMPTY, self._pid) or _pid_alive(pid):
+                continue
+            reclaimed += held
+            _WORKER.pack_into(self._buf, offset, _EMPTY, 0)
+        if reclaimed:
+            self.set_kv_active_bytes(max(0, self.kv_active_bytes() - reclaimed))
+        return reclaimed
+
+    def read_bucket(self, tenant_id: str) -> tuple[int, float, float] | None:
+        """Return ``(offset, tokens, last_refill_ts)`` for a tenant, or ``None``."""
+        key = _key_hash(tenant_id)
+        index = key % self._tenant_capacity
+        for _ in range(min(self._tenant_capacity, _BUCKET_PROBE_LIMIT)):
+            offset = self._buckets_offset + index * _BUCKET.size
+            slot_key, tokens, last_refill_ts, _ = _BUCKET.unpack_from(self._buf, offset)
+            if slot_key == key:
+                return offset, tokens, last_refill_ts
+            if slot_key == _EMPTY:
+                return None
+            index = (index + 1) % self._tenant_capacity
+        return None
+
+    def insert_bucket(
+        self, tenant_id: str, tokens: float, last_refill_ts: float, reusable_at: float
+    ) -> int:
+        """Store a new tenant's bucket in an empty slot or one whose bucket went idle.
+
+        Overwriting an occupied slot in place keeps every probe chain intact, so
+        idle tenants are evicted without tombstones. Raises
+        ``SharedStateUnavailableError`` when no slot near the key's home is free.
+        """
+        key = _key_hash(tenant_id)
+        index = key % self._tenant_capacity
+        for _ in range(min(self._tenant_capacity, _BUCKET_PROBE_LIMIT)):
+            offset = self._buckets_offset + index * _BUCKET.size
+            slot_key, _, _, slot_reusable_at = _BUCKET.unpack_from(self._buf, offset)
+            if slot_key == _EMPTY or slot_reusable_at <= last_refill_ts:
+                _BUCKET.pack_into(self._buf, offset, key, tokens, last_refill_ts, reusable_at)
+                return offset
+            index = (index + 1) % self._tenant_capacity
+        raise SharedStateUnavailableError("shared tenant bucket table is full")
+
+    def write_bucket(
+        self, offset: int, tokens: float, last_refill_ts: float, reusable_at: float
+    ) -> None:
+        struct.pack_into(
+            "<ddd", self._buf, offset + _KEY.size, tokens, last_refill_ts, reusable_at
+        )
+
+    def add_inflight(self, request_id: str) -> bool:
+        key = _key_hash(request_id)
+        index = key % self._inflight_capacity
+        for _ in range(self._inflight_capacity):
+            offset = self._inflight_offset + index * _KEY.size
+            slot_key = _KEY.unpack_from(self._buf, offset)[0]
+            if slot_key == key:
+                return False
+            if slot_key == _EMPTY:
+                _KEY.pack_into(self._buf, offset, key)
+                return True
+            index = (index + 1) % self._inflight_capacity
+        raise SharedStateUnavailableError("shared in-flight request table is full")
+
+    def remove_inflight(self, request_id: str) -> None:
+        key = _key_hash(request_id)
+        capacity = self._inflight_capacity
+        index = key % capacity
+        for _ in range(capacity):
+            slot_key = self._inflight_key(index)
+            if slot_key == _EMPTY:
+                return
+            if slot_key == key:
+                break
+            index = (index + 1) % capacity
+        else:
+            return
+        # Backward-shift deletion keeps probe chains intact without tombstones.
+        hole = index
+        probe = (hole + 1) % capacity
+        while (slot_key := self._inflight_key(probe)) != _EMPTY:
+            home = slot_key % capacity
+            if (probe - home) % capacity >= (probe - hole) % capacity:
+                self._set_inflight_key(hole, slot_key)
+                hole = probe
+            probe = (probe + 1) % capacity
+        self._set_inflight_key(hole, _EMPTY)
+
+    def _inflight_key(self, index: int) -> int:
+        return _KEY.unpack_from(self._buf, self._inflight_offset + index * _KEY.size)[0]
+
+    def _set_inflight_key(self, index: int, key: int) -> None:
+        _KEY.pack_into(self._buf, self._inflight_offset + index * _KEY.size, key)
+
+    def _register_worker(self) -> int:
+        self.reclaim_dead_workers()
+        free = None
+        for index in range(self._worker_capacity):
+            offset = self._workers_offset + index * _WORKER.size
+            pid, _ = _WORKER.unpack_from(self._buf, offset)
+            if pid == self._pid:
+                return offset
+            if pid == _EMPTY and free is None:
+                free = offset
+        if free is None:
+            raise RuntimeError(f"shared state segment {self._name!r} has no free worker slot")
+        _WORKER.pack_into(self._buf, free, self._pid, 0)
+        return free
+
+
+class SharedTokenRateLimiter:
+    """``TokenRateLimiter`` whose buckets live in a shared segment.
+
+    Policies still come from the local config, which every worker loads
+    identically; only the mutable balance and refill timestamp are shared.
+    Like ``TenantBucketStore``, a bucket that is full and has been untouched for
+    a second may be overwritten by a new tenant. When the table has no such slot,
+    or the lock stays busy, ``try_consume`` raises ``SharedStateUnavailableError``
+    and the gateway answers 503.
+    """
+
+    def __init__(
+        self,
+        config: GatewayConfig,
+        segment: SharedStateSegment,
+        rate_controller: AdaptiveRateController | None = None,
+    ) -> None:
+        self._config = config
+        self._segment = segment
+        self._rate_controller = rate_controller
+
+    def try_consume(self, tenant_id: str, amount: int, now: float | None = None) -> bool:
+        ts = now if now is not None else time.monotonic()
+        policy = self._config.policy_for(tenant_id)
+        rate = self._rate_for(tenant_id)
+        with self._segment.locked(bounded=True):
+            found = self._segment.read_bucket(tenant_id)
+            if found is None:
+                bucket = TokenBucket(
+                    rate_tokens_per_sec=rate,
+                    burst_tokens=policy.burst_tokens,
+                    tokens=policy.burst_tokens,
+                    last_refill_ts=ts,
+                )
+                offset = self._segment.insert_bucket(
+                    tenant_id, bucket.tokens, ts, self._reusable_at(bucket)
+                )
+            else:
+                offset, tokens, last_refill_ts = found
+                bucket = TokenBucket(
+                    rate_tokens_per_sec=rate,
+                    burst_tokens=policy.burst_tokens,
+                    tokens=tokens,
+                    last_refill_ts=last_refill_ts,
+                )
+            previous_refill_ts = bucket.last_refill_ts
+            allowed = bucket.try_consume(amount=amount, now=ts)
+            # Another worker may have stamped a later clock reading than ours.
+            bucket.last_refill_ts = max(previous_refill_ts, bucket.last_refill_ts)
+            self._segment.write_bucket(
+                offset, bucket.tokens, bucket.last_refill_ts, self._reusable_at(bucket)
+            )
+        return allowed
+
+    def refund(self, tenant_id: str, amount: int) -> None:
+        if amount <= 0:
+            return
+        burst_tokens = self._config.policy_for(tenant_id).burst_tokens
+
+        def apply() -> None:
+            found = self._segment.read_bucket(tenant_id)
+            if found is None:
+                return
+            offset, tokens, last_refill_ts = found
+            bucket = TokenBucket(
+                rate_tokens_per_sec=self._rate_for(tenant_id),
+                burst_tokens=burst_tokens,
+                tokens=min(burst_tokens, tokens + amount),
+                last_refill_ts=last_refill_ts,
+            )
+            self._segment.write_bucket(
+                offset, bucket.tokens, last_refill_ts, self._reusable_at(bucket)
+            )
+
+        self._segment.run_or_defer(apply)
+
+    def _rate_for(self, tenant_id: str) -> float:
+        if self._rate_controller is None:
+            return self._config.policy_for(tenant_id).rate_tokens_per_sec
+        return self._rate_controller.rate_for(tenant_id)
+
+    @staticmethod
+    def _reusable_at(bucket: TokenBucket) -> float:
+        """When the bucket will be full and idle long enough to hand its slot on."""
+        missing = bucket.burst_tokens - bucket.tokens
+        if missing <= 0:
+            full_at = bucket.last_refill_ts
+        elif bucket.rate_tokens_per_sec > 0:
+            full_at = bucket.last_refill_ts + missing / bucket.rate_tokens_per_sec
+        else:
+            full_at = math.inf
+        return max(full_at, bucket.last_refill_ts + TenantBucketStore._MIN_IDLE_SECONDS)
+
+
+class SharedKVTracker:
+    """Byte-level KV accounting against one budget shared by every worker.
+
+    Each worker remembers its own reservations so it can release them; the
+    running total lives in the segment. There is no block paging here, so
+    fragmentation reads as zero and the prefix cache is unavailable. A
+    reservation that would be shed first reclaims bytes held by dead workers,
+    and one that cannot get the lock in time is shed.
+    """
+
+    def __init__(self, segment: SharedStateSegment) -> None:
+        self._segment = segment
+        self._allocations: dict[str, int] = {}
+
+    @property
+    def active_bytes(self) -> int:
+        return self._segment.kv_active_bytes()
+
+    @property
+    def utilization_ratio(self) -> float:
+        return min(1.0, self._segment.kv_active_bytes() / self._segment.kv_budget_bytes())
+
+    @property
+    def worker_utilization_ratio(self) -> float:
+        return min(1.0, self._segment.worker_kv_bytes() / self._segment.kv_budget_bytes())
+
+    @property
+    def fragmentation_ratio(self) -> float:
+        return 0.0
+
+    def try_reserve(self, request_id: str, bytes_needed: int, shed_threshold: float) -> bool:
+        bytes_needed = max(0, bytes_needed)
+        if not self._try_add(
+            bytes_needed,
+            lambda projected: projected / self._segment.kv_budget_bytes() < shed_threshold,
+        ):
+            return False
+        self._allocations[request_id] = bytes_needed
+        return True
+
+    def try_reserve_many(
+        self, reservations: Sequence[tuple[str, int]], shed_threshold: float
+    ) -> bool:
+        total = sum(max(0, bytes_needed) for _, bytes_needed in reservations)
+        if not self._try_add(
+            total,
+            lambda projected: projected / self._segment.kv_budget_bytes() < shed_threshold,
+        ):
+            return False
+        for request_id, bytes_needed in reservations:
+            self._allocations[request_id] = max(0, bytes_needed)
+        return True
+
+    def try_grow(self, request_id: str, bytes_needed: int) -> bool:
+        if request_id not in self._allocations:
+            return False
+        extra = max(0, bytes_needed)
+        if not self._try_add(
+            extra, lambda projected: projected <= self._segment.kv_budget_bytes()
+        ):
+            return False
+        self._allocations[request_id] += extra
+        return True
+
+    def release(self, request_id: str) -> None:
+        bytes_reserved = self._allocations.pop(request_id, 0)
+        if not bytes_reserved:
+            return
+        self._segment.run_or_defer(lambda: self._segment.add_kv_bytes(-bytes_reserved))
+
+    def _try_add(self, extra: int, fits: Callable[[int], bool]) -> bool:
+        try:
+            with self._segment.locked(bounded=True):
+                if not fits(self._segment.kv_active_bytes() + extra) and not (
+                    self._segment.reclaim_dead_workers()
+                    and fits(self._segment.kv_active_bytes() + extra)
+                ):
+                    return False
+                self._segment.add_kv_bytes(extra)
+        except SharedStateUnavailableError:
+            return False
+        return True
+
+
+class SharedInflightRequestRegistry:
+    """``InflightRequestRegistry`` backed by the segment's request-id set.
+
+    IDs are stored as 64-bit hashes, so a collision between two distinct IDs
+    is possible but vanishingly rare and only causes a spurious 409. ``claim``
+    raises ``SharedStateUnavailableError`` when the set is full or the lock
+    stays busy.
+    """
+
+    def __init__(self, segment: SharedStateSegment) -> None:
+        self._segment = segment
+
+    async def claim(self, request_id: str) -> bool:
+        async with self._segment.locked_async(bounded=True):
+            return self._segment.add_inflight(request_id)
+
+    async def release(self, request_id: str) -> None:
+        async with self._segment.locked_async():
+            self._segment.remove_inflight(request_id)
@@ -0,0 +1,338 @@
+from __future__ import annotations
+
+import json
+import math
+import random
+import time
+from collections import Counter
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from pathlib import Path
+from typing import NamedTuple
+
+from modelop.admission import AdmissionPredictor
+from modelop.backends import SimulatedBackend
+from modelop.capacity import KVCapacityEstimator, PagedKVAllocator
+from modelop.config import GatewayConfig
+from modelop.queueing import create_job_queue
+from modelop.rate_limit import AdaptiveRateController, TokenRateLimiter
+from modelop.scheduler import ContinuousBatchingScheduler, GenerationResult, InferenceJob
+from modelop.speculative import SpeculativeDecoder
+
+
+class SimulatedArrival(NamedTuple):
+    at: float
+    tenant_id: str
+    prompt_tokens: int
+    max_new_tokens: int
+    adapter_id: str | None = None
+
+
+class TenantMix(NamedTuple):
+    tenant_id: str
+    # Share of arrivals, relative to the other entries.
+    weight: float
+    mean_prompt_tokens: int
+    mean_new_tokens: int
+
+
+def poisson_arrivals(
+    rate_per_second: float,
+    duration_seconds: float,
+    mix: Sequence[TenantMix],
+    seed: int = 0,
+) -> Iterator[SimulatedArrival]:
+    """Open-loop Poisson arrivals; token counts are exponential around each tenant's means."""
+    rng = random.Random(seed)
+    weights = [tenant.weight for tenant in mix]
+    at = 0.0
+    while True:
+        at += rng.expovariate(rate_per_second)
+        if at >= duration_seconds:
+            return
+        tenant = rng.choices(mix, weights=weights)[0]
+        yield SimulatedArrival(
+            at=at,
+            tenant_id=tenant.tenant_id,
+            prompt_tokens=max(1, round(rng.expovariate(1 / tenant.mean_prompt_tokens))),
+            max_new_tokens=min(4096, max(1, round(rng.expovariate(1 / tenant.mean_new_tokens)))),
+        )
+
+
+def load_trace(path: str | Path) -> Iterator[SimulatedArrival]:
+    """Read JSON lines with ``at``, ``tenant_id``, ``prompt_tokens``, ``max_new_tokens``
+    and optionally ``adapter_id``, sorted by ``at``."""
+    with open(path) as trace:
+        for line in trace:
+            if line.strip():
+                record = json.loads(line)
+                yield SimulatedArrival(
+                    at=float(record["at"]),
+                    tenant_id=record["tenant_id"],
+                    prompt_tokens=int(record["prompt_tokens"]),
+                    max_new_tokens=int(record["max_new_tokens"]),
+                    adapter_id=record.get("adapter_id"),
+                )
+
+
+def _percentiles(values: list[float]) -> dict[str, float]:
+    if not values:
+        return {}
+    ordered = sorted(values)
+    last = len(ordered) - 1
+    return {
+        f"p{q}": ordered[min(last, math.ceil(q / 100 * len(ordered)) - 1)]
+        for q in (50, 90, 99)
+    } | {"max": ordered[last]}
+
+
+class SimulationReport:
+    """Admission outcomes and latency samples collected over one run."""
+
+    def __init__(self) -> None:
+        self.offered = 0
+        self.rejected: Counter[str] = Counter()
+        self.completed = 0
+        self.unfinished = 0
+        self.generated_tokens = 0
+        self.ttft_seconds: list[float] = []
+        self.tpot_seconds: list[float] = []
+        self.queue_seconds: list[float] = []
+        self.simulated_seconds = 0.0
+        self.wall_seconds = 0.0
+
+    def summary(self) -> dict[str, object]:
+        offered = max(1, self.offered)
+        return {
+            "offered": self.offered,
+            "completed": self.completed,
+            "unfinished": self.unfinished,
+            "shed_rate": sum(self.rejected.values()) / offered,
+            "shed_rate_by_reason": {
+                reason: count / offered for reason, count in sorted(self.rejected.items())
+            },
+            "ttft_seconds": _percentiles(self.ttft_seconds),
+            "tpot_seconds": _percentiles(self.tpot_seconds),
+            "queue_seconds": _percentiles(self.queue_seconds),
+            "generated_tokens_per_second": self.generated_tokens / max(1e-9, self.simulated_seconds),
+            "simulated_seconds": self.simulated_seconds,
+            "wall_seconds": self.wall_seconds,
+            "requests_per_wall_second": self.offered / max(1e-9, self.wall_seconds),
+        }
+
+
+class _SimulatedFuture:
+    """The slice of ``asyncio.Future`` the scheduler uses, resolved synchronously."""
+
+    __slots__ = ("_on_result", "_done", "_error")
+
+    def __init__(self, on_result: Callable[[GenerationResult], None]) -> None:
+        self._on_result = on_result
+        self._done = False
+        self._error: BaseException | None = None
+
+    def done(self) -> bool:
+        return self._done
+
+    def cancelled(self) -> bool:
+        return False
+
+    def exception(self) -> BaseException | None:
+        return self._error
+
+    def add_done_callback(self, callback: Callable[[object], None]) -> None:
+        # The scheduler's callbacks only matter for callers that give up, which
+        # simulated callers never do.
+        return None
+
+    def set_result(self, result: GenerationResult) -> None:
+        self._done = True
+        self._on_result(result)
+
+    def set_exception(self, error: BaseException) -> None:
+        self._done = True
+        self._error = error
+
+
+class _SilentTelemetry:
+    """Accepts every ``Telemetry`` call and records nothing."""
+
+    def __getattr__(self, name: str) -> Callable[..., None]:
+        return _ignore
+
+
+def _ignore(*args: object, **kwargs: object) -> None:
+    return None
+
+
+class GatewaySimulator:
+    """Discrete-event model of one gateway replica in virtual time.
+
+    Runs the real token buckets, paged KV allocator, job queue, TTFT SLO gate
+    and ``ContinuousBatchingScheduler`` built from a ``GatewayConfig``, with
+    the simulated backend's modeled step costs advancing a virtual clock. No
+    task ever sleeps, so a run costs only the scheduler's bookkeeping. Prompts
+    carry token counts only, so the prefix cache and prompt truncation marker
+    are not modeled; over-long prompts are clipped to fit as truncation would.
+    """
+
+    def __init__(self, config: GatewayConfig) -> None:
+        self._config = config
+        self._now = 0.0
+        self._report = SimulationReport()
+        self._rate_controller = (
+            AdaptiveRateController(config, telemetry=_SilentTelemetry())  # type: ignore[arg-type]
+            if config.rate_limit_adaptive
+            else None
+        )
+        self._next_rate_update = config.rate_limit_adaptive_interval_seconds
+        self._rate_limiter = TokenRateLimiter(config=config, rate_controller=self._rate_controller)
+        self._kv_estimator = KVCapacityEstimator(bytes_per_token=config.kv_bytes_per_token)
+        self._kv_tracker = PagedKVAllocator(
+            kv_budget_bytes=config.kv_budget_bytes,
+            bytes_per_token=config.kv_bytes_per_token,
+            block_tokens=config.kv_block_tokens,
+        )
+        self._scheduler = ContinuousBatchingScheduler(
+            max_active_sequences=config.scheduler_max_active_sequences,
+            queue_capacity=config.scheduler_queue_capacity,
+            decode_step_seconds=config.scheduler_decode_step_seconds,
+            idle_sleep_seconds=config.scheduler_idle_sleep_seconds,
+            kv_tracker=self._kv_tracker,
+            batch_state=config.scheduler_batch_state,
+            tick_token_budget=config.scheduler_tick_token_budget,
+            prefill_token_seconds=config.scheduler_prefill_token_seconds,
+            kv_bytes_per_token=config.kv_bytes_per_token,
+            kv_growth_tokens=config.kv_block_tokens,
+            preempt_watermark=config.kv_preempt_watermark,
+            adapter_slots=config.scheduler_adapter_slots,
+            adapter_load_seconds=config.scheduler_adapter_load_seconds,
+            adapter_lookahead=config.scheduler_adapter_lookahead,
+            adapter_max_skips=config.scheduler_adapter_max_skips,
+            speculative=(
+                SpeculativeDecoder(
+                    draft_tokens=config.scheduler_speculative_tokens,
+                    draft_token_seconds=config.scheduler_speculative_draft_token_seconds,
+                    default_acceptance=config.scheduler_speculative_acceptance,
+                    acceptance_rates=config.adapter_speculative_acceptance,
+                )
+                if config.scheduler_speculative_tokens > 0
+                else None
+            ),
+            backend=SimulatedBackend(
+                decode_step_seconds=config.scheduler_decode_step_seconds,
+                prefill_token_seconds=config.scheduler_prefill_token_seconds,
+            ),
+            queue=create_job_queue(
+                config.scheduler_queue_policy,
+                capacity=config.scheduler_queue_capacity,
+                weight_for=lambda tenant_id: config.policy_for(tenant_id).weight,
+                default_deadline_seconds=config.generation_timeout_seconds,
+            ),
+            telemetry=_SilentTelemetry(),  # type: ignore[arg-type]
+            clock=lambda: self._now,
+        )
+        self._predictor = AdmissionPredictor(self._scheduler)
+        self._next_request = 0
+
+    def run(self, arrivals: Iterable[SimulatedArrival]) -> SimulationReport:
+        """Admit each arrival at its time and tick until all admitted work drains."""
+        started = time.perf_counter()
+        scheduler = self._scheduler
+        tick_ends_at: float | None = None
+        for arrival in arrivals:
+            while tick_ends_at is not None and tick_ends_at <= arrival.at:
+                tick_ends_at = self._next_tick(tick_ends_at)
+            self._now = max(self._now, arrival.at)
+            self._admit(arrival)
+            if tick_ends_at is None:
+                tick_ends_at = self._start_tick()
+        while tick_ends_at is not None:
+            tick_ends_at = self._next_tick(tick_ends_at)
+
+        report = self._report
+        report.unfinished = scheduler.queue_depth + scheduler.active_count
+        report.simulated_seconds = self._now
+        report.wall_seconds = time.perf_counter() - started
+        return report
+
+    def _start_tick(self) -> float | None:
+        seconds = self._scheduler.start_tick(now=self._now)
+        if seconds is None:
+            return None
+        # A tick always takes some time, so the virtual clock cannot stall.
+        return self._now + max(seconds, self._config.scheduler_idle_sleep_seconds)
+
+    def _next_tick(self, tick_ends_at: float) -> float | None:
+        self._now = tick_ends_at
+        self._scheduler.finish_tick(now=tick_ends_at)
+        if self._rate_controller is not None and tick_ends_at >= self._next_rate_update:
+            # Sampled at tick boundaries, the nearest the model has to the gateway's timer.
+            scheduler = self._scheduler
+            self._rate_controller.update(
+                self._kv_tracker.utilization_ratio,
+                scheduler.queue_depth / max(1, scheduler.queue_capacity),
+            )
+            self._next_rate_update = tick_ends_at + self._config.rate_limit_adaptive_interval_seconds
+        return self._start_tick()
+
+    def _admit(self, arrival: SimulatedArrival) -> None:
+        config = self._config
+        report = self._report
+        report.offered += 1
+        policy = config.policy_for(arrival.tenant_id)
+        prompt_budget_tokens = config.max_request_tokens - arrival.max_new_tokens
+        if prompt_budget_tokens <= 0:
+            report.rejected["invalid"] += 1
+            return
+        prompt_tokens = min(arrival.prompt_tokens, prompt_budget_tokens)
+        if prompt_tokens < arrival.prompt_tokens and not config.enable_prompt_truncation:
+            report.rejected["invalid"] += 1
+            return
+        estimated_total_tokens = prompt_tokens + arrival.max_new_tokens
+
+        prediction = (
+            None if policy.ttft_slo_seconds is None else self._predictor.predict(prompt_tokens)
+        )
+        if prediction is not None and prediction.ttft_seconds > policy.ttft_slo_seconds:
+            report.rejected["slo"] += 1
+            return
+        if not self._rate_limiter.try_consume(
+            tenant_id=arrival.tenant_id, amount=estimated_total_tokens, now=self._now
+        ):
+            report.rejected["rate_limit"] += 1
+            return
+        request_id = f"sim-{self._next_request}"
+        self._next_request += 1
+        if not self._kv_tracker.try_reserve(
+            request_id=request_id,
+            bytes_needed=self._kv_estimator.estimate_request_bytes(prompt_tokens),
+            shed_threshold=config.shed_threshold,
+        ):
+            self._rate_limiter.refund(tenant_id=arrival.tenant_id, amount=estimated_total_tokens)
+            report.rejected["kv_pressure"] += 1
+            return
+        job = InferenceJob(
+            request_id=request_id,
+            tenant_id=arrival.tenant_id,
+            adapter_id=arrival.adapter_id or policy.default_adapter_id,
+            prompt="",
+            prompt_tokens=prompt_tokens,
+            max_new_tokens=arrival.max_new_tokens,
+            estimated_total_tokens=estimated_total_tokens,
+            admitted_at=self._now,
+            enqueued_at=self._now,
+            future=_SimulatedFuture(self._record),  # type: ignore[arg-type]
+        )
+        if not self._scheduler.enqueue_nowait(job):
+            self._kv_tracker.release(request_id)
+            self._rate_limiter.refund(tenant_id=arrival.tenant_id, amount=estimated_total_tokens)
+            report.rejected["queue_full"] += 1
+
+    def _record(self, result: GenerationResult) -> None:
+        report = self._report
+        report.completed += 1
+        report.generated_tokens += result.completion_tokens
+        report.ttft_seconds.append(result.ttft_seconds)
+        report.queue_seconds.append(result.queue_time_seconds)
+        if result.completion_tokens > 1:
+            report.tpot_seconds.append(result.avg_tpot_seconds)
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import random
+from collections.abc import Mapping
+
+
+class SpeculativeDecoder:
+    """Modeled draft-and-verify decoding.
+
+    Each tick a draft model proposes ``draft_tokens`` tokens per sequence and
+    the target model verifies them in one pass. Drafts are accepted one at a
+    time with the adapter's acceptance rate until the first rejection, and the
+    verify pass always contributes one token of its own, so a sequence commits
+    between 1 and ``draft_tokens + 1`` tokens per tick.
+    """
+
+    def __init__(
+        self,
+        draft_tokens: int,
+        draft_token_seconds: float,
+        default_acceptance: float = 0.7,
+        acceptance_rates: Mapping[str, float] | None = None,
+        seed: int = 0,
+    ) -> None:
+        self._draft_tokens = draft_tokens
+        self._draft_token_seconds = draft_token_seconds
+        self._default_acceptance = default_acceptance
+        self._acceptance_rates = dict(acceptance_rates or {})
+        self._rng = random.Random(seed)
+
+    @property
+    def draft_tokens(self) -> int:
+        return self._draft_tokens
+
+    @property
+    def draft_seconds(self) -> float:
+        """Modeled cost of the draft stage; drafts run sequentially, batched across sequences."""
+        return self._draft_tokens * self._draft_token_seconds
+
+    def acceptance_for(self, adapter_id: str) -> float:
+        return self._acceptance_rates.get(adapter_id, self._default_acceptance)
+
+    def accepted_drafts(self, adapter_id: str) -> int:
+        acceptance = self.acceptance_for(adapter_id)
+        accepted = 0
+        while accepted < self._draft_tokens and self._rng.random() < acceptance:
+            accepted += 1
+        return accepted
+
+    @staticmethod
+    def expected_tokens_per_step(acceptance: float, draft_tokens: int) -> float:
+        """Mean tokens committed per verify pass: ``(1 - a**(k+1)) / (1 - a)``."""
+        if acceptance >= 1.0:
+            return float(draft_tokens + 1)
+        return (1.0 - acceptance ** (draft_tokens + 1)) / (1.0 - acceptance)
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from collections.abc import Iterable
+
 try:
     from prometheus_client import (
         CONTENT_TYPE_LATEST,
@@ -18,6 +20,9 @@ except ModuleNotFoundError:
         def inc(self, amount: float = 1.0) -> None:
             return None
 
+        def dec(self, amount: float = 1.0) -> None:
+            return None
+
         def set(self, value: float) -> None:
             return None
 
@@ -56,12 +61,90 @@ REQUEST_ID_COLLISIONS_TOTAL = Counter(
     "Concurrent request-id collision rejections.",
     ["tenant_id"],
 )
+PREFIX_CACHE_LOOKUP_TOKENS_TOTAL = Counter(
+    "prefix_cache_lookup_tokens_total",
+    "Prompt tokens looked up in the prefix cache by tenant.",
+    ["tenant_id"],
+)
+PREFIX_CACHE_HIT_TOKENS_TOTAL = Counter(
+    "prefix_cache_hit_tokens_total",
+    "Prompt tokens served from the prefix cache by tenant.",
+    ["tenant_id"],
+)
+PREFIX_CACHE_SAVED_BYTES_TOTAL = Counter(
+    "prefix_cache_saved_bytes_total",
+    "KV bytes not reserved thanks to prefix cache hits by tenant.",
+    ["tenant_id"],
+)
+PREEMPTIONS_TOTAL = Counter(
+    "scheduler_preemptions_total",
+    "Active sequences preempted under KV pressure by tenant.",
+    ["tenant_id"],
+)
+RECOMPUTE_TOKENS_TOTAL = Counter(
+    "scheduler_recompute_tokens_total",
+    "Prompt and generated tokens recomputed after preemption by tenant.",
+    ["tenant_id"],
+)
+RATE_LIMIT_LEASE_RENEWALS_TOTAL = Counter(
+    "rate_limit_lease_renewals_total",
+    "Bulk rate-limit lease renewals with the cluster coordinator.",
+    ["result"],
+)
+RESPONSE_CACHE_REQUESTS_TOTAL = Counter(
+    "response_cache_requests_total",
+    "Requests from coalescing tenants by how they were served.",
+    ["tenant_id", "result"],
+)
+ADAPTER_SWAPS_TOTAL = Counter(
+    "adapter_swaps_total",
+    "Adapter loads into a scheduler adapter slot.",
+    ["adapter_id"],
+)
+SPECULATIVE_DRAFT_TOKENS_TOTAL = Counter(
+    "speculative_draft_tokens_total",
+    "Draft tokens proposed for verification by adapter.",
+    ["adapter_id"],
+)
+SPECULATIVE_ACCEPTED_TOKENS_TOTAL = Counter(
+    "speculative_accepted_tokens_total",
+    "Draft tokens accepted by the verify pass by adapter.",
+    ["adapter_id"],
+)
+DEADLINE_REQUESTS_TOTAL = Counter(
+    "deadline_requests_total",
+    "Requests with a deadline by outcome: met, late (finished after it) or dropped (never started).",
+    ["tenant_id", "result"],
+)
+BACKGROUND_JOBS_TOTAL = Counter(
+    "background_jobs_total",
+    "Background tier jobs by event: submitted, rejected, completed, failed or preempted.",
+    ["result"],
+)
 SCHEDULER_TICKS_TOTAL = Counter("scheduler_ticks_total", "Continuous batching ticks.")
 
 KV_CACHE_UTILIZATION_RATIO = Gauge(
     "kv_cache_utilization_ratio",
     "Active KV cache utilization (0..1).",
 )
+KV_CACHE_FRAGMENTATION_RATIO = Gauge(
+    "kv_cache_fragmentation_ratio",
+    "Share of allocated KV block slots left unused (0..1).",
+)
+ADAPTER_RESIDENT = Gauge(
+    "adapter_resident",
+    "1 while the adapter occupies a scheduler adapter slot.",
+    ["adapter_id"],
+)
+RATE_LIMIT_ADAPTIVE_SCALE = Gauge(
+    "rate_limit_adaptive_scale",
+    "AIMD multiplier on configured tenant refill rates (0..1).",
+)
+TENANT_EFFECTIVE_RATE_TOKENS_PER_SEC = Gauge(
+    "tenant_effective_rate_tokens_per_sec",
+    "Token bucket refill rate after adaptive rate control by configured tenant.",
+    ["tenant_id"],
+)
 QUEUE_DEPTH = Gauge("queue_depth", "Inference queue depth.")
 ACTIVE_SEQUENCES = Gauge("active_sequences", "Active decode sequences.")
 
@@ -75,38 +158,158 @@ TPOT_SECONDS = Histogram(
     "Time per output token after first token.",
     ["tenant_id"],
 )
+TICK_DURATION_SECONDS = Histogram(
+    "scheduler_tick_duration_seconds",
+    "Wall time from one scheduler tick start to its token commit.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.02, 0.03, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+TICK_OVERRUN_SECONDS = Histogram(
+    "scheduler_tick_overrun_seconds",
+    "How far a tick ran past its absolute-clock deadline.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5),
+)
+ADAPTER_LOAD_WAIT_SECONDS = Histogram(
+    "adapter_load_wait_seconds",
+    "Time a started sequence waited for its adapter to load.",
+    ["adapter_id"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+SPECULATIVE_ACCEPTED_TOKENS_PER_TICK = Histogram(
+    "speculative_accepted_tokens_per_tick",
+    "Accepted draft tokens committed across the decode batch in one tick.",
+    buckets=(0, 1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+TTFT_PREDICTION_ERROR_SECONDS = Histogram(
+    "ttft_prediction_error_seconds",
+    "Observed minus admission-predicted TTFT; positive means the predictor was optimistic.",
+    ["tenant_id"],
+    buckets=(-2.5, -1.0, -0.5, -0.25, -0.1, -0.05, 0.0, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
 QUEUE_WAIT_SECONDS = Histogram(
     "queue_wait_seconds",
-    "Time from enqueue to first decode step.",
+    "Time from enqueue to slot assignment (prefill start).",
     ["tenant_id"],
 )
 
 
+# Label for tenants and adapters beyond Telemetry's distinct-label budgets.
+OTHER_TENANT_LABEL = "other"
+OTHER_ADAPTER_LABEL = "other"
+
+
+class _LabelBudget:
+    """Keeps reserved values and the first ``limit`` others; the rest share ``other``."""
+
+    def __init__(self, limit: int, reserved: Iterable[str], other: str) -> None:
+        self._limit = limit
+        self._reserved = frozenset(reserved)
+        self._seen: set[str] = set()
+        self._other = other
+
+    def __call__(self, value: str) -> str:
+        if value in self._seen or value in self._reserved:
+            return value
+        if len(self._seen) < self._limit:
+            self._seen.add(value)
+            return value
+        return self._other
+
+
 class Telemetry:
+    """Records gateway metrics; tenant and adapter labels are bounded, since clients choose them.
+
+    ``tenant_labels`` (the configured tenants) always get their own label, as
+    do the first ``max_tenant_labels`` other tenants seen; the rest are
+    reported as ``other``. Adapters are bounded the same way by
+    ``adapter_labels`` and ``max_adapter_labels``.
+    """
+
+    def __init__(
+        self,
+        max_tenant_labels: int = 256,
+        tenant_labels: Iterable[str] = (),
+        max_adapter_labels: int = 64,
+        adapter_labels: Iterable[str] = (),
+    ) -> None:
+        self._tenant = _LabelBudget(max_tenant_labels, tenant_labels, OTHER_TENANT_LABEL)
+        self._adapter = _LabelBudget(max_adapter_labels, adapter_labels, OTHER_ADAPTER_LABEL)
+
     def record_request_outcome(self, tenant_id: str, result: str, reason: str) -> None:
         REQUESTS_TOTAL.labels(
-            tenant_id=tenant_id,
+            tenant_id=self._tenant(tenant_id),
             result=result,
             reason=reason,
         ).inc()
 
     def observe_tpot(self, tenant_id: str, value: float) -> None:
-        TPOT_SECONDS.labels(tenant_id=tenant_id).observe(max(0.0, value))
+        TPOT_SECONDS.labels(tenant_id=self._tenant(tenant_id)).observe(max(0.0, value))
 
     def observe_ttft(self, tenant_id: str, value: float) -> None:
-        TTFT_SECONDS.labels(tenant_id=tenant_id).observe(max(0.0, value))
+        TTFT_SECONDS.labels(tenant_id=self._tenant(tenant_id)).observe(max(0.0, value))
+
+    def observe_ttft_prediction_error(self, tenant_id: str, value: float) -> None:
+        TTFT_PREDICTION_ERROR_SECONDS.labels(tenant_id=self._tenant(tenant_id)).observe(value)
 
     def observe_queue_wait(self, tenant_id: str, value: float) -> None:
-        QUEUE_WAIT_SECONDS.labels(tenant_id=tenant_id).observe(max(0.0, value))
+        QUEUE_WAIT_SECONDS.labels(tenant_id=self._tenant(tenant_id)).observe(max(0.0, value))
 
     def add_generated_tokens(self, tenant_id: str, count: int) -> None:
-        TOKENS_GENERATED_TOTAL.labels(tenant_id=tenant_id).inc(max(0, count))
+        TOKENS_GENERATED_TOTAL.labels(tenant_id=self._tenant(tenant_id)).inc(max(0, count))
 
     def record_prompt_truncation(self, tenant_id: str) -> None:
-        PROMPT_TRUNCATIONS_TOTAL.labels(tenant_id=tenant_id).inc()
+        PROMPT_TRUNCATIONS_TOTAL.labels(tenant_id=self._tenant(tenant_id)).inc()
 
     def record_request_id_collision(self, tenant_id: str) -> None:
-        REQUEST_ID_COLLISIONS_TOTAL.labels(tenant_id=tenant_id).inc()
+        REQUEST_ID_COLLISIONS_TOTAL.labels(tenant_id=self._tenant(tenant_id)).inc()
+
+    def record_prefix_cache_lookup(
+        self, tenant_id: str, prompt_tokens: int, hit_tokens: int, saved_bytes: int
+    ) -> None:
+        PREFIX_CACHE_LOOKUP_TOKENS_TOTAL.labels(tenant_id=self._tenant(tenant_id)).inc(max(0, prompt_tokens))
+        PREFIX_CACHE_HIT_TOKENS_TOTAL.labels(tenant_id=self._tenant(tenant_id)).inc(max(0, hit_tokens))
+        PREFIX_CACHE_SAVED_BYTES_TOTAL.labels(tenant_id=self._tenant(tenant_id)).inc(max(0, saved_bytes))
+
+    def record_preemption(self, tenant_id: str, recompute_tokens: int) -> None:
+        PREEMPTIONS_TOTAL.labels(tenant_id=self._tenant(tenant_id)).inc()
+        RECOMPUTE_TOKENS_TOTAL.labels(tenant_id=self._tenant(tenant_id)).inc(max(0, recompute_tokens))
+
+    def record_response_cache(self, tenant_id: str, result: str) -> None:
+        RESPONSE_CACHE_REQUESTS_TOTAL.labels(tenant_id=self._tenant(tenant_id), result=result).inc()
+
+    def record_deadline_outcome(self, tenant_id: str, result: str) -> None:
+        DEADLINE_REQUESTS_TOTAL.labels(tenant_id=self._tenant(tenant_id), result=result).inc()
+
+    def record_background_job(self, result: str) -> None:
+        BACKGROUND_JOBS_TOTAL.labels(result=result).inc()
+
+    def record_lease_renewal(self, result: str) -> None:
+        RATE_LIMIT_LEASE_RENEWALS_TOTAL.labels(result=result).inc()
+
+    def record_adapter_swap(self, adapter_id: str, evicted_adapter_id: str | None) -> None:
+        ADAPTER_SWAPS_TOTAL.labels(adapter_id=self._adapter(adapter_id)).inc()
+        # inc/dec rather than set, so "other" counts its resident adapters.
+        ADAPTER_RESIDENT.labels(adapter_id=self._adapter(adapter_id)).inc()
+        if evicted_adapter_id is not None:
+            ADAPTER_RESIDENT.labels(adapter_id=self._adapter(evicted_adapter_id)).dec()
+
+    def observe_adapter_load_wait(self, adapter_id: str, value: float) -> None:
+        ADAPTER_LOAD_WAIT_SECONDS.labels(adapter_id=self._adapter(adapter_id)).observe(
+            max(0.0, value)
+        )
+
+    def record_speculation(self, adapter_id: str, drafted: int, accepted: int) -> None:
+        label = self._adapter(adapter_id)
+        SPECULATIVE_DRAFT_TOKENS_TOTAL.labels(adapter_id=label).inc(max(0, drafted))
+        SPECULATIVE_ACCEPTED_TOKENS_TOTAL.labels(adapter_id=label).inc(max(0, accepted))
+
+    def observe_accepted_tokens_per_tick(self, value: int) -> None:
+        SPECULATIVE_ACCEPTED_TOKENS_PER_TICK.observe(max(0, value))
+
+    def observe_tick_duration(self, value: float) -> None:
+        TICK_DURATION_SECONDS.observe(max(0.0, value))
+
+    def observe_tick_overrun(self, value: float) -> None:
+        TICK_OVERRUN_SECONDS.observe(max(0.0, value))
 
     def tick_scheduler(self, queue_depth: int, active_sequences: int) -> None:
         SCHEDULER_TICKS_TOTAL.inc()
@@ -116,6 +319,14 @@ class Telemetry:
     def set_kv_utilization(self, utilization_ratio: float) -> None:
         KV_CACHE_UTILIZATION_RATIO.set(min(1.0, max(0.0, utilization_ratio)))
 
+    def set_adaptive_rates(self, scale: float, rates: dict[str, float]) -> None:
+        RATE_LIMIT_ADAPTIVE_SCALE.set(scale)
+        for tenant_id, rate in rates.items():
+            TENANT_EFFECTIVE_RATE_TOKENS_PER_SEC.labels(tenant_id=self._tenant(tenant_id)).set(rate)
+
+    def set_kv_fragmentation(self, fragmentation_ratio: float) -> None:
+        KV_CACHE_FRAGMENTATION_RATIO.set(min(1.0, max(0.0, fragmentation_ratio)))
+
     @staticmethod
     def scrape() -> tuple[bytes, str]:
         return generate_latest(), CONTENT_TYPE_LATEST
@@ -1,6 +1,17 @@
 from __future__ import annotations
 
+import hashlib
+import heapq
 import math
+import re
+from collections import Counter, OrderedDict
+from collections.abc import Iterable, Iterator, Mapping
+from pathlib import Path
+from typing import Protocol
+
+# GPT-2 style pre-tokenization: contractions, letter runs, digit groups,
+# punctuation runs and whitespace, each optionally led by one space.
+_PRETOKENIZE = re.compile(r"""'(?:[sdmt]|ll|ve|re)| ?[^\W\d_]+| ?\d{1,3}| ?[^\s\w]+|\s+(?!\S)|\s+""")
 
 
 def estimate_tokens(text: str, chars_per_token: float = 4.0) -> int:
@@ -8,3 +19,242 @@ def estimate_tokens(text: str, chars_per_token: float = 4.0) -> int:
         return 0
     return max(1, math.ceil(len(text) / chars_per_token))
 
+
+class Tokenizer(Protocol):
+    def count(self, text: str) -> int: ...
+
+    def count_tokens(self, texts: list[str]) -> list[int]: ...
+
+
+class HeuristicTokenizer:
+    """Character-ratio estimate; free to compute but blind to script and spacing."""
+
+    def __init__(self, chars_per_token: float = 4.0) -> None:
+        self._chars_per_token = chars_per_token
+
+    def count(self, text: str) -> int:
+        return estimate_tokens(text, chars_per_token=self._chars_per_token)
+
+    def count_tokens(self, texts: list[str]) -> list[int]:
+        return [self.count(text) for text in texts]
+
+
+def _merge_pair(ids: list[int], pair: tuple[int, int], new_id: int) -> list[int]:
+    merged: list[int] = []
+    index = 0
+    last = len(ids) - 1
+    while index <= last:
+        if index < last and ids[index] == pair[0] and ids[index + 1] == pair[1]:
+            merged.append(new_id)
+            index += 2
+        else:
+            merged.append(ids[index])
+            index += 1
+    return merged
+
+
+class BPETokenizer:
+    """Byte-level BPE over GPT-2 style pre-tokens.
+
+    Every byte is a base token, so any text encodes without unknowns; CJK and
+    other multi-byte scripts cost several tokens unless merges were learned
+    for them. Pre-tokens longer than ``_WORD_CHUNK_CHARS`` are split into
+    chunks, so neither merge cost nor cache keys grow with client input.
+    Each chunk is merged independently and memoized; inside a chunk a heap
+    of adjacent pairs by rank drives merges over a linked list, applying the
+    lowest-ranked pair leftmost first in O(n log n).
+    """
+
+    _WORD_CHUNK_CHARS = 64
+
+    def __init__(self, merges: list[tuple[int, int]], word_cache_size: int = 65536) -> None:
+        self._ranks: dict[tuple[int, int], int] = {
+            pair: 256 + rank for rank, pair in enumerate(merges)
+        }
+        self._merges = list(merges)
+        self._vocab: list[bytes] = [bytes([byte]) for byte in range(256)]
+        for left, right in merges:
+            self._vocab.append(self._vocab[left] + self._vocab[right])
+        self._word_cache: dict[str, tuple[int, ...]] = {}
+        self._word_cache_size = word_cache_size
+
+    @property
+    def vocab_size(self) -> int:
+        return len(self._vocab)
+
+    @property
+    def merges(self) -> list[tuple[int, int]]:
+        return list(self._merges)
+
+    @classmethod
+    def train(cls, texts: Iterable[str], vocab_size: int) -> BPETokenizer:
+        word_counts = Counter(word for text in texts for word in _PRETOKENIZE.findall(text))
+        words = [(list(word.encode("utf-8")), count) for word, count in word_counts.items()]
+        merges: list[tuple[int, int]] = []
+        for new_id in range(256, vocab_size):
+            pair_counts: Counter[tuple[int, int]] = Counter()
+            for ids, count in words:
+                for pair in zip(ids, ids[1:]):
+                    pair_counts[pair] += count
+            if not pair_counts:
+                break
+            best, _ = pair_counts.most_common(1)[0]
+            merges.append(best)
+            words = [
+                (_merge_pair(ids, best, new_id) if len(ids) > 1 else ids, count)
+                for ids, count in words
+            ]
+        return cls(merges)
+
+    @classmethod
+    def load(cls, path: str | Path) -> BPETokenizer:
+        merges = []
+        for line in Path(path).read_text().splitlines():
+            if line.strip():
+                left, right = line.split()
+                merges.append((int(left), int(right)))
+        return cls(merges)
+
+    def save(self, path: str | Path) -> None:
+        Path(path).write_text("".join(f"{left} {right}\n" for left, right in self._merges))
+
+    def encode(self, text: str) -> list[int]:
+        ids: list[int] = []
+        for word in self._words(text):
+            ids.extend(self._encode_word(word))
+        return ids
+
+    def decode(self, ids: Iterable[int]) -> str:
+        return b"".join(self._vocab[token_id] for token_id in ids).decode("utf-8", errors="replace")
+
+    def count(self, text: str) -> int:
+        cache = self._word_cache
+        total = 0
+        for word in self._words(text):
+            ids = cache.get(word)
+            total += len(ids if ids is not None else self._encode_word(word))
+        return total
+
+    def count_tokens(self, texts: list[str]) -> list[int]:
+        return [self.count(text) for text in texts]
+
+    def _words(self, text: str) -> Iterator[str]:
+        chunk = self._WORD_CHUNK_CHARS
+        for word in _PRETOKENIZE.findall(text):
+            if len(word) <= chunk:
+                yield word
+            else:
+                for start in range(0, len(word), chunk):
+                    yield word[start : start + chunk]
+
+    def _encode_word(self, word: str) -> tuple[int, ...]:
+        cached = self._word_cache.get(word)
+        if cached is not None:
+            return cached
+        encoded = tuple(self._merge(list(word.encode("utf-8"))))
+        if len(self._word_cache) >= self._word_cache_size:
+            self._word_cache.clear()
+        self._word_cache[word] = encoded
+        return encoded
+
+    def _merge(self, ids: list[int]) -> list[int]:
+        size = len(ids)
+        if size < 2:
+            return ids
+        ranks = self._ranks
+        # ids[i] is -1 once node i was merged into its left neighbour; a merged
+        # token's id is its merge rank, so any pair containing it ranks later.
+        following = list(range(1, size + 1))
+        preceding = list(range(-1, size - 1))
+        heap = [
+            (rank, index, ids[index], ids[index + 1])
+            for index in range(size - 1)
+            if (rank := ranks.get((ids[index], ids[index + 1]))) is not None
+        ]
+        heapq.heapify(heap)
+        while heap:
+            new_id, index, left, right = heapq.heappop(heap)
+            right_index = following[index]
+            if ids[index] != left or right_index >= size or ids[right_index] != right:
+                continue  # superseded by an earlier merge
+            ids[index] = new_id
+            ids[right_index] = -1
+            after = following[index] = following[right_index]
+            if after < size:
+                preceding[after] = index
+                rank = ranks.get((new_id, ids[after]))
+                if rank is not None:
+                    heapq.heappush(heap, (rank, index, new_id, ids[after]))
+            before = preceding[index]
+            if before >= 0:
+                rank = ranks.get((ids[before], new_id))
+                if rank is not None:
+                    heapq.heappush(heap, (rank, before, ids[before], new_id))
+        return [token_id for token_id in ids if token_id >= 0]
+
+
+class CachedTokenCounter:
+    """LRU of token counts keyed by a digest of the text.
+
+    Keys are 16-byte BLAKE2b digests, so the cache holds no prompt text and
+    its memory stays bounded by ``capacity`` regardless of prompt size.
+    """
+
+    def __init__(self, tokenizer: Tokenizer, capacity: int = 4096) -> None:
+        self._tokenizer = tokenizer
+        self._capacity = capacity
+        self._counts: OrderedDict[bytes, int] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def count(self, text: str) -> int:
+        key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        count = self._counts.get(key)
+        if count is not None:
+            self._counts.move_to_end(key)
+            self.hits += 1
+            return count
+        self.misses += 1
+        count = self._tokenizer.count(text)
+        self._counts[key] = count
+        if len(self._counts) > self._capacity:
+            self._counts.popitem(last=False)
+        return count
+
+    def count_tokens(self, texts: list[str]) -> list[int]:
+        return [self.count(text) for text in texts]
+
+
+def create_tokenizer(spec: str, cache_size: int = 4096) -> Tokenizer:
+    """Build a tokenizer from ``"heuristic"`` or ``"bpe:<merges file>"``."""
+    if spec == "heuristic":
+        return HeuristicTokenizer()
+    kind, _, path = spec.partition(":")
+    if kind == "bpe" and path:
+        return CachedTokenCounter(BPETokenizer.load(path), capacity=cache_size)
+    raise ValueError(f"unknown tokenizer spec: {spec!r}")
+
+
+class TokenizerRegistry:
+    """Tokenizer per adapter, falling back to a default for unlisted adapters."""
+
+    def __init__(
+        self,
+        default_spec: str = "heuristic",
+        adapter_specs: Mapping[str, str] | None = None,
+        cache_size: int = 4096,
+    ) -> None:
+        built: dict[str, Tokenizer] = {}
+
+        def build(spec: str) -> Tokenizer:
+            if spec not in built:
+                built[spec] = create_tokenizer(spec, cache_size=cache_size)
+            return built[spec]
+
+        self._default = build(default_spec)
+        self._by_adapter = {
+            adapter_id: build(spec) for adapter_id, spec in (adapter_specs or {}).items()
+        }
+
+    def for_adapter(self, adapter_id: str) -> Tokenizer:
+        return self._by_adapter.get(adapter_id, self._default)
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import struct
+from collections import deque
+from collections.abc import Iterator
+from pathlib import Path
+from typing import NamedTuple
+
+_MAGIC = b"MOTRACE1"
+# Magic, then the bytes of the segment written so far (header included).
+_HEADER = struct.Struct("<8sQ")
+# timestamp, prompt_hash, prompt_tokens, max_new_tokens, completion_tokens,
+# queue/ttft/tpot/total seconds, status, then the tenant and adapter byte lengths.
+_RECORD = struct.Struct("<dQIIIffffHBB")
+_MAX_NAME_BYTES = 255
+
+
+class TrafficRecord(NamedTuple):
+    # Wall-clock arrival time (``time.time()``).
+    timestamp: float
+    tenant_id: str
+    adapter_id: str
+    prompt_tokens: int
+    max_new_tokens: int
+    prompt_hash: int
+    # HTTP status the client received.
+    status: int
+    completion_tokens: int = 0
+    queue_seconds: float = 0.0
+    ttft_seconds: float = 0.0
+    tpot_seconds: float = 0.0
+    total_seconds: float = 0.0
+
+
+def prompt_hash(prompt: str) -> int:
+    """64-bit digest that tells prompts apart without storing their text."""
+    return int.from_bytes(hashlib.blake2b(prompt.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _name_bytes(name: str) -> bytes:
+    return name.encode("utf-8")[:_MAX_NAME_BYTES]
+
+
+class TrafficRecorder:
+    """Appends request records to fixed-size memory-mapped segment files.
+
+    Each record is a 48-byte struct plus the tenant and adapter names, copied
+    straight into the mapping, so recording never blocks the event loop on a
+    write syscall; the kernel flushes pages in the background and keeps them
+    across a process crash. A full segment rolls over to a new file, and only
+    the newest ``max_segments`` files of this process are kept. File names
+    carry the pid, so every worker process can share one directory.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        segment_bytes: int = 64 * 1024 * 1024,
+        max_segments: int = 16,
+    ) -> None:
+        if segment_bytes < _HEADER.size + _RECORD.size + 2 * _MAX_NAME_BYTES:
+            raise ValueError("segment_bytes is too small to hold a record")
+        self._directory = Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._segment_bytes = segment_bytes
+        self._max_segments = max(1, max_segments)
+        self._prefix = f"traffic-{os.getpid()}-"
+        self._segments: deque[Path] = deque(sorted(self._directory.glob(f"{self._prefix}*.bin")))
+        self._next_index = (
+            int(self._segments[-1].stem.rsplit("-", 1)[1]) + 1 if self._segments else 0
+        )
+        self._map: mmap.mmap | None = None
+        self._used = 0
+
+    def record(self, record: TrafficRecord) -> None:
+        tenant = _name_bytes(record.tenant_id)
+        adapter = _name_bytes(record.adapter_id)
+        size = _RECORD.size + len(tenant) + len(adapter)
+        if self._map is None or self._used + size > self._segment_bytes:
+            self._rotate()
+        assert self._map is not None
+        offset = self._used
+        _RECORD.pack_into(
+            self._map,
+            offset,
+            record.timestamp,
+            record.prompt_hash,
+            record.prompt_tokens,
+            record.max_new_tokens,
+            record.completion_tokens,
+            record.queue_seconds,
+            record.ttft_seconds,
+            record.tpot_seconds,
+            record.total_seconds,
+            record.status,
+            len(tenant),
+            len(adapter),
+        )
+        offset += _RECORD.size
+        self._map[offset : offset + len(tenant)] = tenant
+        offset += len(tenant)
+        self._map[offset : offset + len(adapter)] = adapter
+        # Publish the record only once it is complete, so readers never see half of one.
+        self._used = offset + len(adapter)
+        _HEADER.pack_into(self._map, 0, _MAGIC, self._used)
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.flush()
+            self._map.close()
+            self._map = None
+
+    def _rotate(self) -> None:
+        self.close()
+        path = self._directory / f"{self._prefix}{self._next_index:06d}.bin"
+        self._next_index += 1
+        with open(path, "w+b") as segment:
+            segment.truncate(self._segment_bytes)
+            self._map = mmap.mmap(segment.fileno(), self._segment_bytes)
+        self._used = _HEADER.size
+        _HEADER.pack_into(self._map, 0, _MAGIC, self._used)
+        self._segments.append(path)
+        while len(self._segments) > self._max_segments:
+            self._segments.popleft().unlink(missing_ok=True)
+
+
+def read_segment(path: str | Path) -> Iterator[TrafficRecord]:
+    """Yield the complete records of one segment in the order they were written."""
+    with open(path, "rb") as segment:
+        data = segment.read()
+    magic, used = _HEADER.unpack_from(data, 0)
+    if magic != _MAGIC:
+        raise ValueError(f"{path} is not a traffic log segment")
+    offset = _HEADER.size
+    while offset < used:
+        (
+            timestamp,
+            hashed,
+            prompt_tokens,
+            max_new_tokens,
+            completion_tokens,
+            queue_seconds,
+            ttft_seconds,
+            tpot_seconds,
+            total_seconds,
+            status,
+            tenant_length,
+            adapter_length,
+        ) = _RECORD.unpack_from(data, offset)
+        offset += _RECORD.size
+        tenant_id = data[offset : offset + tenant_length].decode("utf-8", errors="replace")
+        offset += tenant_length
+        adapter_id = data[offset : offset + adapter_length].decode("utf-8", errors="replace")
+        offset += adapter_length
+        yield TrafficRecord(
+            timestamp=timestamp,
+            tenant_id=tenant_id,
+            adapter_id=adapter_id,
+            prompt_tokens=prompt_tokens,
+            max_new_tokens=max_new_tokens,
+            prompt_hash=hashed,
+            status=status,
+            completion_tokens=completion_tokens,
+            queue_seconds=queue_seconds,
+            ttft_seconds=ttft_seconds,
+            tpot_seconds=tpot_seconds,
+            total_seconds=total_seconds,
+        )
+
+
+def read_traffic_log(directory: str | Path) -> list[TrafficRecord]:
+    """Every record in ``directory``, from all processes, sorted by arrival time."""
+    records = [
+        record
+        for path in sorted(Path(directory).glob("traffic-*.bin"))
+        for record in read_segment(path)
+    ]
+    # Records are written on completion, so arrival order differs even within a file.
+    records.sort(key=lambda record: record.timestamp)
+    return records
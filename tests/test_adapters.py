@@ -0,0 +1,142 @@
+import asyncio
+import time
+import unittest
+
+from modelop.adapters import AdapterSlotCache
+from modelop.capacity import KVPressureTracker
+from modelop.queueing import WeightedFairJobQueue
+from modelop.scheduler import ContinuousBatchingScheduler, InferenceJob
+from modelop.telemetry import Telemetry
+
+
+class AdapterSlotCacheTests(unittest.TestCase):
+    def test_evicts_least_recent_unpinned_adapter(self) -> None:
+        cache = AdapterSlotCache(slots=2, load_seconds=0.5)
+        self.assertEqual(cache.acquire("a", now=0.0).ready_at, 0.5)
+        cache.acquire("b", now=1.0)
+        cache.release("a")
+
+        second_a = cache.acquire("a", now=2.0)
+        self.assertFalse(second_a.loaded)
+        self.assertEqual(second_a.ready_at, 0.5)
+        self.assertFalse(cache.can_acquire("c"))  # a and b are both pinned
+        self.assertIsNone(cache.acquire("c", now=2.0))
+
+        cache.release("b")
+        loaded = cache.acquire("c", now=3.0)
+        self.assertEqual(loaded.evicted_adapter_id, "b")
+        self.assertEqual(cache.resident_adapters, ["a", "c"])
+        self.assertEqual(cache.swaps, 3)
+
+
+class AdapterAwareSchedulingTests(unittest.IsolatedAsyncioTestCase):
+    async def _run(self, adapters: list[str], max_skips: int) -> tuple[list[str], list[str]]:
+        class RecordingTelemetry(Telemetry):
+            def __init__(self) -> None:
+                super().__init__()
+                self.swaps: list[str] = []
+
+            def record_adapter_swap(self, adapter_id: str, evicted_adapter_id: str | None) -> None:
+                self.swaps.append(adapter_id)
+
+        kv_tracker = KVPressureTracker(kv_budget_bytes=1_000_000)
+        telemetry = RecordingTelemetry()
+        scheduler = ContinuousBatchingScheduler(
+            max_active_sequences=1,
+            queue_capacity=10,
+            decode_step_seconds=0.001,
+            idle_sleep_seconds=0.001,
+            kv_tracker=kv_tracker,
+            telemetry=telemetry,
+            adapter_slots=1,
+            adapter_load_seconds=0.01,
+            adapter_max_skips=max_skips,
+        )
+        loop = asyncio.get_running_loop()
+        jobs = []
+        for index, adapter_id in enumerate(adapters):
+            request_id = f"{adapter_id}-{index}"
+            self.assertTrue(kv_tracker.try_reserve(request_id, bytes_needed=10, shed_threshold=1.0))
+            job = InferenceJob(
+                request_id=request_id,
+                tenant_id="tenant-a",
+                adapter_id=adapter_id,
+                prompt="hello",
+                prompt_tokens=2,
+                max_new_tokens=2,
+                estimated_total_tokens=4,
+                admitted_at=time.monotonic(),
+                enqueued_at=time.monotonic(),
+                future=loop.create_future(),
+            )
+            self.assertTrue(await scheduler.enqueue(job))
+            jobs.append(job)
+
+        await scheduler.start()
+        try:
+            await asyncio.wait_for(asyncio.gather(*(job.future for job in jobs)), timeout=5.0)
+        finally:
+            await scheduler.stop()
+        order = [job.request_id for job in sorted(jobs, key=lambda job: job.started_at)]
+        return order, telemetry.swaps
+
+    async def test_prefers_resident_adapter_until_skip_bound(self) -> None:
+        adapters = ["a", "b", "a", "a", "a"]
+
+        order, swaps = await self._run(adapters, max_skips=10)
+        self.assertEqual(order, ["a-0", "a-2", "a-3", "a-4", "b-1"])
+        self.assertEqual(swaps, ["a", "b"])
+
+        # After one skip the b job goes ahead of the remaining resident-adapter jobs.
+        order, swaps = await self._run(adapters, max_skips=1)
+        self.assertEqual(order, ["a-0", "a-2", "b-1", "a-3", "a-4"])
+        self.assertEqual(swaps, ["a", "b", "a"])
+
+    async def test_lookahead_window_keeps_weighted_fair_order(self) -> None:
+        def start_order(adapter_slots: int) -> str:
+            clock = [0.0]
+            scheduler = ContinuousBatchingScheduler(
+                max_active_sequences=1,
+                queue_capacity=100,
+                decode_step_seconds=0.01,
+                idle_sleep_seconds=0.0,
+                kv_tracker=KVPressureTracker(kv_budget_bytes=1_000_000),
+                telemetry=Telemetry(),
+                adapter_slots=adapter_slots,
+                queue=WeightedFairJobQueue(
+                    capacity=100, weight_for={"A": 3.0, "B": 1.0}.__getitem__
+                ),
+                clock=lambda: clock[0],
+            )
+            loop = asyncio.get_running_loop()
+            jobs = [
+                InferenceJob(
+                    request_id=f"{tenant_id}-{index}",
+                    tenant_id=tenant_id,
+                    adapter_id="adapter-x",
+                    prompt="",
+                    prompt_tokens=2,
+                    max_new_tokens=1,
+                    estimated_total_tokens=3,
+                    admitted_at=0.0,
+                    enqueued_at=0.0,
+                    future=loop.create_future(),
+                )
+                for index in range(12)
+                for tenant_id in ("A", "B")
+            ]
+            for job in jobs:
+                self.assertTrue(scheduler.enqueue_nowait(job))
+            while (seconds := scheduler.start_tick(now=clock[0])) is not None:
+                clock[0] += max(seconds, 0.01)
+                scheduler.finish_tick(now=clock[0])
+            started = sorted(jobs, key=lambda job: (job.started_at, job.request_id))
+            return "".join(job.tenant_id for job in started)
+
+        fair = start_order(adapter_slots=0)
+        self.assertEqual(start_order(adapter_slots=2), fair)
+        self.assertEqual(fair[:12].count("A"), 9)
+
+
+if __name__ == "__main__":
+    unittest.main()
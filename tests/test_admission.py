@@ -0,0 +1,43 @@
+import unittest
+from types import SimpleNamespace
+
+from modelop.admission import AdmissionPredictor
+
+
+def _scheduler(**overrides) -> SimpleNamespace:
+    load = {
+        "tokens_per_second": 1000.0,
+        "tick_seconds": 0.02,
+        "max_active_sequences": 4,
+        "active_count": 4,
+        "queue_depth": 2,
+        "queued_tokens": 500,
+        "min_remaining_tokens": 10,
+        "tick_token_budget": 256,
+    }
+    load.update(overrides)
+    return SimpleNamespace(**load)
+
+
+class AdmissionPredictorTests(unittest.TestCase):
+    def test_waits_for_a_slot_then_drains_queued_work(self) -> None:
+        prediction = AdmissionPredictor(_scheduler()).predict(prompt_tokens=600)
+
+        # 10 ticks until a slot frees, 500 queued tokens at 1000 tok/s, 3 prefill ticks.
+        self.assertAlmostEqual(prediction.queue_wait_seconds, 0.2 + 0.5)
+        self.assertAlmostEqual(prediction.ttft_seconds, 0.7 + 3 * 0.02)
+
+    def test_free_slot_means_no_queue_wait(self) -> None:
+        prediction = AdmissionPredictor(_scheduler(active_count=1)).predict(prompt_tokens=10)
+
+        self.assertEqual(prediction.queue_wait_seconds, 0.0)
+        self.assertAlmostEqual(prediction.ttft_seconds, 0.02)
+
+    def test_no_prediction_before_throughput_is_measured(self) -> None:
+        predictor = AdmissionPredictor(_scheduler(tokens_per_second=None, tick_seconds=None))
+
+        self.assertIsNone(predictor.predict(prompt_tokens=10))
+
+
+if __name__ == "__main__":
+    unittest.main()
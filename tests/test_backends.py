@@ -0,0 +1,119 @@
+import asyncio
+import time
+import unittest
+
+from modelop.backends import NumpyReferenceBackend, PrefillChunk, SimulatedBackend, np
+from modelop.capacity import KVPressureTracker
+from modelop.scheduler import ContinuousBatchingScheduler, InferenceJob
+from modelop.telemetry import Telemetry
+
+
+def _chunk(request_id: str, prompt: str, start: int, tokens: int) -> PrefillChunk:
+    return PrefillChunk(
+        request_id=request_id,
+        adapter_id="adapter-x",
+        prompt=prompt,
+        prompt_tokens=(len(prompt) + 3) // 4,
+        start=start,
+        tokens=tokens,
+    )
+
+
+class SimulatedBackendTests(unittest.TestCase):
+    def test_models_step_and_prefill_cost(self) -> None:
+        backend = SimulatedBackend(decode_step_seconds=0.02, prefill_token_seconds=0.001)
+
+        self.assertAlmostEqual(backend.prefill([_chunk("a", "x" * 40, 0, 10)]), 0.01)
+        self.assertEqual(backend.decode(["a", "b"]), 0.02)
+        self.assertEqual(backend.token_text("a", 3), "tok3")
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class NumpyReferenceBackendTests(unittest.TestCase):
+    def test_decode_is_deterministic_across_chunking_and_recompute(self) -> None:
+        prompt = "the quick brown fox jumps over the lazy dog"
+        whole = NumpyReferenceBackend()
+        whole.prefill([_chunk("a", prompt, 0, 11)])
+        for _ in range(3):
+            whole.decode(["a"])
+
+        chunked = NumpyReferenceBackend()
+        chunked.prefill([_chunk("a", prompt, 0, 5)])
+        chunked.prefill([_chunk("a", prompt, 5, 6)])
+        chunked.decode(["a"])
+        # Preemption drops KV; recomputing prompt plus generated tokens resumes decoding.
+        chunked.drop_kv(["a"])
+        chunked.prefill([_chunk("a", prompt, 0, 12)])
+        chunked.decode(["a"])
+        chunked.decode(["a"])
+
+        tokens = [whole.token_text("a", index) for index in range(1, 4)]
+        self.assertEqual([chunked.token_text("a", index) for index in range(1, 4)], tokens)
+        self.assertTrue(all(token.startswith("t") for token in tokens))
+
+        chunked.free(["a"])
+        with self.assertRaises(KeyError):
+            chunked.token_text("a", 1)
+
+    def test_multi_token_decode_matches_single_steps(self) -> None:
+        prompt = "speculative verify passes commit several tokens"
+        single = NumpyReferenceBackend()
+        single.prefill([_chunk("a", prompt, 0, 12)])
+        for _ in range(4):
+            single.decode(["a"])
+
+        batched = NumpyReferenceBackend()
+        batched.prefill([_chunk("a", prompt, 0, 12), _chunk("b", prompt, 0, 12)])
+        batched.decode(["a", "b"], steps=[3, 1], draft_tokens=3)
+        batched.decode(["a", "b"], steps=[1, 3], draft_tokens=3)
+
+        expected = [single.token_text("a", index) for index in range(1, 5)]
+        self.assertEqual([batched.token_text("a", index) for index in range(1, 5)], expected)
+        self.assertEqual([batched.token_text("b", index) for index in range(1, 5)], expected)
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class NumpyBackendSchedulerTests(unittest.IsolatedAsyncioTestCase):
+    async def test_scheduler_collects_backend_tokens(self) -> None:
+        scheduler = ContinuousBatchingScheduler(
+            max_active_sequences=4,
+            queue_capacity=10,
+            decode_step_seconds=0.0,
+            idle_sleep_seconds=0.001,
+            kv_tracker=KVPressureTracker(kv_budget_bytes=1_000_000),
+            telemetry=Telemetry(),
+            backend=NumpyReferenceBackend(),
+        )
+        await scheduler.start()
+        try:
+            now = time.monotonic()
+            jobs = [
+                InferenceJob(
+                    request_id=f"req-{index}",
+                    tenant_id="tenant-a",
+                    adapter_id="adapter-x",
+                    prompt=f"prompt number {index} " * 4,
+                    prompt_tokens=18,
+                    max_new_tokens=4,
+                    estimated_total_tokens=22,
+                    admitted_at=now,
+                    enqueued_at=now,
+                    future=asyncio.get_running_loop().create_future(),
+                )
+                for index in range(3)
+            ]
+            for job in jobs:
+                self.assertTrue(await scheduler.enqueue(job))
+            results = await asyncio.wait_for(asyncio.gather(*(job.future for job in jobs)), 5.0)
+        finally:
+            await scheduler.stop()
+
+        for result in results:
+            self.assertEqual(result.completion_tokens, 4)
+            self.assertEqual(len(result.output.split()), 4)
+            self.assertTrue(result.output.startswith("t"))
+            self.assertFalse(result.output.startswith("tok"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import asyncio
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from modelop.background import BackgroundJobStore, BackgroundTier
+from modelop.capacity import KVPressureTracker
+from modelop.scheduler import ContinuousBatchingScheduler, InferenceJob
+from modelop.telemetry import Telemetry
+
+
+class BackgroundJobStoreTests(unittest.TestCase):
+    def test_jobs_survive_reopen_and_orphans_are_requeued(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = str(Path(directory) / "jobs.sqlite")
+            store = BackgroundJobStore(path, max_queued_jobs=2)
+            first = store.submit("tenant-a", "adapter-x", "one", prompt_tokens=1, max_new_tokens=4)
+            second = store.submit("tenant-a", "adapter-x", "two", prompt_tokens=1, max_new_tokens=4)
+            self.assertIsNone(store.submit("tenant-a", "adapter-x", "three", 1, 4))
+            self.assertEqual([job.job_id for job in store.claim(1)], [first.job_id])
+            store.close()
+
+            store = BackgroundJobStore(path)
+            self.assertEqual(store.get(first.job_id).status, "running")
+            self.assertEqual(store.recover(), 1)
+            claimed = store.claim(5)
+            self.assertEqual([job.job_id for job in claimed], [first.job_id, second.job_id])
+            self.assertEqual(store.claim(5), [])
+
+            store.complete(first.job_id, output="tok1 tok2", completion_tokens=2)
+            done = store.get(first.job_id)
+            self.assertEqual(
+                (done.status, done.output, done.completion_tokens), ("completed", "tok1 tok2", 2)
+            )
+            self.assertIsNone(store.get("missing"))
+            store.close()
+
+
+class BackgroundSchedulingTests(unittest.IsolatedAsyncioTestCase):
+    async def test_background_job_yields_slot_to_interactive_job_then_finishes(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            store = BackgroundJobStore(str(Path(directory) / "jobs.sqlite"))
+            tier = BackgroundTier(store, poll_seconds=0.01)
+            kv_tracker = KVPressureTracker(kv_budget_bytes=1_000_000)
+            scheduler = ContinuousBatchingScheduler(
+                max_active_sequences=1,
+                queue_capacity=10,
+                decode_step_seconds=0.002,
+                idle_sleep_seconds=0.001,
+                kv_tracker=kv_tracker,
+                telemetry=Telemetry(),
+                kv_bytes_per_token=10,
+                background=tier,
+            )
+            job = await tier.submit(
+                "tenant-bg", "adapter-x", "bulk", prompt_tokens=2, max_new_tokens=40
+            )
+            await scheduler.start()
+            try:
+                while (await tier.get(job.job_id)).status != "running":
+                    await asyncio.sleep(0.005)
+
+                kv_tracker.try_reserve("req-1", bytes_needed=20, shed_threshold=0.99)
+                now = time.monotonic()
+                interactive = InferenceJob(
+                    request_id="req-1",
+                    tenant_id="tenant-a",
+                    adapter_id="adapter-x",
+                    prompt="hello",
+                    prompt_tokens=2,
+                    max_new_tokens=3,
+                    estimated_total_tokens=5,
+                    admitted_at=now,
+                    enqueued_at=now,
+                    future=asyncio.get_running_loop().create_future(),
+                )
+                self.assertTrue(await scheduler.enqueue(interactive))
+                result = await asyncio.wait_for(interactive.future, timeout=1.0)
+                # The only slot was handed over rather than waiting out 40 background tokens.
+                self.assertLess(result.queue_time_seconds, 0.02)
+
+                deadline = time.monotonic() + 2.0
+                while (await tier.get(job.job_id)).status != "completed" and (
+                    time.monotonic() < deadline
+                ):
+                    await asyncio.sleep(0.01)
+            finally:
+                await scheduler.stop()
+            finished = await tier.get(job.job_id)
+            self.assertEqual(finished.status, "completed")
+            self.assertEqual(finished.completion_tokens, 40)
+            self.assertEqual(kv_tracker.active_bytes, 0)
+            await tier.close()
+
+    async def test_waits_off_the_loop_for_a_free_adapter_slot_without_churn(self) -> None:
+        class CountingStore(BackgroundJobStore):
+            claim_threads: list[int] = []
+
+            def claim(self, limit, adapter_ids=None):
+                self.claim_threads.append(threading.get_ident())
+                return super().claim(limit, adapter_ids)
+
+        class RecordingTelemetry(Telemetry):
+            def __init__(self) -> None:
+                super().__init__()
+                self.background: list[str] = []
+
+            def record_background_job(self, result: str) -> None:
+                self.background.append(result)
+
+        with tempfile.TemporaryDirectory() as directory:
+            store = CountingStore(str(Path(directory) / "jobs.sqlite"))
+            telemetry = RecordingTelemetry()
+            tier = BackgroundTier(store, telemetry=telemetry, poll_seconds=0.02)
+            scheduler = ContinuousBatchingScheduler(
+                max_active_sequences=2,
+                queue_capacity=10,
+                decode_step_seconds=0.002,
+                idle_sleep_seconds=0.001,
+                kv_tracker=KVPressureTracker(kv_budget_bytes=1_000_000),
+                telemetry=telemetry,
+                adapter_slots=1,
+                adapter_load_seconds=0.0,
+                background=tier,
+            )
+            now = time.monotonic()
+            interactive = InferenceJob(
+                request_id="req-1",
+                tenant_id="tenant-a",
+                adapter_id="adapter-a",
+                prompt="hello",
+                prompt_tokens=2,
+                max_new_tokens=100,
+                estimated_total_tokens=102,
+                admitted_at=now,
+                enqueued_at=now,
+                future=asyncio.get_running_loop().create_future(),
+            )
+            self.assertTrue(await scheduler.enqueue(interactive))
+            job = await tier.submit("tenant-bg", "adapter-b", "bulk", prompt_tokens=2, max_new_tokens=4)
+            await scheduler.start()
+            try:
+                await asyncio.sleep(0.1)
+                # adapter-a holds the only slot, so adapter-b's job is never claimed.
+                self.assertEqual((await tier.get(job.job_id)).status, "queued")
+                self.assertLessEqual(len(store.claim_threads), 0.1 / 0.02 + 2)
+
+                await asyncio.wait_for(interactive.future, timeout=2.0)
+                deadline = time.monotonic() + 2.0
+                while (await tier.get(job.job_id)).status != "completed" and (
+                    time.monotonic() < deadline
+                ):
+                    await asyncio.sleep(0.01)
+            finally:
+                await scheduler.stop()
+            self.assertEqual((await tier.get(job.job_id)).status, "completed")
+            self.assertNotIn("preempted", telemetry.background)
+            self.assertNotIn(threading.get_ident(), store.claim_threads)
+            await tier.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
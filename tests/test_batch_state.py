@@ -0,0 +1,79 @@
+import unittest
+
+from modelop.batch_state import NumpyBatchState, PythonBatchState, np
+
+
+class BatchStateTests(unittest.TestCase):
+    def _exercise(self, state) -> dict[str, object]:
+        short = state.allocate(max_new_tokens=2)
+        long = state.allocate(max_new_tokens=4)
+        paused = state.allocate(max_new_tokens=1)
+
+        first = state.advance(now=1.0, paused={paused})
+        state.advance(now=1.5)
+        completed_after_two = state.completed_slots()
+        state.advance(now=2.5)
+        state.advance(now=3.0)
+
+        return {
+            "first_token_slots": sorted(first.first_token_slots),
+            "completed_after_two": sorted(completed_after_two),
+            "completed": sorted(state.completed_slots()),
+            "generated": [state.generated_tokens(slot) for slot in (short, long, paused)],
+            "first_token_at": [state.first_token_at(slot) for slot in (short, long, paused)],
+            "avg_tpot": [state.avg_tpot(slot) for slot in (short, long, paused)],
+            "slots": (short, long, paused),
+        }
+
+    def test_python_state_tracks_progress_and_completion(self) -> None:
+        observed = self._exercise(PythonBatchState(capacity=4))
+        short, long, paused = observed["slots"]
+
+        self.assertEqual(observed["first_token_slots"], sorted([short, long]))
+        self.assertEqual(observed["completed_after_two"], sorted([short, paused]))
+        self.assertEqual(observed["completed"], sorted([short, long, paused]))
+        self.assertEqual(observed["generated"], [2, 4, 1])
+        self.assertEqual(observed["first_token_at"], [1.0, 1.0, 1.5])
+        self.assertEqual(observed["avg_tpot"], [0.5, 2.0 / 3.0, 0.0])
+
+    @unittest.skipIf(np is None, "numpy not installed")
+    def test_numpy_state_matches_python_state(self) -> None:
+        self.assertEqual(
+            self._exercise(NumpyBatchState(capacity=4)),
+            self._exercise(PythonBatchState(capacity=4)),
+        )
+
+    def _exercise_steps(self, state) -> tuple[list[int], list[bool], list[float]]:
+        first = state.allocate(max_new_tokens=3)
+        second = state.allocate(max_new_tokens=6)
+        state.advance(now=1.0, steps={first: 2, second: 3})
+        state.advance(now=2.0, steps={first: 4, second: 2})
+        return (
+            [state.generated_tokens(slot) for slot in (first, second)],
+            [state.is_done(slot) for slot in (first, second)],
+            [state.avg_tpot(slot) for slot in (first, second)],
+        )
+
+    def test_multi_token_steps_are_capped_at_the_limit(self) -> None:
+        generated, done, avg_tpot = self._exercise_steps(PythonBatchState(capacity=2))
+
+        self.assertEqual(generated, [3, 5])
+        self.assertEqual(done, [True, False])
+        self.assertEqual(avg_tpot, [0.5, 0.25])
+        if np is not None:
+            self.assertEqual(
+                self._exercise_steps(NumpyBatchState(capacity=2)), (generated, done, avg_tpot)
+            )
+
+    def test_released_slots_are_reused_and_reset(self) -> None:
+        state = PythonBatchState(capacity=1)
+        slot = state.allocate(max_new_tokens=1)
+        state.advance(now=1.0)
+        state.release(slot)
+
+        reused = state.allocate(max_new_tokens=3)
+
+        self.assertEqual(reused, slot)
+        self.assertEqual(len(state), 1)
+        self.assertEqual(state.generated_tokens(reused), 0)
+        self.assertFalse(state.is_done(reused))
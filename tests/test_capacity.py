@@ -0,0 +1,62 @@
+import unittest
+
+from modelop.capacity import PagedKVAllocator
+
+
+class PagedKVAllocatorTests(unittest.TestCase):
+    def test_reserves_whole_blocks_and_reports_fragmentation(self) -> None:
+        allocator = PagedKVAllocator(kv_budget_bytes=10 * 4 * 100, bytes_per_token=100, block_tokens=4)
+
+        self.assertTrue(allocator.try_reserve("req-1", bytes_needed=5 * 100, shed_threshold=1.0))
+
+        self.assertEqual(allocator.total_blocks, 10)
+        self.assertEqual(len(allocator.block_table("req-1")), 2)
+        self.assertEqual(allocator.active_bytes, 2 * 4 * 100)
+        self.assertAlmostEqual(allocator.utilization_ratio, 0.2)
+        self.assertAlmostEqual(allocator.fragmentation_ratio, 3 / 8)
+
+    def test_grow_fills_tail_block_before_allocating(self) -> None:
+        allocator = PagedKVAllocator(kv_budget_bytes=4 * 4, bytes_per_token=1, block_tokens=4)
+        self.assertTrue(allocator.try_reserve("req-1", bytes_needed=3, shed_threshold=1.0))
+
+        self.assertTrue(allocator.try_grow("req-1", bytes_needed=1))
+        self.assertEqual(allocator.used_blocks, 1)
+        self.assertEqual(allocator.fragmentation_ratio, 0.0)
+
+        self.assertTrue(allocator.try_grow("req-1", bytes_needed=1))
+        self.assertEqual(allocator.used_blocks, 2)
+
+        self.assertFalse(allocator.try_grow("req-1", bytes_needed=3 * 4))
+        self.assertFalse(allocator.try_grow("unknown", bytes_needed=1))
+
+    def test_shed_threshold_is_block_granular_and_release_frees_blocks(self) -> None:
+        allocator = PagedKVAllocator(kv_budget_bytes=10 * 4, bytes_per_token=1, block_tokens=4)
+
+        self.assertTrue(allocator.try_reserve("req-1", bytes_needed=17, shed_threshold=0.9))
+        # 5 blocks in use; 4 more would project to 0.9 and be shed.
+        self.assertFalse(allocator.try_reserve("req-2", bytes_needed=13, shed_threshold=0.9))
+        self.assertTrue(allocator.try_reserve("req-2", bytes_needed=12, shed_threshold=0.9))
+
+        allocator.release("req-1")
+        allocator.release("req-1")
+
+        self.assertEqual(allocator.used_blocks, 3)
+        self.assertEqual(allocator.block_table("req-1"), [])
+
+    def test_budget_smaller_than_block_shrinks_block(self) -> None:
+        allocator = PagedKVAllocator(kv_budget_bytes=10_000, bytes_per_token=1_000, block_tokens=16)
+
+        self.assertEqual(allocator.block_tokens, 10)
+        self.assertEqual(allocator.total_blocks, 1)
+
+    def test_reserve_many_is_all_or_nothing(self) -> None:
+        allocator = PagedKVAllocator(kv_budget_bytes=10 * 4, bytes_per_token=1, block_tokens=4)
+
+        # 3 + 3 + 3 blocks would project to 0.9 and be shed as a whole.
+        batch = [("req-1", 12), ("req-2", 9), ("req-3", 10)]
+        self.assertFalse(allocator.try_reserve_many(batch, shed_threshold=0.9))
+        self.assertEqual(allocator.used_blocks, 0)
+
+        self.assertTrue(allocator.try_reserve_many(batch[:2], shed_threshold=0.9))
+        self.assertEqual(allocator.used_blocks, 6)
+        self.assertEqual(len(allocator.block_table("req-2")), 3)
@@ -1,6 +1,7 @@
 import unittest
 
 from modelop.context_window import ContextWindowOptimizer
+from modelop.tokenization import BPETokenizer
 
 
 class ContextWindowOptimizerTests(unittest.TestCase):
@@ -23,3 +24,15 @@ class ContextWindowOptimizerTests(unittest.TestCase):
         self.assertTrue(result.prompt_truncated)
         self.assertLessEqual(result.effective_prompt_tokens, 20)
         self.assertIn("[...context truncated...]", result.prompt)
+
+    def test_truncates_to_budget_measured_by_tokenizer(self) -> None:
+        tokenizer = BPETokenizer.train(["plain english words " * 50], vocab_size=300)
+        optimizer = ContextWindowOptimizer()
+        # English compresses well, CJK stays at ~3 byte tokens per character.
+        prompt = "plain english words " * 40 + "東京の天気" * 40
+
+        result = optimizer.optimize(prompt=prompt, max_prompt_tokens=60, tokenizer=tokenizer)
+
+        self.assertTrue(result.prompt_truncated)
+        self.assertEqual(result.effective_prompt_tokens, tokenizer.count(result.prompt))
+        self.assertLessEqual(result.effective_prompt_tokens, 60)
@@ -0,0 +1,147 @@
+import asyncio
+import unittest
+
+from modelop.config import GatewayConfig, TenantPolicy
+from modelop.distributed_rate_limit import (
+    InProcessLeaseCoordinator,
+    LeaseCoordinatorServer,
+    LeaseGrant,
+    LeaseRequest,
+    LeasedTokenRateLimiter,
+    TcpLeaseCoordinator,
+)
+
+_CONFIG = GatewayConfig(
+    tenant_policies={
+        "tenant-a": TenantPolicy(
+            rate_tokens_per_sec=0.0, burst_tokens=1000.0, default_adapter_id="adapter-x"
+        )
+    }
+)
+
+
+class LeasedTokenRateLimiterTests(unittest.IsolatedAsyncioTestCase):
+    async def test_replicas_hold_global_limit_within_overdraft(self) -> None:
+        coordinator = InProcessLeaseCoordinator()
+        nodes = [
+            LeasedTokenRateLimiter(
+                config=_CONFIG,
+                coordinator=coordinator,
+                node_id=f"node-{index}",
+                overdraft_fraction=0.05,
+            )
+            for index in range(3)
+        ]
+
+        admitted = 0
+        for _ in range(40):
+            for node in nodes:
+                admitted += 10 * sum(node.try_consume("tenant-a", amount=10) for _ in range(10))
+            for node in nodes:
+                await node.renew()
+
+        # Global burst is 1000; each replica may overdraw 5% (50 tokens) before settling.
+        self.assertLessEqual(admitted, 1000 + 3 * 50)
+        self.assertGreaterEqual(admitted, 900)
+
+    async def test_tcp_coordinator_renews_and_outage_keeps_local_lease(self) -> None:
+        server = LeaseCoordinatorServer()
+        await server.start()
+        node = LeasedTokenRateLimiter(
+            config=_CONFIG,
+            coordinator=TcpLeaseCoordinator(host="127.0.0.1", port=server.port),
+            node_id="node-tcp",
+            lease_fraction=0.25,
+        )
+        try:
+            self.assertTrue(node.try_consume("tenant-a", amount=40))  # overdraft, no lease yet
+            self.assertFalse(node.try_consume("tenant-a", amount=40))
+            await node.renew()
+            # Settled the 40-token overdraft and leased 2x recent demand (160).
+            self.assertTrue(node.try_consume("tenant-a", amount=100))
+
+            await server.stop()
+            with self.assertRaises(OSError):
+                await node.renew()
+            self.assertTrue(node.try_consume("tenant-a", amount=60))
+            self.assertFalse(node.try_consume("tenant-a", amount=60))
+        finally:
+            await node.stop()
+            await server.stop()
+
+    async def test_retried_renewal_is_settled_only_once(self) -> None:
+        class LostReplyCoordinator(InProcessLeaseCoordinator):
+            lose_replies = 0
+
+            async def renew(
+                self, node_id: str, requests: dict[str, LeaseRequest], seq: int
+            ) -> dict[str, LeaseGrant]:
+                granted = await super().renew(node_id, requests, seq)
+                if self.lose_replies:
+                    self.lose_replies -= 1
+                    raise asyncio.TimeoutError
+                return granted
+
+        coordinator = LostReplyCoordinator()
+        node = LeasedTokenRateLimiter(
+            config=_CONFIG, coordinator=coordinator, node_id="node-0", overdraft_fraction=0.05
+        )
+        admitted = 0
+        for _ in range(40):
+            admitted += 10 * sum(node.try_consume("tenant-a", amount=10) for _ in range(10))
+            # The coordinator applies every renewal but the first reply of each pair is lost.
+            coordinator.lose_replies = 1
+            with self.assertRaises(asyncio.TimeoutError):
+                await node.renew()
+            await node.renew()
+
+        # Settling a retried renewal again would refund its balance a second time.
+        self.assertLessEqual(admitted, 1000 + 50)
+        self.assertGreaterEqual(admitted, 900)
+
+    async def test_requests_larger_than_a_routine_lease_are_admitted(self) -> None:
+        config = GatewayConfig(
+            tenant_policies={
+                "tenant-b": TenantPolicy(
+                    rate_tokens_per_sec=2500.0, burst_tokens=5000.0, default_adapter_id="adapter-x"
+                )
+            }
+        )
+        node = LeasedTokenRateLimiter(
+            config=config, coordinator=InProcessLeaseCoordinator(), node_id="node-0"
+        )
+
+        # 1600 tokens is above both the overdraft (250) and a routine lease (1250).
+        self.assertFalse(node.try_consume("tenant-b", amount=1600))
+        for _ in range(3):
+            await node.renew()
+            self.assertTrue(node.try_consume("tenant-b", amount=1600))
+
+    async def test_renewal_loop_survives_malformed_replies(self) -> None:
+        class FlakyCoordinator(InProcessLeaseCoordinator):
+            calls = 0
+
+            async def renew(
+                self, node_id: str, requests: dict[str, LeaseRequest], seq: int
+            ) -> dict[str, LeaseGrant]:
+                self.calls += 1
+                if self.calls == 1:
+                    raise KeyError("granted")
+                return await super().renew(node_id, requests, seq)
+
+        coordinator = FlakyCoordinator()
+        node = LeasedTokenRateLimiter(
+            config=_CONFIG, coordinator=coordinator, node_id="node-0", renew_interval_seconds=0.01
+        )
+        node.try_consume("tenant-a", amount=10)
+        await node.start()
+        try:
+            with self.assertLogs("modelop.distributed_rate_limit", level="ERROR"):
+                await asyncio.sleep(0.1)
+            self.assertGreater(coordinator.calls, 2)
+        finally:
+            await node.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,17 @@
+import json
+import tempfile
 import unittest
 import threading
 import time
+import uuid
+from pathlib import Path
 
 from fastapi.testclient import TestClient
 
 from modelop.config import GatewayConfig, TenantPolicy
 from modelop.gateway import create_app
+from modelop.tokenization import BPETokenizer
+from modelop.traffic_log import prompt_hash, read_traffic_log
 
 
 class GatewayAdmissionTests(unittest.TestCase):
@@ -157,3 +163,326 @@ class GatewayAdmissionTests(unittest.TestCase):
         self.assertEqual(first_status[0], 200)
         self.assertEqual(second.status_code, 409)
         self.assertIn("already in flight", second.json()["detail"])
+
+    def test_streams_tokens_then_usage_frame(self) -> None:
+        app = create_app(
+            GatewayConfig(
+                scheduler_decode_step_seconds=0.001,
+                stream_channel_capacity=2,
+                tenant_policies={
+                    "tenant-s": TenantPolicy(
+                        rate_tokens_per_sec=10_000.0,
+                        burst_tokens=10_000.0,
+                        default_adapter_id="adapter-s",
+                    )
+                },
+            )
+        )
+        payload = {
+            "tenant_id": "tenant-s",
+            "prompt": "hello world",
+            "max_new_tokens": 6,
+        }
+
+        with TestClient(app) as client:
+            with client.stream("POST", "/v1/generate/stream", json=payload) as response:
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.headers["content-type"].startswith("text/event-stream"))
+                frames = [frame for frame in response.read().decode().split("\n\n") if frame]
+
+        token_frames = [json.loads(frame.removeprefix("data: ")) for frame in frames[:-1]]
+        self.assertEqual([frame["token"] for frame in token_frames], [f"tok{i}" for i in range(1, 7)])
+        self.assertEqual([frame["index"] for frame in token_frames], list(range(1, 7)))
+
+        event_line, data_line = frames[-1].split("\n")
+        self.assertEqual(event_line, "event: done")
+        usage = json.loads(data_line.removeprefix("data: "))
+        self.assertEqual(usage["completion_tokens"], 6)
+        self.assertNotIn("output", usage)
+        self.assertLessEqual(usage["ttft_seconds"], usage["total_time_seconds"])
+
+    def test_reports_prefix_cache_hits_for_shared_prompt_prefix(self) -> None:
+        app = create_app(
+            GatewayConfig(
+                scheduler_decode_step_seconds=0.001,
+                tenant_policies={
+                    "tenant-p": TenantPolicy(
+                        rate_tokens_per_sec=10_000.0,
+                        burst_tokens=10_000.0,
+                        default_adapter_id="adapter-p",
+                    )
+                },
+            )
+        )
+        system_prompt = "You are a careful analyst. " * 10  # 270 chars -> 4 cached 64-char blocks
+
+        with TestClient(app) as client:
+            first = client.post(
+                "/v1/generate",
+                json={"tenant_id": "tenant-p", "prompt": system_prompt + "Q1", "max_new_tokens": 2},
+            )
+            second = client.post(
+                "/v1/generate",
+                json={"tenant_id": "tenant-p", "prompt": system_prompt + "Q2", "max_new_tokens": 2},
+            )
+
+        self.assertEqual(first.json()["cached_prompt_tokens"], 0)
+        self.assertEqual(second.json()["cached_prompt_tokens"], 64)
+
+    def test_prefix_cache_with_bpe_tokenizer_reuses_prompt_blocks(self) -> None:
+        prompt = "hello world " * 200  # 401 BPE tokens, 600 by chars / 4
+        with tempfile.TemporaryDirectory() as directory:
+            merges = Path(directory) / "merges.txt"
+            BPETokenizer.train([prompt], vocab_size=300).save(merges)
+            app = create_app(
+                GatewayConfig(
+                    scheduler_decode_step_seconds=0.001,
+                    default_tokenizer=f"bpe:{merges}",
+                )
+            )
+            payload = {"tenant_id": "tenant-a", "prompt": prompt, "max_new_tokens": 2}
+            with TestClient(app) as client:
+                first = client.post("/v1/generate", json=payload)
+                second = client.post("/v1/generate", json=payload)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 200)
+        prompt_tokens = first.json()["effective_prompt_tokens"]
+        self.assertLess(prompt_tokens, len(prompt) // 4)
+        self.assertEqual(second.json()["cached_prompt_tokens"], (prompt_tokens - 1) // 16 * 16)
+
+    def test_workers_sharing_state_enforce_one_rate_limit(self) -> None:
+        config = GatewayConfig(
+            scheduler_decode_step_seconds=0.001,
+            shared_state_name=f"modelop-test-{uuid.uuid4().hex[:12]}",
+            shared_state_tenant_capacity=1,
+            tenant_policies={
+                "tenant-s": TenantPolicy(
+                    rate_tokens_per_sec=0.0,
+                    burst_tokens=30.0,
+                    default_adapter_id="adapter-s",
+                )
+            },
+        )
+        payload = {"tenant_id": "tenant-s", "prompt": "x" * 40, "max_new_tokens": 10}
+
+        with TestClient(create_app(config)) as first, TestClient(create_app(config)) as second:
+            accepted = first.post("/v1/generate", json=payload)
+            limited = second.post("/v1/generate", json=payload)
+            # tenant-s holds the only bucket slot and never refills, so it is never evicted.
+            unavailable = second.post("/v1/generate", json={**payload, "tenant_id": "tenant-t"})
+            services = first.app.state.services
+            services.shared_state.unlink()
+
+        self.assertEqual(accepted.status_code, 200)
+        self.assertEqual(limited.status_code, 429)
+        self.assertEqual(limited.json()["detail"], "rate limit exceeded")
+        self.assertEqual(unavailable.status_code, 503)
+        self.assertEqual(unavailable.headers["retry-after"], "1")
+
+    def test_coalesces_identical_requests_and_serves_cached_response(self) -> None:
+        # Burst covers one request (15 prompt + 10 new tokens), so repeats only
+        # succeed if they skip rate limiting by sharing the first generation.
+        policy = TenantPolicy(
+            rate_tokens_per_sec=0.0,
+            burst_tokens=30.0,
+            default_adapter_id="adapter-c",
+            coalesce_identical_requests=True,
+        )
+        app = create_app(
+            GatewayConfig(
+                scheduler_decode_step_seconds=0.02,
+                tenant_policies={"tenant-c": policy, "tenant-d": policy},
+            )
+        )
+        payload = {"tenant_id": "tenant-c", "prompt": "hello world " * 5, "max_new_tokens": 10}
+
+        with TestClient(app) as client:
+            concurrent: list[dict] = []
+
+            def send() -> None:
+                concurrent.append(client.post("/v1/generate", json=payload).json())
+
+            threads = [threading.Thread(target=send) for _ in range(3)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            cached = client.post("/v1/generate", json=payload)
+            other_tenant = client.post("/v1/generate", json={**payload, "tenant_id": "tenant-d"})
+            metrics = client.get("/metrics").text
+
+        self.assertEqual(sorted(response["cache_hit"] for response in concurrent), [False, True, True])
+        self.assertEqual({response["output"] for response in concurrent}, {concurrent[0]["output"]})
+        self.assertEqual(len({response["request_id"] for response in concurrent}), 3)
+        self.assertEqual(cached.status_code, 200)
+        self.assertTrue(cached.json()["cache_hit"])
+        self.assertEqual(other_tenant.status_code, 200)
+        self.assertFalse(other_tenant.json()["cache_hit"])
+        if "response_cache_requests_total" in metrics:
+            self.assertIn(
+                'response_cache_requests_total{result="coalesced",tenant_id="tenant-c"} 2.0',
+                metrics,
+            )
+
+    def test_batch_admits_items_together_and_streams_ndjson(self) -> None:
+        app = create_app(
+            GatewayConfig(
+                max_request_tokens=64,
+                scheduler_decode_step_seconds=0.001,
+                tenant_policies={
+                    "tenant-b": TenantPolicy(
+                        rate_tokens_per_sec=0.0,
+                        burst_tokens=25.0,
+                        default_adapter_id="adapter-b",
+                    )
+                },
+            )
+        )
+        items = [
+            {"prompt": "first prompt", "max_new_tokens": 3},
+            {"prompt": "second", "max_new_tokens": 64},
+            {"prompt": "third prompt", "max_new_tokens": 2, "request_id": "batch-own-id"},
+        ]
+
+        with TestClient(app) as client:
+            response = client.post(
+                "/v1/generate/batch", json={"tenant_id": "tenant-b", "items": items}
+            )
+            with client.stream(
+                "POST",
+                "/v1/generate/batch",
+                json={"tenant_id": "tenant-b", "items": [items[0]], "stream": True},
+            ) as streamed:
+                content_type = streamed.headers["content-type"]
+                lines = [json.loads(line) for line in streamed.iter_lines() if line]
+            # The batches drew 6 + 5 and 6 of the 25-token burst; 11 more is too many.
+            limited = client.post(
+                "/v1/generate/batch",
+                json={"tenant_id": "tenant-b", "items": [items[0], items[2]]},
+            )
+            # 5 * 6 tokens can never fit the 25-token burst, however long the client waits.
+            oversized = client.post(
+                "/v1/generate/batch", json={"tenant_id": "tenant-b", "items": [items[0]] * 5}
+            )
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual([result["status"] for result in results], [200, 400, 200])
+        self.assertEqual(results[0]["response"]["completion_tokens"], 3)
+        self.assertEqual(results[2]["response"]["request_id"], "batch-own-id")
+        self.assertNotEqual(
+            results[0]["response"]["request_id"], results[2]["response"]["request_id"]
+        )
+
+        self.assertTrue(content_type.startswith("application/x-ndjson"))
+        self.assertEqual([(line["index"], line["status"]) for line in lines], [(0, 200)])
+        self.assertEqual(limited.status_code, 429)
+        self.assertEqual(oversized.status_code, 400)
+        self.assertIn("burst_tokens=25", oversized.json()["detail"])
+        self.assertEqual(oversized.status_code, 400)
+        self.assertIn("burst_tokens=25", oversized.json()["detail"])
+
+    def test_background_jobs_are_submitted_and_fetched_by_id(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            app = create_app(
+                GatewayConfig(
+                    scheduler_decode_step_seconds=0.001,
+                    background_queue_path=str(Path(directory) / "jobs.sqlite"),
+                )
+            )
+            with TestClient(app) as client:
+                submitted = client.post(
+                    "/v1/jobs", json={"tenant_id": "tenant-a", "prompt": "bulk", "max_new_tokens": 3}
+                )
+                job_id = submitted.json()["job_id"]
+                deadline = time.monotonic() + 2.0
+                while time.monotonic() < deadline:
+                    job = client.get(f"/v1/jobs/{job_id}").json()
+                    if job["status"] == "completed":
+                        break
+                    time.sleep(0.01)
+                missing = client.get("/v1/jobs/unknown")
+
+        self.assertEqual(submitted.status_code, 202)
+        self.assertEqual(submitted.json()["status"], "queued")
+        self.assertEqual(job["status"], "completed")
+        self.assertEqual(job["completion_tokens"], 3)
+        self.assertEqual(job["output"], "tok1 tok2 tok3")
+        self.assertEqual(missing.status_code, 404)
+
+    def test_records_request_shapes_and_outcomes_to_traffic_log(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            app = create_app(
+                GatewayConfig(
+                    max_request_tokens=64,
+                    enable_prompt_truncation=False,
+                    scheduler_decode_step_seconds=0.001,
+                    traffic_log_dir=directory,
+                )
+            )
+            with TestClient(app) as client:
+                ok = client.post(
+                    "/v1/generate",
+                    json={"tenant_id": "tenant-a", "prompt": "x" * 40, "max_new_tokens": 3},
+                )
+                too_long = client.post(
+                    "/v1/generate",
+                    json={"tenant_id": "tenant-b", "prompt": "y" * 400, "max_new_tokens": 3},
+                )
+                # Rejected before the prompt is tokenized, so no count is recorded.
+                no_room = client.post(
+                    "/v1/generate",
+                    json={"tenant_id": "tenant-b", "prompt": "y" * 400, "max_new_tokens": 64},
+                )
+            records = read_traffic_log(directory)
+
+        self.assertEqual(ok.status_code, 200)
+        self.assertEqual(too_long.status_code, 400)
+        self.assertEqual(no_room.status_code, 400)
+        self.assertEqual(
+            [(r.tenant_id, r.adapter_id, r.prompt_tokens, r.status) for r in records],
+            [
+                ("tenant-a", "adapter-analytics-v1", 10, 200),
+                ("tenant-b", "adapter-chat-v1", 100, 400),
+                ("tenant-b", "adapter-chat-v1", 0, 400),
+            ],
+        )
+        self.assertEqual(records[0].completion_tokens, 3)
+        self.assertEqual(records[0].prompt_hash, prompt_hash("x" * 40))
+        self.assertGreater(records[0].ttft_seconds, 0.0)
+
+    def test_rejects_requests_predicted_to_miss_ttft_slo(self) -> None:
+        app = create_app(
+            GatewayConfig(
+                scheduler_decode_step_seconds=0.02,
+                scheduler_max_active_sequences=1,
+                tenant_policies={
+                    "tenant-slo": TenantPolicy(
+                        rate_tokens_per_sec=10_000.0,
+                        burst_tokens=10_000.0,
+                        default_adapter_id="adapter-slo",
+                        ttft_slo_seconds=0.3,
+                    )
+                },
+            )
+        )
+        payload = {"tenant_id": "tenant-slo", "prompt": "hello world", "max_new_tokens": 40}
+
+        with TestClient(app) as client:
+            first_status: list[int] = []
+            first = threading.Thread(
+                target=lambda: first_status.append(
+                    client.post("/v1/generate", json=payload).status_code
+                )
+            )
+            first.start()
+            time.sleep(0.1)
+            # The only slot is busy for ~35 more ticks (~0.7s), beyond the 0.3s SLO.
+            rejected = client.post("/v1/generate", json={**payload, "max_new_tokens": 2})
+            first.join()
+
+        self.assertEqual(first_status, [200])
+        self.assertEqual(rejected.status_code, 429)
+        self.assertIn("SLO", rejected.json()["detail"])
+        self.assertGreaterEqual(int(rejected.headers["Retry-After"]), 1)
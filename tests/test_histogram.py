@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import math
+import random
+import unittest
+
+from modelop.histogram import LogHistogram
+
+
+class LogHistogramTests(unittest.TestCase):
+    def test_percentiles_are_within_precision(self) -> None:
+        rng = random.Random(7)
+        values = [rng.lognormvariate(-3, 1.5) for _ in range(20_000)]
+        histogram = LogHistogram(precision=0.01)
+        for value in values:
+            histogram.record(value)
+
+        ordered = sorted(values)
+        for percent in (50, 90, 99, 99.9):
+            exact = ordered[math.ceil(percent / 100 * len(ordered)) - 1]
+            self.assertLessEqual(abs(histogram.percentile(percent) - exact) / exact, 0.01)
+        self.assertEqual(histogram.percentile(100), max(values))
+        self.assertAlmostEqual(histogram.mean, sum(values) / len(values))
+
+    def test_merge_matches_single_histogram(self) -> None:
+        combined = LogHistogram()
+        left = LogHistogram()
+        right = LogHistogram()
+        for index in range(1, 1001):
+            value = index / 1000
+            combined.record(value)
+            (left if index % 2 else right).record(value)
+
+        left.merge(right)
+        self.assertEqual(left.count, combined.count)
+        self.assertEqual(left.min, combined.min)
+        self.assertEqual(left.max, combined.max)
+        for percent in (50, 99, 99.9):
+            self.assertEqual(left.percentile(percent), combined.percentile(percent))
+
+    def test_empty_and_mismatched_layouts(self) -> None:
+        histogram = LogHistogram()
+        self.assertEqual(histogram.percentile(99), 0.0)
+        self.assertEqual(histogram.mean, 0.0)
+        with self.assertRaises(ValueError):
+            histogram.merge(LogHistogram(precision=0.05))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+
+from modelop.capacity import PagedKVAllocator
+from modelop.prefix_cache import PrefixCache
+
+
+def _cache(total_blocks: int) -> tuple[PagedKVAllocator, PrefixCache]:
+    # 4 tokens per block at 4 chars/token -> 16-char chunks.
+    allocator = PagedKVAllocator(kv_budget_bytes=total_blocks * 4, bytes_per_token=1, block_tokens=4)
+    return allocator, PrefixCache(allocator=allocator)
+
+
+class PrefixCacheTests(unittest.TestCase):
+    def test_shared_prefix_reserves_only_uncached_suffix(self) -> None:
+        allocator, cache = _cache(total_blocks=32)
+        system = "S" * 48  # three full chunks
+
+        first = cache.try_reserve("req-1", "tenant-a", "adapter", system + "first?", 20, 1.0)
+        used_after_first = allocator.used_blocks
+        second = cache.try_reserve("req-2", "tenant-a", "adapter", system + "other!", 20, 1.0)
+
+        self.assertEqual(first, 0)
+        self.assertEqual(second, 12)
+        self.assertEqual(allocator.block_table("req-2")[:3], allocator.block_table("req-1")[:3])
+        self.assertEqual(allocator.used_blocks - used_after_first, 2)  # 8 uncached tokens
+
+    def test_cached_blocks_survive_release_and_are_evicted_lru(self) -> None:
+        allocator, cache = _cache(total_blocks=8)
+        cache.try_reserve("old", "tenant-a", "adapter", "A" * 33, 12, 1.0)
+        cache.try_reserve("new", "tenant-a", "adapter", "B" * 33, 12, 1.0)
+        allocator.release("old")
+        allocator.release("new")
+
+        self.assertEqual(cache.cached_blocks, 4)
+        self.assertEqual(allocator.used_blocks, 4)
+        self.assertEqual(allocator.utilization_ratio, 0.0)
+
+        # Needs 6 blocks with 4 free: the two "old" blocks are reclaimed first.
+        self.assertEqual(cache.try_reserve("big", "tenant-a", "adapter", "C", 24, 1.0), 0)
+        self.assertEqual(cache.cached_blocks, 2)
+        self.assertEqual(cache.try_reserve("hit", "tenant-a", "adapter", "B" * 33, 12, 1.0), None)
+        allocator.release("big")
+        self.assertEqual(cache.try_reserve("hit", "tenant-a", "adapter", "B" * 33, 12, 1.0), 8)
+
+    def test_dense_tokenizer_caches_only_the_blocks_its_count_fills(self) -> None:
+        allocator, cache = _cache(total_blocks=32)
+        # 64 characters is four 16-char chunks, but this tokenizer counted 6 tokens.
+        cached = cache.try_reserve("req-1", "tenant-a", "adapter", "S" * 64, 6, 1.0, prompt_tokens=6)
+
+        self.assertEqual(cached, 0)
+        self.assertEqual(len(allocator.block_table("req-1")), 2)
+        self.assertEqual(cache.cached_blocks, 1)
+        self.assertEqual(
+            cache.try_reserve("req-2", "tenant-a", "adapter", "S" * 64, 6, 1.0, prompt_tokens=6), 4
+        )
+
+    def test_pinned_prefix_is_not_evicted(self) -> None:
+        allocator, cache = _cache(total_blocks=4)
+        cache.try_reserve("live", "tenant-a", "adapter", "A" * 33, 12, 1.0)
+
+        self.assertIsNone(cache.try_reserve("big", "tenant-a", "adapter", "C", 8, 1.0))
+        self.assertEqual(cache.cached_blocks, 2)
+
+    def test_prefixes_are_isolated_per_tenant_and_adapter(self) -> None:
+        _, cache = _cache(total_blocks=32)
+        prompt = "S" * 40
+        cache.try_reserve("req-1", "tenant-a", "adapter", prompt, 10, 1.0)
+
+        self.assertEqual(cache.try_reserve("req-2", "tenant-b", "adapter", prompt, 10, 1.0), 0)
+        self.assertEqual(cache.try_reserve("req-3", "tenant-a", "other", prompt, 10, 1.0), 0)
+        self.assertEqual(cache.try_reserve("req-4", "tenant-a", "adapter", prompt, 10, 1.0), 8)
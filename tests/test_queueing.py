@@ -0,0 +1,154 @@
+import asyncio
+import time
+import unittest
+
+from modelop.queueing import EarliestDeadlineJobQueue, FifoJobQueue, WeightedFairJobQueue
+from modelop.scheduler import InferenceJob
+
+_LOOP = asyncio.new_event_loop()
+
+
+def _job(tenant_id: str, tokens: int, index: int = 0) -> InferenceJob:
+    return InferenceJob(
+        request_id=f"{tenant_id}-{index}",
+        tenant_id=tenant_id,
+        adapter_id="adapter-x",
+        prompt="",
+        prompt_tokens=tokens,
+        max_new_tokens=1,
+        estimated_total_tokens=tokens,
+        admitted_at=0.0,
+        enqueued_at=0.0,
+        future=_LOOP.create_future(),
+    )
+
+
+def _drain(queue) -> list[str]:
+    order = []
+    while (job := queue.pop()) is not None:
+        order.append(job.tenant_id)
+    return order
+
+
+class JobQueueTests(unittest.TestCase):
+    def test_fifo_respects_capacity_and_order(self) -> None:
+        queue = FifoJobQueue(capacity=2)
+
+        self.assertTrue(queue.push(_job("a", 1)))
+        self.assertTrue(queue.push(_job("b", 1)))
+        self.assertFalse(queue.push(_job("c", 1)))
+        self.assertEqual(_drain(queue), ["a", "b"])
+
+    def test_short_jobs_are_not_stuck_behind_long_prompts(self) -> None:
+        queue = WeightedFairJobQueue(capacity=100, weight_for=lambda _tenant: 1.0)
+        for index in range(5):
+            queue.push(_job("tenant-a", 3000, index))
+        for index in range(10):
+            queue.push(_job("tenant-b", 150, index))
+
+        order = _drain(queue)
+
+        # One 3000-token job buys tenant-b all ten 150-token jobs.
+        self.assertEqual(order[:11].count("tenant-b"), 10)
+        self.assertEqual(len(order), 15)
+
+    def test_weights_split_service_by_tokens(self) -> None:
+        weights = {"gold": 3.0, "bronze": 1.0}
+        queue = WeightedFairJobQueue(capacity=100, weight_for=weights.__getitem__)
+        for index in range(40):
+            queue.push(_job("gold", 100, index))
+            queue.push(_job("bronze", 100, index))
+
+        first_forty = _drain(queue)[:40]
+
+        self.assertEqual(first_forty.count("gold"), 30)
+        self.assertEqual(first_forty.count("bronze"), 10)
+
+    def test_peek_matches_pop_order_and_take_charges_only_taken_jobs(self) -> None:
+        weights = {"gold": 3.0, "bronze": 1.0}
+        queue = WeightedFairJobQueue(capacity=100, weight_for=weights.__getitem__)
+        for index in range(8):
+            queue.push(_job("gold", 100, index))
+            queue.push(_job("bronze", 100, index))
+
+        peeked = queue.peek(8)
+        self.assertEqual(queue.peek(8), peeked)
+        self.assertEqual(len(queue), 16)
+
+        # Taking bronze out of turn charges bronze alone; gold keeps its place.
+        bronze = next(job for job in peeked if job.tenant_id == "bronze")
+        queue.take(bronze)
+        expected = [job.request_id for job in queue.peek(15)]
+        order = []
+        while (job := queue.pop()) is not None:
+            order.append(job.request_id)
+        self.assertEqual(order, expected)
+        self.assertNotIn(bronze.request_id, order)
+        self.assertEqual(order[:3], ["gold-0", "gold-1", "gold-2"])
+
+    def test_thousands_of_light_tenants_each_wait_one_heavy_job(self) -> None:
+        queue = WeightedFairJobQueue(capacity=10_000, weight_for=lambda _tenant: 1.0)
+        for index in range(50):
+            queue.push(_job("heavy", 2800, index))
+        for tenant in range(2000):
+            queue.push(_job(f"light-{tenant}", 100))
+
+        order = _drain(queue)
+
+        self.assertEqual(order.index("heavy"), 0)
+        self.assertNotIn("heavy", order[1:2001])
+        self.assertEqual(len(queue), 0)
+        self.assertEqual(queue.backlogged_tenants, 0)
+
+
+class EarliestDeadlineJobQueueTests(unittest.TestCase):
+    def test_orders_by_deadline_then_priority_and_skips_discarded(self) -> None:
+        queue = EarliestDeadlineJobQueue(capacity=4, default_deadline_seconds=10.0)
+        batch = _job("batch", 100)  # no deadline: ordered as due at 0 + 10s
+        urgent = _job("urgent", 5)
+        urgent.deadline_at = 0.2
+        relaxed = _job("relaxed", 5)
+        relaxed.deadline_at = 2.0
+        important = _job("important", 5)
+        important.deadline_at = 2.0
+        important.priority = 5
+        for job in (batch, relaxed, important, urgent):
+            self.assertTrue(queue.push(job))
+        self.assertFalse(queue.push(_job("overflow", 1)))
+
+        self.assertTrue(queue.discard(relaxed))
+        self.assertFalse(queue.discard(relaxed))
+        self.assertEqual(len(queue), 3)
+        self.assertEqual(queue.queued_tokens, 110)
+        self.assertEqual(_drain(queue), ["urgent", "important", "batch"])
+        self.assertEqual(queue.queued_tokens, 0)
+
+    def test_discards_compact_the_heap(self) -> None:
+        queue = EarliestDeadlineJobQueue(capacity=10_000)
+        jobs = [_job("t", 1, index) for index in range(1_000)]
+        for job in jobs:
+            queue.push(job)
+        for job in jobs[:-1]:
+            queue.discard(job)
+
+        self.assertLess(len(queue._heap), 100)
+        self.assertEqual(_drain(queue), ["t"])
+
+    def test_peek_touches_only_the_head_of_a_long_queue(self) -> None:
+        queue = EarliestDeadlineJobQueue(capacity=100_000)
+        jobs = [_job("t", 1, index) for index in range(50_000)]
+        for index, job in enumerate(jobs):
+            job.deadline_at = float(index)
+            queue.push(job)
+        for job in jobs[:10]:
+            queue.discard(job)
+
+        started = time.perf_counter()
+        for _ in range(2_000):
+            peeked = queue.peek(16)
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(peeked, jobs[10:26])
+        self.assertEqual(queue.pop(), jobs[10])
+        # A full scan per peek would take seconds here.
+        self.assertLess(elapsed, 1.0)
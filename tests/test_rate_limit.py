@@ -1,7 +1,8 @@
+import tracemalloc
 import unittest
 
 from modelop.config import GatewayConfig, TenantPolicy
-from modelop.rate_limit import TokenRateLimiter
+from modelop.rate_limit import AdaptiveRateController, TokenRateLimiter
 
 
 class TokenRateLimiterTests(unittest.TestCase):
@@ -25,3 +26,106 @@ class TokenRateLimiterTests(unittest.TestCase):
 
         limiter.refund("tenant-x", amount=25)
         self.assertTrue(limiter.try_consume("tenant-x", amount=25, now=0.5))
+
+    def test_adaptive_rates_back_off_multiplicatively_down_to_weighted_floors(self) -> None:
+        config = GatewayConfig(
+            tenant_policies={
+                "light": TenantPolicy(
+                    rate_tokens_per_sec=1000.0, burst_tokens=100.0, default_adapter_id="adapter-x"
+                ),
+                "heavy": TenantPolicy(
+                    rate_tokens_per_sec=1000.0,
+                    burst_tokens=100.0,
+                    default_adapter_id="adapter-x",
+                    weight=3.0,
+                ),
+            },
+            default_tenant_policy=TenantPolicy(
+                rate_tokens_per_sec=1000.0, burst_tokens=100.0, default_adapter_id="adapter-x"
+            ),
+            rate_limit_adaptive_decrease_factor=0.5,
+            rate_limit_adaptive_increase_step=0.1,
+            rate_limit_adaptive_floor_fraction=0.1,
+        )
+        controller = AdaptiveRateController(config)
+        limiter = TokenRateLimiter(config=config, rate_controller=controller)
+
+        self.assertEqual(controller.update(kv_utilization=0.9, queue_fill=0.0), 0.5)
+        self.assertEqual(controller.update(kv_utilization=0.0, queue_fill=0.6), 0.25)
+        # Between the watermarks the scale holds.
+        self.assertEqual(controller.update(kv_utilization=0.7, queue_fill=0.0), 0.25)
+        self.assertEqual(controller.rate_for("light"), 250.0)
+        for _ in range(20):
+            controller.update(kv_utilization=1.0, queue_fill=1.0)
+        # 10% of the combined 3000 tokens/s, split 1:3:1 by weight.
+        self.assertEqual(controller.rate_for("light"), 60.0)
+        self.assertEqual(controller.rate_for("heavy"), 180.0)
+        self.assertEqual(controller.rate_for("unconfigured"), 60.0)
+
+        self.assertTrue(limiter.try_consume("heavy", amount=100, now=0.0))
+        self.assertFalse(limiter.try_consume("heavy", amount=90, now=0.25))
+        self.assertTrue(limiter.try_consume("heavy", amount=45, now=0.25))
+
+        controller.update(kv_utilization=0.5, queue_fill=0.05)
+        self.assertAlmostEqual(controller.scale, 0.11)
+        self.assertAlmostEqual(controller.rate_for("light"), 110.0)
+
+    def test_idle_buckets_are_evicted_without_changing_decisions(self) -> None:
+        config = GatewayConfig(
+            tenant_policies={},
+            default_tenant_policy=TenantPolicy(
+                rate_tokens_per_sec=10.0, burst_tokens=100.0, default_adapter_id="adapter-x"
+            ),
+        )
+        limiter = TokenRateLimiter(config=config)
+
+        self.assertTrue(limiter.try_consume("drained", amount=100, now=0.0))
+        for index in range(50):
+            limiter.try_consume(f"idle-{index}", amount=1, now=0.0)
+        # Full again by t=5, but used too recently to count as idle.
+        limiter.try_consume("active", amount=1, now=4.9)
+        # By t=5 the idle buckets have refilled and are dropped as new tenants
+        # arrive; the drained one is still 50 tokens short, so it is kept.
+        for index in range(50):
+            limiter.try_consume(f"new-{index}", amount=1, now=5.0)
+
+        self.assertEqual(limiter.tracked_tenants, 52)
+        self.assertFalse(limiter.try_consume("drained", amount=60, now=5.0))
+        self.assertTrue(limiter.try_consume("drained", amount=50, now=5.0))
+
+    def test_memory_stays_flat_under_unique_tenant_spray(self) -> None:
+        limiter = TokenRateLimiter(
+            config=GatewayConfig(tenant_policies={}, rate_limit_max_tenants=10_000)
+        )
+
+        def spray(start: int, count: int) -> None:
+            for index in range(start, start + count):
+                limiter.try_consume(f"sprayed-{index}", amount=10, now=index * 1e-6)
+
+        spray(0, 1_000_000)
+        self.assertLessEqual(limiter.tracked_tenants, 10_000)
+        tracemalloc.start()
+        try:
+            # One full turnover first, so every live bucket was allocated under tracing.
+            spray(1_000_000, 10_000)
+            before, _ = tracemalloc.get_traced_memory()
+            spray(1_010_000, 40_000)
+            after, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        # Well under one byte per new tenant.
+        self.assertLess(after - before, 16 * 1024)
+
+    def test_idle_eviction_bounds_a_spray_spread_over_time(self) -> None:
+        limiter = TokenRateLimiter(
+            config=GatewayConfig(tenant_policies={}, rate_limit_max_tenants=10_000)
+        )
+
+        # 1000 new tenants per second for 200 seconds; each bucket refills within
+        # a second, so idle eviction holds the store near one second of arrivals
+        # and the 10,000 cap is never reached.
+        peak = 0
+        for index in range(200_000):
+            limiter.try_consume(f"sprayed-{index}", amount=10, now=index * 1e-3)
+            peak = max(peak, limiter.tracked_tenants)
+        self.assertLess(peak, 1_500)
@@ -0,0 +1,68 @@
+import asyncio
+import unittest
+
+from modelop.identity import RequestCoalescer
+from modelop.response_cache import ResponseCache, response_cache_key
+
+
+class ResponseCacheTests(unittest.TestCase):
+    def test_entries_expire_and_capacity_evicts_least_recent(self) -> None:
+        cache: ResponseCache[str] = ResponseCache(capacity=2, ttl_seconds=10.0)
+        cache.put(b"a", "A", now=0.0)
+        cache.put(b"b", "B", now=1.0)
+        self.assertEqual(cache.get(b"a", now=2.0), "A")
+        cache.put(b"c", "C", now=3.0)  # evicts b, the least recently used
+
+        self.assertIsNone(cache.get(b"b", now=3.0))
+        self.assertEqual(cache.get(b"c", now=3.0), "C")
+        self.assertIsNone(cache.get(b"a", now=10.0))
+        self.assertEqual(len(cache), 1)
+
+    def test_key_isolates_tenants(self) -> None:
+        first = response_cache_key("tenant-a", "adapter-x", "hello", 8)
+        self.assertEqual(first, response_cache_key("tenant-a", "adapter-x", "hello", 8))
+        self.assertNotEqual(first, response_cache_key("tenant-b", "adapter-x", "hello", 8))
+        self.assertNotEqual(first, response_cache_key("tenant-a", "adapter-x", "hello", 9))
+
+
+class RequestCoalescerTests(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_callers_share_one_run(self) -> None:
+        coalescer: RequestCoalescer[int] = RequestCoalescer()
+        runs = 0
+
+        async def produce() -> int:
+            nonlocal runs
+            runs += 1
+            await asyncio.sleep(0.01)
+            return 42
+
+        results = await asyncio.gather(*(coalescer.run(b"k", produce) for _ in range(5)))
+
+        self.assertEqual(runs, 1)
+        self.assertEqual([value for value, _ in results], [42] * 5)
+        self.assertEqual(sum(coalesced for _, coalesced in results), 4)
+        self.assertEqual(coalescer.inflight_count, 0)
+
+    async def test_waiter_takes_over_when_leader_fails(self) -> None:
+        coalescer: RequestCoalescer[str] = RequestCoalescer()
+        attempts: list[str] = []
+
+        async def produce(name: str) -> str:
+            attempts.append(name)
+            await asyncio.sleep(0.01)
+            if name == "leader":
+                raise RuntimeError("leader failed")
+            return name
+
+        leader = asyncio.create_task(coalescer.run(b"k", lambda: produce("leader")))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(coalescer.run(b"k", lambda: produce("waiter")))
+
+        with self.assertRaises(RuntimeError):
+            await leader
+        self.assertEqual(await waiter, ("waiter", False))
+        self.assertEqual(attempts, ["leader", "waiter"])
+
+
+if __name__ == "__main__":
+    unittest.main()
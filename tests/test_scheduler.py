@@ -5,7 +5,8 @@ import time
 import unittest
 
 from modelop.capacity import KVPressureTracker
-from modelop.scheduler import ContinuousBatchingScheduler, InferenceJob
+from modelop.queueing import EarliestDeadlineJobQueue
+from modelop.scheduler import ContinuousBatchingScheduler, DeadlineExceededError, InferenceJob
 from modelop.telemetry import Telemetry
 
 
@@ -70,3 +71,326 @@ class ContinuousBatchingSchedulerTests(unittest.IsolatedAsyncioTestCase):
         self.assertLess(req_3.queue_time_seconds, 0.05)
         self.assertLess(req_3.total_time_seconds, req_1.total_time_seconds)
         self.assertEqual(kv_tracker.active_bytes, 0)
+
+    async def test_stream_channel_backpressure_pauses_sequence(self) -> None:
+        kv_tracker = KVPressureTracker(kv_budget_bytes=1_000_000)
+        scheduler = ContinuousBatchingScheduler(
+            max_active_sequences=2,
+            queue_capacity=10,
+            decode_step_seconds=0.001,
+            idle_sleep_seconds=0.001,
+            kv_tracker=kv_tracker,
+            telemetry=Telemetry(),
+        )
+        channel: asyncio.Queue[str] = asyncio.Queue(maxsize=1)
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        job = InferenceJob(
+            request_id="req-stream",
+            tenant_id="tenant-a",
+            adapter_id="adapter-x",
+            prompt="hello",
+            prompt_tokens=2,
+            max_new_tokens=3,
+            estimated_total_tokens=5,
+            admitted_at=time.monotonic(),
+            enqueued_at=time.monotonic(),
+            future=future,
+            token_channel=channel,
+        )
+
+        await scheduler.start()
+        try:
+            self.assertTrue(await scheduler.enqueue(job))
+            await asyncio.sleep(0.05)
+            # The unread channel holds one token; decoding waits for the consumer.
+            self.assertFalse(future.done())
+            self.assertEqual(channel.qsize(), 1)
+
+            tokens = [await asyncio.wait_for(channel.get(), timeout=1.0) for _ in range(3)]
+            result = await asyncio.wait_for(future, timeout=1.0)
+        finally:
+            await scheduler.stop()
+
+        self.assertEqual(tokens, ["tok1", "tok2", "tok3"])
+        self.assertEqual(result.completion_tokens, 3)
+        self.assertEqual(result.output, "")
+
+    async def test_long_prompt_prefill_is_chunked_without_stalling_decode(self) -> None:
+        kv_tracker = KVPressureTracker(kv_budget_bytes=1_000_000)
+        scheduler = ContinuousBatchingScheduler(
+            max_active_sequences=2,
+            queue_capacity=10,
+            decode_step_seconds=0.01,
+            idle_sleep_seconds=0.001,
+            kv_tracker=kv_tracker,
+            telemetry=Telemetry(),
+            tick_token_budget=4,
+        )
+        loop = asyncio.get_running_loop()
+        now = time.monotonic()
+        short = InferenceJob(
+            request_id="req-short",
+            tenant_id="tenant-a",
+            adapter_id="adapter-x",
+            prompt="hi",
+            prompt_tokens=1,
+            max_new_tokens=6,
+            estimated_total_tokens=7,
+            admitted_at=now,
+            enqueued_at=now,
+            future=loop.create_future(),
+        )
+        long = InferenceJob(
+            request_id="req-long",
+            tenant_id="tenant-a",
+            adapter_id="adapter-x",
+            prompt="x" * 48,
+            prompt_tokens=12,
+            max_new_tokens=1,
+            estimated_total_tokens=13,
+            admitted_at=now,
+            enqueued_at=now,
+            future=loop.create_future(),
+        )
+
+        await scheduler.start()
+        try:
+            self.assertTrue(await scheduler.enqueue(short))
+            self.assertTrue(await scheduler.enqueue(long))
+            short_result, long_result = await asyncio.wait_for(
+                asyncio.gather(short.future, long.future), timeout=5.0
+            )
+        finally:
+            await scheduler.stop()
+
+        # 12 prompt tokens at <=3 per tick (1 of 4 goes to the running decode) -> 4 ticks.
+        self.assertGreaterEqual(long_result.ttft_seconds, 3.5 * 0.01)
+        self.assertLess(short_result.ttft_seconds, long_result.ttft_seconds / 2)
+        self.assertEqual(short_result.completion_tokens, 6)
+        self.assertLess(short_result.avg_tpot_seconds, 0.025)
+
+    async def test_preempts_under_kv_pressure_and_resumes_with_progress(self) -> None:
+        class RecordingTelemetry(Telemetry):
+            def __init__(self) -> None:
+                super().__init__()
+                self.preemptions: list[tuple[str, int]] = []
+
+            def record_preemption(self, tenant_id: str, recompute_tokens: int) -> None:
+                self.preemptions.append((tenant_id, recompute_tokens))
+
+        # 1 byte per token: two 4-token prompts plus 8 new tokens each need 24 > 20 bytes.
+        kv_tracker = KVPressureTracker(kv_budget_bytes=20)
+        telemetry = RecordingTelemetry()
+        scheduler = ContinuousBatchingScheduler(
+            max_active_sequences=2,
+            queue_capacity=10,
+            decode_step_seconds=0.001,
+            idle_sleep_seconds=0.001,
+            kv_tracker=kv_tracker,
+            telemetry=telemetry,
+            kv_bytes_per_token=1,
+            kv_growth_tokens=2,
+        )
+        loop = asyncio.get_running_loop()
+        jobs = []
+        for request_id in ("req-a", "req-b"):
+            self.assertTrue(kv_tracker.try_reserve(request_id, bytes_needed=4, shed_threshold=1.0))
+            jobs.append(
+                InferenceJob(
+                    request_id=request_id,
+                    tenant_id="tenant-a",
+                    adapter_id="adapter-x",
+                    prompt="x" * 16,
+                    prompt_tokens=4,
+                    max_new_tokens=8,
+                    estimated_total_tokens=12,
+                    admitted_at=time.monotonic(),
+                    enqueued_at=time.monotonic(),
+                    future=loop.create_future(),
+                )
+            )
+
+        await scheduler.start()
+        try:
+            for job in jobs:
+                self.assertTrue(await scheduler.enqueue(job))
+            results = await asyncio.wait_for(
+                asyncio.gather(*(job.future for job in jobs)), timeout=5.0
+            )
+        finally:
+            await scheduler.stop()
+
+        self.assertEqual([result.completion_tokens for result in results], [8, 8])
+        self.assertEqual(results[0].output.split()[-1], "tok8")
+        self.assertEqual(len(telemetry.preemptions), 1)
+        # 4 prompt tokens plus the 6 generated before KV ran out are recomputed.
+        self.assertEqual(telemetry.preemptions[0], ("tenant-a", 10))
+        self.assertEqual(kv_tracker.active_bytes, 0)
+
+    async def test_preempted_job_resumes_after_its_deadline_passes(self) -> None:
+        class RecordingTelemetry(Telemetry):
+            def __init__(self) -> None:
+                super().__init__()
+                self.deadlines: list[str] = []
+                self.preemptions = 0
+
+            def record_deadline_outcome(self, tenant_id: str, result: str) -> None:
+                self.deadlines.append(result)
+
+            def record_preemption(self, tenant_id: str, recompute_tokens: int) -> None:
+                self.preemptions += 1
+
+        clock = [0.0]
+        kv_tracker = KVPressureTracker(kv_budget_bytes=20)
+        telemetry = RecordingTelemetry()
+        scheduler = ContinuousBatchingScheduler(
+            max_active_sequences=2,
+            queue_capacity=10,
+            decode_step_seconds=0.01,
+            idle_sleep_seconds=0.0,
+            kv_tracker=kv_tracker,
+            telemetry=telemetry,
+            kv_bytes_per_token=1,
+            kv_growth_tokens=2,
+            clock=lambda: clock[0],
+        )
+        loop = asyncio.get_running_loop()
+        jobs = []
+        for request_id in ("req-a", "req-b"):
+            self.assertTrue(kv_tracker.try_reserve(request_id, bytes_needed=4, shed_threshold=1.0))
+            job = InferenceJob(
+                request_id=request_id,
+                tenant_id="tenant-a",
+                adapter_id="adapter-x",
+                prompt="x" * 16,
+                prompt_tokens=4,
+                max_new_tokens=8,
+                estimated_total_tokens=12,
+                admitted_at=0.0,
+                enqueued_at=0.0,
+                future=loop.create_future(),
+                # Both start at once, but the preempted one resumes well after this.
+                deadline_at=0.05,
+            )
+            self.assertTrue(scheduler.enqueue_nowait(job))
+            jobs.append(job)
+
+        while (seconds := scheduler.start_tick(now=clock[0])) is not None:
+            clock[0] += max(seconds, 0.01)
+            scheduler.finish_tick(now=clock[0])
+
+        self.assertEqual(telemetry.preemptions, 1)
+        self.assertEqual([job.future.result().completion_tokens for job in jobs], [8, 8])
+        self.assertNotIn("dropped", telemetry.deadlines)
+        self.assertEqual(kv_tracker.active_bytes, 0)
+
+    async def test_enqueue_wakes_idle_loop_and_ticks_hold_period(self) -> None:
+        class RecordingTelemetry(Telemetry):
+            def __init__(self) -> None:
+                super().__init__()
+                self.tick_durations: list[float] = []
+
+            def observe_tick_duration(self, value: float) -> None:
+                self.tick_durations.append(value)
+
+        kv_tracker = KVPressureTracker(kv_budget_bytes=1_000_000)
+        telemetry = RecordingTelemetry()
+        # An idle poll this long would blow the timeout; only the wake-up can start work.
+        scheduler = ContinuousBatchingScheduler(
+            max_active_sequences=2,
+            queue_capacity=10,
+            decode_step_seconds=0.01,
+            idle_sleep_seconds=10.0,
+            kv_tracker=kv_tracker,
+            telemetry=telemetry,
+        )
+        await scheduler.start()
+        try:
+            await asyncio.sleep(0.02)
+            self.assertTrue(kv_tracker.try_reserve("req-1", bytes_needed=100, shed_threshold=0.99))
+            job = InferenceJob(
+                request_id="req-1",
+                tenant_id="tenant-a",
+                adapter_id="adapter-x",
+                prompt="hello",
+                prompt_tokens=2,
+                max_new_tokens=20,
+                estimated_total_tokens=22,
+                admitted_at=time.monotonic(),
+                enqueued_at=time.monotonic(),
+                future=asyncio.get_running_loop().create_future(),
+            )
+            self.assertTrue(await scheduler.enqueue(job))
+            result = await asyncio.wait_for(job.future, timeout=2.0)
+        finally:
+            await scheduler.stop()
+
+        self.assertLess(result.queue_time_seconds, 0.05)
+        self.assertEqual(result.completion_tokens, 20)
+        # Ticks are scheduled on an absolute clock, so bookkeeping does not stretch the period.
+        mean_tick = sum(telemetry.tick_durations) / len(telemetry.tick_durations)
+        self.assertLess(mean_tick, 0.013)
+        self.assertLess(result.total_time_seconds, 21 * 0.013)
+
+    async def test_edf_serves_urgent_job_first_and_drops_missed_deadline(self) -> None:
+        class RecordingTelemetry(Telemetry):
+            def __init__(self) -> None:
+                super().__init__()
+                self.deadlines: list[tuple[str, str]] = []
+
+            def record_deadline_outcome(self, tenant_id: str, result: str) -> None:
+                self.deadlines.append((tenant_id, result))
+
+        kv_tracker = KVPressureTracker(kv_budget_bytes=1_000_000)
+        telemetry = RecordingTelemetry()
+        scheduler = ContinuousBatchingScheduler(
+            max_active_sequences=1,
+            queue_capacity=10,
+            decode_step_seconds=0.005,
+            idle_sleep_seconds=0.001,
+            kv_tracker=kv_tracker,
+            telemetry=telemetry,
+            queue=EarliestDeadlineJobQueue(capacity=10),
+        )
+        loop = asyncio.get_running_loop()
+        now = time.monotonic()
+
+        def make_job(request_id: str, tenant_id: str, deadline_at: float | None) -> InferenceJob:
+            self.assertTrue(kv_tracker.try_reserve(request_id, bytes_needed=10, shed_threshold=1.0))
+            return InferenceJob(
+                request_id=request_id,
+                tenant_id=tenant_id,
+                adapter_id="adapter-x",
+                prompt="hello",
+                prompt_tokens=2,
+                max_new_tokens=10,
+                estimated_total_tokens=12,
+                admitted_at=now,
+                enqueued_at=now,
+                future=loop.create_future(),
+                deadline_at=deadline_at,
+            )
+
+        running = make_job("running", "tenant-batch", None)
+        batch = make_job("batch", "tenant-batch", None)
+        urgent = make_job("urgent", "tenant-rt", now + 1.0)
+        expired = make_job("expired", "tenant-rt", now + 0.01)  # passes while "running" decodes
+        await scheduler.enqueue(running)
+        await scheduler.start()
+        try:
+            await asyncio.sleep(0)
+            for job in (batch, urgent, expired):
+                self.assertTrue(await scheduler.enqueue(job))
+            await asyncio.wait_for(
+                asyncio.gather(running.future, batch.future, urgent.future, return_exceptions=True),
+                timeout=5.0,
+            )
+        finally:
+            await scheduler.stop()
+
+        self.assertIsInstance(expired.future.exception(), DeadlineExceededError)
+        self.assertLess(urgent.started_at, batch.started_at)
+        self.assertEqual(
+            sorted(telemetry.deadlines), [("tenant-rt", "dropped"), ("tenant-rt", "met")]
+        )
+        self.assertEqual(kv_tracker.active_bytes, 0)
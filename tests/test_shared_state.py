@@ -0,0 +1,208 @@
+import asyncio
+import multiprocessing
+import os
+import unittest
+import uuid
+
+from modelop.config import GatewayConfig, TenantPolicy
+from modelop.shared_state import (
+    SharedInflightRequestRegistry,
+    SharedKVTracker,
+    SharedStateSegment,
+    SharedStateUnavailableError,
+    SharedTokenRateLimiter,
+)
+
+_CONFIG = GatewayConfig(
+    tenant_policies={
+        "tenant-a": TenantPolicy(
+            rate_tokens_per_sec=0.0, burst_tokens=1000.0, default_adapter_id="adapter-x"
+        )
+    }
+)
+
+
+def _reserve_and_die(name: str, owner: int) -> None:
+    segment = SharedStateSegment(name=name, kv_budget_bytes=1000, owner=owner)
+    SharedKVTracker(segment).try_reserve("req-lost", bytes_needed=600, shed_threshold=0.9)
+    os._exit(0)
+
+
+def _consume_worker(name: str, owner: int, attempts: int, results) -> None:
+    segment = SharedStateSegment(name=name, kv_budget_bytes=1000, owner=owner)
+    limiter = SharedTokenRateLimiter(config=_CONFIG, segment=segment)
+    results.put(sum(limiter.try_consume("tenant-a", amount=10) for _ in range(attempts)))
+    segment.close()
+
+
+class SharedStateTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.name = f"modelop-test-{uuid.uuid4().hex[:12]}"
+        self.owner = os.getpid()
+        self.segment = self._open()
+
+    def tearDown(self) -> None:
+        self.segment.close()
+        self.segment.unlink()
+
+    def _open(self, owner: int | None = None, **kwargs) -> SharedStateSegment:
+        return SharedStateSegment(
+            name=self.name, kv_budget_bytes=1000, owner=owner or self.owner, **kwargs
+        )
+
+    def test_handles_share_buckets_and_kv_budget(self) -> None:
+        other = self._open()
+        try:
+            first = SharedTokenRateLimiter(config=_CONFIG, segment=self.segment)
+            second = SharedTokenRateLimiter(config=_CONFIG, segment=other)
+            self.assertTrue(first.try_consume("tenant-a", amount=600, now=1.0))
+            self.assertFalse(second.try_consume("tenant-a", amount=600, now=1.0))
+            second.refund("tenant-a", amount=200)
+            self.assertTrue(second.try_consume("tenant-a", amount=600, now=1.0))
+
+            kv_first = SharedKVTracker(self.segment)
+            kv_second = SharedKVTracker(other)
+            self.assertTrue(kv_first.try_reserve("req-1", bytes_needed=600, shed_threshold=0.9))
+            self.assertFalse(kv_second.try_reserve("req-2", bytes_needed=400, shed_threshold=0.9))
+            self.assertEqual(kv_second.active_bytes, 600)
+            kv_second.release("req-1")  # not reserved by this worker; ignored
+            kv_first.release("req-1")
+            self.assertTrue(kv_second.try_reserve("req-2", bytes_needed=400, shed_threshold=0.9))
+        finally:
+            other.close()
+
+    def test_inflight_ids_are_unique_across_handles(self) -> None:
+        self.segment.close()
+        self.segment = self._open(owner=self.owner + 1, inflight_capacity=8)
+        other = self._open(owner=self.owner + 1, inflight_capacity=8)
+        try:
+            first = SharedInflightRequestRegistry(self.segment)
+            second = SharedInflightRequestRegistry(other)
+
+            async def scenario() -> None:
+                ids = [f"req-{index}" for index in range(7)]
+                for request_id in ids:
+                    self.assertTrue(await first.claim(request_id))
+                self.assertFalse(await second.claim("req-3"))
+                # Deleting from the middle of probe chains must keep later IDs findable.
+                for request_id in ids[::2]:
+                    await second.release(request_id)
+                for request_id in ids[1::2]:
+                    self.assertFalse(await second.claim(request_id))
+                for request_id in ids[::2]:
+                    self.assertTrue(await second.claim(request_id))
+
+            asyncio.run(scenario())
+        finally:
+            other.close()
+
+    def test_segment_from_another_launch_is_reset(self) -> None:
+        kv_tracker = SharedKVTracker(self.segment)
+        self.assertTrue(kv_tracker.try_reserve("req-1", bytes_needed=500, shed_threshold=0.9))
+        stale = self._open(owner=self.owner + 1)
+        try:
+            self.assertEqual(SharedKVTracker(stale).active_bytes, 0)
+        finally:
+            stale.close()
+
+    def test_idle_buckets_are_evicted_and_a_full_table_is_unavailable(self) -> None:
+        self.segment.close()
+        self.segment = self._open(owner=self.owner + 1, tenant_capacity=4)
+        limiter = SharedTokenRateLimiter(config=_CONFIG, segment=self.segment)
+        # tenant-a never refills, so its slot is never handed on.
+        self.assertTrue(limiter.try_consume("tenant-a", amount=10, now=0.0))
+        for index in range(3):
+            self.assertTrue(limiter.try_consume(f"spray-{index}", amount=10, now=0.0))
+
+        with self.assertRaises(SharedStateUnavailableError):
+            limiter.try_consume("late", amount=10, now=0.5)
+
+        # The default policy refills the spray buckets within a second.
+        for index in range(3, 6):
+            self.assertTrue(limiter.try_consume(f"spray-{index}", amount=10, now=2.0))
+        self.assertFalse(limiter.try_consume("tenant-a", amount=991, now=2.0))
+
+    def test_busy_lock_sheds_instead_of_blocking(self) -> None:
+        other = self._open(lock_timeout_seconds=0.01)
+        try:
+            limiter = SharedTokenRateLimiter(config=_CONFIG, segment=other)
+            kv_tracker = SharedKVTracker(other)
+            registry = SharedInflightRequestRegistry(other)
+            with self.segment.locked():
+                with self.assertRaises(SharedStateUnavailableError):
+                    limiter.try_consume("tenant-a", amount=10, now=0.0)
+                self.assertFalse(kv_tracker.try_reserve("req-1", bytes_needed=1, shed_threshold=1.0))
+                with self.assertRaises(SharedStateUnavailableError):
+                    asyncio.run(registry.claim("req-1"))
+            self.assertTrue(kv_tracker.try_reserve("req-1", bytes_needed=1, shed_threshold=1.0))
+        finally:
+            other.close()
+
+    def test_releases_under_a_busy_lock_do_not_block_the_event_loop(self) -> None:
+        other = self._open()
+        try:
+            limiter = SharedTokenRateLimiter(config=_CONFIG, segment=other)
+            kv_tracker = SharedKVTracker(other)
+            registry = SharedInflightRequestRegistry(other)
+
+            async def scenario() -> None:
+                self.assertTrue(limiter.try_consume("tenant-a", amount=1000, now=1.0))
+                self.assertTrue(
+                    kv_tracker.try_reserve("req-1", bytes_needed=600, shed_threshold=0.9)
+                )
+                self.assertTrue(await registry.claim("req-1"))
+                with self.segment.locked():
+                    released = asyncio.create_task(registry.release("req-1"))
+                    kv_tracker.release("req-1")
+                    limiter.refund("tenant-a", amount=1000)
+                    # The loop keeps running while another worker holds the lock.
+                    await asyncio.sleep(0.02)
+                    self.assertFalse(released.done())
+                    self.assertEqual(kv_tracker.active_bytes, 600)
+                await released
+                await asyncio.sleep(0.01)
+                self.assertEqual(kv_tracker.active_bytes, 0)
+                self.assertTrue(limiter.try_consume("tenant-a", amount=1000, now=1.0))
+                self.assertTrue(await registry.claim("req-1"))
+
+            asyncio.run(scenario())
+        finally:
+            other.close()
+
+    def test_worker_utilization_counts_only_this_workers_reservations(self) -> None:
+        kv_tracker = SharedKVTracker(self.segment)
+        with self.segment.locked():
+            self.segment.set_kv_active_bytes(900)  # held by other workers
+        self.assertTrue(kv_tracker.try_reserve("req-1", bytes_needed=50, shed_threshold=1.0))
+        self.assertAlmostEqual(kv_tracker.utilization_ratio, 0.95)
+        self.assertAlmostEqual(kv_tracker.worker_utilization_ratio, 0.05)
+
+    def test_kv_bytes_of_a_dead_worker_are_reclaimed(self) -> None:
+        context = multiprocessing.get_context("fork")
+        worker = context.Process(target=_reserve_and_die, args=(self.name, self.owner))
+        worker.start()
+        worker.join(timeout=10)
+        kv_tracker = SharedKVTracker(self.segment)
+        self.assertEqual(kv_tracker.active_bytes, 600)
+
+        self.assertTrue(kv_tracker.try_reserve("req-1", bytes_needed=400, shed_threshold=0.9))
+        self.assertEqual(kv_tracker.active_bytes, 400)
+
+    def test_concurrent_processes_never_overdraw_a_bucket(self) -> None:
+        context = multiprocessing.get_context("fork")
+        results = context.Queue()
+        workers = [
+            context.Process(target=_consume_worker, args=(self.name, self.owner, 60, results))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        granted = sum(results.get(timeout=10) for _ in workers)
+        for worker in workers:
+            worker.join(timeout=10)
+
+        self.assertEqual(granted, 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
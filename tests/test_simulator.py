@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from modelop.config import GatewayConfig, TenantPolicy
+from modelop.simulator import (
+    GatewaySimulator,
+    SimulatedArrival,
+    TenantMix,
+    load_trace,
+    poisson_arrivals,
+)
+
+_POLICIES = {
+    "tenant-a": TenantPolicy(
+        rate_tokens_per_sec=1e9, burst_tokens=1e9, default_adapter_id="adapter-a"
+    )
+}
+
+
+class GatewaySimulatorTests(unittest.TestCase):
+    def test_light_load_runs_in_virtual_time(self) -> None:
+        config = GatewayConfig(
+            tenant_policies=_POLICIES,
+            scheduler_decode_step_seconds=0.02,
+            scheduler_prefill_token_seconds=0.0,
+        )
+        arrivals = [
+            SimulatedArrival(
+                at=float(second), tenant_id="tenant-a", prompt_tokens=100, max_new_tokens=10
+            )
+            for second in range(100)
+        ]
+
+        report = GatewaySimulator(config).run(arrivals)
+
+        self.assertEqual((report.offered, report.completed, report.unfinished), (100, 100, 0))
+        # One tick emits the first token and nine more follow; nothing ever queues.
+        self.assertAlmostEqual(max(report.ttft_seconds), 0.02)
+        self.assertAlmostEqual(max(report.tpot_seconds), 0.02)
+        self.assertGreater(report.simulated_seconds, 99.0)
+        self.assertLess(report.wall_seconds, 5.0)
+
+    def test_sweeping_shed_threshold_trades_kv_sheds_for_queueing(self) -> None:
+        mix = [TenantMix("tenant-a", weight=1.0, mean_prompt_tokens=256, mean_new_tokens=64)]
+        summaries = []
+        for shed_threshold in (0.3, 0.9):
+            config = GatewayConfig(
+                tenant_policies=_POLICIES,
+                shed_threshold=shed_threshold,
+                kv_budget_bytes=64 * 16 * 1024,
+                kv_bytes_per_token=1024,
+                scheduler_max_active_sequences=8,
+            )
+            arrivals = poisson_arrivals(200.0, duration_seconds=5.0, mix=mix, seed=7)
+            summaries.append(GatewaySimulator(config).run(arrivals).summary())
+
+        strict, loose = summaries
+        self.assertEqual(strict["offered"], loose["offered"])
+        self.assertGreater(
+            strict["shed_rate_by_reason"]["kv_pressure"], loose["shed_rate_by_reason"]["kv_pressure"]
+        )
+        self.assertLess(strict["queue_seconds"]["p90"], loose["queue_seconds"]["p90"])
+
+    def test_adaptive_rate_control_sheds_at_the_bucket_instead_of_kv(self) -> None:
+        policy = TenantPolicy(
+            rate_tokens_per_sec=4000.0, burst_tokens=4000.0, default_adapter_id="adapter-a"
+        )
+        mix = [
+            TenantMix("tenant-a", weight=1.0, mean_prompt_tokens=256, mean_new_tokens=64),
+            TenantMix("tenant-b", weight=1.0, mean_prompt_tokens=256, mean_new_tokens=64),
+        ]
+        summaries = []
+        for adaptive in (False, True):
+            config = GatewayConfig(
+                tenant_policies={"tenant-a": policy, "tenant-b": policy},
+                kv_budget_bytes=4096 * 1024,
+                kv_bytes_per_token=1024,
+                scheduler_max_active_sequences=16,
+                rate_limit_adaptive=adaptive,
+            )
+            arrivals = poisson_arrivals(100.0, duration_seconds=20.0, mix=mix, seed=7)
+            summaries.append(GatewaySimulator(config).run(arrivals).summary())
+
+        static, adaptive = summaries
+        self.assertNotIn("rate_limit", static["shed_rate_by_reason"])
+        self.assertGreater(adaptive["shed_rate_by_reason"]["rate_limit"], 0.0)
+        self.assertLess(
+            adaptive["shed_rate_by_reason"]["kv_pressure"],
+            static["shed_rate_by_reason"]["kv_pressure"] / 2,
+        )
+        self.assertGreaterEqual(adaptive["completed"], static["completed"])
+
+    def test_loads_json_lines_trace(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "trace.jsonl"
+            path.write_text(
+                json.dumps(
+                    {"at": 0.5, "tenant_id": "tenant-a", "prompt_tokens": 4, "max_new_tokens": 2}
+                )
+                + "\n\n"
+            )
+            self.assertEqual(
+                list(load_trace(path)),
+                [SimulatedArrival(at=0.5, tenant_id="tenant-a", prompt_tokens=4, max_new_tokens=2)],
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import asyncio
+import time
+import unittest
+
+from modelop.capacity import KVPressureTracker
+from modelop.scheduler import ContinuousBatchingScheduler, InferenceJob
+from modelop.speculative import SpeculativeDecoder
+from modelop.telemetry import Telemetry
+
+
+class SpeculativeDecoderTests(unittest.TestCase):
+    def test_sampled_acceptance_matches_expected_tokens_per_step(self) -> None:
+        decoder = SpeculativeDecoder(
+            draft_tokens=4,
+            draft_token_seconds=0.001,
+            acceptance_rates={"adapter-good": 0.8, "adapter-bad": 0.2},
+        )
+        for adapter_id, acceptance in (("adapter-good", 0.8), ("adapter-bad", 0.2)):
+            mean = sum(decoder.accepted_drafts(adapter_id) + 1 for _ in range(20_000)) / 20_000
+            expected = SpeculativeDecoder.expected_tokens_per_step(acceptance, 4)
+            self.assertAlmostEqual(mean, expected, delta=0.05)
+        self.assertAlmostEqual(decoder.draft_seconds, 0.004)
+        self.assertEqual(SpeculativeDecoder.expected_tokens_per_step(1.0, 4), 5.0)
+
+
+class SpeculativeSchedulingTests(unittest.IsolatedAsyncioTestCase):
+    async def test_accepted_drafts_cut_ticks_and_stream_in_order(self) -> None:
+        class RecordingTelemetry(Telemetry):
+            def __init__(self) -> None:
+                super().__init__()
+                self.accepted_per_tick: list[int] = []
+
+            def observe_accepted_tokens_per_tick(self, value: int) -> None:
+                self.accepted_per_tick.append(value)
+
+        # 1 byte per token; draft KV must fit alongside the committed token.
+        kv_tracker = KVPressureTracker(kv_budget_bytes=1_000)
+        telemetry = RecordingTelemetry()
+        scheduler = ContinuousBatchingScheduler(
+            max_active_sequences=2,
+            queue_capacity=10,
+            decode_step_seconds=0.001,
+            idle_sleep_seconds=0.001,
+            kv_tracker=kv_tracker,
+            telemetry=telemetry,
+            kv_bytes_per_token=1,
+            kv_growth_tokens=2,
+            speculative=SpeculativeDecoder(
+                draft_tokens=3, draft_token_seconds=0.0, default_acceptance=1.0
+            ),
+        )
+        loop = asyncio.get_running_loop()
+        jobs = []
+        for request_id, channel in (("req-plain", None), ("req-stream", asyncio.Queue(maxsize=8))):
+            self.assertTrue(kv_tracker.try_reserve(request_id, bytes_needed=2, shed_threshold=1.0))
+            jobs.append(
+                InferenceJob(
+                    request_id=request_id,
+                    tenant_id="tenant-a",
+                    adapter_id="adapter-x",
+                    prompt="hello",
+                    prompt_tokens=2,
+                    max_new_tokens=8,
+                    estimated_total_tokens=10,
+                    admitted_at=time.monotonic(),
+                    enqueued_at=time.monotonic(),
+                    future=loop.create_future(),
+                    token_channel=channel,
+                )
+            )
+
+        await scheduler.start()
+        try:
+            for job in jobs:
+                self.assertTrue(await scheduler.enqueue(job))
+            results = await asyncio.wait_for(
+                asyncio.gather(*(job.future for job in jobs)), timeout=5.0
+            )
+        finally:
+            await scheduler.stop()
+
+        streamed = [jobs[1].token_channel.get_nowait() for _ in range(8)]
+        self.assertEqual(streamed, [f"tok{index}" for index in range(1, 9)])
+        self.assertEqual(results[0].output.split(), streamed)
+        self.assertEqual([result.completion_tokens for result in results], [8, 8])
+        # Every draft is accepted: 4 tokens per sequence per tick, so two decode ticks.
+        self.assertEqual(telemetry.accepted_per_tick, [6, 6])
+        self.assertEqual(kv_tracker.active_bytes, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import unittest
+
+from modelop.telemetry import Telemetry
+
+
+class TelemetryLabelTests(unittest.TestCase):
+    def test_tenant_labels_beyond_budget_collapse_to_other(self) -> None:
+        telemetry = Telemetry(max_tenant_labels=2, tenant_labels=["label-configured"])
+        for tenant_id in ("label-a", "label-b", "label-c", "label-d", "label-configured"):
+            telemetry.record_request_outcome(tenant_id, result="accepted", reason="accepted")
+
+        body, _ = Telemetry.scrape()
+        text = body.decode()
+        if "prometheus_client not installed" in text:
+            self.skipTest("prometheus_client is not installed")
+        for tenant_id in ("label-a", "label-b", "label-configured", "other"):
+            self.assertIn(f'tenant_id="{tenant_id}"', text)
+        self.assertNotIn('tenant_id="label-c"', text)
+        self.assertNotIn('tenant_id="label-d"', text)
+
+    def test_adapter_labels_beyond_budget_collapse_to_other(self) -> None:
+        telemetry = Telemetry(max_adapter_labels=1, adapter_labels=["swap-configured"])
+        telemetry.record_adapter_swap("swap-configured", evicted_adapter_id=None)
+        telemetry.record_adapter_swap("swap-a", evicted_adapter_id=None)
+        telemetry.record_adapter_swap("swap-b", evicted_adapter_id="swap-a")
+        telemetry.record_adapter_swap("swap-c", evicted_adapter_id="swap-configured")
+        telemetry.observe_adapter_load_wait("swap-d", 0.01)
+
+        body, _ = Telemetry.scrape()
+        text = body.decode()
+        if "prometheus_client not installed" in text:
+            self.skipTest("prometheus_client is not installed")
+        for adapter_id in ("swap-configured", "swap-a", "other"):
+            self.assertIn(f'adapter_swaps_total{{adapter_id="{adapter_id}"}}', text)
+        for adapter_id in ("swap-b", "swap-c", "swap-d"):
+            self.assertNotIn(f'adapter_id="{adapter_id}"', text)
+        # swap-b and swap-c are both resident under "other".
+        self.assertIn('adapter_resident{adapter_id="other"} 2.0', text)
+        self.assertIn('adapter_resident{adapter_id="swap-a"} 0.0', text)
+
+    def test_speculation_adapter_labels_share_the_budget(self) -> None:
+        telemetry = Telemetry(max_adapter_labels=1)
+        for adapter_id in ("draft-a", "draft-b", "draft-c"):
+            telemetry.record_speculation(adapter_id, drafted=4, accepted=3)
+
+        body, _ = Telemetry.scrape()
+        text = body.decode()
+        if "prometheus_client not installed" in text:
+            self.skipTest("prometheus_client is not installed")
+        self.assertIn('speculative_draft_tokens_total{adapter_id="draft-a"} 4.0', text)
+        self.assertIn('speculative_accepted_tokens_total{adapter_id="other"} 6.0', text)
+        self.assertNotIn('adapter_id="draft-b"', text)
+
+
+if __name__ == "__main__":
+    unittest.main()
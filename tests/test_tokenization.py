@@ -0,0 +1,72 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from modelop.tokenization import (
+    BPETokenizer,
+    CachedTokenCounter,
+    HeuristicTokenizer,
+    TokenizerRegistry,
+)
+
+_CORPUS = [
+    "The quick brown fox jumps over the lazy dog. " * 20,
+    "def handler(request):\n    return request.tenant_id\n" * 20,
+    "Tenants share the batch; the scheduler refills slots every tick. " * 20,
+]
+
+
+class BPETokenizerTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.tokenizer = BPETokenizer.train(_CORPUS, vocab_size=320)
+
+    def test_round_trips_and_counts_match_encoding(self) -> None:
+        for text in ["The lazy fox returns.", "def f(x):\n    return x", "東京の天気は晴れ", ""]:
+            ids = self.tokenizer.encode(text)
+            self.assertEqual(self.tokenizer.decode(ids), text)
+            self.assertEqual(self.tokenizer.count(text), len(ids))
+
+    def test_merges_compress_seen_text_and_cjk_costs_more_than_heuristic(self) -> None:
+        english = "The quick brown fox jumps over the lazy dog."
+        self.assertLess(self.tokenizer.count(english), len(english.encode()) / 2)
+
+        cjk = "東京の天気は晴れです" * 4
+        self.assertGreater(self.tokenizer.count(cjk), HeuristicTokenizer().count(cjk))
+
+    def test_long_pre_tokens_are_chunked_for_merging_and_caching(self) -> None:
+        tokenizer = BPETokenizer(self.tokenizer.merges)
+        blob = "thequickbrownfox" * 2048  # one 32 KB pre-token
+
+        ids = tokenizer.encode(blob)
+        self.assertEqual(tokenizer.decode(ids), blob)
+        self.assertEqual(tokenizer.count(blob), len(ids))
+        self.assertLess(len(ids), len(blob))
+        self.assertLessEqual(max(map(len, tokenizer._word_cache)), 64)
+
+    def test_save_and_load_preserve_merges(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "merges.txt"
+            self.tokenizer.save(path)
+            loaded = BPETokenizer.load(path)
+            registry = TokenizerRegistry(adapter_specs={"adapter-code": f"bpe:{path}"})
+
+        text = "def handler(request): return request"
+        self.assertEqual(loaded.encode(text), self.tokenizer.encode(text))
+        self.assertEqual(registry.for_adapter("adapter-code").count(text), len(loaded.encode(text)))
+        self.assertEqual(registry.for_adapter("adapter-other").count(text), 9)  # ceil(36 / 4)
+
+
+class CachedTokenCounterTests(unittest.TestCase):
+    def test_lru_caches_counts_by_prompt_digest(self) -> None:
+        counter = CachedTokenCounter(HeuristicTokenizer(), capacity=2)
+
+        self.assertEqual(counter.count_tokens(["a" * 8, "b" * 8, "a" * 8]), [2, 2, 2])
+        self.assertEqual((counter.hits, counter.misses), (1, 2))
+        counter.count("c" * 8)  # evicts "b" * 8, the least recently used
+        counter.count("b" * 8)
+        self.assertEqual((counter.hits, counter.misses), (1, 4))
+
+
+if __name__ == "__main__":
+    unittest.main()
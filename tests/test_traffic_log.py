@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from modelop.traffic_log import TrafficRecord, TrafficRecorder, read_segment, read_traffic_log
+
+
+def _record(timestamp: float, tenant_id: str = "tenant-a") -> TrafficRecord:
+    return TrafficRecord(
+        timestamp=timestamp,
+        tenant_id=tenant_id,
+        adapter_id="adapter-a",
+        prompt_tokens=120,
+        max_new_tokens=32,
+        prompt_hash=2**63 + 5,
+        status=200,
+        completion_tokens=32,
+        ttft_seconds=0.25,
+        total_seconds=1.5,
+    )
+
+
+class TrafficRecorderTests(unittest.TestCase):
+    def test_round_trips_records_sorted_by_arrival(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            recorder = TrafficRecorder(directory)
+            # Records are written on completion, out of arrival order.
+            recorder.record(_record(20.0, tenant_id="tenant-ü"))
+            recorder.record(_record(10.0))
+            # Readers see every published record while the segment is still open.
+            live = list(read_segment(next(Path(directory).glob("*.bin"))))
+            recorder.close()
+            records = read_traffic_log(directory)
+
+        self.assertEqual(len(live), 2)
+        self.assertEqual([record.timestamp for record in records], [10.0, 20.0])
+        self.assertEqual(records[0], _record(10.0))
+        self.assertEqual(records[1].tenant_id, "tenant-ü")
+
+    def test_rotates_segments_and_keeps_the_newest(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            recorder = TrafficRecorder(directory, segment_bytes=1024, max_segments=2)
+            for index in range(100):
+                recorder.record(_record(float(index)))
+            recorder.close()
+            segments = sorted(Path(directory).glob("*.bin"))
+            records = read_traffic_log(directory)
+
+        self.assertEqual(len(segments), 2)
+        self.assertTrue(records)
+        self.assertLess(len(records), 100)
+        # Oldest segments are dropped whole, so what remains is the most recent run.
+        self.assertEqual(records[-1].timestamp, 99.0)
+        self.assertEqual(
+            [record.timestamp for record in records],
+            [float(index) for index in range(100 - len(records), 100)],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()